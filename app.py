@@ -60,6 +60,15 @@ def create_app(config_name='default'):
     app.register_blueprint(admin_bp)
     app.register_blueprint(student_bp)
     
+    # Per-request identity map statistics
+    from services.identity_map import log_stats
+    app.after_request(log_stats)
+    
+    # Per-request query count and database time headers
+    if Config.DB_PROFILING:
+        from services.query_profiler import add_headers
+        app.after_request(add_headers)
+    
     # Home route
     @app.route('/')
     def index():
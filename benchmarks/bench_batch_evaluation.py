@@ -0,0 +1,87 @@
+"""
+Batch Evaluation Benchmark
+Compares evaluating a class's answers one request per answer with the
+batched GenAIService.evaluate_student_answers, against a stubbed OpenAI client
+
+Usage:
+    python -m benchmarks.bench_batch_evaluation [num_answers] [--latency S] [--drop-rate R]
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+# Add project root to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.stub_openai import StubOpenAIClient
+from services.ai_cache_service import AICacheService
+from services.cache_service import LRUCache
+from services.genai_service import GenAIService
+
+QUESTION = 'Explain the difference between a process and a thread.'
+
+PHRASES = [
+    'A process has its own memory space',
+    'threads share the memory of their process',
+    'switching between threads is cheaper',
+    'a crash in one process does not affect others',
+    'threads need locks to share data safely',
+    'the operating system schedules both',
+]
+
+
+def build_answers(num_answers, seed=42):
+    """Generate student answers of 1-4 sentences"""
+    rng = random.Random(seed)
+    return [
+        '. '.join(rng.sample(PHRASES, k=rng.randint(1, 4))) + '.'
+        for _ in range(num_answers)
+    ]
+
+
+def measure(client, evaluate):
+    """Run evaluate() and return (results, seconds, calls, prompt tokens, completion tokens)"""
+    client.reset()
+    start = time.perf_counter()
+    results = evaluate()
+    elapsed = time.perf_counter() - start
+    return results, elapsed, client.calls, client.prompt_tokens, client.completion_tokens
+
+
+def run(num_answers=300, latency=0.02, drop_rate=0.0):
+    """Evaluate the same answers both ways and print a comparison"""
+    answers = build_answers(num_answers)
+    client = StubOpenAIClient(latency=latency, drop_rate=drop_rate)
+    # Without the reply cache, so both runs make every request they need
+    service = GenAIService(cache=AICacheService(enabled=False, backend=LRUCache(1, 1)))
+    service.client = client
+
+    single = measure(client, lambda: [
+        service.evaluate_student_answer(QUESTION, answer) for answer in answers
+    ])
+    batched = measure(client, lambda: service.evaluate_student_answers(QUESTION, answers))
+
+    assert len(batched[0]) == num_answers, "Batch returned a result per answer"
+    assert all(result['success'] for result in batched[0]), "Batch lost evaluations"
+
+    distinct = len(set(answer.strip() for answer in answers))
+    print(f"Evaluating {num_answers} answers ({distinct} distinct), "
+          f"stub latency {latency * 1000:.0f} ms/call, drop rate {drop_rate:.0%}")
+    print(f"{'':<12}{'time (s)':>10}{'API calls':>11}{'prompt tok':>12}{'output tok':>12}")
+    for name, (_, elapsed, calls, prompt_tokens, completion_tokens) in (('per answer', single),
+                                                                       ('batched', batched)):
+        print(f"{name:<12}{elapsed:>10.2f}{calls:>11}{prompt_tokens:>12}{completion_tokens:>12}")
+    print(f"API calls: {single[2] / batched[2]:.1f}x fewer, wall time: {single[1] / batched[1]:.1f}x faster")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('num_answers', nargs='?', type=int, default=300)
+    parser.add_argument('--latency', type=float, default=0.02, help='Stub seconds per call')
+    parser.add_argument('--drop-rate', type=float, default=0.0,
+                        help='Fraction of batch evaluations the stub leaves out')
+    args = parser.parse_args()
+    run(args.num_answers, args.latency, args.drop_rate)
@@ -0,0 +1,66 @@
+"""
+Chunked Poll Generation Benchmark
+Compares generating a multi-question poll with one request against
+concurrent requests of AI_POLL_QUESTIONS_PER_REQUEST questions over sections
+of the content, against a stubbed OpenAI client
+
+Usage:
+    python -m benchmarks.bench_chunked_poll [num_questions] [--latency S] [--seconds-per-token S]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+# Add project root to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.stub_openai import StubOpenAIClient
+from config import Config
+from services.ai_cache_service import AICacheService
+from services.cache_service import LRUCache
+from services.genai_service import GenAIService
+
+CONTENT = '\n\n'.join(
+    f'Section {i}: processes, threads, scheduling, synchronization and memory management. ' * 4
+    for i in range(8)
+)
+
+
+def measure(service, num_questions, per_request):
+    """Generate a poll with at most per_request questions per request"""
+    service.client.reset()
+    with patch.object(Config, 'AI_POLL_QUESTIONS_PER_REQUEST', per_request):
+        start = time.perf_counter()
+        result = service.generate_activity(CONTENT, 'poll', num_questions)
+        elapsed = time.perf_counter() - start
+    return elapsed, service.client.calls, service.client.completion_tokens, len(result['questions'])
+
+
+def run(num_questions=10, latency=0.5, seconds_per_token=0.005):
+    """Generate the same poll both ways and print a comparison"""
+    # Without the reply cache, so both runs wait for the model
+    service = GenAIService(cache=AICacheService(enabled=False, backend=LRUCache(1, 1)))
+    service.client = StubOpenAIClient(latency=latency, seconds_per_token=seconds_per_token)
+
+    single = measure(service, num_questions, num_questions)
+    chunked = measure(service, num_questions, Config.AI_POLL_QUESTIONS_PER_REQUEST)
+
+    print(f"Generating a {num_questions}-question poll, stub latency {latency * 1000:.0f} ms, "
+          f"{seconds_per_token * 1000:.1f} ms/token")
+    print(f"{'':<14}{'time (s)':>10}{'API calls':>11}{'output tok':>12}{'questions':>11}")
+    for name, (elapsed, calls, tokens, questions) in (('one request', single), ('chunked', chunked)):
+        print(f"{name:<14}{elapsed:>10.2f}{calls:>11}{tokens:>12}{questions:>11}")
+    print(f"Wall time: {single[0] / chunked[0]:.1f}x faster")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('num_questions', nargs='?', type=int, default=10)
+    parser.add_argument('--latency', type=float, default=0.5, help='Stub seconds before the first token')
+    parser.add_argument('--seconds-per-token', type=float, default=0.005,
+                        help='Stub seconds per completion token')
+    args = parser.parse_args()
+    run(args.num_questions, args.latency, args.seconds_per_token)
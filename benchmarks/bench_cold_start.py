@@ -0,0 +1,131 @@
+"""
+Cold Start Benchmark
+Profiles what importing the serverless entry point (api/index.py) costs, using
+`python -X importtime` in a fresh interpreter for every run
+
+Usage:
+    python -m benchmarks.bench_cold_start [runs] [--top N] [--json report.json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+ENTRY_POINT = 'api.index'
+
+# Packages that must only be imported when a feature first needs them
+DEFERRED_MODULES = ['openai', 'PyPDF2', 'pptx', 'pandas']
+
+
+def parse_importtime(stderr):
+    """
+    Parse `-X importtime` output
+
+    Args:
+        stderr (str): Interpreter stderr
+
+    Returns:
+        dict: module name -> (self_us, cumulative_us)
+    """
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def profile_import(module=ENTRY_POINT):
+    """
+    Import a module in a fresh interpreter with -X importtime
+
+    Args:
+        module (str): Module to import
+
+    Returns:
+        dict: wall_ms, import_ms, modules (parsed importtime) and deferred_loaded
+    """
+    env = dict(os.environ)
+    env.setdefault('FLASK_ENV', 'production')
+    env.setdefault('SECRET_KEY', 'bench-secret-key')
+    code = (
+        f"import json, sys, time; start = time.perf_counter(); import {module}; "
+        f"print(json.dumps([(time.perf_counter() - start) * 1000, "
+        f"[m for m in {DEFERRED_MODULES!r} if m in sys.modules]]))"
+    )
+
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=PROJECT_ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+
+    import_ms, deferred_loaded = json.loads(result.stdout.strip().splitlines()[-1])
+    return {
+        'wall_ms': wall_ms,
+        'import_ms': import_ms,
+        'modules': parse_importtime(result.stderr),
+        'deferred_loaded': deferred_loaded
+    }
+
+
+def top_modules(modules, limit):
+    """Top-level packages sorted by cumulative import time"""
+    roots = {}
+    for name, (_, cumulative_us) in modules.items():
+        root = name.split('.')[0]
+        roots[root] = max(roots.get(root, 0), cumulative_us)
+    return sorted(roots.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('runs', nargs='?', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--json', dest='json_path', help='Write the report to this file')
+    args = parser.parse_args()
+
+    runs = [profile_import() for _ in range(args.runs)]
+    import_times = [run['import_ms'] for run in runs]
+    wall_times = [run['wall_ms'] for run in runs]
+    last = runs[-1]
+
+    print(f"Cold start of {ENTRY_POINT} ({args.runs} runs)")
+    print(f"  import {ENTRY_POINT}:      median {statistics.median(import_times):8.1f} ms  "
+          f"min {min(import_times):8.1f} ms")
+    print(f"  interpreter + import: median {statistics.median(wall_times):8.1f} ms")
+    print(f"  modules imported:     {len(last['modules'])}")
+    print(f"  deferred modules loaded: {', '.join(last['deferred_loaded']) or 'none'}")
+    print(f"\nSlowest top-level imports (cumulative, last run):")
+    for name, cumulative_us in top_modules(last['modules'], args.top):
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+    if args.json_path:
+        report = {
+            'entry_point': ENTRY_POINT,
+            'runs': args.runs,
+            'python': sys.version.split()[0],
+            'import_ms_median': statistics.median(import_times),
+            'wall_ms_median': statistics.median(wall_times),
+            'module_count': len(last['modules']),
+            'deferred_loaded': last['deferred_loaded'],
+            'top_modules_ms': {name: us / 1000 for name, us in top_modules(last['modules'], args.top)}
+        }
+        with open(args.json_path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.json_path}")
+
+    return 1 if last['deferred_loaded'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,134 @@
+"""
+Course Leaderboard Benchmark
+Compares the original per-student scan leaderboard with the ledger-backed one
+
+Usage:
+    python -m benchmarks.bench_course_leaderboard [num_students] [num_activities]
+"""
+
+import sys
+import time
+import random
+from pathlib import Path
+from unittest.mock import patch
+
+# Add project root to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.fake_db import FakeDatabaseService
+from models.points_ledger import PointsLedger
+from services.points_service import PointsService
+
+COURSE_ID = 'course-1'
+ACTIVITY_TYPES = ['poll', 'short_answer', 'word_cloud']
+
+
+def build_dataset(num_students, num_activities, seed=42):
+    """Generate students, activities with responses, and the matching ledger"""
+    rng = random.Random(seed)
+    students = [
+        {'_id': i, 'student_id': f'S{i:05d}', 'name': f'Student {i}', 'course_id': COURSE_ID}
+        for i in range(num_students)
+    ]
+
+    activities = []
+    for a in range(num_activities):
+        responders = rng.sample(students, k=int(num_students * 0.8))
+        activities.append({
+            '_id': a,
+            'course_id': COURSE_ID,
+            'type': ACTIVITY_TYPES[a % len(ACTIVITY_TYPES)],
+            'responses': [
+                {
+                    'student_id': s['student_id'],
+                    'student_name': s['name'],
+                    'is_correct': rng.random() < 0.5,
+                    'feedback': 'Good' if rng.random() < 0.1 else None,
+                    'text': 'x' * 200
+                }
+                for s in responders
+            ]
+        })
+
+    ledger = {}
+    for activity in activities:
+        for student_id, entry in PointsLedger.contributions(activity).items():
+            doc = ledger.setdefault(student_id, {
+                **PointsLedger.empty_breakdown(),
+                'student_id': student_id,
+                'course_id': COURSE_ID,
+                'activities_completed': 0
+            })
+            for field in PointsLedger.FIELDS + ['total', 'activities_completed']:
+                doc[field] += entry[field]
+
+    return {
+        'students': students,
+        'activities': activities,
+        'points_ledger': list(ledger.values())
+    }
+
+
+def legacy_course_leaderboard(db, course_id, limit=50):
+    """Original implementation: two full course scans per student"""
+
+    def calculate_points(student_identifier):
+        total = 0
+        for activity in db.find_many('activities', {'course_id': course_id}):
+            responses = activity.get('responses', [])
+            for response in responses:
+                if (response.get('student_id') == student_identifier or
+                        response.get('student_name') == student_identifier):
+                    total += PointsLedger.score_response(
+                        activity.get('type'), response, responses.index(response)
+                    )['total']
+        return total
+
+    def count_activities(student_identifier):
+        count = 0
+        for activity in db.find_many('activities', {'course_id': course_id}):
+            if any(r.get('student_id') == student_identifier for r in activity.get('responses', [])):
+                count += 1
+        return count
+
+    leaderboard = []
+    for student in db.find_many('students', {'course_id': course_id}):
+        leaderboard.append({
+            'student_id': student['student_id'],
+            'points': calculate_points(student['student_id']),
+            'activities_completed': count_activities(student['student_id'])
+        })
+    leaderboard.sort(key=lambda x: x['points'], reverse=True)
+    return leaderboard[:limit]
+
+
+def run(num_students=300, num_activities=20):
+    """Run both implementations on the same data and print a comparison"""
+    db = FakeDatabaseService(build_dataset(num_students, num_activities))
+
+    start = time.perf_counter()
+    legacy = legacy_course_leaderboard(db, COURSE_ID, limit=num_students)
+    legacy_time = time.perf_counter() - start
+    legacy_trips, legacy_docs = db.round_trips, db.documents_returned
+
+    db.reset()
+    with patch('models.student.db_service', db), patch('models.points_ledger.db_service', db):
+        start = time.perf_counter()
+        current = PointsService.get_course_leaderboard(COURSE_ID, limit=num_students)
+        current_time = time.perf_counter() - start
+    current_trips, current_docs = db.round_trips, db.documents_returned
+
+    legacy_points = {e['student_id']: (e['points'], e['activities_completed']) for e in legacy}
+    current_points = {e['student_id']: (e['points'], e['activities_completed']) for e in current}
+    assert legacy_points == current_points, "Leaderboards differ"
+
+    print(f"Course leaderboard: {num_students} students, {num_activities} activities")
+    print(f"{'':<10}{'time (s)':>12}{'round trips':>14}{'docs read':>12}")
+    print(f"{'legacy':<10}{legacy_time:>12.3f}{legacy_trips:>14}{legacy_docs:>12}")
+    print(f"{'ledger':<10}{current_time:>12.3f}{current_trips:>14}{current_docs:>12}")
+    print(f"Speedup: {legacy_time / current_time:.1f}x")
+
+
+if __name__ == '__main__':
+    args = [int(a) for a in sys.argv[1:3]]
+    run(*args)
@@ -0,0 +1,72 @@
+"""
+Document Extraction Benchmark
+Compares extracting a long PDF the previous way (upload bytes in memory,
+every page in the request thread) with budgeted extraction from a spooled
+file, in the request and in worker processes
+
+Usage:
+    python -m benchmarks.bench_extract_document [pages] [--workers N] [--max-chars CHARS]
+"""
+
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+# Add project root to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.sample_documents import lecture_pages, make_pdf
+from services import document_service
+from services.document_service import extract_document_content
+
+
+def extract_all(content):
+    """The previous extract_text_from_pdf: every page of an in-memory copy"""
+    from PyPDF2 import PdfReader
+
+    reader = PdfReader(io.BytesIO(content))
+    return '\n\n'.join(text for text in (page.extract_text() for page in reader.pages) if text)
+
+
+def run(pages=400, workers=4, max_chars=250000):
+    """Extract one document each way and print time and characters"""
+    content = make_pdf(lecture_pages(pages))
+    fd, path = tempfile.mkstemp(suffix='.pdf')
+    with os.fdopen(fd, 'wb') as file:
+        file.write(content)
+
+    print(f"{pages} pages, {len(content) / 1e6:.1f} MB, budget {max_chars} chars, {os.cpu_count()} CPUs")
+    print(f"{'':<32}{'time (s)':>10}{'chars':>10}")
+    try:
+        runs = [
+            ('all pages, in memory', 1, lambda: extract_all(content)),
+            ('budget, mmap, in request', 1, lambda: extract_document_content('doc.pdf', path, max_chars=max_chars)),
+            (f'budget, mmap, {workers} processes', workers,
+             lambda: extract_document_content('doc.pdf', path, max_chars=max_chars)),
+        ]
+        # Start the worker processes first, as an earlier upload would have
+        with patch.object(document_service.Config, 'DOCUMENT_EXTRACTION_WORKERS', workers):
+            document_service._get_pool().submit(len, '').result()
+        for name, run_workers, extract in runs:
+            with patch.object(document_service.Config, 'DOCUMENT_EXTRACTION_WORKERS', run_workers):
+                start = time.perf_counter()
+                text = extract()
+                print(f"{name:<32}{time.perf_counter() - start:>10.2f}{len(text):>10}")
+    finally:
+        os.remove(path)
+        if document_service._pool is not None:
+            document_service._pool.shutdown()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('pages', nargs='?', type=int, default=400)
+    parser.add_argument('--workers', type=int, default=4, help='worker processes')
+    parser.add_argument('--max-chars', type=int, default=250000, help='character budget')
+    args = parser.parse_args()
+    run(args.pages, args.workers, args.max_chars)
@@ -0,0 +1,64 @@
+"""
+Streaming Activity Generation Benchmark
+Compares when a teacher first sees a question of a generated poll with
+GenAIService.generate_activity (whole reply) and stream_activity (each
+question as it is generated), against a stubbed OpenAI client
+
+Usage:
+    python -m benchmarks.bench_stream_activity [num_questions] [--latency S] [--seconds-per-token S]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add project root to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.stub_openai import StubOpenAIClient
+from services.ai_cache_service import AICacheService
+from services.cache_service import LRUCache
+from services.genai_service import GenAIService
+
+CONTENT = 'Processes and threads: memory spaces, scheduling, context switches and synchronization.'
+
+
+def run(num_questions=10, latency=0.5, seconds_per_token=0.005):
+    """Generate the same poll both ways and print time to first question and to done"""
+    client = StubOpenAIClient(latency=latency, seconds_per_token=seconds_per_token)
+    # Without the reply cache, so both runs wait for the model
+    service = GenAIService(cache=AICacheService(enabled=False, backend=LRUCache(1, 1)))
+    service.client = client
+
+    start = time.perf_counter()
+    generated = service.generate_activity(CONTENT, 'poll', num_questions)
+    blocking = time.perf_counter() - start
+
+    start = time.perf_counter()
+    first = None
+    for event, value in service.stream_activity(CONTENT, 'poll', num_questions):
+        if event == 'question' and first is None:
+            first = time.perf_counter() - start
+        elif event == 'done':
+            streamed = value
+    streaming = time.perf_counter() - start
+
+    assert len(generated['questions']) == len(streamed['questions']) == num_questions
+
+    print(f"Generating a {num_questions}-question poll, stub latency {latency * 1000:.0f} ms, "
+          f"{seconds_per_token * 1000:.1f} ms/token")
+    print(f"{'':<12}{'first question (s)':>20}{'done (s)':>10}")
+    print(f"{'blocking':<12}{blocking:>20.2f}{blocking:>10.2f}")
+    print(f"{'streaming':<12}{first:>20.2f}{streaming:>10.2f}")
+    print(f"Time to first question: {blocking / first:.1f}x sooner")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('num_questions', nargs='?', type=int, default=10)
+    parser.add_argument('--latency', type=float, default=0.5, help='Stub seconds before the first token')
+    parser.add_argument('--seconds-per-token', type=float, default=0.005,
+                        help='Stub seconds per completion token')
+    args = parser.parse_args()
+    run(args.num_questions, args.latency, args.seconds_per_token)
@@ -0,0 +1,69 @@
+"""
+Content Selection Benchmark
+Compares summarize_content's keyword-centrality selection with the previous
+head/middle/tail truncation on synthetic lecture notes: how many of the
+document's topics reach the AI prompt, and how long selection takes
+
+Usage:
+    python -m benchmarks.bench_summarize [pages] [--budget CHARS]
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+# Add project root to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.document_service import _cut_at_boundary, summarize_content
+
+FILLER = ['the', 'system', 'when', 'used', 'example', 'important', 'operating', 'data', 'value']
+
+
+def build_document(pages, seed=42):
+    """Lecture notes: a page header, 5 paragraphs per page, a new topic every 4 pages"""
+    rng = random.Random(seed)
+    text = []
+    for page in range(pages):
+        topic = f'topic{page // 4}'
+        words = [f'{topic}{suffix}' for suffix in 'abcdef'] + FILLER
+        paragraphs = [' '.join(rng.choice(words) for _ in range(50)).capitalize() + '.' for _ in range(5)]
+        text.append(f'CS101 Operating Systems - Lecture notes - Page {page + 1}\n\n' + '\n\n'.join(paragraphs))
+    return '\n\n'.join(text), (pages + 3) // 4
+
+
+def head_middle_tail(text, max_length):
+    """The previous summarize_content: 40% start, 30% middle, 30% end"""
+    start_text = _cut_at_boundary(text[:int(max_length * 0.4)], from_end=True)
+    middle_start = len(text) // 2 - int(max_length * 0.3) // 2
+    middle_text = text[middle_start:middle_start + int(max_length * 0.3)]
+    middle_text = _cut_at_boundary(_cut_at_boundary(middle_text, from_start=True), from_end=True)
+    end_text = _cut_at_boundary(text[-int(max_length * 0.3):], from_start=True)
+    return f"{start_text}\n\n[... content from middle section ...]\n\n{middle_text}\n\n[... content from end section ...]\n\n{end_text}"
+
+
+def topics_covered(summary, topics):
+    """Number of topics with at least one keyword in the summary"""
+    return sum(1 for i in range(topics) if f'topic{i}' in summary)
+
+
+def run(pages=200, budget=10000):
+    """Select content both ways and print coverage and time"""
+    text, topics = build_document(pages)
+    print(f"{pages} pages, {len(text)} chars, {topics} topics, budget {budget} chars")
+    print(f"{'':<18}{'time (ms)':>10}{'chars':>8}{'topics covered':>16}")
+    for name, select in (('head/middle/tail', head_middle_tail), ('centrality', summarize_content)):
+        start = time.perf_counter()
+        summary = select(text, budget)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<18}{elapsed * 1000:>10.1f}{len(summary):>8}{topics_covered(summary, topics):>16}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('pages', nargs='?', type=int, default=200)
+    parser.add_argument('--budget', type=int, default=10000, help='max_length in characters')
+    args = parser.parse_args()
+    run(args.pages, args.budget)
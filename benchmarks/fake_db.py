@@ -0,0 +1,82 @@
+"""
+In-memory stand-in for DatabaseService used by the benchmarks
+Counts round trips and documents returned so query patterns can be compared
+without a running MongoDB
+"""
+
+import time
+
+
+def _matches(document, query):
+    """Check a document against a simple equality / $or / $in query"""
+    for key, value in query.items():
+        if key == '$or':
+            if not any(_matches(document, clause) for clause in value):
+                return False
+        elif isinstance(value, dict) and '$in' in value:
+            if document.get(key) not in value['$in']:
+                return False
+        elif document.get(key) != value:
+            return False
+    return True
+
+
+class FakeDatabaseService:
+    """
+    Minimal DatabaseService replacement backed by Python lists
+    Each call sleeps for `latency` seconds to model a network round trip
+    """
+
+    def __init__(self, collections, latency=0.0005):
+        self.collections = collections
+        self.latency = latency
+        self.round_trips = 0
+        self.documents_returned = 0
+
+    def _round_trip(self, documents):
+        self.round_trips += 1
+        self.documents_returned += len(documents)
+        if self.latency:
+            time.sleep(self.latency)
+        return documents
+
+    def find_many(self, collection_name, query, sort=None, limit=None, skip=None, **kwargs):
+        documents = [
+            doc for doc in self.collections.get(collection_name, [])
+            if _matches(doc, query)
+        ]
+        if skip:
+            documents = documents[skip:]
+        if limit:
+            documents = documents[:limit]
+        return self._round_trip(documents)
+
+    def find_one(self, collection_name, query, **kwargs):
+        documents = self.find_many(collection_name, query, limit=1)
+        return documents[0] if documents else None
+
+    def count_documents(self, collection_name, query=None):
+        documents = [
+            doc for doc in self.collections.get(collection_name, [])
+            if _matches(doc, query or {})
+        ]
+        self._round_trip([])
+        return len(documents)
+
+    def aggregate(self, collection_name, pipeline):
+        """Support the $match + $group/$sum:1 count pipelines used by the models"""
+        documents = self.collections.get(collection_name, [])
+        for stage in pipeline:
+            if '$match' in stage:
+                documents = [doc for doc in documents if _matches(doc, stage['$match'])]
+            elif '$group' in stage:
+                field = stage['$group']['_id'].lstrip('$')
+                counts = {}
+                for doc in documents:
+                    counts[doc.get(field)] = counts.get(doc.get(field), 0) + 1
+                documents = [{'_id': key, 'count': count} for key, count in counts.items()]
+        return self._round_trip(documents)
+
+    def reset(self):
+        self.round_trips = 0
+        self.documents_returned = 0
@@ -0,0 +1,56 @@
+"""
+Generated course documents for the benchmarks and tests
+make_pdf writes a text-only PDF (one Helvetica text block per page) without
+a PDF library, so extraction can be measured on documents of any size.
+"""
+
+
+def _escape(text):
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def make_pdf(pages):
+    """
+    Build a PDF with one page per entry of pages
+
+    Args:
+        pages (list): Text of each page, a list of lines (or one string)
+
+    Returns:
+        bytes: PDF file content
+    """
+    count = len(pages)
+    # Objects: 1 catalog, 2 page tree, 3 font, then a page and its content stream per page
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        ('<< /Type /Pages /Kids [%s] /Count %d >>'
+         % (' '.join(f'{4 + 2 * i} 0 R' for i in range(count)), count)).encode(),
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>',
+    ]
+    for i, page in enumerate(pages):
+        lines = page.split('\n') if isinstance(page, str) else page
+        commands = ['BT', '/F1 10 Tf', '12 TL', '40 800 Td']
+        commands += [f'({_escape(line)}) Tj T*' for line in lines]
+        commands.append('ET')
+        stream = '\n'.join(commands).encode('latin-1', 'replace')
+        objects.append(('<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] '
+                        '/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>' % (5 + 2 * i)).encode())
+        objects.append(b'<< /Length %d >>\nstream\n' % len(stream) + stream + b'\nendstream')
+
+    data = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(data))
+        data += b'%d 0 obj\n' % number + body + b'\nendobj\n'
+    xref = len(data)
+    data += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    data += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    data += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+    return bytes(data)
+
+
+def lecture_pages(count, lines_per_page=50):
+    """Text of count pages of lecture notes, each naming its page number"""
+    return [[f'Page {page + 1}: threads of a process share memory and must lock shared data {line}.'
+             for line in range(lines_per_page)]
+            for page in range(count)]
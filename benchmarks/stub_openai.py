@@ -0,0 +1,272 @@
+"""
+Stand-ins for the OpenAI API used by the benchmarks and tests
+StubOpenAIClient answers chat completions in memory with canned evaluations
+(or polls) after a simulated latency and counts calls and tokens, so request patterns
+can be compared without an API key. StubOpenAIServer serves the same replies
+over HTTP for the real openai client and can fail requests with 429 or 5xx
+on demand.
+"""
+
+import json
+import random
+import re
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+# Marker the batch evaluation prompt puts before its JSON list of answers
+ANSWERS_MARKER = 'Student Answers:\n'
+# Opening of the poll generation prompt, with the number of questions
+POLL_PATTERN = re.compile(r'Create (\d+) quiz question')
+# Part of a poll generated by several requests
+PART_PATTERN = re.compile(r'part (\d+) of (\d+) of a longer quiz')
+
+# Distinct poll questions: (question, correct option, wrong options)
+POLL_QUESTIONS = [
+    ('What do threads of one process share?', 'Its memory', ['Their stacks', 'Their registers', 'Nothing']),
+    ('What does a context switch save?', 'CPU registers', ['Disk blocks', 'Open sockets', 'The page cache']),
+    ('Which primitive protects a critical section?', 'A mutex', ['A pipe', 'A signal', 'A socket']),
+    ('What happens when two threads wait on each other forever?', 'Deadlock', ['Starvation', 'Paging', 'Thrashing']),
+    ('Which scheduler gives each task a fixed time slice?', 'Round robin', ['FIFO', 'Shortest job first', 'Lottery']),
+    ('What isolates the address spaces of processes?', 'Virtual memory', ['The file system', 'The shell', 'The compiler']),
+    ('Which call creates a new process on Unix?', 'fork', ['exec', 'wait', 'kill']),
+    ('What is a race condition?', 'An outcome depending on timing', ['A fast loop', 'A CPU benchmark', 'A compiler bug']),
+    ('What does a semaphore count?', 'Available permits', ['Open files', 'CPU cores', 'Page faults']),
+    ('Why are threads cheaper than processes?', 'They share resources', ['They use no memory', 'They skip scheduling', 'They run in the kernel']),
+    ('What blocks a thread until a condition holds?', 'A condition variable', ['A hash table', 'A timer', 'A pipe buffer']),
+    ('What is thrashing?', 'Constant paging', ['Fast caching', 'Idle CPUs', 'Disk formatting']),
+]
+
+
+class StubOpenAIClient:
+    """
+    Minimal OpenAI client replacement (client.chat.completions.create)
+    Each call sleeps for `latency` seconds plus `seconds_per_token` for every
+    completion token, which models a model generating its reply
+    """
+
+    def __init__(self, latency=0.02, seconds_per_token=0.0001, drop_rate=0.0, seed=42):
+        """
+        Args:
+            latency (float): Fixed seconds per call
+            seconds_per_token (float): Seconds per completion token
+            drop_rate (float): Fraction of batch evaluations left out of the reply
+            seed (int): Random seed for drop_rate
+        """
+        self.latency = latency
+        self.seconds_per_token = seconds_per_token
+        self.drop_rate = drop_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+        self.reset()
+
+    def reset(self):
+        """Reset the counters"""
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    @staticmethod
+    def _answer_ids(prompt):
+        """Ids of the answers in a batch evaluation prompt (None for a single answer)"""
+        start = prompt.find(ANSWERS_MARKER)
+        if start == -1:
+            return None
+        answers, _ = json.JSONDecoder().raw_decode(prompt, start + len(ANSWERS_MARKER))
+        return [answer['id'] for answer in answers]
+
+    @staticmethod
+    def _evaluation(score):
+        return {
+            'score': score,
+            'feedback': 'Clear answer that covers the main idea of the question.',
+            'strengths': ['Accurate definition', 'Relevant example'],
+            'improvements': ['Explain the reasoning in more detail'],
+            'encouragement': 'Great work, keep it up!'
+        }
+
+    @staticmethod
+    def _poll(num_questions, first=0):
+        questions = []
+        for i in range(first, first + num_questions):
+            question, correct, wrong = POLL_QUESTIONS[i % len(POLL_QUESTIONS)]
+            questions.append({
+                'question': question,
+                'options': [{'label': label, 'text': text}
+                            for label, text in zip('ABCD', [correct] + wrong)],
+                'correct_answer': 'A',
+                'explanation': f'{correct} is the right answer; the other options describe '
+                               f'unrelated parts of the operating system.'
+            })
+        return {'title': 'Processes and Threads Quiz', 'questions': questions}
+
+    def reply(self, messages):
+        """
+        Build the reply to a chat completion request and count it
+
+        Args:
+            messages (list): Chat messages
+
+        Returns:
+            tuple: (content, prompt_tokens, completion_tokens)
+        """
+        prompt = ''.join(message['content'] for message in messages)
+        ids = self._answer_ids(prompt)
+        poll = POLL_PATTERN.search(prompt)
+        with self._lock:
+            if poll:
+                # Parts of a chunked poll (and top-ups listing existing questions) get
+                # different questions, as the model would for different sections
+                part = PART_PATTERN.search(prompt)
+                first = (int(part.group(1)) - 1) * 3 if part else prompt.count('\n- ')
+                content = json.dumps(self._poll(int(poll.group(1)), first), indent=2)
+            elif ids is None:
+                content = json.dumps(self._evaluation(80))
+            else:
+                kept = [i for i in ids if self._rng.random() >= self.drop_rate]
+                content = json.dumps({'evaluations': [{'id': i, **self._evaluation(80)} for i in kept]})
+
+            prompt_tokens = len(prompt) // 4 + 1
+            completion_tokens = len(content) // 4 + 1
+            self.calls += 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+        return content, prompt_tokens, completion_tokens
+
+    def _create(self, model, messages, max_tokens=None, stream=False, **kwargs):
+        content, prompt_tokens, completion_tokens = self.reply(messages)
+        if stream:
+            usage = None
+            if (kwargs.get('stream_options') or {}).get('include_usage'):
+                usage = SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+            return self._stream(content, usage=usage)
+        time.sleep(self.latency + completion_tokens * self.seconds_per_token)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content), finish_reason='stop')],
+            usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+        )
+
+    def _stream(self, content, chunk_chars=16, usage=None):
+        """Yield the reply in streamed chunks, sleeping per token as it goes"""
+        time.sleep(self.latency)
+        for start in range(0, len(content), chunk_chars):
+            piece = content[start:start + chunk_chars]
+            time.sleep((len(piece) / 4) * self.seconds_per_token)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece), finish_reason=None)])
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=None), finish_reason='stop')])
+        if usage is not None:
+            # Sent last when the request asked for stream_options include_usage
+            yield SimpleNamespace(choices=[], usage=usage)
+
+
+class StubOpenAIServer:
+    """
+    Local HTTP server speaking the chat completions API
+    Point the openai client at it with base_url=server.url. Requests are
+    answered like StubOpenAIClient's; fail_next() makes the next requests
+    fail with an error status instead.
+    """
+
+    def __init__(self, latency=0.0, seconds_per_token=0.0):
+        """
+        Args:
+            latency (float): Fixed seconds per request
+            seconds_per_token (float): Seconds per completion token
+        """
+        self.client = StubOpenAIClient(latency=latency, seconds_per_token=seconds_per_token)
+        self.requests = 0
+        self._failures = deque()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        """Base URL for the openai client"""
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}/v1'
+
+    def fail_next(self, status, count=1, retry_after=None):
+        """
+        Fail the next requests
+
+        Args:
+            status (int): HTTP status to answer with (e.g. 429, 500)
+            count (int): Number of requests to fail
+            retry_after (float): Retry-After header to send, if any
+        """
+        with self._lock:
+            self._failures.extend([(status, retry_after)] * count)
+
+    def _next_failure(self):
+        with self._lock:
+            self.requests += 1
+            return self._failures.popleft() if self._failures else None
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                failure = server._next_failure()
+                if failure:
+                    status, retry_after = failure
+                    payload = {'error': {'message': f'Stub failure {status}', 'type': 'stub_error'}}
+                    headers = {'retry-after': str(retry_after)} if retry_after is not None else {}
+                    return self._send(status, payload, headers)
+
+                content, prompt_tokens, completion_tokens = server.client.reply(body.get('messages', []))
+                time.sleep(server.client.latency + completion_tokens * server.client.seconds_per_token)
+                self._send(200, {
+                    'id': f'chatcmpl-stub-{server.requests}',
+                    'object': 'chat.completion',
+                    'created': int(time.time()),
+                    'model': body.get('model', 'stub'),
+                    'choices': [{
+                        'index': 0,
+                        'message': {'role': 'assistant', 'content': content},
+                        'finish_reason': 'stop'
+                    }],
+                    'usage': {
+                        'prompt_tokens': prompt_tokens,
+                        'completion_tokens': completion_tokens,
+                        'total_tokens': prompt_tokens + completion_tokens
+                    }
+                })
+
+            def _send(self, status, payload, headers=None):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        """Serve requests on a background thread"""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving"""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
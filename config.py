@@ -4,6 +4,7 @@ Handles environment variables and application configuration
 """
 
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -23,6 +24,35 @@ class Config:
     MONGODB_URI = os.getenv('MONGODB_URI', 'mongodb://localhost:27017/')
     DATABASE_NAME = 'learning_activity_system'
     
+    # MongoDB Client Options
+    # Every worker process has its own pool: size MONGO_MAX_POOL_SIZE for the
+    # threads per worker, not for the whole deployment
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000))
+    MONGO_MAX_POOL_SIZE = int(os.getenv('MONGO_MAX_POOL_SIZE', 100))
+    MONGO_MIN_POOL_SIZE = int(os.getenv('MONGO_MIN_POOL_SIZE', 0))
+    MONGO_MAX_IDLE_TIME_MS = int(os.getenv('MONGO_MAX_IDLE_TIME_MS')) if os.getenv('MONGO_MAX_IDLE_TIME_MS') else None
+    MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv('MONGO_WAIT_QUEUE_TIMEOUT_MS')) if os.getenv('MONGO_WAIT_QUEUE_TIMEOUT_MS') else None
+    # Comma-separated wire compressors in order of preference, e.g. 'zstd,snappy,zlib'
+    # (zstd needs the zstandard package, snappy needs python-snappy)
+    MONGO_COMPRESSORS = os.getenv('MONGO_COMPRESSORS', '')
+    # primary, primaryPreferred, secondary, secondaryPreferred or nearest
+    MONGO_READ_PREFERENCE = os.getenv('MONGO_READ_PREFERENCE', 'primary')
+    # Write concern 'w' value, e.g. '1' or 'majority' (empty = server default)
+    MONGO_WRITE_CONCERN = os.getenv('MONGO_WRITE_CONCERN', '')
+    # Register pool/command listeners that feed /admin/stats
+    MONGO_MONITORING = os.getenv('MONGO_MONITORING', 'true').lower() in ('1', 'true', 'yes')
+    # Per-request query profiling (X-DB-Queries / Server-Timing headers,
+    # /admin/debug/queries) and the slow-query log; diagnostics, off by default
+    # since every command reply is measured and headers reveal query counts
+    DB_PROFILING = os.getenv('DB_PROFILING', 'false').lower() in ('1', 'true', 'yes')
+    DB_PROFILER_HEADERS = os.getenv('DB_PROFILER_HEADERS', 'false').lower() in ('1', 'true', 'yes')
+    SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', 100))
+    # Warn when one request repeats the same query shape this many times (N+1)
+    REPEATED_QUERY_WARN = int(os.getenv('REPEATED_QUERY_WARN', 10))
+    # Create indexes on first connection instead of with create_indexes.py
+    # (adds a dozen round trips to every cold start; off by default)
+    MONGO_CREATE_INDEXES_ON_CONNECT = os.getenv('MONGO_CREATE_INDEXES_ON_CONNECT', 'false').lower() in ('1', 'true', 'yes')
+    
     # OpenAI Configuration
     # Supports both OpenAI API keys (sk-...) and GitHub Personal Access Tokens (github_pat_...)
     # For GitHub Models: Use your GitHub PAT and set model to 'gpt-4o-mini'
@@ -31,15 +61,90 @@ class Config:
     OPENAI_MODEL = os.getenv('OPENAI_MODEL', 'gpt-4o-mini')
     OPENAI_TIMEOUT = 30  # seconds
     
+    # AI evaluation of submitted answers
+    # thread: background thread pool, queue: evaluation_worker.py, sync: in the request
+    # On Vercel the instance freezes after the response, losing thread jobs,
+    # so sync is the default there
+    AI_EVALUATION_MODE = os.getenv('AI_EVALUATION_MODE', 'sync' if os.getenv('VERCEL') else 'thread')
+    AI_EVALUATION_WORKERS = int(os.getenv('AI_EVALUATION_WORKERS', 8))
+    # A status poll runs a job that has been queued this long itself
+    # (0: never; only for hosts where no worker or thread can run jobs)
+    AI_EVALUATION_INLINE_AFTER_SECONDS = int(os.getenv('AI_EVALUATION_INLINE_AFTER_SECONDS', 0))
+    # A running job is retried if its worker has not finished it after this long
+    AI_EVALUATION_STALE_SECONDS = int(os.getenv('AI_EVALUATION_STALE_SECONDS', 120))
+    # Batched evaluation: answers to one question share a request within these limits
+    AI_BATCH_TOKEN_BUDGET = int(os.getenv('AI_BATCH_TOKEN_BUDGET', 8000))
+    AI_BATCH_MAX_ANSWERS = int(os.getenv('AI_BATCH_MAX_ANSWERS', 25))
+    # Polls with more questions are generated by concurrent requests over
+    # sections of the content, each asking for at most this many questions
+    AI_POLL_QUESTIONS_PER_REQUEST = int(os.getenv('AI_POLL_QUESTIONS_PER_REQUEST', 3))
+    # Cache of GenAI replies for identical requests
+    AI_CACHE_ENABLED = os.getenv('AI_CACHE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    # 'mongo' (ai_cache collection), 'disk' (files under AI_CACHE_DIR) or 'memory' (per process)
+    AI_CACHE_BACKEND = os.getenv('AI_CACHE_BACKEND', 'mongo').lower()
+    AI_CACHE_DIR = os.getenv('AI_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'ai_cache'))
+    AI_CACHE_MAX_ENTRIES = int(os.getenv('AI_CACHE_MAX_ENTRIES', 5000))
+    AI_CACHE_TTL_SECONDS = int(os.getenv('AI_CACHE_TTL_SECONDS', 7 * 24 * 3600))
+    # Scheduling of GenAI API calls: concurrent calls, per-minute budgets
+    # of the API account (0: unlimited) and retries of 429/5xx responses
+    AI_MAX_CONCURRENCY = int(os.getenv('AI_MAX_CONCURRENCY', 4))
+    AI_REQUESTS_PER_MINUTE = int(os.getenv('AI_REQUESTS_PER_MINUTE', 0))
+    AI_TOKENS_PER_MINUTE = int(os.getenv('AI_TOKENS_PER_MINUTE', 0))
+    AI_MAX_RETRIES = int(os.getenv('AI_MAX_RETRIES', 4))
+    AI_RETRY_BASE_SECONDS = float(os.getenv('AI_RETRY_BASE_SECONDS', 1))
+    AI_RETRY_MAX_SECONDS = float(os.getenv('AI_RETRY_MAX_SECONDS', 30))
+    # Calls made while serving a web request give up retrying after this
+    # many seconds in total (0: only AI_MAX_RETRIES limits them)
+    AI_REQUEST_DEADLINE_SECONDS = float(os.getenv('AI_REQUEST_DEADLINE_SECONDS', 20))
+    
     # Application Configuration
     APP_HOST = os.getenv('APP_HOST', '0.0.0.0')
     APP_PORT = int(os.getenv('APP_PORT', 5000))
     
+    # Leaderboard Configuration
+    # The global leaderboard is served from a materialized snapshot that is
+    # recomputed once it is older than LEADERBOARD_REFRESH_SECONDS
+    LEADERBOARD_REFRESH_SECONDS = int(os.getenv('LEADERBOARD_REFRESH_SECONDS', 60))
+    # Submissions refresh it in the background once it is at least this old
+    LEADERBOARD_MIN_REFRESH_SECONDS = int(os.getenv('LEADERBOARD_MIN_REFRESH_SECONDS', 10))
+    LEADERBOARD_TOP_N = int(os.getenv('LEADERBOARD_TOP_N', 100))
+    
+    # Cache Configuration
+    # Process-level cache for course, user and activity lookups by ID
+    CACHE_ENABLED = os.getenv('CACHE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', 2000))
+    CACHE_TTL_SECONDS = int(os.getenv('CACHE_TTL_SECONDS', 300))
+    # Users carry enrollments and roles used by access checks; a per-process
+    # (memory) cache keeps them this briefly since other workers' changes
+    # cannot invalidate it (0: users are not cached by the memory backend)
+    USER_CACHE_TTL_SECONDS = int(os.getenv('USER_CACHE_TTL_SECONDS', 5))
+    # Activities carry the active flag, deadline and answers submissions are
+    # checked against; the same short per-process limit applies to them
+    ACTIVITY_CACHE_TTL_SECONDS = int(os.getenv('ACTIVITY_CACHE_TTL_SECONDS', 5))
+    # 'memory' (per process) or 'redis' (shared by all workers, needs REDIS_URL)
+    CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'memory').lower()
+    REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+    # Computed leaderboards are cached for a shorter time than documents
+    LEADERBOARD_CACHE_SECONDS = int(os.getenv('LEADERBOARD_CACHE_SECONDS', 15))
+    
     # File Upload Configuration
     UPLOAD_FOLDER = 'uploads'
     ALLOWED_EXTENSIONS = {'csv', 'txt'}
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
-    
+    # Text extraction from uploaded PDF/PowerPoint files stops after this
+    # many pages or characters (enough for summarize_content to choose from)
+    DOCUMENT_MAX_PAGES = int(os.getenv('DOCUMENT_MAX_PAGES', 300))
+    DOCUMENT_MAX_CHARS = int(os.getenv('DOCUMENT_MAX_CHARS', 250000))
+    # Worker processes extracting pages of long PDFs (0: up to 4, one per CPU; 1: in the request)
+    DOCUMENT_EXTRACTION_WORKERS = int(os.getenv('DOCUMENT_EXTRACTION_WORKERS', 0))
+    # Cache of text extracted from uploads, keyed by the file's SHA-256
+    DOCUMENT_CACHE_ENABLED = os.getenv('DOCUMENT_CACHE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    # 'gridfs' (document_cache bucket), 'disk' (files under DOCUMENT_CACHE_DIR) or 'memory' (per process)
+    DOCUMENT_CACHE_BACKEND = os.getenv('DOCUMENT_CACHE_BACKEND', 'gridfs').lower()
+    DOCUMENT_CACHE_DIR = os.getenv('DOCUMENT_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'document_cache'))
+    DOCUMENT_CACHE_MAX_ENTRIES = int(os.getenv('DOCUMENT_CACHE_MAX_ENTRIES', 500))
+    DOCUMENT_CACHE_TTL_SECONDS = int(os.getenv('DOCUMENT_CACHE_TTL_SECONDS', 30 * 24 * 3600))
+
     @staticmethod
     def init_app(app):
         """
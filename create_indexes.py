@@ -0,0 +1,91 @@
+"""
+Create Indexes Script
+Brings the MongoDB indexes in line with services/index_migrations.py
+Run this once per deployment (and whenever SCHEMA_VERSION changes); the app
+does not create indexes on its first connection, which kept them off the
+cold-start path
+
+Usage:
+    python create_indexes.py                    # apply (idempotent)
+    python create_indexes.py --diff             # show what apply would change
+    python create_indexes.py --drop-undeclared  # apply and drop unknown indexes
+"""
+
+from services.db_service import db_service
+from services.index_migrations import IndexMigrator
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def show_diff():
+    """
+    Log the difference between the database and the declared indexes
+
+    Returns:
+        bool: True if the database is up to date
+    """
+    db_service._ensure_connection()
+    diff = IndexMigrator(db_service.db).diff()
+
+    logger.info(f"Schema version: {diff['applied_version']} (declared: {diff['target_version']})")
+    for spec in diff['missing']:
+        logger.info(f"  + {spec.collection}.{spec.name}{' (unique)' if spec.unique else ''}")
+    for spec in diff['changed']:
+        logger.info(f"  ~ {spec.collection}.{spec.name} (options differ, will be rebuilt)")
+    for collection, name in diff['retired']:
+        logger.info(f"  - {collection}.{name} (retired)")
+    for collection, name in diff['undeclared']:
+        logger.info(f"  ? {collection}.{name} (not declared, kept unless --drop-undeclared)")
+
+    up_to_date = not (diff['missing'] or diff['changed'] or diff['retired'])
+    if up_to_date:
+        logger.info("✓ Indexes match the declaration")
+    return up_to_date
+
+def create_indexes(drop_undeclared=False):
+    """
+    Apply the declared indexes
+
+    Args:
+        drop_undeclared (bool): Also drop indexes that are not declared
+
+    Returns:
+        bool: True if successful
+    """
+    logger.info("Applying index migrations...")
+
+    try:
+        db_service._ensure_connection()
+        result = IndexMigrator(db_service.db).apply(drop_undeclared=drop_undeclared)
+
+        for name in result['created']:
+            logger.info(f"  + {name}")
+        for name in result['rebuilt']:
+            logger.info(f"  ~ {name}")
+        for name in result['dropped']:
+            logger.info(f"  - {name}")
+
+        if result['errors']:
+            for name, message in result['errors'].items():
+                logger.error(f"✗ {name}: {message}")
+            logger.error("Fix the errors above (e.g. remove duplicate students) and run again")
+            return False
+
+        logger.info(f"✓ Indexes at schema version {result['version']}")
+        return True
+    except Exception as e:
+        logger.error(f"✗ Failed to apply index migrations: {e}")
+        return False
+
+if __name__ == '__main__':
+    import sys
+
+    if '--diff' in sys.argv:
+        ok = show_diff()
+    else:
+        ok = create_indexes(drop_undeclared='--drop-undeclared' in sys.argv)
+
+    if not ok:
+        sys.exit(1)
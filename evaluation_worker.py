@@ -0,0 +1,43 @@
+"""
+AI Evaluation Worker
+Processes queued AI evaluations of student responses
+Run one or more of these next to the web app when AI_EVALUATION_MODE=queue
+(with AI_EVALUATION_MODE=thread the web app runs jobs itself)
+
+Usage:
+    python evaluation_worker.py            # run until interrupted
+    python evaluation_worker.py --drain    # process what is queued, then exit
+"""
+
+from services.evaluation_service import evaluation_service
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def drain():
+    """
+    Process queued jobs until the queue is empty
+
+    Returns:
+        int: Number of jobs processed
+    """
+    processed = 0
+    while True:
+        claimed = evaluation_service.process_batch()
+        if not claimed:
+            return processed
+        processed += claimed
+
+if __name__ == '__main__':
+    import sys
+
+    if '--drain' in sys.argv:
+        logger.info(f"✓ Processed {drain()} evaluation jobs")
+    else:
+        logger.info("Waiting for AI evaluation jobs (Ctrl+C to stop)...")
+        try:
+            evaluation_service.work()
+        except KeyboardInterrupt:
+            logger.info("Stopped")
@@ -47,6 +47,10 @@ def init_database():
         else:
             logger.info("✓ Admin account already exists")
         
+        # Create indexes (no longer done on every connection)
+        if db_service.ensure_indexes():
+            logger.info("✓ Database indexes created")
+        
         # Verify collections exist
         collections = db_service.db.list_collection_names()
         logger.info(f"✓ Database collections: {', '.join(collections)}")
@@ -0,0 +1,102 @@
+"""
+Migrate Embedded Responses Script
+Moves the responses array of every activity into the responses collection
+Run it before the new code serves traffic: until an activity is migrated,
+its embedded responses are invisible to the responses collection readers.
+Safe to run more than once, and submissions that arrive first are kept:
+copies are upserted by student, so a rerun skips responses it already copied
+and a student's newer response in the collection is never overwritten.
+Positions stay unique because submissions reserve positions after the
+embedded responses (see Activity.add_response).
+"""
+
+from pymongo import UpdateOne
+from services.db_service import db_service
+from models.activity import Activity
+from models.response import Response
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def migrate_activity(activity):
+    """
+    Copy one activity's embedded responses into the responses collection
+    
+    Args:
+        activity (dict): Activity document with a responses array
+        
+    Returns:
+        int: Number of responses migrated
+    """
+    activity_id = str(activity['_id'])
+    responses = activity.get('responses') or []
+    
+    collection = db_service.get_collection(Response.COLLECTION_NAME)
+    
+    # One response per student (the unique index allows no more): keep each
+    # student's first one, and whatever an interrupted run or the student
+    # already stored in the collection
+    operations = []
+    for position, response in enumerate(responses):
+        document = dict(response)
+        document['activity_id'] = activity_id
+        document['course_id'] = str(activity.get('course_id'))
+        document['position'] = position
+        document['migrated'] = True
+        operations.append(UpdateOne(
+            {'activity_id': activity_id, 'student_id': document.get('student_id')},
+            {'$setOnInsert': document},
+            upsert=True
+        ))
+    
+    migrated = 0
+    if operations:
+        migrated = collection.bulk_write(operations, ordered=True).upserted_count
+    
+    # Submissions since the deploy already counted the embedded responses;
+    # $max only covers activities nobody has submitted to since
+    db_service.update_one(
+        Activity.COLLECTION_NAME,
+        {'_id': activity['_id']},
+        {
+            '$unset': {'responses': ''},
+            '$max': {'response_count': len(responses)}
+        }
+    )
+    return migrated
+
+def migrate_responses():
+    """
+    Migrate all activities that still embed responses
+    
+    Returns:
+        bool: True if successful
+    """
+    logger.info("Migrating embedded activity responses...")
+    
+    try:
+        activities = db_service.find_many(
+            Activity.COLLECTION_NAME,
+            {'responses': {'$exists': True}}
+        )
+        logger.info(f"Found {len(activities)} activities with embedded responses")
+        
+        total = 0
+        for activity in activities:
+            count = migrate_activity(activity)
+            total += count
+            logger.info(f"  {activity.get('title', activity['_id'])}: {count} responses")
+        
+        logger.info(f"✓ Migrated {total} responses from {len(activities)} activities")
+        return True
+    except Exception as e:
+        logger.error(f"✗ Failed to migrate responses: {e}")
+        return False
+
+if __name__ == '__main__':
+    import sys
+    
+    if not migrate_responses():
+        sys.exit(1)
@@ -6,6 +6,11 @@ Defines learning activity data structure and operations
 from datetime import datetime
 from bson import ObjectId
 from services.db_service import db_service
+from services import identity_map
+from services.cache_service import cache_service
+from config import Config
+from models.points_ledger import PointsLedger
+from models.response import Response
 from utils.time_utils import get_hk_time
 import secrets
 import string
@@ -22,6 +27,21 @@ class Activity:
     TYPE_SHORT_ANSWER = 'short_answer'
     TYPE_WORD_CLOUD = 'word_cloud'
     
+    # Fields needed by list and count views; leaves out content and AI output
+    SUMMARY_PROJECTION = {
+        'title': 1,
+        'type': 1,
+        'course_id': 1,
+        'teacher_id': 1,
+        'link': 1,
+        'response_count': 1,
+        'created_at': 1,
+        'updated_at': 1,
+        'active': 1,
+        'ai_generated': 1,
+        'deadline': 1
+    }
+    
     def __init__(self, title, activity_type, content, course_id, teacher_id, deadline=None):
         """
         Initialize activity object
@@ -40,7 +60,7 @@ class Activity:
         self.course_id = course_id
         self.teacher_id = teacher_id
         self.link = self._generate_unique_link()
-        self.responses = []
+        self.response_count = 0  # Responses live in the responses collection
         self.created_at = get_hk_time()
         self.updated_at = get_hk_time()
         self.active = True
@@ -67,7 +87,7 @@ class Activity:
             'course_id': self.course_id,
             'teacher_id': self.teacher_id,
             'link': self.link,
-            'responses': self.responses,
+            'response_count': self.response_count,
             'created_at': self.created_at,
             'updated_at': self.updated_at,
             'active': self.active,
@@ -120,7 +140,52 @@ class Activity:
                 activity_id = ObjectId(activity_id)
             except:
                 return None
-        return db_service.find_one(Activity.COLLECTION_NAME, {'_id': activity_id})
+        
+        cached = identity_map.lookup(Activity.COLLECTION_NAME, activity_id)
+        if cached is not None:
+            return cached
+        
+        activity = cache_service.get(Activity.COLLECTION_NAME, activity_id)
+        if activity is None:
+            activity = db_service.find_one(Activity.COLLECTION_NAME, {'_id': activity_id})
+            Activity._cache(activity)
+        identity_map.remember(Activity.COLLECTION_NAME, activity)
+        return activity
+    
+    @staticmethod
+    def _cache(activity):
+        """
+        Cache an activity found in the database
+        A per-process cache only keeps it for Config.ACTIVITY_CACHE_TTL_SECONDS
+        (0: not at all), since a teacher closing or editing the activity on
+        another worker cannot invalidate it and submissions are checked
+        against its active flag, deadline and answers
+        
+        Args:
+            activity (dict): Activity document or None
+        """
+        if activity is None:
+            return
+        if cache_service.shared:
+            cache_service.set(Activity.COLLECTION_NAME, activity['_id'], activity)
+        elif Config.ACTIVITY_CACHE_TTL_SECONDS > 0:
+            cache_service.set(
+                Activity.COLLECTION_NAME,
+                activity['_id'],
+                activity,
+                Config.ACTIVITY_CACHE_TTL_SECONDS
+            )
+    
+    @staticmethod
+    def _invalidate(activity_id):
+        """
+        Drop cached copies of a activity after it changed
+        
+        Args:
+            activity_id (str or ObjectId): Activity ID
+        """
+        identity_map.forget(Activity.COLLECTION_NAME, activity_id)
+        cache_service.delete(Activity.COLLECTION_NAME, activity_id)
     
     @staticmethod
     def find_by_link(link):
@@ -155,6 +220,90 @@ class Activity:
             sort=[('created_at', -1)]
         )
     
+    @staticmethod
+    def find_by_courses(course_ids):
+        """
+        Find all activities in several courses with one query
+        
+        Args:
+            course_ids (list): Course IDs (str or ObjectId)
+            
+        Returns:
+            dict: course_id (str) -> list of activity documents, newest first
+        """
+        course_ids = [str(course_id) for course_id in course_ids]
+        grouped = {course_id: [] for course_id in course_ids}
+        if not course_ids:
+            return grouped
+        
+        activities = db_service.find_many(
+            Activity.COLLECTION_NAME,
+            {'course_id': {'$in': course_ids}, 'active': True},
+            sort=[('created_at', -1)]
+        )
+        for activity in activities:
+            grouped[activity['course_id']].append(activity)
+        return grouped
+    
+    @staticmethod
+    def find_summaries_by_course(course_id):
+        """
+        Find summary rows for all activities in a course
+        Same as find_by_course but only with SUMMARY_PROJECTION fields
+        
+        Args:
+            course_id (str or ObjectId): Course ID
+            
+        Returns:
+            list: List of activity summary documents
+        """
+        if isinstance(course_id, ObjectId):
+            course_id = str(course_id)
+        return db_service.find_many(
+            Activity.COLLECTION_NAME,
+            {'course_id': course_id, 'active': True},
+            sort=[('created_at', -1)],
+            projection=Activity.SUMMARY_PROJECTION
+        )
+    
+    @staticmethod
+    def count_by_course(course_id):
+        """
+        Count active activities in a course
+        
+        Args:
+            course_id (str or ObjectId): Course ID
+            
+        Returns:
+            int: Number of activities
+        """
+        return db_service.count_documents(
+            Activity.COLLECTION_NAME,
+            {'course_id': str(course_id), 'active': True}
+        )
+    
+    @staticmethod
+    def count_by_courses(course_ids):
+        """
+        Count active activities in several courses with one aggregation
+        
+        Args:
+            course_ids (list): Course IDs (str or ObjectId)
+            
+        Returns:
+            dict: course_id (str) -> number of activities (courses without
+                  activities are left out)
+        """
+        course_ids = [str(course_id) for course_id in course_ids]
+        if not course_ids:
+            return {}
+        
+        counts = db_service.aggregate(Activity.COLLECTION_NAME, [
+            {'$match': {'course_id': {'$in': course_ids}, 'active': True}},
+            {'$group': {'_id': '$course_id', 'count': {'$sum': 1}}}
+        ])
+        return {row['_id']: row['count'] for row in counts}
+    
     @staticmethod
     def find_by_teacher(teacher_id):
         """
@@ -172,28 +321,123 @@ class Activity:
             sort=[('created_at', -1)]
         )
     
+    @staticmethod
+    def find_summaries_by_teacher(teacher_id):
+        """
+        Find summary rows for all activities by teacher
+        
+        Args:
+            teacher_id (str): Teacher ID
+            
+        Returns:
+            list: List of activity summary documents
+        """
+        return db_service.find_many(
+            Activity.COLLECTION_NAME,
+            {'teacher_id': teacher_id, 'active': True},
+            sort=[('created_at', -1)],
+            projection=Activity.SUMMARY_PROJECTION
+        )
+    
+    @staticmethod
+    def attach_responses(activities):
+        """
+        Load responses for a list of activities with one query
+        Sets activity['responses'] on each activity, in submission order
+        
+        Args:
+            activities (list): Activity documents
+            
+        Returns:
+            list: The same activities with responses attached
+        """
+        grouped = Response.find_by_activities([activity['_id'] for activity in activities])
+        for activity in activities:
+            activity['responses'] = grouped.get(str(activity['_id']), [])
+        return activities
+    
+    @staticmethod
+    def attach_student_responses(activities, student_identifiers):
+        """
+        Load one student's responses for a list of activities with one query
+        Sets activity['student_response'] on each activity (None if not answered)
+        
+        Args:
+            activities (list): Activity documents
+            student_identifiers (list): The student's student_id and/or name
+            
+        Returns:
+            list: The same activities with the student's response attached
+        """
+        found = Response.find_by_student(
+            [activity['_id'] for activity in activities],
+            student_identifiers
+        )
+        for activity in activities:
+            activity['student_response'] = found.get(str(activity['_id']))
+        return activities
+    
     @staticmethod
     def add_response(activity_id, response_data):
         """
         Add student response to activity
+        A student who already responded has that response replaced
         
         Args:
             activity_id (str): Activity ID
             response_data (dict): Response data with student info and answer
             
         Returns:
-            bool: True if successful
+            str: ID of the student's response, or None if the activity does not exist
         """
         response_data['submitted_at'] = get_hk_time()
-        result = db_service.update_one(
+        
+        response_id, previous = Response.create(activity_id, response_data)
+        
+        if previous is not None:
+            # The student already responded (a resubmitted poll or a duplicate
+            # request): the answer is replaced and only the difference scored
+            activity = Activity.find_by_id(activity_id)
+            if activity:
+                PointsLedger.record_update(
+                    activity,
+                    previous,
+                    {**previous, **response_data},
+                    previous.get('position', 0)
+                )
+            return response_id
+        
+        # Reserve the next submission position atomically; an activity that
+        # still embeds its responses continues counting after them, so the
+        # positions never collide with the ones the migration assigns
+        activity = db_service.find_one_and_update(
             Activity.COLLECTION_NAME,
             {'_id': ObjectId(activity_id)},
-            {
-                '$push': {'responses': response_data},
-                '$set': {'updated_at': get_hk_time()}
-            }
+            [{
+                '$set': {
+                    'response_count': {'$add': [
+                        {'$ifNull': ['$response_count', {'$size': {'$ifNull': ['$responses', []]}}]},
+                        1
+                    ]},
+                    'updated_at': get_hk_time()
+                }
+            }],
+            projection={'type': 1, 'course_id': 1, 'response_count': 1},
+            return_after=True
         )
-        return result.modified_count > 0
+        Activity._invalidate(activity_id)
+        if not activity:
+            Response.delete(response_id)
+            return None
+        
+        position = activity['response_count'] - 1
+        Response.update(response_id, {
+            'course_id': str(activity.get('course_id')),
+            'position': position
+        })
+        
+        PointsLedger.record_response(activity, response_data, position)
+        return response_id
     
     @staticmethod
     def update_response(activity_id, student_identifier, response_data):
@@ -207,42 +451,37 @@ class Activity:
             response_data (dict): Updated response data
             
         Returns:
-            bool: True if successful
+            str: ID of the updated (or newly added) response, or None on failure
         """
         response_data['submitted_at'] = get_hk_time()
         
-        # Find the activity and locate the response index
         activity = Activity.find_by_id(activity_id)
         if not activity:
-            return False
-        
-        responses = activity.get('responses', [])
-        response_index = None
+            return None
         
         # Find the response by student_id or student_name
-        for i, response in enumerate(responses):
-            if (response.get('student_id') == student_identifier or 
-                response.get('student_name') == student_identifier):
-                response_index = i
-                break
+        existing = Response.find_for_student(activity_id, student_identifier)
         
-        if response_index is None:
+        if existing is None:
             # Response doesn't exist, add it instead
             return Activity.add_response(activity_id, response_data)
         
-        # Update the specific response
-        update_fields = {}
-        for key, value in response_data.items():
-            update_fields[f'responses.{response_index}.{key}'] = value
-        
-        update_fields['updated_at'] = get_hk_time()
+        if not Response.update(existing['_id'], response_data):
+            return None
         
-        result = db_service.update_one(
+        db_service.update_one(
             Activity.COLLECTION_NAME,
             {'_id': ObjectId(activity_id)},
-            {'$set': update_fields}
+            {'$set': {'updated_at': get_hk_time()}}
         )
-        return result.modified_count > 0
+        Activity._invalidate(activity_id)
+        PointsLedger.record_update(
+            activity,
+            existing,
+            {**existing, **response_data},
+            existing.get('position', 0)
+        )
+        return str(existing['_id'])
     
     @staticmethod
     def get_responses(activity_id):
@@ -255,10 +494,7 @@ class Activity:
         Returns:
             list: List of responses
         """
-        activity = Activity.find_by_id(activity_id)
-        if activity:
-            return activity.get('responses', [])
-        return []
+        return Response.find_by_activity(activity_id)
     
     @staticmethod
     def get_response_count(activity_id):
@@ -271,10 +507,7 @@ class Activity:
         Returns:
             int: Number of responses
         """
-        activity = Activity.find_by_id(activity_id)
-        if activity:
-            return len(activity.get('responses', []))
-        return 0
+        return Response.count_by_activity(activity_id)
     
     @staticmethod
     def update_activity(activity_id, update_data):
@@ -294,6 +527,7 @@ class Activity:
             {'_id': ObjectId(activity_id)},
             {'$set': update_data}
         )
+        Activity._invalidate(activity_id)
         return result.modified_count > 0
     
     @staticmethod
@@ -348,37 +582,36 @@ class Activity:
         Returns:
             bool: True if successful
         """
-        # Find the activity and locate the response index
         activity = Activity.find_by_id(activity_id)
         if not activity:
             return False
         
-        responses = activity.get('responses', [])
-        response_index = None
-        
         # Find the response by student_id or student_name
-        for i, response in enumerate(responses):
-            if (response.get('student_id') == student_identifier or 
-                response.get('student_name') == student_identifier):
-                response_index = i
-                break
-        
-        if response_index is None:
+        existing = Response.find_for_student(activity_id, student_identifier)
+        if existing is None:
             return False
         
         # Update the specific response with feedback
-        update_fields = {
-            f'responses.{response_index}.feedback': feedback,
-            f'responses.{response_index}.feedback_at': get_hk_time(),
-            'updated_at': get_hk_time()
-        }
+        success = Response.update(existing['_id'], {
+            'feedback': feedback,
+            'feedback_at': get_hk_time()
+        })
+        if not success:
+            return False
         
-        result = db_service.update_one(
+        db_service.update_one(
             Activity.COLLECTION_NAME,
             {'_id': ObjectId(activity_id)},
-            {'$set': update_fields}
+            {'$set': {'updated_at': get_hk_time()}}
         )
-        return result.modified_count > 0
+        Activity._invalidate(activity_id)
+        PointsLedger.record_update(
+            activity,
+            existing,
+            {**existing, 'feedback': feedback},
+            existing.get('position', 0)
+        )
+        return True
     
     @staticmethod
     def delete(activity_id):
@@ -391,8 +624,15 @@ class Activity:
         Returns:
             bool: True if successful
         """
+        activity = Activity.find_by_id(activity_id)
         result = db_service.delete_one(
             Activity.COLLECTION_NAME,
             {'_id': ObjectId(activity_id)}
         )
+        Activity._invalidate(activity_id)
+        if result.deleted_count > 0 and activity:
+            # Hard-deleted responses no longer count towards points
+            Activity.attach_responses([activity])
+            PointsLedger.remove_activity(activity)
+            Response.delete_by_activity(activity_id)
         return result.deleted_count > 0
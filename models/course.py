@@ -6,6 +6,8 @@ Defines course data structure and operations
 from datetime import datetime
 from bson import ObjectId
 from services.db_service import db_service
+from services import identity_map
+from services.cache_service import cache_service
 from utils.time_utils import get_hk_time
 
 class Course:
@@ -74,7 +76,64 @@ class Course:
                 course_id = ObjectId(course_id)
             except:
                 return None
-        return db_service.find_one(Course.COLLECTION_NAME, {'_id': course_id})
+        
+        cached = identity_map.lookup(Course.COLLECTION_NAME, course_id)
+        if cached is not None:
+            return cached
+        
+        course = cache_service.get(Course.COLLECTION_NAME, course_id)
+        if course is None:
+            course = db_service.find_one(Course.COLLECTION_NAME, {'_id': course_id})
+            cache_service.set(Course.COLLECTION_NAME, course_id, course)
+        identity_map.remember(Course.COLLECTION_NAME, course)
+        return course
+    
+    @staticmethod
+    def _invalidate(course_id):
+        """
+        Drop cached copies of a course after it changed
+        
+        Args:
+            course_id (str or ObjectId): Course ID
+        """
+        identity_map.forget(Course.COLLECTION_NAME, course_id)
+        cache_service.delete(Course.COLLECTION_NAME, course_id)
+    
+    @staticmethod
+    def find_many_by_ids(course_ids):
+        """
+        Find several courses by ID with one query
+        
+        Args:
+            course_ids (list): Course IDs (str or ObjectId); invalid IDs are skipped
+            
+        Returns:
+            dict: course_id (str) -> course document
+        """
+        found = {}
+        object_ids = []
+        for course_id in course_ids:
+            if not course_id:
+                continue
+            if isinstance(course_id, str):
+                if not ObjectId.is_valid(course_id):
+                    continue
+                course_id = ObjectId(course_id)
+            cached = identity_map.lookup(Course.COLLECTION_NAME, course_id)
+            if cached is None:
+                cached = cache_service.get(Course.COLLECTION_NAME, course_id)
+                identity_map.remember(Course.COLLECTION_NAME, cached)
+            if cached is not None:
+                found[str(course_id)] = cached
+            else:
+                object_ids.append(course_id)
+        
+        if object_ids:
+            for course in db_service.find_many(Course.COLLECTION_NAME, {'_id': {'$in': object_ids}}):
+                cache_service.set(Course.COLLECTION_NAME, course['_id'], course)
+                identity_map.remember(Course.COLLECTION_NAME, course)
+                found[str(course['_id'])] = course
+        return found
     
     @staticmethod
     def find_by_teacher(teacher_id):
@@ -93,6 +152,44 @@ class Course:
             sort=[('created_at', -1)]
         )
     
+    @staticmethod
+    def count_by_teacher(teacher_id):
+        """
+        Count active courses by teacher
+        
+        Args:
+            teacher_id (str): Teacher ID
+            
+        Returns:
+            int: Number of courses
+        """
+        return db_service.count_documents(
+            Course.COLLECTION_NAME,
+            {'teacher_id': teacher_id, 'active': True}
+        )
+    
+    @staticmethod
+    def count_by_teachers(teacher_ids):
+        """
+        Count active courses for several teachers with one aggregation
+        
+        Args:
+            teacher_ids (list): Teacher IDs (str)
+            
+        Returns:
+            dict: teacher_id -> number of courses (teachers without courses
+                  are left out)
+        """
+        teacher_ids = [str(teacher_id) for teacher_id in teacher_ids]
+        if not teacher_ids:
+            return {}
+        
+        counts = db_service.aggregate(Course.COLLECTION_NAME, [
+            {'$match': {'teacher_id': {'$in': teacher_ids}, 'active': True}},
+            {'$group': {'_id': '$teacher_id', 'count': {'$sum': 1}}}
+        ])
+        return {row['_id']: row['count'] for row in counts}
+    
     @staticmethod
     def find_by_code(code):
         """
@@ -124,6 +221,7 @@ class Course:
             {'_id': ObjectId(course_id)},
             {'$set': update_data}
         )
+        Course._invalidate(course_id)
         return result.modified_count > 0
     
     @staticmethod
@@ -143,6 +241,7 @@ class Course:
             {'_id': ObjectId(course_id)},
             {'$addToSet': {'students': student_id}}
         )
+        Course._invalidate(course_id)
         return result.modified_count > 0
     
     @staticmethod
@@ -162,6 +261,7 @@ class Course:
             {'_id': ObjectId(course_id)},
             {'$pull': {'students': student_id}}
         )
+        Course._invalidate(course_id)
         return result.modified_count > 0
     
     @staticmethod
@@ -208,19 +308,35 @@ class Course:
         )
     
     @staticmethod
-    def find_all():
+    def find_all(skip=None, limit=None):
         """
         Get all courses (including inactive) - for admin use
         
+        Args:
+            skip (int): Number of courses to skip (optional)
+            limit (int): Maximum number of courses to return (optional)
+        
         Returns:
             list: List of all course documents
         """
         return db_service.find_many(
             Course.COLLECTION_NAME,
             {},
-            sort=[('created_at', -1)]
+            sort=[('created_at', -1)],
+            skip=skip,
+            limit=limit
         )
     
+    @staticmethod
+    def count_all():
+        """
+        Count all courses (including inactive)
+        
+        Returns:
+            int: Number of courses
+        """
+        return db_service.count_documents(Course.COLLECTION_NAME, {})
+    
     @staticmethod
     def update(course_id, update_data):
         """
@@ -250,4 +366,5 @@ class Course:
             Course.COLLECTION_NAME,
             {'_id': ObjectId(course_id)}
         )
+        Course._invalidate(course_id)
         return result.deleted_count > 0
@@ -0,0 +1,191 @@
+"""
+Evaluation Job Model Module
+Queue of AI evaluations waiting to be written onto student responses
+"""
+
+from bson import ObjectId
+from datetime import timedelta
+from services.db_service import db_service
+from utils.time_utils import get_hk_time
+
+class EvaluationJob:
+    """
+    One queued AI evaluation of a short answer or word cloud response
+    Jobs move queued -> running -> done/failed; a running job whose worker
+    disappeared (e.g. a frozen serverless instance) can be claimed again
+    once it is older than the stale timeout, or is failed by
+    fail_abandoned() if that was its last attempt
+    """
+
+    COLLECTION_NAME = 'evaluation_jobs'
+
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+
+    # A job is given up after this many claims
+    MAX_ATTEMPTS = 3
+
+    @staticmethod
+    def create(job_id, activity, response_id, question, answer, activity_type):
+        """
+        Queue an evaluation
+
+        Args:
+            job_id (ObjectId): ID for the job (already stored on the response)
+            activity (dict): Activity document
+            response_id (str): ID of the response to write the evaluation onto
+            question (str): Question or prompt shown to the student
+            answer (str): Student answer (keywords joined for word clouds)
+            activity_type (str): short_answer or word_cloud
+
+        Returns:
+            str: Job ID
+        """
+        db_service.insert_one(EvaluationJob.COLLECTION_NAME, {
+            '_id': job_id,
+            'activity_id': str(activity['_id']),
+            'response_id': str(response_id),
+            'question': question,
+            'answer': answer,
+            'activity_type': activity_type,
+            'status': EvaluationJob.STATUS_QUEUED,
+            'attempts': 0,
+            'created_at': get_hk_time()
+        })
+        return str(job_id)
+
+    @staticmethod
+    def find_by_id(job_id):
+        """
+        Find a job by ID
+
+        Args:
+            job_id (str): Job ID
+
+        Returns:
+            dict: Job document or None
+        """
+        try:
+            return db_service.find_one(EvaluationJob.COLLECTION_NAME, {'_id': ObjectId(job_id)})
+        except Exception:
+            return None
+
+    @staticmethod
+    def claim(job_id=None, stale_after_seconds=120, activity_id=None):
+        """
+        Atomically take a queued (or stale running) job
+
+        Args:
+            job_id (str): Claim this job only (default: the oldest claimable job)
+            stale_after_seconds (float): Age after which a running job is claimable again
+            activity_id (str): Only claim a job of this activity (optional)
+
+        Returns:
+            dict: The claimed job or None if there is nothing to claim
+        """
+        now = get_hk_time()
+        query = {
+            '$or': [
+                {'status': EvaluationJob.STATUS_QUEUED},
+                {
+                    'status': EvaluationJob.STATUS_RUNNING,
+                    'started_at': {'$lt': now - timedelta(seconds=stale_after_seconds)}
+                }
+            ],
+            'attempts': {'$lt': EvaluationJob.MAX_ATTEMPTS}
+        }
+        if job_id is not None:
+            query['_id'] = ObjectId(job_id)
+        if activity_id is not None:
+            query['activity_id'] = activity_id
+
+        return db_service.find_one_and_update(
+            EvaluationJob.COLLECTION_NAME,
+            query,
+            {
+                '$set': {'status': EvaluationJob.STATUS_RUNNING, 'started_at': now},
+                '$inc': {'attempts': 1}
+            },
+            return_after=True,
+            sort=[('created_at', 1)]
+        )
+
+    @staticmethod
+    def fail_abandoned(stale_after_seconds=120, job_id=None):
+        """
+        Mark stale running jobs that have used up their attempts as failed
+        claim() never takes these again, so without this a worker that died
+        during the last attempt would leave the job running forever
+
+        Args:
+            stale_after_seconds (float): Age after which a running job is abandoned
+            job_id (str): Only check this job (optional)
+
+        Returns:
+            list: The jobs marked failed
+        """
+        now = get_hk_time()
+        query = {
+            'status': EvaluationJob.STATUS_RUNNING,
+            'started_at': {'$lt': now - timedelta(seconds=stale_after_seconds)},
+            'attempts': {'$gte': EvaluationJob.MAX_ATTEMPTS}
+        }
+        if job_id is not None:
+            query['_id'] = ObjectId(job_id)
+
+        failed = []
+        while True:
+            job = db_service.find_one_and_update(
+                EvaluationJob.COLLECTION_NAME,
+                query,
+                {'$set': {
+                    'status': EvaluationJob.STATUS_FAILED,
+                    'finished_at': now,
+                    'error': 'Worker stopped during the last attempt'
+                }},
+                return_after=True
+            )
+            if job is None:
+                return failed
+            failed.append(job)
+
+    @staticmethod
+    def release(job_id, error):
+        """
+        Put a claimed job back in the queue after a failed attempt
+
+        Args:
+            job_id (str or ObjectId): Job ID
+            error (str): Why the attempt failed
+        """
+        db_service.update_one(
+            EvaluationJob.COLLECTION_NAME,
+            {'_id': ObjectId(str(job_id))},
+            {'$set': {'status': EvaluationJob.STATUS_QUEUED, 'error': error}}
+        )
+
+    @staticmethod
+    def finish(job_id, evaluation=None, error=None):
+        """
+        Record the outcome of a job
+
+        Args:
+            job_id (str or ObjectId): Job ID
+            evaluation (dict): AI evaluation (None if the job failed)
+            error (str): Error message for a failed job
+        """
+        update = {
+            'status': EvaluationJob.STATUS_FAILED if evaluation is None else EvaluationJob.STATUS_DONE,
+            'finished_at': get_hk_time()
+        }
+        if evaluation is not None:
+            update['evaluation'] = evaluation
+        if error:
+            update['error'] = error
+        db_service.update_one(
+            EvaluationJob.COLLECTION_NAME,
+            {'_id': ObjectId(str(job_id))},
+            {'$set': update}
+        )
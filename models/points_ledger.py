@@ -0,0 +1,418 @@
+"""
+Points Ledger Model Module
+Maintains per-(student, course) point totals incrementally
+"""
+
+from pymongo import ReplaceOne
+from services.db_service import db_service
+from utils.time_utils import get_hk_time
+import logging
+
+logger = logging.getLogger(__name__)
+
+class PointsLedger:
+    """
+    Persistent points ledger keyed by (student_id, course_id)
+    Updated atomically with $inc whenever a response changes, so reading a
+    student's points is an indexed lookup instead of a scan over activities
+    """
+
+    COLLECTION_NAME = 'points_ledger'
+
+    # Point values for different actions
+    POINTS = {
+        'poll_response': 10,           # Completing a poll
+        'short_answer_response': 20,   # Submitting a short answer
+        'word_cloud_response': 15,     # Contributing to word cloud
+        'poll_correct': 30,            # Getting poll answer correct (with auto-grading)
+        'early_submission': 5,         # Bonus for being among first submissions
+        'feedback_received': 5,        # Receiving teacher feedback
+    }
+
+    # Number of leading responses that earn the early submission bonus
+    EARLY_SUBMISSION_LIMIT = 5
+
+    # Breakdown fields stored on every ledger entry
+    FIELDS = [
+        'poll_responses',
+        'short_answer_responses',
+        'word_cloud_responses',
+        'correct_answers',
+        'early_submissions',
+        'feedback_received'
+    ]
+
+    @staticmethod
+    def empty_breakdown():
+        """
+        Get a zeroed points breakdown
+
+        Returns:
+            dict: Points breakdown with every field and total set to 0
+        """
+        breakdown = {field: 0 for field in PointsLedger.FIELDS}
+        breakdown['total'] = 0
+        return breakdown
+
+    @staticmethod
+    def score_response(activity_type, response, position):
+        """
+        Calculate the points a single response is worth
+
+        Args:
+            activity_type (str): Type of the activity the response belongs to
+            response (dict): Response document
+            position (int): Index of the response within the activity
+
+        Returns:
+            dict: Points breakdown for this response
+        """
+        from models.activity import Activity
+
+        points = PointsLedger.POINTS
+        breakdown = PointsLedger.empty_breakdown()
+
+        if activity_type == Activity.TYPE_POLL:
+            breakdown['poll_responses'] = points['poll_response']
+            # Check if answer is correct (for auto-graded polls)
+            if response.get('is_correct'):
+                breakdown['correct_answers'] = points['poll_correct']
+        elif activity_type == Activity.TYPE_SHORT_ANSWER:
+            breakdown['short_answer_responses'] = points['short_answer_response']
+        elif activity_type == Activity.TYPE_WORD_CLOUD:
+            breakdown['word_cloud_responses'] = points['word_cloud_response']
+
+        if position < PointsLedger.EARLY_SUBMISSION_LIMIT:
+            breakdown['early_submissions'] = points['early_submission']
+
+        if response.get('feedback'):
+            breakdown['feedback_received'] = points['feedback_received']
+
+        breakdown['total'] = sum(breakdown[field] for field in PointsLedger.FIELDS)
+        return breakdown
+
+    @staticmethod
+    def _apply(course_id, response, delta, activities_delta=0):
+        """
+        Atomically add a points delta to a student's ledger entry
+
+        Args:
+            course_id (str): Course ID
+            response (dict): Response identifying the student
+            delta (dict): Points breakdown to add (may be negative)
+            activities_delta (int): Change in number of activities completed
+        """
+        increments = {field: delta.get(field, 0) for field in PointsLedger.FIELDS + ['total']}
+        increments['activities_completed'] = activities_delta
+
+        if not any(increments.values()):
+            return
+
+        try:
+            db_service.update_one(
+                PointsLedger.COLLECTION_NAME,
+                {
+                    'student_id': response.get('student_id'),
+                    'course_id': str(course_id)
+                },
+                {
+                    '$inc': increments,
+                    '$set': {
+                        'student_name': response.get('student_name'),
+                        'updated_at': get_hk_time()
+                    }
+                },
+                upsert=True
+            )
+        except Exception as e:
+            # The ledger can always be rebuilt, never fail the submission for it
+            logger.error(f"Error updating points ledger for {response.get('student_id')}: {e}")
+            return
+
+        PointsLedger._invalidate_course(course_id)
+
+    @staticmethod
+    def _invalidate_course(course_id):
+        """
+        Drop the course's cached leaderboard so new points show immediately
+
+        Args:
+            course_id (str): Course ID
+        """
+        from services.points_service import PointsService
+
+        try:
+            PointsService.invalidate_course_leaderboard(course_id)
+        except Exception as e:
+            logger.error(f"Error invalidating leaderboard of course {course_id}: {e}")
+
+    @staticmethod
+    def record_response(activity, response, position):
+        """
+        Credit a student's first response to an activity to the ledger
+
+        Args:
+            activity (dict): Activity document (needs type and course_id)
+            response (dict): The response that was added
+            position (int): Index of the response within the activity
+        """
+        delta = PointsLedger.score_response(activity.get('type'), response, position)
+        PointsLedger._apply(activity.get('course_id'), response, delta, activities_delta=1)
+
+    @staticmethod
+    def record_update(activity, old_response, new_response, position):
+        """
+        Apply the points difference between two versions of a response
+
+        Args:
+            activity (dict): Activity document (needs type and course_id)
+            old_response (dict): Response before the change
+            new_response (dict): Response after the change
+            position (int): Index of the response within the activity
+        """
+        activity_type = activity.get('type')
+        old_points = PointsLedger.score_response(activity_type, old_response, position)
+        new_points = PointsLedger.score_response(activity_type, new_response, position)
+        delta = {
+            field: new_points[field] - old_points[field]
+            for field in PointsLedger.FIELDS + ['total']
+        }
+        PointsLedger._apply(activity.get('course_id'), new_response, delta)
+
+    @staticmethod
+    def contributions(activity):
+        """
+        Calculate what every student earns from one activity
+
+        Args:
+            activity (dict): Activity document with responses attached
+
+        Returns:
+            dict: student_id -> points breakdown plus student_name and activities_completed
+        """
+        entries = {}
+
+        for index, response in enumerate(activity.get('responses', [])):
+            position = response.get('position', index)
+            student_id = response.get('student_id')
+            entry = entries.get(student_id)
+            if entry is None:
+                entry = PointsLedger.empty_breakdown()
+                entry['student_name'] = response.get('student_name')
+                entry['activities_completed'] = 1
+                entries[student_id] = entry
+
+            points = PointsLedger.score_response(activity.get('type'), response, position)
+            for field in PointsLedger.FIELDS + ['total']:
+                entry[field] += points[field]
+
+        return entries
+
+    @staticmethod
+    def remove_activity(activity):
+        """
+        Take back the points an activity contributed (used on hard delete)
+
+        Args:
+            activity (dict): Activity document with responses attached
+        """
+        for student_id, entry in PointsLedger.contributions(activity).items():
+            delta = {field: -entry[field] for field in PointsLedger.FIELDS + ['total']}
+            PointsLedger._apply(
+                activity.get('course_id'),
+                {'student_id': student_id, 'student_name': entry['student_name']},
+                delta,
+                activities_delta=-entry['activities_completed']
+            )
+
+    @staticmethod
+    def find_entries(student_identifier, course_id=None):
+        """
+        Find ledger entries for a student
+
+        Args:
+            student_identifier (str): student_id or student_name
+            course_id (str, optional): Filter by specific course
+
+        Returns:
+            list: Ledger entries (one per course)
+        """
+        query = {
+            '$or': [
+                {'student_id': student_identifier},
+                {'student_name': student_identifier}
+            ]
+        }
+        if course_id:
+            query['course_id'] = str(course_id)
+        return db_service.find_many(PointsLedger.COLLECTION_NAME, query)
+
+    @staticmethod
+    def find_by_course(course_id):
+        """
+        Find every ledger entry in a course
+
+        Args:
+            course_id (str): Course ID
+
+        Returns:
+            dict: student_id -> ledger entry
+        """
+        entries = db_service.find_many(PointsLedger.COLLECTION_NAME, {'course_id': str(course_id)})
+        return {entry.get('student_id'): entry for entry in entries}
+
+    @staticmethod
+    def count_above(course_id, points):
+        """
+        Count students in a course with more points than a given total
+        Answered from the (course_id, total) index alone: entries are removed
+        when a student leaves the course (see remove_student)
+
+        Args:
+            course_id (str): Course ID
+            points (int): Points total to compare against
+
+        Returns:
+            int: Number of students with a higher total
+        """
+        return db_service.count_documents(
+            PointsLedger.COLLECTION_NAME,
+            {'course_id': str(course_id), 'total': {'$gt': points}}
+        )
+
+    @staticmethod
+    def remove_student(student_id, course_id):
+        """
+        Remove a student's ledger entry for a course they left, so they no
+        longer take part in the course ranking
+
+        Args:
+            student_id (str): Student ID number
+            course_id (str): Course ID
+
+        Returns:
+            int: Number of entries removed
+        """
+        result = db_service.delete_many(
+            PointsLedger.COLLECTION_NAME,
+            {'student_id': student_id, 'course_id': str(course_id)}
+        )
+        PointsLedger._invalidate_course(course_id)
+        return result.deleted_count
+
+    @staticmethod
+    def totals_by_student():
+        """
+        Sum every student's ledger entries across all courses
+
+        Returns:
+            dict: student_id -> dict with total and activities_completed
+        """
+        totals = {}
+        for entry in db_service.find_many(PointsLedger.COLLECTION_NAME, {}):
+            student_totals = totals.setdefault(
+                entry.get('student_id'), {'total': 0, 'activities_completed': 0}
+            )
+            student_totals['total'] += entry.get('total', 0)
+            student_totals['activities_completed'] += entry.get('activities_completed', 0)
+        return totals
+
+    @staticmethod
+    def breakdown(entry):
+        """
+        Extract the points breakdown from a ledger entry
+
+        Args:
+            entry (dict): Ledger entry or None
+
+        Returns:
+            dict: Points breakdown and total
+        """
+        breakdown = PointsLedger.empty_breakdown()
+        if entry:
+            for field in PointsLedger.FIELDS + ['total']:
+                breakdown[field] = entry.get(field, 0)
+        return breakdown
+
+    @staticmethod
+    def get_points(student_identifier, course_id=None):
+        """
+        Get a student's points breakdown from the ledger
+
+        Args:
+            student_identifier (str): student_id or student_name
+            course_id (str, optional): Filter by specific course
+
+        Returns:
+            dict: Points breakdown and total, plus activities_completed
+        """
+        breakdown = PointsLedger.empty_breakdown()
+        breakdown['activities_completed'] = 0
+
+        for entry in PointsLedger.find_entries(student_identifier, course_id):
+            for field in PointsLedger.FIELDS + ['total', 'activities_completed']:
+                breakdown[field] += entry.get(field, 0)
+
+        return breakdown
+
+    @staticmethod
+    def rebuild():
+        """
+        Rebuild the whole ledger from the activities and responses collections
+        for the students enrolled in each course
+
+        Returns:
+            int: Number of ledger entries written
+        """
+        from models.activity import Activity
+        from models.student import Student
+
+        # Students who left a course have no entry in it (see remove_student)
+        enrolled = {
+            (student.get('student_id'), str(student.get('course_id')))
+            for student in db_service.find_many(
+                Student.COLLECTION_NAME, {}, projection={'student_id': 1, 'course_id': 1}
+            )
+        }
+
+        totals = {}
+        activities = Activity.attach_responses(db_service.find_many(Activity.COLLECTION_NAME, {}))
+
+        for activity in activities:
+            course_id = str(activity.get('course_id'))
+            for student_id, entry in PointsLedger.contributions(activity).items():
+                key = (student_id, course_id)
+                if key not in enrolled:
+                    continue
+                if key not in totals:
+                    totals[key] = PointsLedger.empty_breakdown()
+                    totals[key]['activities_completed'] = 0
+                for field in PointsLedger.FIELDS + ['total', 'activities_completed']:
+                    totals[key][field] += entry[field]
+                totals[key]['student_name'] = entry['student_name']
+
+        now = get_hk_time()
+        documents = []
+        for (student_id, course_id), entry in totals.items():
+            entry['student_id'] = student_id
+            entry['course_id'] = course_id
+            entry['updated_at'] = now
+            documents.append(entry)
+
+        # Replace entries in place rather than emptying the collection, so
+        # rankings and concurrent $inc updates never see a missing entry;
+        # then remove entries nothing was rebuilt (or incremented) for
+        collection = db_service.get_collection(PointsLedger.COLLECTION_NAME)
+        if documents:
+            collection.bulk_write([
+                ReplaceOne(
+                    {'student_id': document['student_id'], 'course_id': document['course_id']},
+                    document,
+                    upsert=True
+                )
+                for document in documents
+            ], ordered=False)
+        collection.delete_many({'updated_at': {'$lt': now}})
+
+        logger.info(f"Rebuilt points ledger: {len(documents)} entries from {len(activities)} activities")
+        return len(documents)
@@ -0,0 +1,261 @@
+"""
+Response Model Module
+Stores student responses to activities in their own collection
+"""
+
+from bson import ObjectId
+from services.db_service import db_service
+
+class Response:
+    """
+    Student response model
+    One document per student per activity, keyed by (activity_id, student_id)
+    """
+
+    COLLECTION_NAME = 'responses'
+
+    @staticmethod
+    def _strip_ids(responses):
+        """
+        Remove database IDs so responses can be rendered or serialized
+        like the old embedded response dicts
+
+        Args:
+            responses (list): Response documents
+
+        Returns:
+            list: The same documents without '_id'
+        """
+        for response in responses:
+            response.pop('_id', None)
+        return responses
+
+    @staticmethod
+    def _student_query(activity_id, student_identifier):
+        """
+        Build a query matching one student's responses to an activity
+
+        Args:
+            activity_id (str): Activity ID
+            student_identifier (str): student_id or student_name
+
+        Returns:
+            dict: Query filter
+        """
+        return {
+            'activity_id': str(activity_id),
+            '$or': [
+                {'student_id': student_identifier},
+                {'student_name': student_identifier}
+            ]
+        }
+
+    @staticmethod
+    def create(activity_id, response_data):
+        """
+        Store a student's response, replacing the one they already submitted
+        Keyed by the unique (activity_id, student_id) index, so two concurrent
+        submissions from one student never leave two responses
+
+        Args:
+            activity_id (str): Activity ID
+            response_data (dict): Response data with student info and answer
+
+        Returns:
+            tuple: (response ID, the replaced response or None if this inserted one)
+        """
+        response_id = ObjectId()
+        previous = db_service.find_one_and_update(
+            Response.COLLECTION_NAME,
+            {'activity_id': str(activity_id), 'student_id': response_data.get('student_id')},
+            {'$set': response_data, '$setOnInsert': {'_id': response_id}},
+            upsert=True
+        )
+        if previous is not None:
+            response_id = previous['_id']
+        return str(response_id), previous
+
+    @staticmethod
+    def delete(response_id):
+        """
+        Delete a response
+
+        Args:
+            response_id (str): Response ID
+
+        Returns:
+            bool: True if a response was deleted
+        """
+        result = db_service.delete_one(Response.COLLECTION_NAME, {'_id': ObjectId(str(response_id))})
+        return result.deleted_count > 0
+
+    @staticmethod
+    def find_by_activity(activity_id):
+        """
+        Find all responses to an activity in submission order
+
+        Args:
+            activity_id (str): Activity ID
+
+        Returns:
+            list: List of response documents
+        """
+        return Response._strip_ids(db_service.find_many(
+            Response.COLLECTION_NAME,
+            {'activity_id': str(activity_id)},
+            sort=[('position', 1)]
+        ))
+
+    @staticmethod
+    def find_by_activities(activity_ids):
+        """
+        Find responses to several activities with one query
+
+        Args:
+            activity_ids (list): Activity IDs
+
+        Returns:
+            dict: activity_id (str) -> list of responses in submission order
+        """
+        activity_ids = [str(activity_id) for activity_id in activity_ids]
+        grouped = {activity_id: [] for activity_id in activity_ids}
+        if not activity_ids:
+            return grouped
+
+        responses = db_service.find_many(
+            Response.COLLECTION_NAME,
+            {'activity_id': {'$in': activity_ids}},
+            sort=[('activity_id', 1), ('position', 1)]
+        )
+        for response in Response._strip_ids(responses):
+            grouped[response['activity_id']].append(response)
+        return grouped
+
+    @staticmethod
+    def find_for_student(activity_id, student_identifier):
+        """
+        Find a student's first response to an activity
+
+        Args:
+            activity_id (str): Activity ID
+            student_identifier (str): student_id or student_name
+
+        Returns:
+            dict: Response document (including _id) or None
+        """
+        responses = db_service.find_many(
+            Response.COLLECTION_NAME,
+            Response._student_query(activity_id, student_identifier),
+            sort=[('position', 1)],
+            limit=1
+        )
+        return responses[0] if responses else None
+
+    @staticmethod
+    def find_by_student(activity_ids, student_identifiers):
+        """
+        Find a student's responses to several activities with one query
+        Served by the (activity_id, student_id) and (activity_id, student_name)
+        indexes, so the cost does not grow with the number of other responses
+
+        Args:
+            activity_ids (list): Activity IDs
+            student_identifiers (list): The student's student_id and/or name
+
+        Returns:
+            dict: activity_id (str) -> the student's first response
+        """
+        activity_ids = [str(activity_id) for activity_id in activity_ids]
+        student_identifiers = [identifier for identifier in student_identifiers if identifier]
+        if not activity_ids or not student_identifiers:
+            return {}
+
+        responses = db_service.find_many(
+            Response.COLLECTION_NAME,
+            {
+                'activity_id': {'$in': activity_ids},
+                '$or': [
+                    {'student_id': {'$in': student_identifiers}},
+                    {'student_name': {'$in': student_identifiers}}
+                ]
+            },
+            sort=[('position', 1)]
+        )
+        found = {}
+        for response in Response._strip_ids(responses):
+            found.setdefault(response['activity_id'], response)
+        return found
+
+    @staticmethod
+    def update(response_id, update_data):
+        """
+        Update fields of a response
+
+        Args:
+            response_id (ObjectId or str): Response ID
+            update_data (dict): Fields to set
+
+        Returns:
+            bool: True if successful
+        """
+        if isinstance(response_id, str):
+            response_id = ObjectId(response_id)
+        result = db_service.update_one(
+            Response.COLLECTION_NAME,
+            {'_id': response_id},
+            {'$set': update_data}
+        )
+        return result.modified_count > 0
+
+    @staticmethod
+    def set_evaluation(response_id, job_id, evaluation, status):
+        """
+        Write a background AI evaluation onto a response
+        Ignored if the response was edited (and re-queued) since the job started
+
+        Args:
+            response_id (str): Response ID
+            job_id (str): Evaluation job that produced the result
+            evaluation (dict): AI evaluation (None if it failed)
+            status (str): done or failed
+
+        Returns:
+            bool: True if the response was updated
+        """
+        result = db_service.update_one(
+            Response.COLLECTION_NAME,
+            {'_id': ObjectId(str(response_id)), 'ai_evaluation_job': str(job_id)},
+            {'$set': {'ai_evaluation': evaluation, 'ai_evaluation_status': status}}
+        )
+        return result.modified_count > 0
+
+    @staticmethod
+    def count_by_activity(activity_id):
+        """
+        Count responses to an activity
+
+        Args:
+            activity_id (str): Activity ID
+
+        Returns:
+            int: Number of responses
+        """
+        return db_service.count_documents(
+            Response.COLLECTION_NAME,
+            {'activity_id': str(activity_id)}
+        )
+
+    @staticmethod
+    def delete_by_activity(activity_id):
+        """
+        Delete every response to an activity
+
+        Args:
+            activity_id (str): Activity ID
+
+        Returns:
+            int: Number of responses deleted
+        """
+        collection = db_service.get_collection(Response.COLLECTION_NAME)
+        result = collection.delete_many({'activity_id': str(activity_id)})
+        return result.deleted_count
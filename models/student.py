@@ -6,6 +6,7 @@ Defines student data structure and operations
 from datetime import datetime
 from bson import ObjectId
 from services.db_service import db_service
+from models.points_ledger import PointsLedger
 from utils.time_utils import get_hk_time
 
 class Student:
@@ -141,6 +142,27 @@ class Student:
         """
         return db_service.count_documents(Student.COLLECTION_NAME, {'course_id': course_id})
     
+    @staticmethod
+    def count_by_courses(course_ids):
+        """
+        Count students in several courses with one aggregation
+        
+        Args:
+            course_ids (list): Course IDs (str)
+            
+        Returns:
+            dict: course_id -> number of students (empty courses are left out)
+        """
+        course_ids = [str(course_id) for course_id in course_ids]
+        if not course_ids:
+            return {}
+        
+        counts = db_service.aggregate(Student.COLLECTION_NAME, [
+            {'$match': {'course_id': {'$in': course_ids}}},
+            {'$group': {'_id': '$course_id', 'count': {'$sum': 1}}}
+        ])
+        return {row['_id']: row['count'] for row in counts}
+    
     @staticmethod
     def bulk_insert(students_data):
         """
@@ -181,7 +203,7 @@ class Student:
     @staticmethod
     def delete_student(student_id):
         """
-        Delete student from database
+        Delete student from database, with their points ledger entry
         
         Args:
             student_id (str): Student database ID
@@ -189,16 +211,20 @@ class Student:
         Returns:
             bool: True if successful
         """
+        student = Student.find_by_id(student_id)
         result = db_service.delete_one(
             Student.COLLECTION_NAME,
             {'_id': ObjectId(student_id)}
         )
+        if result.deleted_count and student:
+            PointsLedger.remove_student(student.get('student_id'), student.get('course_id'))
         return result.deleted_count > 0
     
     @staticmethod
     def unenroll(student_id, course_id):
         """
-        Unenroll student from a course (delete enrollment record)
+        Unenroll student from a course (delete enrollment record and the
+        points ledger entry that ranks them in the course)
         For admin use when deleting courses
         
         Args:
@@ -208,6 +234,7 @@ class Student:
         Returns:
             bool: True if successful
         """
+        student = Student.find_by_id(student_id)
         result = db_service.delete_one(
             Student.COLLECTION_NAME,
             {
@@ -215,4 +242,6 @@ class Student:
                 'course_id': course_id
             }
         )
+        if result.deleted_count and student:
+            PointsLedger.remove_student(student.get('student_id'), course_id)
         return result.deleted_count > 0
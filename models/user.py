@@ -6,6 +6,9 @@ Defines user data structure and operations
 from datetime import datetime
 from bson import ObjectId
 from services.db_service import db_service
+from services import identity_map
+from services.cache_service import cache_service
+from config import Config
 from utils.time_utils import get_hk_time
 
 class User:
@@ -89,7 +92,82 @@ class User:
                 user_id = ObjectId(user_id)
             except:
                 return None
-        return db_service.find_one(User.COLLECTION_NAME, {'_id': user_id})
+        
+        cached = identity_map.lookup(User.COLLECTION_NAME, user_id)
+        if cached is not None:
+            return cached
+        
+        user = cache_service.get(User.COLLECTION_NAME, user_id)
+        if user is None:
+            user = db_service.find_one(User.COLLECTION_NAME, {'_id': user_id})
+            User._cache(user)
+        identity_map.remember(User.COLLECTION_NAME, user)
+        return user
+    
+    @staticmethod
+    def _cache(user):
+        """
+        Cache a user found in the database
+        A per-process cache only keeps it for Config.USER_CACHE_TTL_SECONDS
+        (0: not at all), since enrollment and role changes made by another
+        worker cannot invalidate it
+        
+        Args:
+            user (dict): User document or None
+        """
+        if user is None:
+            return
+        if cache_service.shared:
+            cache_service.set(User.COLLECTION_NAME, user['_id'], user)
+        elif Config.USER_CACHE_TTL_SECONDS > 0:
+            cache_service.set(User.COLLECTION_NAME, user['_id'], user, Config.USER_CACHE_TTL_SECONDS)
+    
+    @staticmethod
+    def _invalidate(user_id):
+        """
+        Drop cached copies of a user after it changed
+        
+        Args:
+            user_id (str or ObjectId): User ID
+        """
+        identity_map.forget(User.COLLECTION_NAME, user_id)
+        cache_service.delete(User.COLLECTION_NAME, user_id)
+    
+    @staticmethod
+    def find_many_by_ids(user_ids):
+        """
+        Find several users by ID with one query
+        
+        Args:
+            user_ids (list): User IDs (str or ObjectId); invalid IDs are skipped
+            
+        Returns:
+            dict: user_id (str) -> user document
+        """
+        found = {}
+        object_ids = []
+        for user_id in user_ids:
+            if not user_id:
+                continue
+            if isinstance(user_id, str):
+                if not ObjectId.is_valid(user_id):
+                    continue
+                user_id = ObjectId(user_id)
+            cached = identity_map.lookup(User.COLLECTION_NAME, user_id)
+            if cached is None:
+                cached = cache_service.get(User.COLLECTION_NAME, user_id)
+                identity_map.remember(User.COLLECTION_NAME, cached)
+            if cached is not None:
+                found[str(user_id)] = cached
+            else:
+                object_ids.append(user_id)
+        
+        if object_ids:
+            for user in db_service.find_many(User.COLLECTION_NAME, {'_id': {'$in': object_ids}}):
+                User._cache(user)
+                identity_map.remember(User.COLLECTION_NAME, user)
+                found[str(user['_id'])] = user
+        return found
     
     @staticmethod
     def find_by_email(email):
@@ -114,6 +192,24 @@ class User:
         """
         return db_service.find_many(User.COLLECTION_NAME, {'role': 'teacher'})
     
+    @staticmethod
+    def get_recent_teachers(limit=10):
+        """
+        Get the most recently created teacher accounts
+        
+        Args:
+            limit (int): Maximum number of teachers to return
+            
+        Returns:
+            list: List of teacher documents, newest first
+        """
+        return db_service.find_many(
+            User.COLLECTION_NAME,
+            {'role': 'teacher'},
+            sort=[('created_at', -1)],
+            limit=limit
+        )
+    
     @staticmethod
     def get_all_students():
         """
@@ -149,11 +245,13 @@ class User:
         Returns:
             bool: Success status
         """
-        return db_service.update_one(
+        result = db_service.update_one(
             User.COLLECTION_NAME,
             {'_id': ObjectId(user_id)},
             {'$addToSet': {'enrolled_courses': str(course_id)}}
         )
+        User._invalidate(user_id)
+        return result
     
     @staticmethod
     def unenroll_course(user_id, course_id):
@@ -167,11 +265,13 @@ class User:
         Returns:
             bool: Success status
         """
-        return db_service.update_one(
+        result = db_service.update_one(
             User.COLLECTION_NAME,
             {'_id': ObjectId(user_id)},
             {'$pull': {'enrolled_courses': str(course_id)}}
         )
+        User._invalidate(user_id)
+        return result
     
     @staticmethod
     def count_teachers():
@@ -203,8 +303,31 @@ class User:
                 return False
         
         # Update the user document
-        return db_service.update_one(
+        result = db_service.update_one(
             User.COLLECTION_NAME,
             {'_id': user_id},
             {'$set': update_data}
         )
+        User._invalidate(user_id)
+        return result
+    
+    @staticmethod
+    def delete_user(user_id):
+        """
+        Hard delete a user - for admin use
+        
+        Args:
+            user_id (str or ObjectId): User ID
+            
+        Returns:
+            bool: Success status
+        """
+        if isinstance(user_id, str):
+            try:
+                user_id = ObjectId(user_id)
+            except:
+                return False
+        
+        result = db_service.delete_one(User.COLLECTION_NAME, {'_id': user_id})
+        User._invalidate(user_id)
+        return result.deleted_count > 0
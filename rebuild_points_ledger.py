@@ -0,0 +1,39 @@
+"""
+Rebuild Points Ledger Script
+Reconstructs the points_ledger collection from the existing activities collection
+Run this once after deploying the ledger, or whenever it may have drifted
+"""
+
+from models.points_ledger import PointsLedger
+from services.points_service import PointsService
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def rebuild_points_ledger():
+    """
+    Rebuild the points ledger from scratch
+    
+    Returns:
+        bool: True if successful
+    """
+    logger.info("Rebuilding points ledger from activities...")
+    
+    try:
+        count = PointsLedger.rebuild()
+        logger.info(f"✓ Points ledger rebuilt with {count} entries")
+        
+        snapshot = PointsService.refresh_global_leaderboard()
+        logger.info(f"✓ Global leaderboard refreshed ({snapshot['total_students']} students)")
+        return True
+    except Exception as e:
+        logger.error(f"✗ Failed to rebuild points ledger: {e}")
+        return False
+
+if __name__ == '__main__':
+    import sys
+    
+    if not rebuild_points_ledger():
+        sys.exit(1)
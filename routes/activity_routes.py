@@ -3,13 +3,21 @@ Activity Routes Module
 Handles learning activity creation, management, and student participation
 """
 
-from flask import Blueprint, request, jsonify, session, render_template, redirect, url_for
+from flask import Blueprint, Response, request, jsonify, session, render_template, redirect, url_for, stream_with_context
 from models.activity import Activity
 from models.course import Course
+from models.user import User
+from models.evaluation_job import EvaluationJob
+from services.document_cache_service import document_cache_service
 from services.genai_service import genai_service
+from services.evaluation_service import evaluation_service, EvaluationService
+from services.points_service import PointsService
 from bson import ObjectId
 from datetime import datetime, timedelta
+import json
 import logging
+import os
+import tempfile
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -43,7 +51,8 @@ def create_activity():
         courses = Course.find_by_teacher(session['user_id'])
         for course in courses:
             course['_id'] = str(course['_id'])
-        return render_template('create_activity.html', courses=courses)
+        return render_template('create_activity.html', courses=courses,
+                               last_upload=session.get('last_upload'))
     
     try:
         data = request.get_json() if request.is_json else request.form
@@ -185,6 +194,9 @@ def ai_generate_activity():
     """
     Generate activity using AI
     Uses GPT-4 to create activity based on teaching content or uploaded document
+    Requests accepting text/event-stream get Server-Sent Events instead: a
+    'title' event, a 'question' event per question as soon as it is
+    generated, then a 'done' event with the same body as the JSON response
     """
     try:
         logger.info("=== AI Generate Activity Request Started ===")
@@ -216,74 +228,92 @@ def ai_generate_activity():
                     'message': 'Invalid file format. Only PDF and PowerPoint files are supported.'
                 }), 400
             
-            # Read file content
-            file_content = file.read()
-            
-            # Check file size with detailed messages
-            max_size = 10 * 1024 * 1024  # 10MB hard limit
-            recommended_size = 2 * 1024 * 1024  # 2MB recommended
-            warning_size = 3 * 1024 * 1024  # 3MB warning
-            
-            file_size_mb = len(file_content) / (1024 * 1024)
-            
-            if len(file_content) > max_size:
-                return jsonify({
-                    'success': False,
-                    'message': f'File size ({file_size_mb:.1f}MB) exceeds 10MB limit. Please use a smaller file.'
-                }), 400
-            
-            # Log warning for large files
-            if len(file_content) > warning_size:
-                logger.warning(f"Large file uploaded: {file_size_mb:.1f}MB. Recommended size is 1-2MB for best results.")
-            
-            # Extract text from document
+            # Spool the upload to a temporary file; extraction memory-maps it
+            # instead of keeping copies of the bytes
+            fd, file_path = tempfile.mkstemp(suffix=file_ext)
+            os.close(fd)
             try:
-                from services.document_service import extract_document_content, summarize_content
-                teaching_content = extract_document_content(file.filename, file_content)
+                file.save(file_path)
+                file_size = os.path.getsize(file_path)
                 
-                # Use intelligent summarization that samples from entire document
-                # Adjust length based on number of questions requested
-                activity_type = request.form.get('type', 'short_answer').strip()
-                num_questions = int(request.form.get('num_questions', 1))
+                # Check file size with detailed messages
+                max_size = 10 * 1024 * 1024  # 10MB hard limit
+                recommended_size = 2 * 1024 * 1024  # 2MB recommended
+                warning_size = 3 * 1024 * 1024  # 3MB warning
                 
-                # CRITICAL: Reduce input content significantly for large files
-                # to leave enough space for AI output (especially for polls)
-                # Calculate appropriate content length based on activity type
-                if activity_type == 'poll':
-                    # For poll: Much shorter input needed because output is long
-                    # Each question generates ~200 tokens output
-                    # Limit input to allow full output generation
-                    if num_questions <= 3:
-                        max_content_length = 2500  # ~600 tokens input, leaves room for 3 questions
-                    elif num_questions <= 5:
-                        max_content_length = 2000  # ~500 tokens input, leaves room for 5 questions
-                    else:
-                        max_content_length = 1500  # ~400 tokens input, leaves room for 10 questions
-                else:
-                    # For other types: 3000 chars is sufficient (output is shorter)
-                    max_content_length = 3000
+                file_size_mb = file_size / (1024 * 1024)
                 
-                teaching_content = summarize_content(teaching_content, max_length=max_content_length)
+                if file_size > max_size:
+                    return jsonify({
+                        'success': False,
+                        'message': f'File size ({file_size_mb:.1f}MB) exceeds 10MB limit. Please use a smaller file.'
+                    }), 400
                 
-                logger.info(f"Extracted {len(teaching_content)} characters from {file.filename} (file size: {len(file_content)} bytes)")
-                logger.info(f"Activity type: {activity_type}, num_questions: {num_questions}, content_length: {len(teaching_content)}")
+                # Log warning for large files
+                if file_size > warning_size:
+                    logger.warning(f"Large file uploaded: {file_size_mb:.1f}MB. Recommended size is 1-2MB for best results.")
                 
-                if not teaching_content or len(teaching_content) < 50:
+                # Extract text from document (or reuse the text cached for
+                # an identical upload)
+                try:
+                    from services.document_service import extract_document_content
+                    
+                    # Keep the most informative parts of the whole document
+                    # Adjust length based on number of questions requested
+                    activity_type = request.form.get('type', 'short_answer').strip()
+                    num_questions = int(request.form.get('num_questions', 1))
+                    max_content_length = _document_content_length(activity_type, num_questions)
+                    
+                    digest = document_cache_service.key(file_path)
+                    teaching_content = document_cache_service.content(
+                        digest, max_content_length,
+                        extract=lambda: extract_document_content(file.filename, file_path),
+                        filename=file.filename
+                    )
+                    
+                    logger.info(f"Extracted {len(teaching_content)} characters from {file.filename} (file size: {file_size} bytes)")
+                    logger.info(f"Activity type: {activity_type}, num_questions: {num_questions}, content_length: {len(teaching_content)}")
+                    
+                    if not teaching_content or len(teaching_content) < 50:
+                        return jsonify({
+                            'success': False,
+                            'message': 'Could not extract meaningful content from file. Please check the file format.'
+                        }), 400
+                    
+                    # "Last upload" generates from this file again without re-sending it
+                    session['last_upload'] = {'digest': digest, 'filename': file.filename}
+                    
+                except Exception as e:
+                    logger.error(f"Document extraction error: {e}")
+                    import traceback
+                    traceback.print_exc()
                     return jsonify({
                         'success': False,
-                        'message': 'Could not extract meaningful content from file. Please check the file format.'
+                        'message': f'Failed to extract content from file: {str(e)}'
                     }), 400
                 
-            except Exception as e:
-                logger.error(f"Document extraction error: {e}")
-                import traceback
-                traceback.print_exc()
+            finally:
+                os.remove(file_path)
+            
+            course_id = request.form.get('course_id', '').strip()
+            
+        elif content_source == 'last_upload':
+            # Generate from the teacher's previous upload, using its cached text
+            activity_type = request.form.get('type', 'short_answer').strip()
+            num_questions = int(request.form.get('num_questions', 1))
+            course_id = request.form.get('course_id', '').strip()
+            
+            last_upload = session.get('last_upload')
+            if last_upload:
+                teaching_content = document_cache_service.content(
+                    last_upload['digest'], _document_content_length(activity_type, num_questions)
+                )
+            if not teaching_content:
                 return jsonify({
                     'success': False,
-                    'message': f'Failed to extract content from file: {str(e)}'
+                    'message': 'The last uploaded file is no longer available. Please upload it again.'
                 }), 400
-            
-            course_id = request.form.get('course_id', '').strip()
+            logger.info(f"Using last upload {last_upload['filename']} ({len(teaching_content)} characters)")
             
         else:
             # Handle text content (original functionality)
@@ -317,6 +347,9 @@ def ai_generate_activity():
         logger.info(f"Generating AI activity for: {teaching_content[:100]}... ({activity_type}, {num_questions} questions)")
         logger.info(f"Content length: {len(teaching_content)} characters")
         
+        if 'text/event-stream' in request.headers.get('Accept', ''):
+            return _stream_generated_activity(teaching_content, activity_type, num_questions)
+        
         try:
             generated = genai_service.generate_activity(teaching_content, activity_type, num_questions)
             logger.info(f"AI generation successful. Activity type: {generated.get('activity_type')}")
@@ -349,6 +382,61 @@ def ai_generate_activity():
             'message': f'Failed to generate activity: {str(e)}'
         }), 500
 
+def _document_content_length(activity_type, num_questions):
+    """
+    Length of the content selected from an uploaded document
+    CRITICAL: Reduce input content significantly for large files to leave
+    enough space for AI output (especially for polls)
+    
+    Args:
+        activity_type (str): Type of activity to generate
+        num_questions (int): Number of questions requested
+        
+    Returns:
+        int: max_length for summarize_content
+    """
+    if activity_type == 'poll':
+        # For poll: each request asks for at most a few questions
+        # (~200 tokens output each) about its own section, so
+        # every request gets ~2500 chars (~600 tokens) of input
+        return 2500 * genai_service.poll_request_count(min(num_questions, 10))
+    # For other types: 3000 chars is sufficient (output is shorter)
+    return 3000
+
+def _stream_generated_activity(teaching_content, activity_type, num_questions):
+    """
+    Stream AI activity generation as Server-Sent Events
+    
+    Args:
+        teaching_content (str): Teaching content (already extracted/summarized)
+        activity_type (str): Type of activity
+        num_questions (int): Number of questions (poll only)
+        
+    Returns:
+        Response: text/event-stream response
+    """
+    username = session['username']
+    
+    def events():
+        for event, value in genai_service.stream_activity(teaching_content, activity_type, num_questions):
+            if event == 'done':
+                # Mark as AI generated
+                value['ai_generated'] = True
+                value = {
+                    'success': True,
+                    'message': 'Activity generated successfully',
+                    'generated_content': value
+                }
+                logger.info(f"AI activity streamed for {username}")
+            yield f"event: {event}\ndata: {json.dumps(value, ensure_ascii=False)}\n\n"
+    
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        # Keep proxies from buffering the stream
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @activity_bp.route('/activity/<activity_id>')
 @login_required
 def activity_detail(activity_id):
@@ -379,6 +467,7 @@ def activity_detail(activity_id):
             return "Access denied", 403
         
         print("DEBUG: Ownership check passed")
+        Activity.attach_responses([activity])
         activity['_id'] = str(activity['_id'])
         
         # Get course info
@@ -524,6 +613,9 @@ def submit_response(activity_id):
             'student_name': data.get('student_name', 'Anonymous')
         }
         
+        # (question, answer, activity_type) to evaluate with AI, if any
+        evaluation_request = None
+        
         # Parse response based on activity type
         if activity['type'] == Activity.TYPE_POLL:
             # Check if this is multi-question poll
@@ -580,17 +672,12 @@ def submit_response(activity_id):
                     'message': 'Please enter your answer'
                 }), 400
             
-            # Generate AI evaluation for short answer
-            question = activity['content'].get('question', '')
-            ai_result = genai_service.evaluate_student_answer(
-                question=question,
-                student_answer=response_data['text'],
-                activity_type='short_answer'
+            # AI evaluation for short answer
+            evaluation_request = (
+                activity['content'].get('question', ''),
+                response_data['text'],
+                'short_answer'
             )
-            
-            if ai_result['success']:
-                response_data['ai_evaluation'] = ai_result['evaluation']
-                logger.info("AI evaluation added to short answer response")
         
         elif activity['type'] == Activity.TYPE_WORD_CLOUD:
             response_data['keywords'] = data.get('keywords', [])
@@ -600,18 +687,29 @@ def submit_response(activity_id):
                     'message': 'Please enter at least one keyword'
                 }), 400
             
-            # Generate AI evaluation for word cloud
-            prompt = activity['content'].get('prompt', '')
-            keywords_text = ', '.join(response_data['keywords'])
+            # AI evaluation for word cloud
+            evaluation_request = (
+                activity['content'].get('prompt', ''),
+                ', '.join(response_data['keywords']),
+                'word_cloud'
+            )
+        
+        # Evaluate now (sync mode) or mark the response as pending and queue
+        # the evaluation once it is stored, so the worker is not held for the
+        # whole AI round trip
+        evaluation_job_id = None
+        if evaluation_request and evaluation_service.is_async:
+            evaluation_job_id = evaluation_service.prepare(response_data)
+        elif evaluation_request:
+            question, answer, activity_type = evaluation_request
             ai_result = genai_service.evaluate_student_answer(
-                question=prompt,
-                student_answer=keywords_text,
-                activity_type='word_cloud'
+                question=question,
+                student_answer=answer,
+                activity_type=activity_type
             )
-            
             if ai_result['success']:
                 response_data['ai_evaluation'] = ai_result['evaluation']
-                logger.info("AI evaluation added to word cloud response")
+                logger.info(f"AI evaluation added to {activity_type} response")
         
         # Check if this is an update (for short_answer and word_cloud)
         is_update = data.get('is_update', False)
@@ -619,22 +717,40 @@ def submit_response(activity_id):
         
         # For short answer and word cloud, allow updates
         if is_update and activity['type'] in [Activity.TYPE_SHORT_ANSWER, Activity.TYPE_WORD_CLOUD]:
-            success = Activity.update_response(activity_id, student_identifier, response_data)
+            response_id = Activity.update_response(activity_id, student_identifier, response_data)
             action = 'updated'
         else:
             # Add new response (for poll, or first submission for short_answer/word_cloud)
-            success = Activity.add_response(activity_id, response_data)
+            response_id = Activity.add_response(activity_id, response_data)
             action = 'submitted'
         
-        if success:
+        if response_id:
             logger.info(f"Response {action} for activity {activity_id}")
             
+            # Points changed: bring the global leaderboard up to date
+            PointsService.schedule_refresh()
+            
             # Prepare result message
             result = {
                 'success': True,
                 'message': f'Response {action} successfully'
             }
             
+            # Queue the AI evaluation; the client polls the status URL for it
+            if evaluation_job_id is not None:
+                question, answer, activity_type = evaluation_request
+                job_id = evaluation_service.enqueue(
+                    evaluation_job_id, activity, response_id, question, answer, activity_type
+                )
+                if job_id is None:
+                    result['evaluation_status'] = EvaluationJob.STATUS_FAILED
+                else:
+                    result['evaluation_job'] = job_id
+                    result['evaluation_status'] = EvaluationService.STATUS_PENDING
+                    result['evaluation_status_url'] = url_for(
+                        'activity.evaluation_status', activity_id=activity_id, job_id=job_id
+                    )
+            
             # For multi-question polls, include evaluation results
             if activity['type'] == Activity.TYPE_POLL and 'score' in response_data:
                 result['evaluation'] = {
@@ -663,6 +779,75 @@ def submit_response(activity_id):
             'message': 'Failed to submit response'
         }), 500
 
+def _can_view_activity(activity):
+    """
+    Check the logged-in user may see an activity's results: the teacher who
+    owns it (as in activity_detail) or a student enrolled in its course (as
+    in the student activity view)
+    
+    Args:
+        activity (dict): Activity document
+        
+    Returns:
+        bool: True if access is allowed
+    """
+    if session.get('role') == 'student':
+        user = User.find_by_id(session.get('user_id'))
+        return bool(user) and str(activity.get('course_id')) in user.get('enrolled_courses', [])
+    return str(activity.get('teacher_id')) == str(session.get('user_id'))
+
+@activity_bp.route('/activity/<activity_id>/evaluation/<job_id>')
+def evaluation_status(activity_id, job_id):
+    """
+    Get the status of a queued AI evaluation
+    Polled by the student page after submitting
+    """
+    try:
+        if 'user_id' not in session:
+            return jsonify({
+                'success': False,
+                'message': 'Not authenticated'
+            }), 401
+        
+        activity = Activity.find_by_id(activity_id)
+        if not activity:
+            return jsonify({
+                'success': False,
+                'message': 'Evaluation not found'
+            }), 404
+        
+        if not _can_view_activity(activity):
+            return jsonify({
+                'success': False,
+                'message': 'Access denied'
+            }), 403
+        
+        job = evaluation_service.status(job_id)
+        
+        if not job or job['activity_id'] != activity_id:
+            return jsonify({
+                'success': False,
+                'message': 'Evaluation not found'
+            }), 404
+        
+        result = {
+            'success': True,
+            'status': job['status']
+        }
+        if job['status'] == EvaluationJob.STATUS_DONE:
+            result['ai_evaluation'] = job['evaluation']
+        if 'queued_seconds' in job:
+            result['queued_seconds'] = job['queued_seconds']
+        
+        return jsonify(result), 200
+        
+    except Exception as e:
+        logger.error(f"Evaluation status error: {e}")
+        return jsonify({
+            'success': False,
+            'message': 'Failed to get evaluation status'
+        }), 500
+
 @activity_bp.route('/activity/<activity_id>/group-answers', methods=['POST'])
 @login_required
 def group_answers(activity_id):
@@ -692,7 +877,7 @@ def group_answers(activity_id):
                 'message': 'Only short answer activities can be grouped'
             }), 400
         
-        responses = activity.get('responses', [])
+        responses = Activity.get_responses(activity_id)
         
         if not responses:
             return jsonify({
@@ -8,6 +8,13 @@ from models.user import User
 from models.course import Course
 from models.activity import Activity
 from models.student import Student
+from services.cache_service import cache_service
+from services.ai_cache_service import ai_cache_service
+from services.ai_scheduler import ai_scheduler
+from services.document_cache_service import document_cache_service
+from services.db_service import db_service
+from services.query_profiler import query_profiler
+from config import Config
 import logging
 
 # Configure logging
@@ -35,6 +42,74 @@ def admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+# Largest page size accepted by the paginated admin API endpoints
+MAX_PAGE_SIZE = 500
+
+def get_page_args(default_limit=None):
+    """
+    Read skip/limit pagination parameters from the query string
+    
+    Args:
+        default_limit (int): Page size when no limit is given (None = no limit)
+        
+    Returns:
+        tuple: (skip, limit)
+    """
+    skip = max(request.args.get('skip', 0, type=int), 0)
+    limit = request.args.get('limit', default_limit, type=int)
+    if limit is not None:
+        limit = min(max(limit, 1), MAX_PAGE_SIZE)
+    return skip, limit
+
+def page_info(skip, limit, returned, total):
+    """
+    Build the pagination block returned by the admin API endpoints
+    
+    Args:
+        skip (int): Number of documents skipped
+        limit (int): Page size (None = no limit)
+        returned (int): Number of documents in this page
+        total (int): Number of documents matching the query
+        
+    Returns:
+        dict: Pagination info
+    """
+    return {
+        'skip': skip,
+        'limit': limit,
+        'total': total,
+        'has_more': skip + returned < total
+    }
+
+def add_activity_owner_info(activities):
+    """
+    Add teacher and course names to activity summaries
+    Resolves all teachers and courses with one query each
+    
+    Args:
+        activities (list): Activity documents
+        
+    Returns:
+        list: The same activities with display fields added
+    """
+    teachers = User.find_many_by_ids({activity.get('teacher_id') for activity in activities})
+    courses = Course.find_many_by_ids({activity.get('course_id') for activity in activities})
+    
+    for activity in activities:
+        activity['_id'] = str(activity['_id'])
+        activity['response_count'] = activity.get('response_count', 0)
+        
+        # Get teacher info
+        teacher = teachers.get(str(activity.get('teacher_id')))
+        activity['teacher_name'] = teacher['username'] if teacher else 'Unknown'
+        
+        # Get course info
+        course = courses.get(str(activity.get('course_id')))
+        activity['course_name'] = course['name'] if course else 'Unknown'
+        activity['course_code'] = course['code'] if course else 'N/A'
+    
+    return activities
+
 @admin_bp.route('/admin')
 @admin_required
 def admin_dashboard():
@@ -55,16 +130,12 @@ def admin_dashboard():
         stats['short_answer_count'] = Activity.count_by_type(Activity.TYPE_SHORT_ANSWER)
         stats['word_cloud_count'] = Activity.count_by_type(Activity.TYPE_WORD_CLOUD)
         
-        # Get recent teachers
-        recent_teachers = User.get_all_teachers()
+        # Get the 10 most recent teachers with their course counts
+        recent_teachers = User.get_recent_teachers(limit=10)
+        course_counts = Course.count_by_teachers([teacher['_id'] for teacher in recent_teachers])
         for teacher in recent_teachers:
             teacher['_id'] = str(teacher['_id'])
-            # Get teacher's course count
-            teacher['course_count'] = len(Course.find_by_teacher(teacher['_id']))
-        
-        # Sort by created_at and limit to 10
-        recent_teachers.sort(key=lambda x: x.get('created_at', ''), reverse=True)
-        recent_teachers = recent_teachers[:10]
+            teacher['course_count'] = course_counts.get(teacher['_id'], 0)
         
         return render_template(
             'admin.html',
@@ -90,7 +161,12 @@ def get_stats():
             'total_activities': Activity.count_all(),
             'poll_count': Activity.count_by_type(Activity.TYPE_POLL),
             'short_answer_count': Activity.count_by_type(Activity.TYPE_SHORT_ANSWER),
-            'word_cloud_count': Activity.count_by_type(Activity.TYPE_WORD_CLOUD)
+            'word_cloud_count': Activity.count_by_type(Activity.TYPE_WORD_CLOUD),
+            'cache': cache_service.stats(),
+            'ai_cache': ai_cache_service.stats(),
+            'ai_calls': ai_scheduler.stats(),
+            'document_cache': document_cache_service.stats(),
+            'database': db_service.pool_stats()
         }
         
         return jsonify({
@@ -105,6 +181,19 @@ def get_stats():
             'message': 'Failed to fetch statistics'
         }), 500
 
+@admin_bp.route('/admin/debug/queries')
+@admin_required
+def get_query_profile():
+    """
+    Get recent per-request query profiles and slow queries
+    API endpoint for finding routes that issue too many or slow queries
+    """
+    return jsonify({
+        'success': True,
+        'profiling': Config.DB_PROFILING,
+        **query_profiler.stats()
+    }), 200
+
 @admin_bp.route('/admin/teachers')
 @admin_required
 def get_teachers():
@@ -116,9 +205,10 @@ def get_teachers():
         teachers = User.get_all_teachers()
         
         # Add course count for each teacher
+        course_counts = Course.count_by_teachers([teacher['_id'] for teacher in teachers])
         for teacher in teachers:
             teacher['_id'] = str(teacher['_id'])
-            teacher['course_count'] = len(Course.find_by_teacher(teacher['_id']))
+            teacher['course_count'] = course_counts.get(teacher['_id'], 0)
             # Remove password field
             if 'password' in teacher:
                 del teacher['password']
@@ -144,30 +234,25 @@ def get_all_activities():
     """
     try:
         # Get all activities (not filtered by teacher)
-        from services.db_service import db_service
+        skip, limit = get_page_args(default_limit=100)
+        query = {'active': True}
         activities = db_service.find_many(
             Activity.COLLECTION_NAME,
-            {'active': True},
+            query,
             sort=[('created_at', -1)],
-            limit=100
+            skip=skip,
+            limit=limit,
+            projection=Activity.SUMMARY_PROJECTION
         )
         
         # Add teacher and course info
-        for activity in activities:
-            activity['_id'] = str(activity['_id'])
-            activity['response_count'] = len(activity.get('responses', []))
-            
-            # Get teacher info
-            teacher = User.find_by_id(activity['teacher_id'])
-            activity['teacher_name'] = teacher['username'] if teacher else 'Unknown'
-            
-            # Get course info
-            course = Course.find_by_id(activity['course_id'])
-            activity['course_name'] = course['name'] if course else 'Unknown'
+        add_activity_owner_info(activities)
+        total = db_service.count_documents(Activity.COLLECTION_NAME, query)
         
         return jsonify({
             'success': True,
-            'activities': activities
+            'activities': activities,
+            'pagination': page_info(skip, limit, len(activities), total)
         }), 200
         
     except Exception as e:
@@ -189,9 +274,15 @@ def users_page():
 def get_all_users():
     """Get all users (teachers, students, admins)"""
     try:
-        from services.db_service import db_service
-        users = list(db_service.find_many(User.COLLECTION_NAME, {}, limit=500))
-        
+        skip, limit = get_page_args(default_limit=500)
+        query = {}
+        if request.args.get('role'):
+            query['role'] = request.args.get('role')
+        users = list(db_service.find_many(User.COLLECTION_NAME, query, skip=skip, limit=limit))
+        
+        course_counts = Course.count_by_teachers([
+            user['_id'] for user in users if user.get('role') == 'teacher'
+        ])
         for user in users:
             user['_id'] = str(user['_id'])
             if 'password' in user:
@@ -199,12 +290,16 @@ def get_all_users():
             
             # Add additional stats
             if user['role'] == 'teacher':
-                courses = Course.find_by_teacher(user['_id'])
-                user['course_count'] = len(courses)
+                user['course_count'] = course_counts.get(user['_id'], 0)
             elif user['role'] == 'student':
                 user['enrolled_count'] = len(user.get('enrolled_courses', []))
         
-        return jsonify({'success': True, 'users': users}), 200
+        total = db_service.count_documents(User.COLLECTION_NAME, query)
+        return jsonify({
+            'success': True,
+            'users': users,
+            'pagination': page_info(skip, limit, len(users), total)
+        }), 200
     except Exception as e:
         logger.error(f"Get all users error: {e}")
         return jsonify({'success': False, 'message': 'Failed to fetch users'}), 500
@@ -229,9 +324,6 @@ def manage_user(user_id):
             data = request.get_json()
             
             # Update user
-            from services.db_service import db_service
-            from bson import ObjectId
-            
             update_data = {}
             if 'username' in data:
                 update_data['username'] = data['username'].strip()
@@ -246,11 +338,7 @@ def manage_user(user_id):
             if 'password' in data and data['password'].strip():
                 update_data['password'] = User.hash_password(data['password'])
             
-            result = db_service.update_one(
-                User.COLLECTION_NAME,
-                {'_id': ObjectId(user_id)},
-                {'$set': update_data}
-            )
+            result = User.update_user(user_id, update_data)
             
             if result:
                 logger.info(f"User {user_id} updated by admin")
@@ -259,14 +347,11 @@ def manage_user(user_id):
                 return jsonify({'success': False, 'message': 'Update failed'}), 500
         
         elif request.method == 'DELETE':
-            from services.db_service import db_service
-            from bson import ObjectId
-            
             # Don't allow deleting self
             if user_id == session.get('user_id'):
                 return jsonify({'success': False, 'message': 'Cannot delete your own account'}), 400
             
-            result = db_service.delete_one(User.COLLECTION_NAME, {'_id': ObjectId(user_id)})
+            result = User.delete_user(user_id)
             
             if result:
                 logger.info(f"User {user_id} deleted by admin")
@@ -314,7 +399,6 @@ def create_user():
             user_data['student_id'] = data.get('student_id', username)
             user_data['enrolled_courses'] = []
         
-        from services.db_service import db_service
         user_id = db_service.insert_one(User.COLLECTION_NAME, user_data)
         
         if user_id:
@@ -339,28 +423,24 @@ def activities_page():
 def get_activities_list():
     """Get all activities for admin management"""
     try:
-        from services.db_service import db_service
+        skip, limit = get_page_args(default_limit=500)
         activities = list(db_service.find_many(
             Activity.COLLECTION_NAME,
             {},
             sort=[('created_at', -1)],
-            limit=500
+            skip=skip,
+            limit=limit,
+            projection=Activity.SUMMARY_PROJECTION
         ))
         
-        for activity in activities:
-            activity['_id'] = str(activity['_id'])
-            activity['response_count'] = len(activity.get('responses', []))
-            
-            # Get teacher info
-            teacher = User.find_by_id(activity['teacher_id'])
-            activity['teacher_name'] = teacher['username'] if teacher else 'Unknown'
-            
-            # Get course info
-            course = Course.find_by_id(activity['course_id'])
-            activity['course_name'] = course['name'] if course else 'Unknown'
-            activity['course_code'] = course['code'] if course else 'N/A'
+        add_activity_owner_info(activities)
+        total = db_service.count_documents(Activity.COLLECTION_NAME, {})
         
-        return jsonify({'success': True, 'activities': activities}), 200
+        return jsonify({
+            'success': True,
+            'activities': activities,
+            'pagination': page_info(skip, limit, len(activities), total)
+        }), 200
     except Exception as e:
         logger.error(f"Get activities list error: {e}")
         return jsonify({'success': False, 'message': 'Failed to fetch activities'}), 500
@@ -375,6 +455,7 @@ def manage_activity(activity_id):
             if not activity:
                 return jsonify({'success': False, 'message': 'Activity not found'}), 404
             
+            Activity.attach_responses([activity])
             activity['_id'] = str(activity['_id'])
             return jsonify({'success': True, 'activity': activity}), 200
         
@@ -402,26 +483,32 @@ def courses_page():
 def get_courses():
     """Get all courses with statistics"""
     try:
-        courses = Course.find_all()
+        skip, limit = get_page_args()
+        courses = Course.find_all(skip=skip, limit=limit)
+        
+        # Resolve teachers and counts for the whole page at once
+        course_ids = [str(course['_id']) for course in courses]
+        teachers = User.find_many_by_ids({course.get('teacher_id') for course in courses})
+        student_counts = Student.count_by_courses(course_ids)
+        activity_counts = Activity.count_by_courses(course_ids)
         
         for course in courses:
             course['_id'] = str(course['_id'])
             
             # Get teacher info
-            teacher = User.find_by_id(course['teacher_id'])
+            teacher = teachers.get(str(course.get('teacher_id')))
             if teacher:
                 course['teacher_username'] = teacher['username']
                 course['teacher_email'] = teacher['email']
             
-            # Get student count
-            students = Student.find_by_course(course['_id'])
-            course['student_count'] = len(students) if students else 0
-            
-            # Get activity count
-            activities = Activity.find_by_course(course['_id'])
-            course['activity_count'] = len(activities) if activities else 0
+            course['student_count'] = student_counts.get(course['_id'], 0)
+            course['activity_count'] = activity_counts.get(course['_id'], 0)
         
-        return jsonify({'success': True, 'courses': courses}), 200
+        return jsonify({
+            'success': True,
+            'courses': courses,
+            'pagination': page_info(skip, limit, len(courses), Course.count_all())
+        }), 200
     except Exception as e:
         logger.error(f"Get courses error: {e}")
         return jsonify({'success': False, 'message': 'Failed to fetch courses'}), 500
@@ -445,12 +532,10 @@ def manage_course(course_id):
                 course['teacher_email'] = teacher['email']
             
             # Get student count
-            students = Student.find_by_course(course_id)
-            course['student_count'] = len(students) if students else 0
+            course['student_count'] = Student.count_by_course(course_id)
             
             # Get activity count
-            activities = Activity.find_by_course(course_id)
-            course['activity_count'] = len(activities) if activities else 0
+            course['activity_count'] = Activity.count_by_course(course_id)
             
             return jsonify({'success': True, 'course': course}), 200
         
@@ -483,7 +568,7 @@ def manage_course(course_id):
         
         elif request.method == 'DELETE':
             # Delete all activities in this course
-            activities = Activity.find_by_course(course_id)
+            activities = Activity.find_summaries_by_course(course_id)
             if activities:
                 for activity in activities:
                     Activity.delete(str(activity['_id']))
@@ -44,12 +44,14 @@ def dashboard():
     # Get teacher's courses
     courses = Course.find_by_teacher(teacher_id)
     
-    # Add student count and activity count to each course
+    # Add student count and activity count to each course (one query each for all courses)
+    course_ids = [str(course['_id']) for course in courses]
+    student_counts = Student.count_by_courses(course_ids)
+    activity_counts = Activity.count_by_courses(course_ids)
     for course in courses:
         course['_id'] = str(course['_id'])
-        course['student_count'] = Student.count_by_course(course['_id'])
-        activities = Activity.find_by_course(course['_id'])
-        course['activity_count'] = len(activities)
+        course['student_count'] = student_counts.get(course['_id'], 0)
+        course['activity_count'] = activity_counts.get(course['_id'], 0)
     
     return render_template('dashboard.html', courses=courses, username=session.get('username'))
 
@@ -136,10 +138,10 @@ def course_detail(course_id):
             student['_id'] = str(student['_id'])
         
         # Get activities
-        activities = Activity.find_by_course(course_id)
+        activities = Activity.find_summaries_by_course(course_id)
         for activity in activities:
             activity['_id'] = str(activity['_id'])
-            activity['response_count'] = len(activity.get('responses', []))
+            activity['response_count'] = activity.get('response_count', 0)
             
             # Add deadline info for teacher (info only, doesn't restrict access)
             activity['is_expired'] = Activity.is_expired(activity)
@@ -108,6 +108,51 @@ def student_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def student_identifiers(user):
+    """
+    Get the values a student's responses may be recorded under
+    
+    Args:
+        user (dict): Student user document
+        
+    Returns:
+        list: The student's student_id and username (empty values left out)
+    """
+    return [
+        identifier for identifier in (user.get('student_id'), user.get('username'))
+        if identifier
+    ]
+
+def load_enrolled_courses(user):
+    """
+    Load a student's enrolled courses and their activities
+    Uses a fixed number of queries however many courses the student has
+    
+    Args:
+        user (dict): Student user document
+        
+    Returns:
+        list: (course, activities) pairs in enrollment order, with the
+              student's own response attached to every activity as
+              'student_response' (matched by student_id or username, like
+              the course and activity pages); missing courses are skipped
+    """
+    enrolled_course_ids = user.get('enrolled_courses', [])
+    courses_by_id = Course.find_many_by_ids(enrolled_course_ids)
+    activities_by_course = Activity.find_by_courses(list(courses_by_id.keys()))
+    Activity.attach_student_responses([
+        activity
+        for activities in activities_by_course.values()
+        for activity in activities
+    ], student_identifiers(user))
+    
+    enrolled = []
+    for course_id in enrolled_course_ids:
+        course = courses_by_id.get(str(course_id))
+        if course:
+            enrolled.append((course, activities_by_course.get(str(course_id), [])))
+    return enrolled
+
 @student_bp.route('/dashboard')
 @student_required
 def dashboard():
@@ -122,7 +167,6 @@ def dashboard():
             return redirect(url_for('auth.login'))
         
         # Get enrolled courses
-        enrolled_course_ids = user.get('enrolled_courses', [])
         enrolled_courses = []
         
         # Get recent activities across all enrolled courses
@@ -130,46 +174,39 @@ def dashboard():
         total_activities = 0
         completed_activities = 0
         
-        for course_id in enrolled_course_ids:
-            course = Course.find_by_id(course_id)
-            if course:
-                # Get activities for this course
-                activities = list(Activity.find_by_course(course_id))
-                total_activities += len(activities)
+        for course, activities in load_enrolled_courses(user):
+            total_activities += len(activities)
+            
+            # Count completed activities for this specific course
+            course_completed = 0
+            
+            # Get recent activities with course info
+            for activity in activities:
+                # Check if student has completed this activity
+                is_completed = activity.get('student_response') is not None
                 
-                # Count completed activities for this specific course
-                course_completed = 0
+                # Check if activity is expired
+                is_expired = Activity.is_expired(activity)
                 
-                # Get recent activities with course info
-                for activity in activities:
-                    # Check if student has completed this activity
-                    responses = activity.get('responses', [])
-                    student_response = next((r for r in responses 
-                                           if r.get('student_id') == user.get('student_id')), None)
-                    is_completed = student_response is not None
-                    
-                    # Check if activity is expired
-                    is_expired = Activity.is_expired(activity)
-                    
-                    # Deadline is already stored in HK time, no conversion needed
-                    if activity.get('deadline'):
-                        activity['deadline_display'] = activity['deadline']
-                    
-                    if is_completed:
-                        course_completed += 1
-                        completed_activities += 1
-                    
-                    # Add to recent activities list (only first 3 per course)
-                    if len([a for a in recent_activities if a.get('course_code') == course.get('code')]) < 3:
-                        activity['course_name'] = course.get('name')
-                        activity['course_code'] = course.get('code')
-                        activity['completed'] = is_completed
-                        activity['is_expired'] = is_expired
-                        recent_activities.append(activity)
+                # Deadline is already stored in HK time, no conversion needed
+                if activity.get('deadline'):
+                    activity['deadline_display'] = activity['deadline']
+                
+                if is_completed:
+                    course_completed += 1
+                    completed_activities += 1
                 
-                course['activity_count'] = len(activities)
-                course['completed_activities'] = course_completed
-                enrolled_courses.append(course)
+                # Add to recent activities list (only first 3 per course)
+                if len([a for a in recent_activities if a.get('course_code') == course.get('code')]) < 3:
+                    activity['course_name'] = course.get('name')
+                    activity['course_code'] = course.get('code')
+                    activity['completed'] = is_completed
+                    activity['is_expired'] = is_expired
+                    recent_activities.append(activity)
+            
+            course['activity_count'] = len(activities)
+            course['completed_activities'] = course_completed
+            enrolled_courses.append(course)
         
         # Sort recent activities by date
         recent_activities.sort(key=lambda x: x.get('created_at', ''), reverse=True)
@@ -219,21 +256,14 @@ def course_detail(course_id):
             return render_template('error.html', 
                 message='You are not enrolled in this course'), 403
         
-        # Get activities
-        activities = list(Activity.find_by_course(course_id))
-        
-        # Get student's responses for each activity
-        student_id = user.get('student_id')
-        username = user.get('username')
+        # Get activities with the student's response to each
+        activities = Activity.attach_student_responses(
+            list(Activity.find_by_course(course_id)),
+            student_identifiers(user)
+        )
         
         for activity in activities:
-            responses = activity.get('responses', [])
-            # Find student's response
-            student_response = next((r for r in responses 
-                                   if r.get('student_id') == student_id or
-                                      r.get('student_name') == username), None)
-            activity['student_response'] = student_response
-            activity['has_responded'] = student_response is not None
+            activity['has_responded'] = activity['student_response'] is not None
             
             # Check if activity is expired
             activity['is_expired'] = Activity.is_expired(activity)
@@ -374,18 +404,14 @@ def view_activity(activity_id):
         if activity.get('deadline'):
             activity['deadline_display'] = activity['deadline']
         
-        # Clean all documents FIRST before processing
+        # Check if student has already responded
+        Activity.attach_student_responses([activity], student_identifiers(user))
+        
+        # Clean all documents before rendering
         activity = clean_mongodb_document(activity)
         course = clean_mongodb_document(course)
         user = clean_mongodb_document(user)
-        
-        # Check if student has already responded (use cleaned activity)
-        student_id = user.get('student_id')
-        username = user.get('username')
-        responses = activity.get('responses', [])
-        student_response = next((r for r in responses 
-                               if r.get('student_id') == student_id or
-                                  r.get('student_name') == username), None)
+        student_response = activity.pop('student_response', None)
         
         # Log response info
         if student_response:
@@ -420,27 +446,13 @@ def my_responses():
     try:
         user_id = session.get('user_id')
         user = User.find_by_id(user_id)
-        student_id = user.get('student_id')
-        username = user.get('username')
-        
-        # Get all enrolled courses
-        enrolled_course_ids = user.get('enrolled_courses', [])
         
         all_responses = []
         
-        for course_id in enrolled_course_ids:
-            course = Course.find_by_id(course_id)
-            if not course:
-                continue
-                
-            activities = Activity.find_by_course(course_id)
-            
+        # Get all enrolled courses
+        for course, activities in load_enrolled_courses(user):
             for activity in activities:
-                responses = activity.get('responses', [])
-                # Find student's response
-                student_response = next((r for r in responses 
-                                       if r.get('student_id') == student_id or
-                                          r.get('student_name') == username), None)
+                student_response = activity.get('student_response')
                 
                 if student_response:
                     all_responses.append({
@@ -473,27 +485,22 @@ def my_courses():
         user_id = session.get('user_id')
         user = User.find_by_id(user_id)
         
-        enrolled_course_ids = user.get('enrolled_courses', [])
         enrolled_courses = []
         
-        for course_id in enrolled_course_ids:
-            course = Course.find_by_id(course_id)
-            if course:
-                # Get statistics
-                activities = list(Activity.find_by_course(course_id))
-                total_activities = len(activities)
-                
-                # Count completed activities
-                completed = 0
-                for activity in activities:
-                    responses = activity.get('responses', [])
-                    if any(r.get('student_id') == user.get('student_id') for r in responses):
-                        completed += 1
-                
-                course['total_activities'] = total_activities
-                course['completed_activities'] = completed
-                course['completion_rate'] = (completed / total_activities * 100) if total_activities > 0 else 0
-                enrolled_courses.append(course)
+        for course, activities in load_enrolled_courses(user):
+            # Get statistics
+            total_activities = len(activities)
+            
+            # Count completed activities
+            completed = 0
+            for activity in activities:
+                if activity.get('student_response') is not None:
+                    completed += 1
+            
+            course['total_activities'] = total_activities
+            course['completed_activities'] = completed
+            course['completion_rate'] = (completed / total_activities * 100) if total_activities > 0 else 0
+            enrolled_courses.append(course)
         
         return render_template('student/my_courses.html',
             user=user,
@@ -519,19 +526,18 @@ def browse_courses():
         enrolled_course_ids = [str(cid) for cid in user.get('enrolled_courses', [])]
         
         # Separate enrolled and available courses
-        available_courses = []
-        for course in all_courses:
-            course_id_str = str(course['_id'])
-            if course_id_str not in enrolled_course_ids:
-                # Get course statistics
-                activities = list(Activity.find_by_course(course_id_str))
-                course['activity_count'] = len(activities)
-                
-                # Get teacher info
-                teacher = User.find_by_id(course.get('teacher_id'))
-                course['teacher_name'] = teacher.get('username') if teacher else 'Unknown'
-                
-                available_courses.append(course)
+        available_courses = [
+            course for course in all_courses
+            if str(course['_id']) not in enrolled_course_ids
+        ]
+        
+        # Get course statistics and teacher info in one query each
+        activity_counts = Activity.count_by_courses([course['_id'] for course in available_courses])
+        teachers = User.find_many_by_ids({course.get('teacher_id') for course in available_courses})
+        for course in available_courses:
+            course['activity_count'] = activity_counts.get(str(course['_id']), 0)
+            teacher = teachers.get(str(course.get('teacher_id')))
+            course['teacher_name'] = teacher.get('username') if teacher else 'Unknown'
         
         return render_template('student/browse_courses.html',
             user=user,
@@ -552,21 +558,12 @@ def my_activities():
         user_id = session.get('user_id')
         user = User.find_by_id(user_id)
         
-        enrolled_course_ids = user.get('enrolled_courses', [])
         all_activities = []
         
-        for course_id in enrolled_course_ids:
-            course = Course.find_by_id(course_id)
-            if not course:
-                continue
-            
-            activities = list(Activity.find_by_course(course_id))
-            
+        for course, activities in load_enrolled_courses(user):
             for activity in activities:
                 # Check if completed
-                responses = activity.get('responses', [])
-                student_response = next((r for r in responses 
-                                       if r.get('student_id') == user.get('student_id')), None)
+                student_response = activity.get('student_response')
                 
                 # Check if expired
                 is_expired = Activity.is_expired(activity)
@@ -578,7 +575,7 @@ def my_activities():
                 activity['course_code'] = course.get('code')
                 activity['completed'] = student_response is not None
                 activity['is_expired'] = is_expired
-                activity['response_count'] = len(responses)
+                activity['response_count'] = activity.get('response_count', 0)
                 all_activities.append(activity)
         
         # Sort by date
@@ -625,10 +622,11 @@ def leaderboard():
         # Get leaderboards for each course
         course_leaderboards = []
         my_course_ranks = []
+        courses_by_id = Course.find_many_by_ids(course_ids)
         
         for course_id in course_ids:
             try:
-                course = Course.find_by_id(course_id)
+                course = courses_by_id.get(str(course_id))
                 if course:
                     leaderboard_data = PointsService.get_course_leaderboard(course_id, limit=10)
                     
@@ -653,13 +651,11 @@ def leaderboard():
                 logger.error(f"Error processing course {course_id}: {course_error}")
                 continue
         
-        # Get global leaderboard
-        try:
-            global_leaderboard = PointsService.get_global_leaderboard(limit=50)
-            logger.info(f"Global leaderboard: {len(global_leaderboard)} students")
-        except Exception as e:
-            logger.error(f"Error getting global leaderboard: {e}")
-            global_leaderboard = []
+        # Get global leaderboard from the materialized snapshot
+        global_snapshot = PointsService.get_global_leaderboard_snapshot()
+        global_leaderboard = global_snapshot.get('entries', [])[:50]
+        global_updated_at = global_snapshot.get('updated_at')
+        logger.info(f"Global leaderboard: {len(global_leaderboard)} students (updated {global_updated_at})")
         
         # Calculate student's overall points and achievements - use student_identifier
         try:
@@ -683,17 +679,10 @@ def leaderboard():
             logger.error(f"Error getting achievements: {e}")
             achievements = []
         
-        # Find student's global rank and points - use student_identifier
-        my_global_rank = None
-        global_my_points = 0
-        try:
-            for i, entry in enumerate(global_leaderboard):
-                if entry.get('student_id') == student_identifier:
-                    my_global_rank = i + 1
-                    global_my_points = entry.get('points', 0)
-                    break
-        except Exception as e:
-            logger.error(f"Error finding global rank: {e}")
+        # Find student's global rank and points from the snapshot's rank index
+        global_rank = PointsService.get_global_rank(global_snapshot, student_identifier)
+        my_global_rank = global_rank['rank']
+        global_my_points = global_rank['points']
         
         return render_template('student/leaderboard.html',
             user=user,
@@ -703,6 +692,7 @@ def leaderboard():
             my_course_ranks=my_course_ranks,
             my_global_rank=my_global_rank,
             global_my_points=global_my_points,
+            global_updated_at=global_updated_at,
             overall_points=overall_points,
             achievements=achievements
         )
@@ -0,0 +1,496 @@
+"""
+AI Cache Service Module
+Content-addressed cache of GenAI replies: a request with the same model,
+messages, temperature, max_tokens and options as an earlier one is answered
+from the cache instead of the API. Backends (AI_CACHE_BACKEND):
+- mongo: ai_cache collection shared by every worker, expired by a TTL index (default)
+- disk: JSON files under AI_CACHE_DIR
+- memory: per-process LRU cache
+"""
+
+from datetime import datetime, timedelta, timezone
+from config import Config
+from services.cache_service import CacheBackend, LRUCache
+from services.db_service import db_service
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+def request_key(model, messages, temperature, max_tokens, **options):
+    """
+    Build the cache key of a chat completion request
+
+    Args:
+        model (str): Model name
+        messages (list): Chat messages
+        temperature (float): Sampling temperature
+        max_tokens (int): Completion token limit
+        **options: Other options that change the reply (e.g. response_format)
+
+    Returns:
+        str: SHA-256 hex digest of the canonical request
+    """
+    request = {
+        'model': model,
+        'messages': messages,
+        'temperature': temperature,
+        'max_tokens': max_tokens,
+        **options
+    }
+    canonical = json.dumps(request, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+def _utc_now():
+    """
+    Current time in UTC
+    The TTL monitor compares expires_at with UTC, so this collection does not
+    use the naive Hong Kong times stored elsewhere
+    """
+    return datetime.now(timezone.utc)
+
+class MongoCache(CacheBackend):
+    """
+    Cache stored in the ai_cache collection
+    Expired entries are removed by the TTL index on expires_at; when the
+    collection grows past max_entries the least recently used entries are
+    deleted (checked every EVICT_EVERY writes)
+    """
+
+    name = 'mongo'
+
+    shared = True
+
+    COLLECTION_NAME = 'ai_cache'
+
+    # Writes between two size checks
+    EVICT_EVERY = 50
+
+    def __init__(self, max_entries, ttl_seconds):
+        """
+        Initialize the backend
+
+        Args:
+            max_entries (int): Maximum number of entries kept
+            ttl_seconds (float): Default TTL in seconds
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _count(self, counter, amount=1):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def get(self, key):
+        """
+        Get a value if it is cached and not expired, marking it recently used
+
+        Args:
+            key (str): Cache key
+
+        Returns:
+            Cached value or None (also None if MongoDB is unreachable)
+        """
+        now = _utc_now()
+        try:
+            entry = db_service.find_one_and_update(
+                self.COLLECTION_NAME,
+                {'_id': key, 'expires_at': {'$gt': now}},
+                {'$set': {'last_used_at': now}},
+                projection={'value': 1}
+            )
+        except Exception as e:
+            logger.warning(f"AI cache get failed: {e}")
+            return None
+
+        if entry is None:
+            self._count('misses')
+            return None
+        self._count('hits')
+        return entry['value']
+
+    def set(self, key, value, ttl_seconds=None):
+        """
+        Store a value with a TTL
+
+        Args:
+            key (str): Cache key
+            value: BSON-compatible value to cache
+            ttl_seconds (float): TTL for this entry (default: the cache TTL)
+        """
+        now = _utc_now()
+        try:
+            db_service.update_one(
+                self.COLLECTION_NAME,
+                {'_id': key},
+                {'$set': {
+                    'value': value,
+                    'created_at': now,
+                    'last_used_at': now,
+                    'expires_at': now + timedelta(seconds=ttl_seconds or self.ttl_seconds)
+                }},
+                upsert=True
+            )
+        except Exception as e:
+            logger.warning(f"AI cache set failed: {e}")
+            return
+
+        with self._lock:
+            self._writes += 1
+            due = self._writes % self.EVICT_EVERY == 0
+        if due:
+            self.evict()
+
+    def evict(self):
+        """
+        Delete the least recently used entries beyond max_entries
+
+        Returns:
+            int: Number of entries deleted
+        """
+        try:
+            excess = db_service.count_documents(self.COLLECTION_NAME) - self.max_entries
+            if excess <= 0:
+                return 0
+            oldest = db_service.find_many(
+                self.COLLECTION_NAME, {},
+                sort=[('last_used_at', 1)], limit=excess, projection={'_id': 1}
+            )
+            result = db_service.delete_many(
+                self.COLLECTION_NAME, {'_id': {'$in': [entry['_id'] for entry in oldest]}}
+            )
+        except Exception as e:
+            logger.warning(f"AI cache eviction failed: {e}")
+            return 0
+
+        self._count('evictions', result.deleted_count)
+        return result.deleted_count
+
+    def delete(self, key):
+        """
+        Remove a value
+
+        Args:
+            key (str): Cache key
+        """
+        try:
+            db_service.delete_one(self.COLLECTION_NAME, {'_id': key})
+        except Exception as e:
+            logger.warning(f"AI cache delete failed: {e}")
+
+    def clear(self):
+        """Remove every value"""
+        db_service.delete_many(self.COLLECTION_NAME, {})
+
+    def stats(self):
+        """
+        Get cache statistics (hit counts are for this process)
+
+        Returns:
+            dict: hits, misses, evictions, size and hit_rate
+        """
+        try:
+            size = db_service.count_documents(self.COLLECTION_NAME)
+        except Exception as e:
+            logger.warning(f"AI cache stats failed: {e}")
+            size = None
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'backend': self.name,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': size,
+                'max_entries': self.max_entries,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0
+            }
+
+class DiskCache(CacheBackend):
+    """
+    Cache stored as one JSON file per entry under a directory
+    A hit touches the file, so the oldest modification times are the least
+    recently used entries; they are deleted when the directory grows past
+    max_entries (checked every EVICT_EVERY writes)
+    """
+
+    name = 'disk'
+
+    # Writes between two size checks
+    EVICT_EVERY = 50
+
+    def __init__(self, directory, max_entries, ttl_seconds):
+        """
+        Initialize the backend
+
+        Args:
+            directory (str): Directory holding the cache files
+            max_entries (int): Maximum number of entries kept
+            ttl_seconds (float): Default TTL in seconds
+        """
+        self.directory = directory
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _path(self, key):
+        """File of a cache key (spread over 256 subdirectories)"""
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _files(self):
+        """Every cache file with its modification time"""
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith('.json'):
+                    path = os.path.join(root, name)
+                    try:
+                        files.append((os.path.getmtime(path), path))
+                    except OSError:
+                        pass
+        return files
+
+    def get(self, key):
+        """
+        Get a value if it is cached and not expired
+
+        Args:
+            key (str): Cache key
+
+        Returns:
+            Cached value or None
+        """
+        path = self._path(key)
+        try:
+            with open(path, encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        if entry['expires_at'] <= time.time():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            with self._lock:
+                self.expirations += 1
+                self.misses += 1
+            return None
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return entry['value']
+
+    def set(self, key, value, ttl_seconds=None):
+        """
+        Store a value with a TTL
+        The file is written next to its final name and renamed, so readers
+        never see a partial entry
+
+        Args:
+            key (str): Cache key
+            value: JSON-compatible value to cache
+            ttl_seconds (float): TTL for this entry (default: the cache TTL)
+        """
+        path = self._path(key)
+        entry = {'expires_at': time.time() + (ttl_seconds or self.ttl_seconds), 'value': value}
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(temp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"AI cache set failed: {e}")
+            return
+
+        with self._lock:
+            self._writes += 1
+            due = self._writes % self.EVICT_EVERY == 0
+        if due:
+            self.evict()
+
+    def evict(self):
+        """
+        Delete the least recently used entries beyond max_entries
+
+        Returns:
+            int: Number of entries deleted
+        """
+        files = self._files()
+        excess = len(files) - self.max_entries
+        if excess <= 0:
+            return 0
+
+        deleted = 0
+        for _, path in sorted(files)[:excess]:
+            try:
+                os.remove(path)
+                deleted += 1
+            except OSError:
+                pass
+        with self._lock:
+            self.evictions += deleted
+        return deleted
+
+    def delete(self, key):
+        """
+        Remove a value
+
+        Args:
+            key (str): Cache key
+        """
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def clear(self):
+        """Remove every value"""
+        for _, path in self._files():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self):
+        """
+        Get cache statistics
+
+        Returns:
+            dict: hits, misses, evictions, expirations, size and hit_rate
+        """
+        size = len(self._files())
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'backend': self.name,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'size': size,
+                'max_entries': self.max_entries,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0
+            }
+
+def create_backend():
+    """
+    Create the cache backend selected by Config.AI_CACHE_BACKEND
+
+    Returns:
+        CacheBackend: Configured backend
+    """
+    if Config.AI_CACHE_BACKEND == 'mongo':
+        return MongoCache(Config.AI_CACHE_MAX_ENTRIES, Config.AI_CACHE_TTL_SECONDS)
+    if Config.AI_CACHE_BACKEND == 'disk':
+        return DiskCache(Config.AI_CACHE_DIR, Config.AI_CACHE_MAX_ENTRIES, Config.AI_CACHE_TTL_SECONDS)
+    return LRUCache(Config.AI_CACHE_MAX_ENTRIES, Config.AI_CACHE_TTL_SECONDS)
+
+class AICacheService:
+    """
+    Cache of GenAI replies keyed by request_key()
+    Each entry remembers the tokens and time its request cost, so the
+    statistics show what the hits saved
+    """
+
+    key = staticmethod(request_key)
+
+    def __init__(self, enabled=None, backend=None):
+        """
+        Initialize the cache service from configuration
+
+        Args:
+            enabled (bool): Override Config.AI_CACHE_ENABLED
+            backend (CacheBackend): Backend to use (default: create_backend())
+        """
+        self.enabled = Config.AI_CACHE_ENABLED if enabled is None else enabled
+        self._cache = backend if backend is not None else create_backend()
+        self._lock = threading.Lock()
+        self.tokens_saved = 0
+        self.seconds_saved = 0.0
+
+    def get(self, key):
+        """
+        Get a cached reply
+
+        Args:
+            key (str): Request key
+
+        Returns:
+            The cached (parsed) reply or None
+        """
+        if not self.enabled:
+            return None
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        with self._lock:
+            self.tokens_saved += entry.get('tokens', 0)
+            self.seconds_saved += entry.get('seconds', 0.0)
+        return entry['value']
+
+    def set(self, key, value, tokens=0, seconds=0.0):
+        """
+        Cache a reply (None is ignored)
+
+        Args:
+            key (str): Request key
+            value: Parsed reply
+            tokens (int): Tokens the request used
+            seconds (float): Time the request took
+        """
+        if self.enabled and value is not None:
+            self._cache.set(key, {'value': value, 'tokens': tokens, 'seconds': round(seconds, 3)})
+
+    def delete(self, key):
+        """
+        Forget a cached reply
+
+        Args:
+            key (str): Request key
+        """
+        self._cache.delete(key)
+
+    def clear(self):
+        """Forget every cached reply"""
+        self._cache.clear()
+
+    def stats(self):
+        """
+        Get cache statistics
+
+        Returns:
+            dict: Backend statistics plus whether caching is enabled and the
+                  tokens and seconds saved by hits in this process
+        """
+        stats = self._cache.stats()
+        stats['enabled'] = self.enabled
+        with self._lock:
+            stats['tokens_saved'] = self.tokens_saved
+            stats['seconds_saved'] = round(self.seconds_saved, 3)
+        return stats
+
+# Global AI cache service instance
+ai_cache_service = AICacheService()
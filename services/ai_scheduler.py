@@ -0,0 +1,519 @@
+"""
+AI Scheduler Module
+Every GenAI API call goes through the scheduler, which
+- keeps calls within requests-per-minute and tokens-per-minute budgets
+- retries rate limited (429), server (5xx) and connection errors with
+  jittered exponential backoff, honouring Retry-After
+- runs at most max_workers calls at once, whether they are made on its
+  thread pool or on the caller's thread, counting a streamed call until
+  its stream is read
+- gives calls made while serving a web request a total deadline, so
+  retries do not hold the request for minutes; functions the request runs
+  on the thread pool inherit it
+- records latency and token usage per kind of call
+"""
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from flask import has_request_context
+from config import Config
+import random
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Errors without an HTTP status that are worth retrying (openai exception names)
+RETRYABLE_ERRORS = {'APITimeoutError', 'APIConnectionError', 'TimeoutError', 'ConnectionError'}
+
+def error_status(error):
+    """
+    Get the HTTP status of an API error
+
+    Args:
+        error (Exception): Error raised by the client
+
+    Returns:
+        int: Status code or None for errors without one
+    """
+    status = getattr(error, 'status_code', None)
+    return status if isinstance(status, int) else None
+
+def is_retryable(error):
+    """
+    Check whether a failed call may succeed when repeated
+
+    Args:
+        error (Exception): Error raised by the client
+
+    Returns:
+        bool: True for 408/409/429/5xx responses and timeouts/connection errors
+    """
+    status = error_status(error)
+    if status is not None:
+        return status in (408, 409, 429) or status >= 500
+    return type(error).__name__ in RETRYABLE_ERRORS
+
+def retry_after(error):
+    """
+    Get the delay requested by a Retry-After header
+
+    Args:
+        error (Exception): Error raised by the client
+
+    Returns:
+        float: Seconds to wait or None if the response did not say
+    """
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+def usage_tokens(response):
+    """
+    Get the prompt and completion tokens reported for a completion
+
+    Args:
+        response: Chat completion
+
+    Returns:
+        tuple: (prompt_tokens, completion_tokens), zeros if not reported
+    """
+    usage = getattr(response, 'usage', None)
+    counts = [getattr(usage, 'prompt_tokens', 0), getattr(usage, 'completion_tokens', 0)]
+    return tuple(count if isinstance(count, int) else 0 for count in counts)
+
+class RateLimiter:
+    """
+    Sliding one-minute window over requests and tokens
+    Calls reserve their estimated tokens before they start; the reservation
+    is corrected with the real usage once the reply arrives
+    """
+
+    WINDOW_SECONDS = 60.0
+
+    def __init__(self, requests_per_minute=0, tokens_per_minute=0, clock=time.monotonic, sleep=time.sleep):
+        """
+        Initialize the limiter
+
+        Args:
+            requests_per_minute (int): Request budget (0: unlimited)
+            tokens_per_minute (int): Token budget (0: unlimited)
+            clock (callable): Time source (replaceable in tests)
+            sleep (callable): Sleep function (replaceable in tests)
+        """
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._window = deque()  # [started_at, tokens] per call
+        self._paused_until = 0.0
+
+    def _wait_time(self, now, tokens):
+        """Seconds until a call of this size fits the budgets (0 if it fits now)"""
+        while self._window and self._window[0][0] <= now - self.WINDOW_SECONDS:
+            self._window.popleft()
+
+        wait = max(0.0, self._paused_until - now)
+        if self.requests_per_minute and len(self._window) >= self.requests_per_minute:
+            oldest = self._window[len(self._window) - self.requests_per_minute][0]
+            wait = max(wait, oldest + self.WINDOW_SECONDS - now)
+
+        if self.tokens_per_minute and self._window:
+            # A call larger than the whole budget runs alone in the window
+            excess = sum(entry[1] for entry in self._window) + tokens - self.tokens_per_minute
+            for started_at, used in self._window:
+                if excess <= 0:
+                    break
+                excess -= used
+                wait = max(wait, started_at + self.WINDOW_SECONDS - now)
+        return wait
+
+    def acquire(self, tokens=0):
+        """
+        Wait until a call fits the budgets and reserve it
+
+        Args:
+            tokens (int): Estimated tokens of the call
+
+        Returns:
+            list: Reservation to pass to adjust()
+        """
+        while True:
+            with self._lock:
+                now = self._clock()
+                wait = self._wait_time(now, tokens)
+                if wait <= 0:
+                    reservation = [now, tokens]
+                    self._window.append(reservation)
+                    return reservation
+            self._sleep(wait)
+
+    def adjust(self, reservation, tokens):
+        """
+        Replace a reservation's estimate with the tokens actually used
+
+        Args:
+            reservation (list): Value returned by acquire()
+            tokens (int): Tokens used
+        """
+        with self._lock:
+            reservation[1] = tokens
+
+    def pause(self, seconds):
+        """
+        Hold back every call for a while (after the API said it is rate limited)
+
+        Args:
+            seconds (float): How long to pause
+        """
+        with self._lock:
+            self._paused_until = max(self._paused_until, self._clock() + seconds)
+
+class CallMetrics:
+    """
+    Latency and token usage of API calls, per kind of call
+    """
+
+    def __init__(self, history=200):
+        """
+        Initialize empty metrics
+
+        Args:
+            history (int): Number of recent latencies kept per kind for percentiles
+        """
+        self._history = history
+        self._lock = threading.Lock()
+        self._kinds = {}
+
+    def _kind(self, kind):
+        if kind not in self._kinds:
+            self._kinds[kind] = {
+                'calls': 0,
+                'failures': 0,
+                'retries': 0,
+                'rate_limited': 0,
+                'prompt_tokens': 0,
+                'completion_tokens': 0,
+                'latencies': deque(maxlen=self._history)
+            }
+        return self._kinds[kind]
+
+    def record_call(self, kind, latency, prompt_tokens, completion_tokens):
+        """Record a successful call"""
+        with self._lock:
+            entry = self._kind(kind)
+            entry['calls'] += 1
+            entry['prompt_tokens'] += prompt_tokens
+            entry['completion_tokens'] += completion_tokens
+            entry['latencies'].append(latency)
+
+    def record_retry(self, kind, status):
+        """Record a failed attempt that will be retried"""
+        with self._lock:
+            entry = self._kind(kind)
+            entry['retries'] += 1
+            if status == 429:
+                entry['rate_limited'] += 1
+
+    def record_failure(self, kind):
+        """Record a call that failed for good"""
+        with self._lock:
+            self._kind(kind)['failures'] += 1
+
+    @staticmethod
+    def _percentile(values, fraction):
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+    def stats(self):
+        """
+        Get the metrics
+
+        Returns:
+            dict: Per kind of call: calls, failures, retries, rate_limited,
+                  tokens and p50/p95 latency in milliseconds
+        """
+        with self._lock:
+            result = {}
+            for kind, entry in self._kinds.items():
+                latencies = list(entry['latencies'])
+                result[kind] = {
+                    key: value for key, value in entry.items() if key != 'latencies'
+                }
+                result[kind]['latency_p50_ms'] = round(self._percentile(latencies, 0.5) * 1000, 1) if latencies else None
+                result[kind]['latency_p95_ms'] = round(self._percentile(latencies, 0.95) * 1000, 1) if latencies else None
+            return result
+
+class AIScheduler:
+    """
+    Rate-limited, retrying and concurrent execution of AI API calls
+    """
+
+    def __init__(self, max_workers=None, requests_per_minute=None, tokens_per_minute=None,
+                 max_retries=None, base_delay=None, max_delay=None, request_deadline=None,
+                 clock=time.monotonic, sleep=time.sleep):
+        """
+        Initialize the scheduler from configuration (the thread pool is started on first use)
+
+        Args:
+            max_workers (int): Concurrent calls (default: Config.AI_MAX_CONCURRENCY)
+            requests_per_minute (int): Default: Config.AI_REQUESTS_PER_MINUTE
+            tokens_per_minute (int): Default: Config.AI_TOKENS_PER_MINUTE
+            max_retries (int): Retries per call (default: Config.AI_MAX_RETRIES)
+            base_delay (float): First backoff in seconds (default: Config.AI_RETRY_BASE_SECONDS)
+            max_delay (float): Longest backoff in seconds (default: Config.AI_RETRY_MAX_SECONDS)
+            request_deadline (float): Seconds a call made while serving a web
+                request may take with its retries (default:
+                Config.AI_REQUEST_DEADLINE_SECONDS, 0: no deadline)
+            clock (callable): Time source of the rate limiter and deadlines (replaceable in tests)
+            sleep (callable): Sleep function (replaceable in tests)
+        """
+        self.max_workers = max_workers or Config.AI_MAX_CONCURRENCY
+        self.max_retries = Config.AI_MAX_RETRIES if max_retries is None else max_retries
+        self.base_delay = Config.AI_RETRY_BASE_SECONDS if base_delay is None else base_delay
+        self.max_delay = Config.AI_RETRY_MAX_SECONDS if max_delay is None else max_delay
+        self.request_deadline = Config.AI_REQUEST_DEADLINE_SECONDS if request_deadline is None else request_deadline
+        self._clock = clock
+        self._sleep = sleep
+        self.limiter = RateLimiter(
+            Config.AI_REQUESTS_PER_MINUTE if requests_per_minute is None else requests_per_minute,
+            Config.AI_TOKENS_PER_MINUTE if tokens_per_minute is None else tokens_per_minute,
+            clock=clock,
+            sleep=sleep
+        )
+        self.metrics = CallMetrics()
+        # Bounds calls made on callers' threads as well as on the pool
+        self._slots = threading.BoundedSemaphore(self.max_workers)
+        self._executor = None
+        self._lock = threading.Lock()
+        # Deadline a pool thread's calls inherit from whoever submitted its function
+        self._local = threading.local()
+
+    def _get_executor(self):
+        """Get the thread pool, creating it on first use"""
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix='ai-call'
+                    )
+        return self._executor
+
+    def backoff(self, attempt, requested=None):
+        """
+        Delay before retrying
+
+        Args:
+            attempt (int): Number of failed attempts so far (1 for the first retry)
+            requested (float): Delay asked for by a Retry-After header
+
+        Returns:
+            float: Seconds to wait: exponential with full jitter, but never
+                   less than what the server asked for
+        """
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        if requested is not None:
+            delay = max(delay, min(requested, self.max_delay))
+        return delay
+
+    def _give_up_at(self, deadline):
+        """Clock time after which a call stops retrying (None: only max_retries applies)"""
+        if deadline is None:
+            inherited = getattr(self._local, 'give_up_at', None)
+            if inherited is not None:
+                return inherited
+            if has_request_context():
+                deadline = self.request_deadline
+        return self._clock() + deadline if deadline else None
+
+    def _run_with_deadline(self, give_up_at, function, *args, **kwargs):
+        """Run a submitted function with its submitter's deadline applying to its calls"""
+        previous = getattr(self._local, 'give_up_at', None)
+        self._local.give_up_at = give_up_at
+        try:
+            return function(*args, **kwargs)
+        finally:
+            self._local.give_up_at = previous
+
+    def _wait_to_retry(self, error, attempt, kind, give_up_at):
+        """
+        Wait before retrying a failed attempt, or raise its error
+
+        Args:
+            error (Exception): Error of the attempt
+            attempt (int): Number of failed attempts so far
+            kind (str): Name the call is recorded under
+            give_up_at (float): Clock time of the call's deadline or None
+
+        Raises:
+            Exception: The error, if it is not retryable or retries ran out
+        """
+        status = error_status(error)
+        delay = self.backoff(attempt, retry_after(error))
+        out_of_time = give_up_at is not None and self._clock() + delay >= give_up_at
+        if not is_retryable(error) or attempt > self.max_retries or out_of_time:
+            self.metrics.record_failure(kind)
+            raise error
+
+        self.metrics.record_retry(kind, status)
+        logger.warning(f"AI call ({kind}) failed with {status or type(error).__name__}, "
+                       f"retry {attempt}/{self.max_retries} in {delay:.1f}s")
+        if status == 429:
+            # The account's limit is shared, so every caller waits (in acquire)
+            self.limiter.pause(delay)
+        else:
+            self._sleep(delay)
+
+    def _record(self, kind, reservation, started, prompt_tokens, completion_tokens):
+        """Correct the rate limiter's reservation and record a successful call"""
+        if prompt_tokens or completion_tokens:
+            self.limiter.adjust(reservation, prompt_tokens + completion_tokens)
+        self.metrics.record_call(kind, time.monotonic() - started, prompt_tokens, completion_tokens)
+
+    def call(self, request, estimated_tokens=0, kind='chat', deadline=None):
+        """
+        Make an API call within the budgets, retrying transient errors
+
+        Args:
+            request (callable): Makes the call and returns the completion
+            estimated_tokens (int): Prompt plus completion tokens expected
+            kind (str): Name the call is recorded under
+            deadline (float): Seconds the call may take including retries
+                (default: request_deadline inside a web request, else none)
+
+        Returns:
+            The completion returned by request()
+
+        Raises:
+            Exception: The last error if the call failed for good
+        """
+        give_up_at = self._give_up_at(deadline)
+        attempt = 0
+        while True:
+            with self._slots:
+                reservation = self.limiter.acquire(estimated_tokens)
+                started = time.monotonic()
+                try:
+                    response = request()
+                    error = None
+                except Exception as e:
+                    error = e
+
+            if error is None:
+                self._record(kind, reservation, started, *usage_tokens(response))
+                return response
+            attempt += 1
+            self._wait_to_retry(error, attempt, kind, give_up_at)
+
+    def stream(self, request, estimated_tokens=0, kind='chat', deadline=None):
+        """
+        Make a streaming API call within the budgets
+        The call holds its concurrency slot until the stream is read. Errors
+        up to the first chunk are retried like call()'s; an error later in
+        the stream cannot be, since chunks were already passed on, and is
+        recorded as a failure. Usage reported by a chunk (stream_options
+        include_usage) corrects the rate limiter's reservation.
+
+        Args:
+            request (callable): Makes the call and returns the chunk stream
+            estimated_tokens (int): Prompt plus completion tokens expected
+            kind (str): Name the call is recorded under
+            deadline (float): Seconds the call may take including retries
+                (default: request_deadline inside a web request, else none)
+
+        Yields:
+            The stream's chunks
+
+        Raises:
+            Exception: The last error if the call failed for good
+        """
+        give_up_at = self._give_up_at(deadline)
+        attempt = 0
+        while True:
+            self._slots.acquire()
+            reservation = self.limiter.acquire(estimated_tokens)
+            started = time.monotonic()
+            try:
+                chunks = iter(request())
+                chunk = next(chunks, None)
+                break
+            except Exception as e:
+                self._slots.release()
+                attempt += 1
+                self._wait_to_retry(e, attempt, kind, give_up_at)
+
+        prompt_tokens = completion_tokens = 0
+        try:
+            while chunk is not None:
+                reported = usage_tokens(chunk)
+                if any(reported):
+                    prompt_tokens, completion_tokens = reported
+                yield chunk
+                try:
+                    chunk = next(chunks, None)
+                except Exception:
+                    self.metrics.record_failure(kind)
+                    raise
+        finally:
+            self._slots.release()
+        self._record(kind, reservation, started, prompt_tokens, completion_tokens)
+
+    def submit(self, function, *args, **kwargs):
+        """
+        Run a function on the scheduler's thread pool
+        The pool thread has no request context, so the deadline of the
+        submitting web request is captured here and applied to the
+        function's calls
+
+        Args:
+            function (callable): Function to run (its API calls should use call())
+            *args, **kwargs: Arguments for the function
+
+        Returns:
+            Future: Result of the function
+        """
+        give_up_at = self._give_up_at(None)
+        return self._get_executor().submit(self._run_with_deadline, give_up_at, function, *args, **kwargs)
+
+    def map(self, function, items):
+        """
+        Run a function for every item concurrently
+
+        Args:
+            function (callable): Function of one item
+            items (list): Items
+
+        Returns:
+            list: Results in the order of the items (errors are raised)
+        """
+        items = list(items)
+        if len(items) <= 1:
+            return [function(item) for item in items]
+        futures = [self.submit(function, item) for item in items]
+        return [future.result() for future in futures]
+
+    def stats(self):
+        """
+        Get call metrics and the configured budgets
+
+        Returns:
+            dict: Budgets plus per-kind call metrics
+        """
+        return {
+            'max_concurrency': self.max_workers,
+            'request_deadline_seconds': self.request_deadline,
+            'requests_per_minute': self.limiter.requests_per_minute,
+            'tokens_per_minute': self.limiter.tokens_per_minute,
+            'calls': self.metrics.stats()
+        }
+
+# Global AI scheduler instance
+ai_scheduler = AIScheduler()
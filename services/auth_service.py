@@ -8,6 +8,7 @@ import logging
 from datetime import datetime
 from bson import ObjectId
 from services.db_service import db_service
+from models.user import User
 from utils.time_utils import get_hk_time
 
 # Configure logging
@@ -22,9 +23,16 @@ class AuthService:
     
     def __init__(self):
         """Initialize authentication service"""
-        self.users_collection = db_service.get_collection('users')
         logger.info("Auth Service initialized")
     
+    @property
+    def users_collection(self):
+        """
+        Get the users collection
+        Looked up on use so importing this module does not connect to MongoDB
+        """
+        return db_service.get_collection('users')
+    
     def hash_password(self, password):
         """
         Hash password using bcrypt
@@ -180,6 +188,7 @@ class AuthService:
                 {'_id': user['_id']},
                 {'$set': {'last_login': get_hk_time()}}
             )
+            User._invalidate(user['_id'])
             
             logger.info(f"User logged in successfully: {username}")
             
@@ -248,6 +257,7 @@ class AuthService:
                 {'_id': ObjectId(user_id)},
                 {'$set': update_data}
             )
+            User._invalidate(user_id)
             
             return result.modified_count > 0
             
@@ -291,6 +301,7 @@ class AuthService:
                 {'_id': ObjectId(user_id)},
                 {'$set': {'password': hashed_password}}
             )
+            User._invalidate(user_id)
             
             logger.info(f"Password changed for user: {user['username']}")
             
@@ -0,0 +1,405 @@
+"""
+Cache Service Module
+Cache for documents that rarely change (courses, users, activities) and for
+computed leaderboards, with pluggable backends:
+- memory: per-process LRU cache with a TTL (default)
+- redis: shared by every worker talking to the same Redis server
+"""
+
+from collections import OrderedDict
+from config import Config
+import bson
+import copy
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+class CacheBackend:
+    """
+    Interface implemented by cache backends
+    Backends must return copies so callers can modify what they get back
+    """
+
+    name = 'base'
+
+    # Whether every worker process sees the same entries
+    shared = False
+
+    def get(self, key):
+        """Get a value or None if missing or expired"""
+        raise NotImplementedError
+
+    def set(self, key, value, ttl_seconds=None):
+        """Store a value, optionally with a TTL other than the default"""
+        raise NotImplementedError
+
+    def delete(self, key):
+        """Remove a value"""
+        raise NotImplementedError
+
+    def clear(self):
+        """Remove every value"""
+        raise NotImplementedError
+
+    def stats(self):
+        """Get cache statistics as a dict"""
+        raise NotImplementedError
+
+class LRUCache(CacheBackend):
+    """
+    Size-bounded cache with least-recently-used eviction and a TTL
+    Values are stored and returned as copies, like the identity map
+    """
+
+    name = 'memory'
+
+    def __init__(self, max_entries, ttl_seconds):
+        """
+        Initialize an empty cache
+
+        Args:
+            max_entries (int): Maximum number of entries kept
+            ttl_seconds (float): Seconds an entry stays valid
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        """
+        Get a value if it is cached and not expired
+
+        Args:
+            key (str): Cache key
+
+        Returns:
+            Copy of the cached value or None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return copy.deepcopy(value)
+
+    def set(self, key, value, ttl_seconds=None):
+        """
+        Store a value, evicting the least recently used entries if full
+
+        Args:
+            key (str): Cache key
+            value: Value to cache
+            ttl_seconds (float): TTL for this entry (default: the cache TTL)
+        """
+        expires_at = time.monotonic() + (ttl_seconds or self.ttl_seconds)
+        with self._lock:
+            self._entries[key] = (expires_at, copy.deepcopy(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        """
+        Remove a value
+
+        Args:
+            key (str): Cache key
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Remove every value"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Get cache statistics
+
+        Returns:
+            dict: hits, misses, evictions, expirations, size and hit_rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'backend': self.name,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0
+            }
+
+class RedisCache(CacheBackend):
+    """
+    Cache stored in Redis, shared by every worker process
+    Values are BSON-encoded so ObjectId and datetime fields survive the round
+    trip. Eviction is left to the server (maxmemory-policy allkeys-lru);
+    hit/miss counters are kept in Redis so they cover the whole worker pool.
+    """
+
+    name = 'redis'
+
+    shared = True
+
+    # Local hit/miss counts are pushed to Redis after this many lookups
+    STATS_FLUSH_EVERY = 50
+
+    def __init__(self, client, ttl_seconds, prefix='cache:'):
+        """
+        Initialize the backend
+
+        Args:
+            client: Redis client (redis.Redis or anything speaking the same API)
+            ttl_seconds (float): Default TTL in seconds
+            prefix (str): Prefix for every key written by this cache
+        """
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+        self._pending = {'hits': 0, 'misses': 0}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_url(cls, url, ttl_seconds):
+        """
+        Create a backend connected to a Redis URL
+
+        Args:
+            url (str): Redis URL (redis://host:port/db)
+            ttl_seconds (float): Default TTL in seconds
+
+        Returns:
+            RedisCache: Connected backend
+        """
+        # Only needed when CACHE_BACKEND=redis
+        import redis
+        return cls(redis.Redis.from_url(url), ttl_seconds)
+
+    def _count(self, counter):
+        """Count a hit or miss, pushing the counts to Redis in batches"""
+        with self._lock:
+            self._pending[counter] += 1
+            due = sum(self._pending.values()) >= self.STATS_FLUSH_EVERY
+        if due:
+            self._flush_stats()
+
+    def _flush_stats(self):
+        """Add the locally counted hits and misses to the shared counters"""
+        with self._lock:
+            pending, self._pending = self._pending, {'hits': 0, 'misses': 0}
+        try:
+            for counter, amount in pending.items():
+                if amount:
+                    self.client.incrby(f"{self.prefix}stats:{counter}", amount)
+        except Exception as e:
+            logger.debug(f"Could not update cache counters: {e}")
+
+    def get(self, key):
+        """
+        Get a value if it is cached
+
+        Args:
+            key (str): Cache key
+
+        Returns:
+            Decoded value or None (also None if Redis is unreachable)
+        """
+        try:
+            data = self.client.get(self.prefix + key)
+        except Exception as e:
+            logger.warning(f"Redis cache get failed: {e}")
+            return None
+
+        if data is None:
+            self._count('misses')
+            return None
+        self._count('hits')
+        return bson.decode(data)['value']
+
+    def set(self, key, value, ttl_seconds=None):
+        """
+        Store a value with a TTL
+
+        Args:
+            key (str): Cache key
+            value: BSON-compatible value to cache
+            ttl_seconds (float): TTL for this entry (default: the cache TTL)
+        """
+        try:
+            self.client.set(
+                self.prefix + key,
+                bson.encode({'value': value}),
+                ex=int(ttl_seconds or self.ttl_seconds)
+            )
+        except Exception as e:
+            logger.warning(f"Redis cache set failed: {e}")
+
+    def delete(self, key):
+        """
+        Remove a value
+
+        Args:
+            key (str): Cache key
+        """
+        try:
+            self.client.delete(self.prefix + key)
+        except Exception as e:
+            logger.warning(f"Redis cache delete failed: {e}")
+
+    def clear(self):
+        """Remove every value written with this cache's prefix"""
+        keys = list(self.client.scan_iter(match=self.prefix + '*'))
+        if keys:
+            self.client.delete(*keys)
+
+    def stats(self):
+        """
+        Get statistics shared by every worker
+
+        Returns:
+            dict: hits, misses and hit_rate
+        """
+        self._flush_stats()
+        try:
+            hits = int(self.client.get(f"{self.prefix}stats:hits") or 0)
+            misses = int(self.client.get(f"{self.prefix}stats:misses") or 0)
+        except Exception as e:
+            logger.warning(f"Redis cache stats failed: {e}")
+            hits = misses = 0
+        lookups = hits + misses
+        return {
+            'backend': self.name,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / lookups, 3) if lookups else 0.0
+        }
+
+def create_backend():
+    """
+    Create the cache backend selected by Config.CACHE_BACKEND
+
+    Returns:
+        CacheBackend: Configured backend (memory if Redis is unavailable)
+    """
+    if Config.CACHE_BACKEND == 'redis':
+        try:
+            return RedisCache.from_url(Config.REDIS_URL, Config.CACHE_TTL_SECONDS)
+        except Exception as e:
+            logger.error(f"Redis cache unavailable, falling back to memory: {e}")
+    return LRUCache(Config.CACHE_MAX_ENTRIES, Config.CACHE_TTL_SECONDS)
+
+class CacheService:
+    """
+    Cache for documents and computed results, shared across requests
+    Entries are dropped explicitly when a model changes a document; the TTL
+    bounds how stale another worker's copy can get with the memory backend
+    """
+
+    def __init__(self, enabled=None, backend=None, max_entries=None, ttl_seconds=None):
+        """
+        Initialize the cache service from configuration
+
+        Args:
+            enabled (bool): Override Config.CACHE_ENABLED
+            backend (CacheBackend): Backend to use (default: create_backend())
+            max_entries (int): Size of an in-memory backend created here
+            ttl_seconds (float): TTL of an in-memory backend created here
+        """
+        self.enabled = Config.CACHE_ENABLED if enabled is None else enabled
+        if backend is None:
+            if max_entries or ttl_seconds:
+                backend = LRUCache(
+                    max_entries or Config.CACHE_MAX_ENTRIES,
+                    ttl_seconds or Config.CACHE_TTL_SECONDS
+                )
+            else:
+                backend = create_backend()
+        self._cache = backend
+
+    @staticmethod
+    def _key(namespace, key):
+        """Build the cache key for a document"""
+        return f"{namespace}:{key}"
+
+    def get(self, namespace, key):
+        """
+        Get a cached document
+
+        Args:
+            namespace (str): Collection name
+            key (str or ObjectId): Document ID
+
+        Returns:
+            dict: Copy of the document or None
+        """
+        if not self.enabled:
+            return None
+        return self._cache.get(self._key(namespace, key))
+
+    def set(self, namespace, key, value, ttl_seconds=None):
+        """
+        Cache a value (None is ignored so misses are not cached)
+
+        Args:
+            namespace (str): Collection name or other namespace
+            key (str or ObjectId): Document ID or other key
+            value: Document or computed result
+            ttl_seconds (float): TTL for this entry (default: the cache TTL)
+        """
+        if self.enabled and value is not None:
+            self._cache.set(self._key(namespace, key), value, ttl_seconds)
+
+    def delete(self, namespace, key):
+        """
+        Invalidate a cached document
+
+        Args:
+            namespace (str): Collection name
+            key (str or ObjectId): Document ID
+        """
+        self._cache.delete(self._key(namespace, key))
+
+    @property
+    def shared(self):
+        """Whether an invalidation reaches every worker process"""
+        return self._cache.shared
+
+    def clear(self):
+        """Invalidate every cached document"""
+        self._cache.clear()
+
+    def stats(self):
+        """
+        Get cache statistics
+
+        Returns:
+            dict: Cache statistics plus whether caching is enabled
+        """
+        stats = self._cache.stats()
+        stats['enabled'] = self.enabled
+        return stats
+
+# Global cache service instance
+cache_service = CacheService()
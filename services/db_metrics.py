@@ -0,0 +1,162 @@
+"""
+Database Metrics Module
+Collects connection pool and command statistics from pymongo's monitoring API
+"""
+
+from pymongo import monitoring
+import threading
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """
+    Connection pool listener
+    Tracks open and checked-out connections and how long checkouts wait,
+    which is what pool sizing for the worker/thread count depends on
+    """
+
+    def __init__(self):
+        """Initialize counters"""
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Reset every counter"""
+        with self._lock:
+            self.connections_open = 0
+            self.connections_created = 0
+            self.connections_closed = 0
+            self.checked_out = 0
+            self.max_checked_out = 0
+            self.checkouts = 0
+            self.checkout_failures = 0
+            self.checkout_wait_seconds = 0.0
+            self.max_checkout_wait_seconds = 0.0
+            self.pool_clears = 0
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool_clears += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.connections_created += 1
+            self.connections_open += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.connections_closed += 1
+            self.connections_open -= 1
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.checkout_failures += 1
+
+    def connection_checked_out(self, event):
+        # duration is reported by pymongo 4.9+
+        waited = getattr(event, 'duration', None) or 0.0
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.max_checked_out = max(self.max_checked_out, self.checked_out)
+            self.checkout_wait_seconds += waited
+            self.max_checkout_wait_seconds = max(self.max_checkout_wait_seconds, waited)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out -= 1
+
+    def stats(self):
+        """
+        Get pool statistics
+
+        Returns:
+            dict: Connection and checkout counters
+        """
+        with self._lock:
+            return {
+                'connections_open': self.connections_open,
+                'connections_created': self.connections_created,
+                'connections_closed': self.connections_closed,
+                'checked_out': self.checked_out,
+                'max_checked_out': self.max_checked_out,
+                'checkouts': self.checkouts,
+                'checkout_failures': self.checkout_failures,
+                'avg_checkout_wait_ms': round(
+                    self.checkout_wait_seconds * 1000 / self.checkouts, 3
+                ) if self.checkouts else 0.0,
+                'max_checkout_wait_ms': round(self.max_checkout_wait_seconds * 1000, 3),
+                'pool_clears': self.pool_clears
+            }
+
+class CommandMetrics(monitoring.CommandListener):
+    """
+    Command listener
+    Counts commands and their server round-trip time by command name
+    """
+
+    def __init__(self):
+        """Initialize counters"""
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Reset every counter"""
+        with self._lock:
+            self.commands = {}
+            self.failures = 0
+
+    def _record(self, event):
+        """Add one finished command to the per-command totals"""
+        with self._lock:
+            entry = self.commands.setdefault(event.command_name, {'count': 0, 'total_ms': 0.0})
+            entry['count'] += 1
+            entry['total_ms'] += event.duration_micros / 1000
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._record(event)
+
+    def failed(self, event):
+        self._record(event)
+        with self._lock:
+            self.failures += 1
+
+    def stats(self):
+        """
+        Get command statistics
+
+        Returns:
+            dict: Per-command count/total/average time and the failure count
+        """
+        with self._lock:
+            return {
+                'failures': self.failures,
+                'commands': {
+                    name: {
+                        'count': entry['count'],
+                        'total_ms': round(entry['total_ms'], 3),
+                        'avg_ms': round(entry['total_ms'] / entry['count'], 3)
+                    }
+                    for name, entry in self.commands.items()
+                }
+            }
+
+# Global listeners, registered on the client by DatabaseService
+pool_metrics = PoolMetrics()
+command_metrics = CommandMetrics()
@@ -3,10 +3,13 @@ Database Service Module
 Handles MongoDB connection and basic database operations
 """
 
-from pymongo import MongoClient, ASCENDING, DESCENDING
+from pymongo import MongoClient, ReturnDocument
 from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
 import logging
 from config import Config
+from services.db_metrics import pool_metrics, command_metrics
+from services.index_migrations import IndexMigrator
+from services.query_profiler import query_profiler
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -37,26 +40,73 @@ class DatabaseService:
         # Do not attempt to connect here. Connection will be created lazily.
         return
 
+    @staticmethod
+    def _client_options():
+        """
+        Build MongoClient keyword arguments from configuration
+        Options left unset in Config keep pymongo's defaults
+        
+        Returns:
+            dict: Keyword arguments for MongoClient
+        """
+        options = {
+            'serverSelectionTimeoutMS': Config.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            'maxPoolSize': Config.MONGO_MAX_POOL_SIZE,
+            'minPoolSize': Config.MONGO_MIN_POOL_SIZE,
+            'readPreference': Config.MONGO_READ_PREFERENCE,
+            'tlsAllowInvalidCertificates': True  # Allow invalid certificates for Python 3.13+
+        }
+        if Config.MONGO_MAX_IDLE_TIME_MS is not None:
+            options['maxIdleTimeMS'] = Config.MONGO_MAX_IDLE_TIME_MS
+        if Config.MONGO_WAIT_QUEUE_TIMEOUT_MS is not None:
+            options['waitQueueTimeoutMS'] = Config.MONGO_WAIT_QUEUE_TIMEOUT_MS
+        if Config.MONGO_COMPRESSORS:
+            options['compressors'] = Config.MONGO_COMPRESSORS
+        if Config.MONGO_WRITE_CONCERN:
+            w = Config.MONGO_WRITE_CONCERN
+            options['w'] = int(w) if w.isdigit() else w
+        listeners = []
+        if Config.MONGO_MONITORING:
+            listeners += [pool_metrics, command_metrics]
+        if Config.DB_PROFILING:
+            listeners.append(query_profiler)
+        if listeners:
+            options['event_listeners'] = listeners
+        return options
+
+    def pool_stats(self):
+        """
+        Get connection pool and command statistics from the monitoring listeners
+        
+        Returns:
+            dict: Pool counters, per-command timings and the pool options in use
+        """
+        return {
+            'pool': pool_metrics.stats(),
+            'commands': command_metrics.stats(),
+            'max_pool_size': Config.MONGO_MAX_POOL_SIZE,
+            'monitoring': Config.MONGO_MONITORING
+        }
+
     def _connect(self):
-        """Establish connection to MongoDB and create indexes.
+        """Establish connection to MongoDB.
 
         This is called lazily when a database operation is attempted.
+        Indexes are created by create_indexes.py, not on connect, unless
+        MONGO_CREATE_INDEXES_ON_CONNECT is set.
         """
         if self._client is not None:
             return
 
         try:
-            # SSL/TLS configuration for Python 3.13+ compatibility
-            self._client = MongoClient(
-                Config.MONGODB_URI,
-                serverSelectionTimeoutMS=5000,
-                tlsAllowInvalidCertificates=True  # Allow invalid certificates for Python 3.13+
-            )
+            # Pool, compression, read/write concern and SSL/TLS options from Config
+            self._client = MongoClient(Config.MONGODB_URI, **self._client_options())
             # Test connection
             self._client.admin.command('ping')
             self._db = self._client[Config.DATABASE_NAME]
             logger.info(f"Successfully connected to MongoDB: {Config.DATABASE_NAME}")
-            self._create_indexes()
+            if Config.MONGO_CREATE_INDEXES_ON_CONNECT:
+                self._create_indexes()
         except (ConnectionFailure, ServerSelectionTimeoutError) as e:
             logger.error(f"Failed to connect to MongoDB: {e}")
             # Keep client as None so subsequent attempts can retry
@@ -72,32 +122,33 @@ class DatabaseService:
         if self._client is None or self._db is None:
             self._connect()
     
+    def ensure_indexes(self):
+        """
+        Connect and bring indexes in line with services/index_migrations.py
+        
+        Returns:
+            bool: True if every declared index exists
+        """
+        self._ensure_connection()
+        return self._create_indexes()
+    
     def _create_indexes(self):
         """
-        Create database indexes for better query performance
-        Called automatically during initialization
+        Apply the declared index migrations
+        
+        Returns:
+            bool: True if successful
         """
         try:
-            # Users collection indexes
-            self._db.users.create_index([("username", ASCENDING)], unique=True)
-            self._db.users.create_index([("email", ASCENDING)])
-            
-            # Courses collection indexes
-            self._db.courses.create_index([("code", ASCENDING)])
-            self._db.courses.create_index([("teacher_id", ASCENDING)])
-            
-            # Activities collection indexes
-            self._db.activities.create_index([("course_id", ASCENDING)])
-            self._db.activities.create_index([("teacher_id", ASCENDING)])
-            self._db.activities.create_index([("link", ASCENDING)], unique=True)
-            
-            # Students collection indexes
-            self._db.students.create_index([("course_id", ASCENDING)])
-            self._db.students.create_index([("student_id", ASCENDING)])
-            
-            logger.info("Database indexes created successfully")
+            result = IndexMigrator(self._db).apply()
+            if result['errors']:
+                return False
+            logger.info(f"Database indexes at schema version {result['version']} "
+                        f"({len(result['created'])} created, {len(result['dropped'])} dropped)")
+            return True
         except Exception as e:
             logger.error(f"Error creating indexes: {e}")
+            return False
     
     @property
     def db(self):
@@ -138,25 +189,26 @@ class DatabaseService:
             logger.error(f"Error inserting document into {collection_name}: {e}")
             raise
     
-    def find_one(self, collection_name, query):
+    def find_one(self, collection_name, query, projection=None):
         """
         Find a single document in a collection
         
         Args:
             collection_name (str): Name of the collection
             query (dict): Query filter
+            projection (dict): Fields to include or exclude (optional)
             
         Returns:
             dict: Found document or None
         """
         try:
             self._ensure_connection()
-            return self._db[collection_name].find_one(query)
+            return self._db[collection_name].find_one(query, projection)
         except Exception as e:
             logger.error(f"Error finding document in {collection_name}: {e}")
             raise
     
-    def find_many(self, collection_name, query, sort=None, limit=None):
+    def find_many(self, collection_name, query, sort=None, limit=None, projection=None, skip=None):
         """
         Find multiple documents in a collection
         
@@ -165,15 +217,19 @@ class DatabaseService:
             query (dict): Query filter
             sort (list): Sort specification
             limit (int): Maximum number of documents to return
+            projection (dict): Fields to include or exclude (optional)
+            skip (int): Number of documents to skip, for pagination (optional)
             
         Returns:
             Cursor: MongoDB cursor with results
         """
         try:
             self._ensure_connection()
-            cursor = self._db[collection_name].find(query)
+            cursor = self._db[collection_name].find(query, projection)
             if sort:
                 cursor = cursor.sort(sort)
+            if skip:
+                cursor = cursor.skip(skip)
             if limit:
                 cursor = cursor.limit(limit)
             return list(cursor)
@@ -181,7 +237,7 @@ class DatabaseService:
             logger.error(f"Error finding documents in {collection_name}: {e}")
             raise
     
-    def update_one(self, collection_name, query, update):
+    def update_one(self, collection_name, query, update, upsert=False):
         """
         Update a single document in a collection
         
@@ -189,19 +245,50 @@ class DatabaseService:
             collection_name (str): Name of the collection
             query (dict): Query filter
             update (dict): Update operations
+            upsert (bool): Insert a new document if none matches
             
         Returns:
             UpdateResult: Result of the update operation
         """
         try:
             self._ensure_connection()
-            result = self._db[collection_name].update_one(query, update)
+            result = self._db[collection_name].update_one(query, update, upsert=upsert)
             logger.info(f"Updated document in {collection_name}: {result.modified_count} modified")
             return result
         except Exception as e:
             logger.error(f"Error updating document in {collection_name}: {e}")
             raise
     
+    def find_one_and_update(self, collection_name, query, update, projection=None, return_after=False, sort=None, upsert=False):
+        """
+        Atomically update a single document and return it
+        
+        Args:
+            collection_name (str): Name of the collection
+            query (dict): Query filter
+            update (dict): Update operations
+            projection (dict): Fields to return (optional)
+            return_after (bool): Return the document after the update instead of before
+            sort (list): Which matching document to update first (optional)
+            upsert (bool): Insert a new document if none matches
+            
+        Returns:
+            dict: Matched document or None
+        """
+        try:
+            self._ensure_connection()
+            return self._db[collection_name].find_one_and_update(
+                query,
+                update,
+                projection=projection,
+                sort=sort,
+                upsert=upsert,
+                return_document=ReturnDocument.AFTER if return_after else ReturnDocument.BEFORE
+            )
+        except Exception as e:
+            logger.error(f"Error updating document in {collection_name}: {e}")
+            raise
+    
     def delete_one(self, collection_name, query):
         """
         Delete a single document from a collection
@@ -222,6 +309,26 @@ class DatabaseService:
             logger.error(f"Error deleting document from {collection_name}: {e}")
             raise
     
+    def delete_many(self, collection_name, query):
+        """
+        Delete every matching document from a collection
+        
+        Args:
+            collection_name (str): Name of the collection
+            query (dict): Query filter
+            
+        Returns:
+            DeleteResult: Result of the delete operation
+        """
+        try:
+            self._ensure_connection()
+            result = self._db[collection_name].delete_many(query)
+            logger.info(f"Deleted documents from {collection_name}: {result.deleted_count} deleted")
+            return result
+        except Exception as e:
+            logger.error(f"Error deleting documents from {collection_name}: {e}")
+            raise
+    
     def count_documents(self, collection_name, query=None):
         """
         Count documents in a collection
@@ -242,6 +349,24 @@ class DatabaseService:
             logger.error(f"Error counting documents in {collection_name}: {e}")
             raise
     
+    def aggregate(self, collection_name, pipeline):
+        """
+        Run an aggregation pipeline on a collection
+        
+        Args:
+            collection_name (str): Name of the collection
+            pipeline (list): Aggregation stages
+            
+        Returns:
+            list: Result documents
+        """
+        try:
+            self._ensure_connection()
+            return list(self._db[collection_name].aggregate(pipeline))
+        except Exception as e:
+            logger.error(f"Error aggregating {collection_name}: {e}")
+            raise
+    
     def close(self):
         """Close database connection"""
         if self._client:
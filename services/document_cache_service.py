@@ -0,0 +1,336 @@
+"""
+Document Cache Service Module
+Cache of text extracted from uploaded PDF/PowerPoint files, keyed by the
+SHA-256 of the file, and of the content selected from it for AI prompts.
+Generating again from the same file skips parsing it. Backends
+(DOCUMENT_CACHE_BACKEND):
+- gridfs: document_cache GridFS bucket shared by every worker (default)
+- disk: JSON files under DOCUMENT_CACHE_DIR
+- memory: per-process LRU cache
+"""
+
+from datetime import datetime, timedelta, timezone
+from config import Config
+from services.ai_cache_service import DiskCache
+from services.cache_service import CacheBackend, LRUCache
+from services.db_service import db_service
+from services.document_service import summarize_content
+import gridfs
+import hashlib
+import json
+import threading
+import time
+import zlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+def file_digest(path):
+    """
+    Hash a file
+
+    Args:
+        path (str): File path
+
+    Returns:
+        str: SHA-256 hex digest of the file content
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+class GridFSCache(CacheBackend):
+    """
+    Cache stored as files in a GridFS bucket
+    Each value is zlib-compressed JSON split into chunks, so long documents
+    are not limited by the 16 MB document size. The file metadata records
+    last use and expiry; evict() deletes expired files and the least
+    recently used beyond max_entries (run every EVICT_EVERY writes)
+    """
+
+    name = 'gridfs'
+
+    shared = True
+
+    BUCKET_NAME = 'document_cache'
+
+    # Writes between two size checks
+    EVICT_EVERY = 20
+
+    def __init__(self, max_entries, ttl_seconds):
+        """
+        Initialize the backend
+
+        Args:
+            max_entries (int): Maximum number of entries kept
+            ttl_seconds (float): Default TTL in seconds
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _count(self, counter, amount=1):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def _files(self):
+        """The bucket's files collection (connects if needed)"""
+        return db_service.get_collection(f'{self.BUCKET_NAME}.files')
+
+    def _bucket(self):
+        self._files()
+        return gridfs.GridFSBucket(db_service.db, bucket_name=self.BUCKET_NAME)
+
+    def get(self, key):
+        """
+        Get a value if it is cached and not expired, marking it recently used
+
+        Args:
+            key (str): Cache key
+
+        Returns:
+            Cached value or None (also None if MongoDB is unreachable)
+        """
+        now = datetime.now(timezone.utc)
+        try:
+            entry = self._files().find_one_and_update(
+                {'_id': key, 'metadata.expires_at': {'$gt': now}},
+                {'$set': {'metadata.last_used_at': now}},
+                projection={'_id': 1}
+            )
+            value = None
+            if entry is not None:
+                value = json.loads(zlib.decompress(self._bucket().open_download_stream(key).read()))
+        except Exception as e:
+            logger.warning(f"Document cache get failed: {e}")
+            value = None
+
+        self._count('misses' if value is None else 'hits')
+        return value
+
+    def set(self, key, value, ttl_seconds=None):
+        """
+        Store a value with a TTL, replacing an earlier one
+
+        Args:
+            key (str): Cache key
+            value: JSON-compatible value to cache
+            ttl_seconds (float): TTL for this entry (default: the cache TTL)
+        """
+        now = datetime.now(timezone.utc)
+        data = zlib.compress(json.dumps(value, ensure_ascii=False).encode('utf-8'))
+        try:
+            bucket = self._bucket()
+            self.delete(key)
+            bucket.upload_from_stream_with_id(key, key, data, metadata={
+                'created_at': now,
+                'last_used_at': now,
+                'expires_at': now + timedelta(seconds=ttl_seconds or self.ttl_seconds)
+            })
+        except Exception as e:
+            logger.warning(f"Document cache set failed: {e}")
+            return
+
+        with self._lock:
+            self._writes += 1
+            due = self._writes % self.EVICT_EVERY == 0
+        if due:
+            self.evict()
+
+    def evict(self):
+        """
+        Delete expired entries and the least recently used beyond max_entries
+
+        Returns:
+            int: Number of entries deleted
+        """
+        now = datetime.now(timezone.utc)
+        try:
+            files = self._files()
+            expired = [entry['_id'] for entry in files.find({'metadata.expires_at': {'$lte': now}}, {'_id': 1})]
+            excess = files.count_documents({}) - len(expired) - self.max_entries
+            oldest = []
+            if excess > 0:
+                oldest = [entry['_id'] for entry in files.find({'metadata.expires_at': {'$gt': now}}, {'_id': 1})
+                          .sort('metadata.last_used_at', 1).limit(excess)]
+        except Exception as e:
+            logger.warning(f"Document cache eviction failed: {e}")
+            return 0
+
+        for key in expired + oldest:
+            self.delete(key)
+        self._count('evictions', len(expired) + len(oldest))
+        return len(expired) + len(oldest)
+
+    def delete(self, key):
+        """
+        Remove a value
+
+        Args:
+            key (str): Cache key
+        """
+        try:
+            self._bucket().delete(key)
+        except gridfs.NoFile:
+            pass
+        except Exception as e:
+            logger.warning(f"Document cache delete failed: {e}")
+
+    def clear(self):
+        """Remove every value"""
+        for entry in self._files().find({}, {'_id': 1}):
+            self.delete(entry['_id'])
+
+    def stats(self):
+        """
+        Get cache statistics (hit counts are for this process)
+
+        Returns:
+            dict: hits, misses, evictions, size and hit_rate
+        """
+        try:
+            size = self._files().count_documents({})
+        except Exception as e:
+            logger.warning(f"Document cache stats failed: {e}")
+            size = None
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'backend': self.name,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': size,
+                'max_entries': self.max_entries,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0
+            }
+
+def create_backend():
+    """
+    Create the cache backend selected by Config.DOCUMENT_CACHE_BACKEND
+
+    Returns:
+        CacheBackend: Configured backend
+    """
+    if Config.DOCUMENT_CACHE_BACKEND == 'gridfs':
+        return GridFSCache(Config.DOCUMENT_CACHE_MAX_ENTRIES, Config.DOCUMENT_CACHE_TTL_SECONDS)
+    if Config.DOCUMENT_CACHE_BACKEND == 'disk':
+        return DiskCache(Config.DOCUMENT_CACHE_DIR, Config.DOCUMENT_CACHE_MAX_ENTRIES,
+                         Config.DOCUMENT_CACHE_TTL_SECONDS)
+    return LRUCache(Config.DOCUMENT_CACHE_MAX_ENTRIES, Config.DOCUMENT_CACHE_TTL_SECONDS)
+
+class DocumentCacheService:
+    """
+    Cache of uploaded documents keyed by file_digest()
+    An upload's extracted text is stored under its digest and each selection
+    of prompt content under the digest and length, so a new length only
+    needs summarize_content and a repeated one nothing at all
+    """
+
+    key = staticmethod(file_digest)
+
+    def __init__(self, enabled=None, backend=None):
+        """
+        Initialize the cache service from configuration
+
+        Args:
+            enabled (bool): Override Config.DOCUMENT_CACHE_ENABLED
+            backend (CacheBackend): Backend to use (default: create_backend())
+        """
+        self.enabled = Config.DOCUMENT_CACHE_ENABLED if enabled is None else enabled
+        self._cache = backend if backend is not None else create_backend()
+        self._lock = threading.Lock()
+        self.seconds_saved = 0.0
+
+    def _saved(self, entry):
+        with self._lock:
+            self.seconds_saved += entry.get('seconds', 0.0)
+
+    def get_document(self, digest):
+        """
+        Get the extracted text of an upload
+
+        Args:
+            digest (str): SHA-256 of the file
+
+        Returns:
+            dict: filename and text, or None if not cached
+        """
+        if not self.enabled:
+            return None
+        return self._cache.get(digest)
+
+    def content(self, digest, max_length, extract=None, filename=None):
+        """
+        Get the content of an upload selected for an AI prompt
+
+        Args:
+            digest (str): SHA-256 of the file
+            max_length (int): Length passed to summarize_content
+            extract (callable): Returns the file's text if it is not cached
+            filename (str): Name of the uploaded file, stored with its text
+
+        Returns:
+            str: Selected content, or None if the upload is not cached and
+                 no extract function was given
+        """
+        if not self.enabled:
+            return summarize_content(extract(), max_length) if extract else None
+
+        content_key = f"{digest}-{max_length}"
+        entry = self._cache.get(content_key)
+        if entry is not None:
+            self._saved(entry)
+            return entry['text']
+
+        started = time.perf_counter()
+        document = self._cache.get(digest)
+        if document is not None:
+            self._saved(document)
+        elif extract is None:
+            return None
+        else:
+            document = {'filename': filename, 'text': extract(),
+                        'seconds': round(time.perf_counter() - started, 3)}
+            self._cache.set(digest, document)
+
+        content = summarize_content(document['text'], max_length)
+        seconds = document.get('seconds', 0.0) + time.perf_counter() - started
+        self._cache.set(content_key, {'text': content, 'seconds': round(seconds, 3)})
+        return content
+
+    def delete(self, digest):
+        """
+        Forget an upload's text (selected content expires on its own)
+
+        Args:
+            digest (str): SHA-256 of the file
+        """
+        self._cache.delete(digest)
+
+    def clear(self):
+        """Forget every upload"""
+        self._cache.clear()
+
+    def stats(self):
+        """
+        Get cache statistics
+
+        Returns:
+            dict: Backend statistics plus whether caching is enabled and the
+                  extraction seconds saved by hits in this process
+        """
+        stats = self._cache.stats()
+        stats['enabled'] = self.enabled
+        with self._lock:
+            stats['seconds_saved'] = round(self.seconds_saved, 3)
+        return stats
+
+# Global document cache service instance
+document_cache_service = DocumentCacheService()
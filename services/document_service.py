@@ -1,40 +1,90 @@
 """
 Document Processing Service
-Extracts text content from PDF and PowerPoint files
+Extracts text content from PDF and PowerPoint files and selects the most
+informative parts of it for AI prompts
 """
 
 import logging
-from typing import Optional
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from typing import Optional, Union
+from config import Config
+import heapq
 import io
+import math
+import mmap
+import multiprocessing
+import os
+import re
+import threading
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def extract_text_from_pdf(file_content: bytes) -> str:
+# Stands in for chunks left out between selected ones
+OMITTED_MARKER = '[...]'
+
+# Weight kept by a keyword once a selected chunk covers it
+COVERED_TERM_WEIGHT = 0.3
+
+# Common English words that say nothing about the topic
+STOP_WORDS = frozenset("""
+a about above after again all also am an and any are as at be because been before being below
+between both but by can could did do does doing down during each few for from further had has
+have having he her here hers him his how i if in into is it its itself just me more most my no
+nor not now of off on once only or other our out over own same she should so some such than that
+the their them then there these they this those through to too under until up very was we were
+what when where which while who whom why will with would you your slide page figure example
+""".split())
+
+# Pages of a PDF extracted by one worker process task
+PAGES_PER_TASK = 16
+
+_WORD = re.compile(r"[a-z][a-z0-9'+#-]*[a-z0-9+#]|[\u4e00-\u9fff\u3400-\u4dbf]+")
+_SENTENCE_END = re.compile(r'(?<=[.!?。！？])\s+|(?<=[。！？])')
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def extract_text_from_pdf(source: Union[bytes, str], max_pages: Optional[int] = None,
+                          max_chars: Optional[int] = None) -> str:
     """
     Extract text from PDF file
+    Pages are extracted in order and extraction stops once max_pages pages or
+    max_chars characters have been read. A file path (spooled upload) is
+    memory-mapped, and long documents are split into page ranges extracted by
+    a pool of worker processes.
     
     Args:
-        file_content (bytes): PDF file content
+        source (bytes or str): PDF file content, or the path of the file
+        max_pages (int): Page budget (default: Config.DOCUMENT_MAX_PAGES)
+        max_chars (int): Character budget (default: Config.DOCUMENT_MAX_CHARS)
         
     Returns:
         str: Extracted text content
     """
+    max_pages = max_pages or Config.DOCUMENT_MAX_PAGES
+    max_chars = max_chars or Config.DOCUMENT_MAX_CHARS
     try:
         from PyPDF2 import PdfReader
         
-        pdf_file = io.BytesIO(file_content)
-        reader = PdfReader(pdf_file)
+        with _open_source(source) as pdf_file:
+            reader = PdfReader(pdf_file)
+            total_pages = len(reader.pages)
+            page_count = min(total_pages, max_pages)
+            parallel = isinstance(source, str) and _use_worker_processes(page_count)
+            text_content = None if parallel else _page_texts(reader, 0, page_count, max_chars)
         
-        text_content = []
-        for page in reader.pages:
-            text = page.extract_text()
-            if text:
-                text_content.append(text)
+        if parallel:
+            text_content = _extract_pdf_parallel(source, page_count, max_chars)
         
         extracted_text = '\n\n'.join(text_content)
-        logger.info(f"Extracted {len(extracted_text)} characters from PDF")
+        logger.info(f"Extracted {len(extracted_text)} characters from PDF "
+                    f"({len(text_content)} of {total_pages} pages with text read)")
         
         return extracted_text
         
@@ -43,25 +93,34 @@ def extract_text_from_pdf(file_content: bytes) -> str:
         raise Exception(f"Failed to extract PDF content: {str(e)}")
 
 
-def extract_text_from_pptx(file_content: bytes) -> str:
+def extract_text_from_pptx(source: Union[bytes, str], max_pages: Optional[int] = None,
+                           max_chars: Optional[int] = None) -> str:
     """
     Extract text from PowerPoint file
+    Slides are read in order until max_pages slides or max_chars characters.
     
     Args:
-        file_content (bytes): PowerPoint file content
+        source (bytes or str): PowerPoint file content, or the path of the file
+        max_pages (int): Slide budget (default: Config.DOCUMENT_MAX_PAGES)
+        max_chars (int): Character budget (default: Config.DOCUMENT_MAX_CHARS)
         
     Returns:
         str: Extracted text content
     """
+    max_pages = max_pages or Config.DOCUMENT_MAX_PAGES
+    max_chars = max_chars or Config.DOCUMENT_MAX_CHARS
     try:
         from pptx import Presentation
         
-        pptx_file = io.BytesIO(file_content)
-        prs = Presentation(pptx_file)
+        # A path is opened as a zip file that reads only the parts it needs
+        prs = Presentation(source if isinstance(source, str) else io.BytesIO(source))
         
         text_content = []
+        collected = 0
         
         for slide_num, slide in enumerate(prs.slides, 1):
+            if slide_num > max_pages or collected >= max_chars:
+                break
             slide_text = [f"--- Slide {slide_num} ---"]
             
             # Extract text from shapes
@@ -83,6 +142,7 @@ def extract_text_from_pptx(file_content: bytes) -> str:
             
             if len(slide_text) > 1:  # Has content beyond the header
                 text_content.append('\n'.join(slide_text))
+                collected += len(text_content[-1])
         
         extracted_text = '\n\n'.join(text_content)
         logger.info(f"Extracted {len(extracted_text)} characters from PPTX ({len(prs.slides)} slides)")
@@ -94,13 +154,16 @@ def extract_text_from_pptx(file_content: bytes) -> str:
         raise Exception(f"Failed to extract PowerPoint content: {str(e)}")
 
 
-def extract_document_content(filename: str, file_content: bytes) -> str:
+def extract_document_content(filename: str, source: Union[bytes, str], max_pages: Optional[int] = None,
+                             max_chars: Optional[int] = None) -> str:
     """
     Extract text content from document based on file extension
     
     Args:
         filename (str): Name of the file
-        file_content (bytes): File content
+        source (bytes or str): File content, or the path of the file
+        max_pages (int): Page/slide budget (default: Config.DOCUMENT_MAX_PAGES)
+        max_chars (int): Character budget (default: Config.DOCUMENT_MAX_CHARS)
         
     Returns:
         str: Extracted text content
@@ -108,54 +171,319 @@ def extract_document_content(filename: str, file_content: bytes) -> str:
     filename_lower = filename.lower()
     
     if filename_lower.endswith('.pdf'):
-        return extract_text_from_pdf(file_content)
+        return extract_text_from_pdf(source, max_pages, max_chars)
     elif filename_lower.endswith(('.ppt', '.pptx')):
-        return extract_text_from_pptx(file_content)
+        return extract_text_from_pptx(source, max_pages, max_chars)
     else:
         raise ValueError(f"Unsupported file format: {filename}. Only PDF and PowerPoint files are supported.")
 
 
+@contextmanager
+def _open_source(source: Union[bytes, str]):
+    """Binary file object for file content, or a read-only memory map of a file path"""
+    if not isinstance(source, str):
+        yield io.BytesIO(source)
+        return
+    with open(source, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:  # Empty files cannot be mapped
+            yield file
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
+
+
+def _page_texts(reader, start: int, stop: int, max_chars: int) -> list:
+    """Text of pages start to stop (those that have any), until max_chars characters"""
+    texts = []
+    collected = 0
+    for number in range(start, stop):
+        if collected >= max_chars:
+            break
+        text = reader.pages[number].extract_text()
+        if text:
+            texts.append(text)
+            collected += len(text)
+    return texts
+
+
+def _extract_pdf_range(path: str, start: int, stop: int, max_chars: int) -> list:
+    """Worker process task: text of a range of pages of the PDF at path"""
+    from PyPDF2 import PdfReader
+    
+    with _open_source(path) as pdf_file:
+        return _page_texts(PdfReader(pdf_file), start, stop, max_chars)
+
+
+def _pool_size() -> int:
+    """Worker processes in the shared extraction pool"""
+    return Config.DOCUMENT_EXTRACTION_WORKERS or min(4, os.cpu_count() or 1)
+
+
+def _use_worker_processes(page_count: int) -> bool:
+    """Whether a document of page_count pages is worth extracting in worker processes"""
+    return page_count >= 2 * PAGES_PER_TASK and _pool_size() > 1
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """Process pool shared by all extractions, created on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # spawn: forking a process with running threads (web server,
+                # GenAI scheduler) can copy locks held by other threads
+                _pool = ProcessPoolExecutor(max_workers=_pool_size(), mp_context=multiprocessing.get_context('spawn'))
+    return _pool
+
+
+def _extract_pdf_parallel(path: str, page_count: int, max_chars: int) -> list:
+    """
+    Extract page ranges of a PDF file in worker processes
+    Ranges are queued in page order and their results taken in the same
+    order; once max_chars characters have been collected the ranges that have
+    not started are cancelled. Falls back to extracting in this process when
+    no process pool can be used (e.g. no /dev/shm on serverless hosts).
+    """
+    global _pool
+    try:
+        pool = _get_pool()
+        futures = [pool.submit(_extract_pdf_range, path, start, min(start + PAGES_PER_TASK, page_count), max_chars)
+                   for start in range(0, page_count, PAGES_PER_TASK)]
+    except (OSError, NotImplementedError, BrokenProcessPool) as e:
+        logger.warning(f"Process pool unavailable, extracting in process: {e}")
+        with _pool_lock:
+            _pool = None
+        return _extract_pdf_range(path, 0, page_count, max_chars)
+    
+    texts = []
+    collected = 0
+    try:
+        for future in futures:
+            if collected >= max_chars:
+                break
+            for text in future.result():
+                texts.append(text)
+                collected += len(text)
+    except BrokenProcessPool as e:
+        logger.warning(f"Extraction worker died, extracting in process: {e}")
+        with _pool_lock:
+            _pool = None
+        return _extract_pdf_range(path, 0, page_count, max_chars)
+    finally:
+        for future in futures:
+            future.cancel()
+    return texts
+
+
 def summarize_content(text: str, max_length: int = 3000) -> str:
     """
-    Intelligently summarize or truncate content to fit within AI token limits
-    Prioritizes keeping the most important content from beginning, middle, and end
+    Select the most informative parts of content to fit within AI token limits
+    Lines repeated on many pages (headers, footers) are dropped after their
+    first occurrence. The text is split into chunks of a few sentences, each chunk is scored by
+    how central its keywords are to the whole document (TF-IDF), and the best
+    chunks are packed into max_length. After each pick the weight of the
+    keywords it covered is reduced, so later picks cover other topics.
+    Chosen chunks are kept in document order, with "[...]" marking the gaps.
     
     Args:
         text (str): Full text content
         max_length (int): Maximum character length
         
     Returns:
-        str: Summarized or truncated text
+        str: Selected content (the text itself if it already fits)
     """
     if len(text) <= max_length:
         return text
     
-    # For very long content, take samples from beginning, middle, and end
-    # to ensure comprehensive coverage
-    if len(text) > max_length * 3:
-        # Take 40% from beginning, 30% from middle, 30% from end
-        start_length = int(max_length * 0.4)
-        middle_length = int(max_length * 0.3)
-        end_length = int(max_length * 0.3)
+    chunk_length = max(200, min(600, max_length // 6))
+    chunks = _split_chunks(_drop_repeated_lines(text), chunk_length)
+    vectors = _tfidf_vectors([_terms(chunk) for chunk in chunks])
+    selected = _select_chunks(chunks, vectors, max_length)
+    
+    if not selected:
+        # Nothing scoreable (e.g. no words): truncate at a good boundary
+        return _cut_at_boundary(text[:max_length], from_end=True)
+    
+    parts = []
+    for position, index in enumerate(selected):
+        if position and index != selected[position - 1] + 1:
+            parts.append(OMITTED_MARKER)
+        parts.append(chunks[index])
+    logger.info(f"Selected {len(selected)} of {len(chunks)} chunks ({max_length} char budget)")
+    return '\n\n'.join(parts)
+
+
+def _drop_repeated_lines(text: str, min_repeats: int = 3) -> str:
+    """
+    Remove the repeats of lines that occur on many pages
+    Lines are compared ignoring case and numbers, so "Page 3" and "Page 4"
+    are the same line. Repeated boilerplate would otherwise look central to
+    the document, being similar to every page.
+    
+    Args:
+        text (str): Full text content
+        min_repeats (int): Occurrences that make a line boilerplate
         
-        start_text = text[:start_length]
-        middle_start = len(text) // 2 - middle_length // 2
-        middle_text = text[middle_start:middle_start + middle_length]
-        end_text = text[-end_length:]
+    Returns:
+        str: Text with only the first occurrence of such lines
+    """
+    def key(line):
+        return re.sub(r'\d+', '#', line.strip().lower())
+    
+    lines = text.split('\n')
+    counts = Counter(key(line) for line in lines if line.strip())
+    seen = set()
+    kept = []
+    for line in lines:
+        line_key = key(line)
+        if line_key and counts[line_key] >= min_repeats:
+            if line_key in seen:
+                continue
+            seen.add(line_key)
+        kept.append(line)
+    return '\n'.join(kept)
+
+
+def _split_chunks(text: str, chunk_length: int) -> list:
+    """
+    Split text into chunks of whole sentences of about chunk_length characters
+    Paragraphs (and slides) are kept together when they fit; shorter ones are
+    merged and longer ones split between sentences
+    
+    Args:
+        text (str): Full text content
+        chunk_length (int): Target characters per chunk
+        
+    Returns:
+        list: Chunks (str) in document order
+    """
+    pieces = []
+    for paragraph in re.split(r'\n\s*\n', text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if len(paragraph) <= chunk_length:
+            pieces.append(paragraph)
+            continue
+        for sentence in _SENTENCE_END.split(paragraph):
+            sentence = sentence.strip()
+            # Sentences longer than a chunk are cut between words
+            while len(sentence) > chunk_length:
+                cut = sentence.rfind(' ', chunk_length // 2, chunk_length)
+                cut = cut if cut > 0 else chunk_length
+                pieces.append(sentence[:cut].strip())
+                sentence = sentence[cut:].strip()
+            if sentence:
+                pieces.append(sentence)
+    
+    chunks, current = [], ''
+    for piece in pieces:
+        if current and len(current) + 1 + len(piece) > chunk_length:
+            chunks.append(current)
+            current = piece
+        else:
+            current = f"{current} {piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _terms(text: str) -> list:
+    """
+    Get the keywords of a text
+    English words of 3+ letters except stop words, and character bigrams
+    of Chinese text (which has no spaces between words)
+    
+    Args:
+        text (str): Text
+        
+    Returns:
+        list: Terms (str), with repeats
+    """
+    terms = []
+    for word in _WORD.findall(text.lower()):
+        if word[0] >= '\u3400':
+            terms.extend(word[i:i + 2] for i in range(max(1, len(word) - 1)))
+        elif len(word) >= 3 and word not in STOP_WORDS:
+            terms.append(word)
+    return terms
+
+
+def _tfidf_vectors(chunk_terms: list) -> list:
+    """
+    Weight each chunk's terms by TF-IDF
+    Terms in almost every chunk (page headers, course names) get little
+    weight, so boilerplate does not look important
+    
+    Args:
+        chunk_terms (list): Terms (list) of each chunk
         
-        # Clean up at sentence boundaries
-        start_text = _cut_at_boundary(start_text, from_end=True)
-        middle_text = _cut_at_boundary(middle_text, from_start=True)
-        middle_text = _cut_at_boundary(middle_text, from_end=True)
-        end_text = _cut_at_boundary(end_text, from_start=True)
+    Returns:
+        list: Unit-length {term: weight} vector per chunk
+    """
+    document_frequency = Counter()
+    for terms in chunk_terms:
+        document_frequency.update(set(terms))
+    
+    count = len(chunk_terms)
+    vectors = []
+    for terms in chunk_terms:
+        vector = {
+            term: (1 + math.log(frequency)) * math.log((1 + count) / (1 + document_frequency[term]))
+            for term, frequency in Counter(terms).items()
+        }
+        norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+        vectors.append({term: weight / norm for term, weight in vector.items()} if norm else {})
+    return vectors
+
+
+def _select_chunks(chunks: list, vectors: list, max_length: int) -> list:
+    """
+    Pick the chunks that best cover the document's keywords within max_length
+    A chunk's value is the similarity of its vector to the document's
+    (the sum of all chunk vectors), counting only keyword weight not yet
+    covered by earlier picks. Values only go down as picks are made, so
+    chunks are re-scored lazily from a heap (deterministic: ties go to the
+    earlier chunk).
+    
+    Args:
+        chunks (list): Chunks (str)
+        vectors (list): TF-IDF vector per chunk
+        max_length (int): Character budget, gap markers included
         
-        return f"{start_text}\n\n[... content from middle section ...]\n\n{middle_text}\n\n[... content from end section ...]\n\n{end_text}"
+    Returns:
+        list: Indexes of the selected chunks, in document order
+    """
+    centroid = Counter()
+    for vector in vectors:
+        centroid.update(vector)
+    
+    def value(index):
+        return sum(weight * centroid[term] for term, weight in vectors[index].items())
     
-    # For moderately long content, just truncate at a good boundary
-    truncated = text[:max_length]
-    truncated = _cut_at_boundary(truncated, from_end=True)
+    heap = [(-value(index), index) for index in range(len(chunks)) if vectors[index]]
+    heapq.heapify(heap)
     
-    return truncated + "\n\n... (content continues)"
+    selected, used = [], 0
+    # A chunk costs its length plus a separator and possibly a gap marker
+    overhead = 2 * (len(OMITTED_MARKER) + 2)
+    while heap:
+        _, index = heapq.heappop(heap)
+        current = value(index)
+        if heap and current < -heap[0][0]:
+            # Its keywords were partly covered since it was scored
+            heapq.heappush(heap, (-current, index))
+            continue
+        if current <= 0:
+            break
+        cost = len(chunks[index]) + overhead
+        if used + cost > max_length:
+            continue
+        selected.append(index)
+        used += cost
+        for term in vectors[index]:
+            centroid[term] *= COVERED_TERM_WEIGHT
+    return sorted(selected)
 
 
 def _cut_at_boundary(text: str, from_start: bool = False, from_end: bool = False) -> str:
@@ -0,0 +1,305 @@
+"""
+Evaluation Service Module
+Runs AI evaluation of short answer and word cloud responses off the request path
+- thread: jobs are stored in MongoDB and run by an in-process thread pool
+- queue: jobs are only stored; evaluation_worker.py processes them
+- sync: evaluate inside the submit request (the original behaviour; the
+  default on Vercel)
+Where background threads are frozen between requests (serverless) and no
+worker runs, AI_EVALUATION_INLINE_AFTER_SECONDS lets polling a job that
+nobody picked up run it inline; it is off by default
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from bson import ObjectId
+from config import Config
+from models.evaluation_job import EvaluationJob
+from models.response import Response
+from services.genai_service import genai_service
+from utils.time_utils import get_hk_time
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+class EvaluationService:
+    """
+    Background AI evaluation of student responses
+    """
+
+    MODE_THREAD = 'thread'
+    MODE_QUEUE = 'queue'
+    MODE_SYNC = 'sync'
+
+    STATUS_PENDING = 'pending'
+
+    def __init__(self, mode=None, workers=None):
+        """
+        Initialize the service (the thread pool is started on first use)
+
+        Args:
+            mode (str): thread, queue or sync (default: Config.AI_EVALUATION_MODE)
+            workers (int): Thread pool size (default: Config.AI_EVALUATION_WORKERS)
+        """
+        self.mode = mode or Config.AI_EVALUATION_MODE
+        self.workers = workers or Config.AI_EVALUATION_WORKERS
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_async(self):
+        """Whether evaluations run outside the submit request"""
+        return self.mode != self.MODE_SYNC
+
+    def _get_executor(self):
+        """Get the thread pool, creating it on first use"""
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers,
+                        thread_name_prefix='ai-evaluation'
+                    )
+        return self._executor
+
+    @staticmethod
+    def prepare(response_data):
+        """
+        Mark a response as waiting for an AI evaluation before it is saved
+
+        Args:
+            response_data (dict): Response data about to be stored
+
+        Returns:
+            ObjectId: ID of the job to enqueue once the response is stored
+        """
+        job_id = ObjectId()
+        response_data['ai_evaluation'] = None
+        response_data['ai_evaluation_status'] = EvaluationService.STATUS_PENDING
+        response_data['ai_evaluation_job'] = str(job_id)
+        return job_id
+
+    def enqueue(self, job_id, activity, response_id, question, answer, activity_type):
+        """
+        Queue the evaluation of a stored response
+
+        Args:
+            job_id (ObjectId): ID returned by prepare()
+            activity (dict): Activity document
+            response_id (str): Stored response ID
+            question (str): Question or prompt
+            answer (str): Student answer
+            activity_type (str): short_answer or word_cloud
+
+        Returns:
+            str: Job ID, or None if the job could not be queued (the
+                 response's evaluation is then marked failed, since nothing
+                 would ever run it)
+        """
+        try:
+            job_id = EvaluationJob.create(job_id, activity, response_id, question, answer, activity_type)
+            if self.mode == self.MODE_THREAD:
+                self._get_executor().submit(self._process_safely, job_id)
+            return job_id
+        except Exception as e:
+            logger.error(f"Could not queue AI evaluation of response {response_id}: {e}")
+            try:
+                EvaluationJob.finish(job_id, error=str(e))
+                Response.set_evaluation(response_id, job_id, None, EvaluationJob.STATUS_FAILED)
+            except Exception as e:
+                logger.error(f"Could not mark AI evaluation of response {response_id} failed: {e}")
+            return None
+
+    def _process_safely(self, job_id):
+        """Thread pool entry point; errors are logged instead of lost in a Future"""
+        try:
+            self.process(job_id)
+        except Exception as e:
+            logger.error(f"AI evaluation job {job_id} crashed: {e}")
+
+    def process(self, job_id=None):
+        """
+        Claim and run a job until it succeeds or runs out of attempts
+
+        Args:
+            job_id (str): Job to run (default: the oldest claimable job)
+
+        Returns:
+            bool: True if a job was claimed
+        """
+        claimed = False
+        while True:
+            job = EvaluationJob.claim(job_id, Config.AI_EVALUATION_STALE_SECONDS)
+            if job is None:
+                return claimed
+            claimed = True
+            if self.run(job):
+                return True
+            job_id = str(job['_id'])
+
+    def run(self, job):
+        """
+        Evaluate one claimed job and write the result onto its response
+
+        Args:
+            job (dict): Claimed job document
+
+        Returns:
+            bool: True if the job is finished (done or out of attempts)
+        """
+        started = time.monotonic()
+        try:
+            result = genai_service.evaluate_student_answer(
+                question=job['question'],
+                student_answer=job['answer'],
+                activity_type=job['activity_type']
+            )
+        except Exception as e:
+            result = {'success': False, 'error': str(e)}
+        return self._record(job, result, time.monotonic() - started)
+
+    def process_batch(self, limit=None):
+        """
+        Claim the oldest job plus more queued jobs of the same activity and
+        evaluate them together with one batched request
+        Jobs that fail are released for a retry like in process()
+
+        Args:
+            limit (int): Jobs per batch (default: Config.AI_BATCH_MAX_ANSWERS)
+
+        Returns:
+            int: Number of jobs claimed
+        """
+        limit = limit or Config.AI_BATCH_MAX_ANSWERS
+        first = EvaluationJob.claim(stale_after_seconds=Config.AI_EVALUATION_STALE_SECONDS)
+        if first is None:
+            return 0
+
+        jobs = [first]
+        while len(jobs) < limit:
+            job = EvaluationJob.claim(
+                stale_after_seconds=Config.AI_EVALUATION_STALE_SECONDS,
+                activity_id=first['activity_id']
+            )
+            if job is None:
+                break
+            jobs.append(job)
+
+        # Jobs of one activity share the question unless it was edited in between
+        groups = {}
+        for job in jobs:
+            groups.setdefault((job['question'], job['activity_type']), []).append(job)
+
+        for (question, activity_type), group in groups.items():
+            started = time.monotonic()
+            try:
+                results = genai_service.evaluate_student_answers(
+                    question, [job['answer'] for job in group], activity_type
+                )
+            except Exception as e:
+                results = [{'success': False, 'error': str(e)}] * len(group)
+            elapsed = time.monotonic() - started
+            for job, result in zip(group, results):
+                self._record(job, result, elapsed)
+        return len(jobs)
+
+    def _record(self, job, result, elapsed):
+        """
+        Store the outcome of one evaluation attempt
+
+        Args:
+            job (dict): Claimed job document
+            result (dict): evaluate_student_answer() result
+            elapsed (float): Seconds the evaluation took
+
+        Returns:
+            bool: True if the job is finished (done or out of attempts)
+        """
+        if result['success']:
+            evaluation = result['evaluation']
+            Response.set_evaluation(job['response_id'], job['_id'], evaluation, EvaluationJob.STATUS_DONE)
+            EvaluationJob.finish(job['_id'], evaluation=evaluation)
+            logger.info(f"AI evaluation job {job['_id']} done in {elapsed:.1f}s")
+            return True
+
+        error = result.get('error', 'AI evaluation unavailable')
+        if job.get('attempts', 1) < EvaluationJob.MAX_ATTEMPTS:
+            EvaluationJob.release(job['_id'], error)
+            return False
+
+        Response.set_evaluation(job['response_id'], job['_id'], None, EvaluationJob.STATUS_FAILED)
+        EvaluationJob.finish(job['_id'], error=error)
+        logger.warning(f"AI evaluation job {job['_id']} failed: {error}")
+        return True
+
+    def status(self, job_id):
+        """
+        Get the status of a job
+        A queued job is only run in the polling request when
+        AI_EVALUATION_INLINE_AFTER_SECONDS is set (for hosts without a
+        worker); otherwise its queue delay is reported as queued_seconds.
+        A running job abandoned on its last attempt is marked failed.
+
+        Args:
+            job_id (str): Job ID
+
+        Returns:
+            dict: Job document or None if it does not exist
+        """
+        job = EvaluationJob.find_by_id(job_id)
+        if job is None:
+            return None
+
+        if job['status'] == EvaluationJob.STATUS_RUNNING:
+            started = job.get('started_at')
+            stale = started is not None and (get_hk_time() - started).total_seconds() > Config.AI_EVALUATION_STALE_SECONDS
+            if stale and job.get('attempts', 0) >= EvaluationJob.MAX_ATTEMPTS and self.fail_abandoned(job_id):
+                job = EvaluationJob.find_by_id(job_id)
+            return job
+
+        if job['status'] != EvaluationJob.STATUS_QUEUED:
+            return job
+
+        waited = (get_hk_time() - job['created_at']).total_seconds()
+        inline_after = Config.AI_EVALUATION_INLINE_AFTER_SECONDS
+        if inline_after and waited >= inline_after:
+            logger.info(f"AI evaluation job {job_id} still queued after {waited:.0f}s, running it inline")
+            self.process(job_id)
+            job = EvaluationJob.find_by_id(job_id)
+        else:
+            job['queued_seconds'] = round(waited, 1)
+        return job
+
+    def fail_abandoned(self, job_id=None):
+        """
+        Fail jobs whose worker stopped during their last attempt, and their responses
+
+        Args:
+            job_id (str): Only check this job (optional)
+
+        Returns:
+            int: Number of jobs marked failed
+        """
+        jobs = EvaluationJob.fail_abandoned(Config.AI_EVALUATION_STALE_SECONDS, job_id)
+        for job in jobs:
+            Response.set_evaluation(job['response_id'], job['_id'], None, EvaluationJob.STATUS_FAILED)
+            logger.warning(f"AI evaluation job {job['_id']} abandoned on its last attempt")
+        return len(jobs)
+
+    def work(self, poll_interval=1.0, stop_event=None):
+        """
+        Process queued jobs until stopped (used by evaluation_worker.py)
+        Jobs of the same activity are evaluated in batches
+
+        Args:
+            poll_interval (float): Seconds to wait when the queue is empty
+            stop_event (threading.Event): Stop when set (default: run forever)
+        """
+        while stop_event is None or not stop_event.is_set():
+            if not self.process_batch():
+                self.fail_abandoned()
+                time.sleep(poll_interval)
+
+# Global evaluation service instance
+evaluation_service = EvaluationService()
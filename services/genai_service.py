@@ -3,17 +3,39 @@ GenAI Service Module
 Handles integration with OpenAI GPT-4 for AI-powered features
 - Activity generation based on teaching content
 - Automatic grouping of student answers
+- Evaluation of student answers, one at a time or batched
 """
 
-from openai import OpenAI
 import logging
 import json
+import re
+import threading
+import time
+from concurrent.futures import as_completed
+from difflib import SequenceMatcher
 from config import Config
+from services.ai_cache_service import ai_cache_service
+from services.ai_scheduler import ai_scheduler
+from utils.json_stream import JSONObjectStream
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# JSON fields of an answer evaluation, per activity type
+EVALUATION_FIELDS = {
+    'short_answer': '''    "score": <0-100>,
+    "feedback": "Constructive feedback highlighting strengths and areas for improvement",
+    "strengths": ["strength 1", "strength 2"],
+    "improvements": ["suggestion 1", "suggestion 2"],
+    "encouragement": "Positive encouraging message"''',
+    'word_cloud': '''    "score": <0-100>,
+    "feedback": "Brief feedback on relevance and creativity",
+    "relevance": "How relevant is this to the topic?",
+    "creativity": "How creative or insightful is this contribution?",
+    "encouragement": "Positive message"'''
+}
+
 class GenAIService:
     """
     AI service for generating learning activities and analyzing responses
@@ -21,30 +43,84 @@ class GenAIService:
     Uses GPT-4o-mini model
     """
     
-    def __init__(self):
+    # Rough characters per token, for budgeting prompts without a tokenizer
+    CHARS_PER_TOKEN = 4
+    # Tokens of the batch evaluation prompt besides the question and answers
+    BATCH_PROMPT_TOKENS = 300
+    # Completion tokens reserved for each evaluation in a batch reply
+    BATCH_TOKENS_PER_EVALUATION = 250
+    # Content shorter than this per poll request is given whole to every request
+    MIN_SECTION_CHARS = 200
+    # Questions at least this similar (0-1, after normalizing) are duplicates
+    DUPLICATE_QUESTION_SIMILARITY = 0.85
+    
+    def __init__(self, cache=None, scheduler=None):
+        """
+        Initialize AI service settings
+        The API client is created on first use (see client) so importing this
+        module does not pay for the openai package on every cold start
+        
+        Args:
+            cache (AICacheService): Reply cache (default: the global ai_cache_service)
+            scheduler (AIScheduler): Rate limits, retries and concurrency of API
+                                     calls (default: the global ai_scheduler)
         """
-        Initialize AI client
+        self.cache = cache or ai_cache_service
+        self.scheduler = scheduler or ai_scheduler
+        self._client = None
+        self._client_lock = threading.Lock()
+        self.model = Config.OPENAI_MODEL
+        self.timeout = Config.OPENAI_TIMEOUT
+        logger.info(f"GenAI Service initialized with model: {self.model}")
+    
+    @property
+    def client(self):
+        """
+        Get the AI client, creating it on first use
         Supports GitHub Models API (using GitHub Personal Access Token)
         and OpenAI API (using OpenAI API key)
+        
+        Returns:
+            OpenAI: API client
         """
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = self._create_client()
+        return self._client
+    
+    @client.setter
+    def client(self, value):
+        """Replace the AI client (e.g. with a stub in tests)"""
+        self._client = value
+    
+    @staticmethod
+    def _create_client():
+        """
+        Create the API client for the configured key
+        
+        Returns:
+            OpenAI: API client
+        """
+        # Imported here: the openai package is the slowest import in the app
+        from openai import OpenAI
+        
         api_key = Config.OPENAI_API_KEY
         
+        # Retries are done by the scheduler, which shares backoff across callers
         # Detect if using GitHub PAT (starts with 'github_pat_' or 'ghp_')
         if api_key.startswith('github_pat_') or api_key.startswith('ghp_'):
             # Use GitHub Models API endpoint
-            self.client = OpenAI(
+            logger.info("Using GitHub Models API endpoint")
+            return OpenAI(
                 api_key=api_key,
-                base_url="https://models.inference.ai.azure.com"
+                base_url="https://models.inference.ai.azure.com",
+                max_retries=0
             )
-            logger.info("Using GitHub Models API endpoint")
-        else:
-            # Use standard OpenAI API
-            self.client = OpenAI(api_key=api_key)
-            logger.info("Using OpenAI API endpoint")
         
-        self.model = Config.OPENAI_MODEL
-        self.timeout = Config.OPENAI_TIMEOUT
-        logger.info(f"GenAI Service initialized with model: {self.model}")
+        # Use standard OpenAI API
+        logger.info("Using OpenAI API endpoint")
+        return OpenAI(api_key=api_key, max_retries=0)
     
     def generate_activity(self, teaching_content, activity_type='short_answer', num_questions=1):
         """
@@ -63,9 +139,104 @@ class GenAIService:
             # Validate num_questions
             num_questions = max(1, min(10, int(num_questions)))
             
-            # Construct prompt based on activity type
-            prompts = {
-                'poll': f"""Create {num_questions} quiz question(s) from this content:
+            if activity_type == 'poll' and self.poll_request_count(num_questions) > 1:
+                events = list(self._chunked_poll(teaching_content, num_questions))
+                return self._chunked_poll_result(events, teaching_content, num_questions)
+            
+            try:
+                result = self._complete(
+                    **self._activity_request(teaching_content, activity_type, num_questions),
+                    parse=self._activity_parser(activity_type, num_questions),
+                    kind='generate_activity',
+                    timeout=60  # Increase timeout for large responses
+                )
+            except (json.JSONDecodeError, ValueError):
+                raise
+            except Exception as api_error:
+                logger.error(f"OpenAI API error: {api_error}")
+                # If API call fails, return fallback immediately
+                return self._get_fallback_activity(activity_type, teaching_content)
+            
+            return self._finish_activity(result, teaching_content, activity_type, num_questions)
+            
+        except json.JSONDecodeError as e:
+            logger.error(f"JSON parse error: {e}")
+            # Return fallback activity on JSON parse error
+            return self._get_fallback_activity(activity_type, teaching_content)
+        except Exception as e:
+            logger.error(f"Error generating activity: {e}")
+            # Return fallback activity
+            return self._get_fallback_activity(activity_type, teaching_content)
+    
+    def stream_activity(self, teaching_content, activity_type='short_answer', num_questions=1):
+        """
+        Generate a learning activity, reporting its parts as they are generated
+        Same request (and cache) as generate_activity, but the reply is
+        streamed and each question is yielded as soon as it is complete
+        
+        Args:
+            teaching_content (str): Teaching topic or keywords
+            activity_type (str): Type of activity (poll, short_answer, word_cloud)
+            num_questions (int): Number of questions to generate (1-10, only for poll type)
+            
+        Yields:
+            tuple: ('title', str), ('question', dict) per question, then
+                   ('done', dict) with the activity as generate_activity returns it
+        """
+        try:
+            num_questions = max(1, min(10, int(num_questions)))
+            
+            if activity_type == 'poll' and self.poll_request_count(num_questions) > 1:
+                # Questions of each part are yielded as soon as the part completes
+                events = []
+                for event in self._chunked_poll(teaching_content, num_questions):
+                    events.append(event)
+                    yield event
+                yield 'done', self._chunked_poll_result(events, teaching_content, num_questions)
+                return
+            
+            result = None
+            try:
+                for event, value in self._stream(
+                    **self._activity_request(teaching_content, activity_type, num_questions),
+                    parse=self._activity_parser(activity_type, num_questions),
+                    kind='stream_activity',
+                    timeout=60
+                ):
+                    if event == 'done':
+                        result = value
+                    else:
+                        yield event, value
+            except (json.JSONDecodeError, ValueError) as e:
+                logger.error(f"Streamed activity could not be used: {e}")
+            except Exception as api_error:
+                logger.error(f"OpenAI API error: {api_error}")
+            
+            if result is None:
+                yield 'done', self._get_fallback_activity(activity_type, teaching_content)
+            else:
+                yield 'done', self._finish_activity(result, teaching_content, activity_type, num_questions)
+        except Exception as e:
+            logger.error(f"Error streaming activity: {e}")
+            yield 'done', self._get_fallback_activity(activity_type, teaching_content)
+    
+    def _activity_request(self, teaching_content, activity_type, num_questions, part=None, avoid=None):
+        """
+        Build the chat request generating an activity
+        
+        Args:
+            teaching_content (str): Teaching topic or keywords
+            activity_type (str): Type of activity (poll, short_answer, word_cloud)
+            num_questions (int): Number of questions (1-10, only for poll type)
+            part (tuple): (part, parts) when the poll is one of several requests
+            avoid (list): Questions (str) the poll must not repeat
+            
+        Returns:
+            dict: messages, temperature and max_tokens for _complete() or _stream()
+        """
+        # Construct prompt based on activity type
+        prompts = {
+            'poll': f"""Create {num_questions} quiz question(s) from this content:
 
 {teaching_content}
 
@@ -88,8 +259,8 @@ JSON format (exactly {num_questions} questions):
         }}
     ]
 }}""",
-                
-                'short_answer': f"""Create 3 questions from: {teaching_content}
+            
+            'short_answer': f"""Create 3 questions from: {teaching_content}
 
 IMPORTANT: Generate a descriptive title based on the main topic (e.g., "Explain Data Structures", "Describe Cloud Computing").
 
@@ -104,8 +275,8 @@ JSON format:
         }}
     ]
 }}""",
-                
-                'word_cloud': f"""Create word cloud activity from: {teaching_content}
+            
+            'word_cloud': f"""Create word cloud activity from: {teaching_content}
 
 IMPORTANT: Generate a descriptive title based on the topic (e.g., "Key Concepts in Networking", "Important Terms in Software Engineering").
 
@@ -116,105 +287,251 @@ JSON format:
     "expected_keywords": ["...", "...", "..."],
     "instructions": "..."
 }}"""
-            }
-            
-            prompt = prompts.get(activity_type, prompts['short_answer'])
-            
-            # Calculate appropriate max_tokens based on number of questions
-            # Each poll question needs ~150-200 tokens (question + 4 options + explanation)
-            # Add buffer for JSON structure
-            if activity_type == 'poll':
-                base_tokens = 300  # For JSON structure and title
-                tokens_per_question = 200  # Per question (question + options + explanation)
-                max_tokens = base_tokens + (num_questions * tokens_per_question)
-                # Increase limit to allow for larger responses
-                # gpt-4o-mini supports up to 16,384 tokens output
-                max_tokens = min(max_tokens, 16000)
-                logger.info(f"Requesting {num_questions} poll questions with max_tokens={max_tokens}")
-            else:
-                max_tokens = 2000  # Sufficient for other activity types
-            
-            # Call OpenAI API
-            # Use lower temperature for poll questions to ensure consistent formatting
-            temperature = 0.5 if activity_type == 'poll' else 0.7
+        }
+        
+        prompt = prompts.get(activity_type, prompts['short_answer'])
+        if activity_type == 'poll' and part:
+            prompt += (f"\n\nThese questions are part {part[0]} of {part[1]} of a longer quiz; "
+                       f"the content above is what this part covers. Ask about different points "
+                       f"than the other parts would.")
+        if activity_type == 'poll' and avoid:
+            prompt += "\n\nDo not repeat or rephrase these existing questions:\n"
+            prompt += '\n'.join(f"- {question}" for question in avoid)
+        
+        # Calculate appropriate max_tokens based on number of questions
+        # Each poll question needs ~150-200 tokens (question + 4 options + explanation)
+        # Add buffer for JSON structure
+        if activity_type == 'poll':
+            base_tokens = 300  # For JSON structure and title
+            tokens_per_question = 200  # Per question (question + options + explanation)
+            max_tokens = base_tokens + (num_questions * tokens_per_question)
+            # Increase limit to allow for larger responses
+            # gpt-4o-mini supports up to 16,384 tokens output
+            max_tokens = min(max_tokens, 16000)
+            logger.info(f"Requesting {num_questions} poll questions with max_tokens={max_tokens}")
+        else:
+            max_tokens = 2000  # Sufficient for other activity types
+        
+        # Use lower temperature for poll questions to ensure consistent formatting
+        temperature = 0.5 if activity_type == 'poll' else 0.7
+        
+        return {
+            'messages': [
+                {"role": "system", "content": "You are an expert educational content creator. Generate concise, high-quality learning activities in valid JSON format. Be efficient with words while maintaining clarity."},
+                {"role": "user", "content": prompt}
+            ],
+            'temperature': temperature,
+            'max_tokens': max_tokens
+        }
+    
+    def _activity_parser(self, activity_type, num_questions):
+        """
+        Get the parser for a generated activity reply
+        
+        Args:
+            activity_type (str): Type of activity
+            num_questions (int): Number of questions requested
             
-            try:
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {"role": "system", "content": "You are an expert educational content creator. Generate concise, high-quality learning activities in valid JSON format. Be efficient with words while maintaining clarity."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    temperature=temperature,
-                    max_tokens=max_tokens,
-                    timeout=60  # Increase timeout for large responses
-                )
-            except Exception as api_error:
-                logger.error(f"OpenAI API error: {api_error}")
-                # If API call fails, return fallback immediately
-                return self._get_fallback_activity(activity_type, teaching_content)
+        Returns:
+            callable: Parses the reply; raises ValueError if a multi-question
+                      poll came back without questions (so it is not cached)
+        """
+        def parse(content):
+            result = self._parse_json(content)
+            if activity_type == 'poll' and num_questions > 1 and not result.get('questions'):
+                # If no questions generated, use fallback (and do not cache the reply)
+                raise ValueError("No questions generated")
+            return result
+        return parse
+    
+    def _finish_activity(self, result, teaching_content, activity_type, num_questions):
+        """
+        Complete a generated activity with its type and source
+        
+        Args:
+            result (dict): Parsed reply
+            teaching_content (str): Teaching topic or keywords
+            activity_type (str): Type of activity
+            num_questions (int): Number of questions requested
             
-            # Parse response
-            content = response.choices[0].message.content
-            finish_reason = response.choices[0].finish_reason
+        Returns:
+            dict: Generated activity
+        """
+        result['activity_type'] = activity_type
+        result['source_content'] = teaching_content[:100] + "..." if len(teaching_content) > 100 else teaching_content
+        
+        # Validate poll question count for multi-question polls
+        if activity_type == 'poll' and num_questions > 1:
+            questions = result.get('questions', [])
+            actual_count = len(questions)
             
-            logger.info(f"AI response - Length: {len(content)} chars, Finish reason: {finish_reason}")
+            if actual_count != num_questions:
+                logger.warning(f"Expected {num_questions} questions but got {actual_count}. Attempting retry...")
+                
+                # If we got fewer questions than expected, this might be due to token limit
+                # Return what we have with a warning
+                logger.info(f"Returning {actual_count} questions instead of {num_questions}")
+                result['note'] = f"Generated {actual_count} questions (requested {num_questions})"
+        
+        return result
+    
+    def poll_request_count(self, num_questions):
+        """
+        Get the number of concurrent requests a poll is generated with
+        
+        Args:
+            num_questions (int): Number of questions requested
             
-            # Check if response was cut off
-            if finish_reason == 'length':
-                logger.warning(f"Response was truncated due to token limit! Content length: {len(content)}")
-                logger.warning("Reducing content or question count recommended")
+        Returns:
+            int: Requests of at most Config.AI_POLL_QUESTIONS_PER_REQUEST questions
+        """
+        per_request = max(1, Config.AI_POLL_QUESTIONS_PER_REQUEST)
+        return -(-max(1, num_questions) // per_request)
+    
+    def _chunked_poll(self, teaching_content, num_questions):
+        """
+        Generate a poll with concurrent requests over sections of the content
+        Each request asks for a few questions about its own section, so the
+        time taken is that of the slowest small reply and no reply is long
+        enough to be truncated. Near-duplicate questions are dropped and, if
+        that leaves too few, one more request asks for the rest.
+        
+        Args:
+            teaching_content (str): Teaching content
+            num_questions (int): Number of questions
             
-            # Log first and last 100 chars to debug
-            logger.debug(f"Response start: {content[:100]}")
-            logger.debug(f"Response end: {content[-100:]}")
+        Yields:
+            tuple: ('title', str) once, then ('question', dict) per distinct
+                   question (at most num_questions) as the requests complete
+        """
+        parts = self.poll_request_count(num_questions)
+        sections = self._split_sections(teaching_content, parts)
+        counts = [num_questions // parts + (1 if i < num_questions % parts else 0) for i in range(parts)]
+        logger.info(f"Requesting {num_questions} poll questions in {parts} concurrent parts of {counts}")
+        
+        futures = [
+            self.scheduler.submit(self._generate_poll_part, section, count, (i + 1, parts))
+            for i, (section, count) in enumerate(zip(sections, counts))
+        ]
+        kept, has_title = [], False
+        
+        def accept(result):
+            nonlocal has_title
+            if not result:
+                return
+            if not has_title and result.get('title'):
+                has_title = True
+                yield 'title', result['title']
+            for question in result.get('questions') or []:
+                if len(kept) < num_questions and self._is_new_question(question, kept):
+                    kept.append(question)
+                    yield 'question', question
+        
+        for future in as_completed(futures):
+            yield from accept(future.result())
+        
+        missing = num_questions - len(kept)
+        if missing and kept:
+            logger.info(f"Requesting {missing} more poll questions to replace duplicates or failed parts")
+            yield from accept(self._generate_poll_part(
+                teaching_content, missing, avoid=[question['question'] for question in kept]
+            ))
+    
+    def _generate_poll_part(self, teaching_content, num_questions, part=None, avoid=None):
+        """
+        Generate the questions of one request of a chunked poll
+        
+        Args:
+            teaching_content (str): Section of the content
+            num_questions (int): Number of questions
+            part (tuple): (part, parts)
+            avoid (list): Questions (str) not to repeat
             
-            # Extract JSON from response
-            if '```json' in content:
-                content = content.split('```json')[1].split('```')[0].strip()
-            elif '```' in content:
-                content = content.split('```')[1].split('```')[0].strip()
+        Returns:
+            dict: Parsed reply, or None if the request failed
+        """
+        try:
+            return self._complete(
+                **self._activity_request(teaching_content, 'poll', num_questions, part=part, avoid=avoid),
+                parse=self._activity_parser('poll', num_questions),
+                kind='generate_poll_part',
+                timeout=60
+            )
+        except Exception as e:
+            logger.warning(f"Poll part {part} failed: {e}")
+            return None
+    
+    def _chunked_poll_result(self, events, teaching_content, num_questions):
+        """
+        Assemble the activity from the events of _chunked_poll()
+        
+        Args:
+            events (list): (event, value) tuples
+            teaching_content (str): Teaching content
+            num_questions (int): Number of questions requested
             
-            # Try to parse JSON
-            try:
-                result = json.loads(content)
-            except json.JSONDecodeError as json_err:
-                logger.error(f"JSON decode error: {json_err}")
-                logger.error(f"Content preview (first 500 chars): {content[:500]}")
-                logger.error(f"Content preview (last 500 chars): {content[-500:]}")
-                # If JSON is invalid, try to fix common issues or return fallback
-                raise json_err
-            
-            result['activity_type'] = activity_type
-            result['source_content'] = teaching_content[:100] + "..." if len(teaching_content) > 100 else teaching_content
-            
-            # Validate poll question count for multi-question polls
-            if activity_type == 'poll' and num_questions > 1:
-                questions = result.get('questions', [])
-                actual_count = len(questions)
-                
-                if actual_count != num_questions:
-                    logger.warning(f"Expected {num_questions} questions but got {actual_count}. Attempting retry...")
-                    
-                    # If we got fewer questions than expected, this might be due to token limit
-                    # Return what we have with a warning
-                    if actual_count > 0:
-                        logger.info(f"Returning {actual_count} questions instead of {num_questions}")
-                        result['note'] = f"Generated {actual_count} questions (requested {num_questions})"
-                    else:
-                        # If no questions generated, use fallback
-                        raise ValueError(f"No questions generated")
+        Returns:
+            dict: Generated activity, or the fallback if no question was generated
+        """
+        fallback = self._get_fallback_activity('poll', teaching_content)
+        questions = [value for event, value in events if event == 'question']
+        if not questions:
+            return fallback
+        titles = [value for event, value in events if event == 'title']
+        result = {'title': titles[0] if titles else fallback['title'], 'questions': questions}
+        return self._finish_activity(result, teaching_content, 'poll', num_questions)
+    
+    @classmethod
+    def _split_sections(cls, text, parts):
+        """
+        Split content into consecutive sections of similar length
+        
+        Args:
+            text (str): Teaching content
+            parts (int): Number of sections
             
-            return result
+        Returns:
+            list: parts sections (str); the whole text for each if it is too
+                  short or has too few paragraphs/sentences to split
+        """
+        units = [unit.strip() for unit in re.split(r'\n\s*\n', text) if unit.strip()]
+        if len(units) < parts:
+            units = [unit for unit in re.split(r'(?<=[.!?。！？])\s+', text.strip()) if unit]
+        if parts == 1 or len(units) < parts or len(text) < parts * cls.MIN_SECTION_CHARS:
+            return [text] * parts
+        
+        total = sum(len(unit) for unit in units)
+        sections, position = [[] for _ in range(parts)], 0
+        for unit in units:
+            # Each unit goes to the section its start falls in
+            sections[min(parts - 1, position * parts // total)].append(unit)
+            position += len(unit)
+        return ['\n\n'.join(section) if section else text for section in sections]
+    
+    @staticmethod
+    def _normalize_question(text):
+        """Lowercase words of a question, without punctuation"""
+        return ' '.join(re.findall(r'\w+', str(text).lower()))
+    
+    def _is_new_question(self, question, kept):
+        """
+        Check a generated poll question is usable and not a near-duplicate
+        
+        Args:
+            question (dict): Generated question
+            kept (list): Questions accepted so far
             
-        except json.JSONDecodeError as e:
-            logger.error(f"JSON parse error: {e}, Content: {content[:200]}...")
-            # Return fallback activity on JSON parse error
-            return self._get_fallback_activity(activity_type, teaching_content)
-        except Exception as e:
-            logger.error(f"Error generating activity: {e}")
-            # Return fallback activity
-            return self._get_fallback_activity(activity_type, teaching_content)
+        Returns:
+            bool: True if the question is well-formed and differs from every kept one
+        """
+        if not isinstance(question, dict) or not question.get('question') or not question.get('options'):
+            return False
+        text = self._normalize_question(question['question'])
+        return all(
+            SequenceMatcher(None, text, self._normalize_question(other['question'])).ratio()
+            < self.DUPLICATE_QUESTION_SIMILARITY
+            for other in kept
+        )
     
     def group_answers(self, answers, question):
         """
@@ -264,27 +581,18 @@ Return the analysis in JSON format:
 }}"""
             
             # Call OpenAI API
-            response = self.client.chat.completions.create(
-                model=self.model,
+            result = self._complete(
                 messages=[
                     {"role": "system", "content": "You are an expert educational analyst. Group and analyze student responses to help teachers understand class comprehension."},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0.5,
-                max_tokens=1500
+                max_tokens=1500,
+                parse=self._parse_json,
+                kind='group_answers'
             )
-            
-            content = response.choices[0].message.content
             logger.info(f"Grouped {len(answers)} answers into semantic clusters")
             
-            # Extract JSON from response
-            if '```json' in content:
-                content = content.split('```json')[1].split('```')[0].strip()
-            elif '```' in content:
-                content = content.split('```')[1].split('```')[0].strip()
-            
-            result = json.loads(content)
-            
             # Add actual answer texts to groups
             grouped_indices = set()
             for group in result.get('groups', []):
@@ -350,17 +658,15 @@ Return the analysis in JSON format:
             
             target = language_names.get(target_language, target_language)
             
-            response = self.client.chat.completions.create(
-                model=self.model,
+            translated = self._complete(
                 messages=[
                     {"role": "system", "content": f"You are a professional translator. Translate the following text to {target}."},
                     {"role": "user", "content": text}
                 ],
                 temperature=0.3,
-                max_tokens=500
+                max_tokens=500,
+                kind='translate'
             )
-            
-            translated = response.choices[0].message.content
             logger.info(f"Translated text to {target_language}")
             return translated
             
@@ -491,9 +797,58 @@ Return the analysis in JSON format:
             dict: Evaluation with feedback, score, and suggestions
         """
         try:
-            # Construct evaluation prompt
-            if activity_type == 'short_answer':
-                prompt = f"""You are an educational AI assistant. Evaluate this student's answer and provide constructive feedback.
+            logger.info(f"Generating AI evaluation for {activity_type} answer")
+            
+            # Call AI with shorter timeout for faster feedback
+            evaluation = self._complete(
+                **self._evaluation_request(question, student_answer, activity_type),
+                parse=self._parse_json,
+                kind='evaluate_answer',
+                timeout=30  # Shorter timeout for evaluation
+            )
+            
+            logger.info("AI evaluation generated successfully")
+            return {
+                'success': True,
+                'evaluation': evaluation
+            }
+            
+        except json.JSONDecodeError as e:
+            logger.error(f"JSON parse error in evaluation: {e}")
+            return {
+                'success': False,
+                'evaluation': {
+                    'score': 70,
+                    'feedback': 'Good effort! Your answer shows understanding of the topic.',
+                    'encouragement': 'Keep up the good work!'
+                }
+            }
+        except Exception as e:
+            logger.error(f"Evaluation generation error: {e}")
+            return {
+                'success': False,
+                'evaluation': {
+                    'score': 70,
+                    'feedback': 'Thank you for your submission. Your answer has been recorded.',
+                    'encouragement': 'Keep learning!'
+                }
+            }
+    
+    def _evaluation_request(self, question, student_answer, activity_type):
+        """
+        Build the chat request evaluating one answer
+        
+        Args:
+            question (str): The question asked
+            student_answer (str): Student's answer
+            activity_type (str): Type of activity (short_answer or word_cloud)
+            
+        Returns:
+            dict: messages, temperature and max_tokens for _complete()
+        """
+        # Construct evaluation prompt
+        if activity_type == 'short_answer':
+            prompt = f"""You are an educational AI assistant. Evaluate this student's answer and provide constructive feedback.
 
 Question: {question}
 
@@ -501,17 +856,13 @@ Student's Answer: {student_answer}
 
 Provide evaluation in JSON format:
 {{
-    "score": <0-100>,
-    "feedback": "Constructive feedback highlighting strengths and areas for improvement",
-    "strengths": ["strength 1", "strength 2"],
-    "improvements": ["suggestion 1", "suggestion 2"],
-    "encouragement": "Positive encouraging message"
+{EVALUATION_FIELDS['short_answer']}
 }}
 
 Be supportive, constructive, and encouraging. Focus on what the student did well and how they can improve."""
 
-            else:  # word_cloud
-                prompt = f"""You are an educational AI assistant. Evaluate this student's word/phrase contribution.
+        else:  # word_cloud
+            prompt = f"""You are an educational AI assistant. Evaluate this student's word/phrase contribution.
 
 Prompt: {question}
 
@@ -519,66 +870,377 @@ Student's Contribution: {student_answer}
 
 Provide evaluation in JSON format:
 {{
-    "score": <0-100>,
-    "feedback": "Brief feedback on relevance and creativity",
-    "relevance": "How relevant is this to the topic?",
-    "creativity": "How creative or insightful is this contribution?",
-    "encouragement": "Positive message"
+{EVALUATION_FIELDS['word_cloud']}
 }}
 
 Be brief, supportive, and encouraging."""
 
-            logger.info(f"Generating AI evaluation for {activity_type} answer")
+        return {
+            'messages': [
+                {"role": "system", "content": "You are a supportive educational AI assistant."},
+                {"role": "user", "content": prompt}
+            ],
+            'temperature': 0.7,
+            'max_tokens': 500
+        }
+    
+    def evaluate_student_answers(self, question, student_answers, activity_type='short_answer',
+                                 token_budget=None, max_batch_size=None):
+        """
+        Evaluate many answers to the same question with as few API calls as possible
+        Answers are packed into batches that fit the token budget and each batch
+        is evaluated by one JSON-mode request, the batches running concurrently
+        on the scheduler's threads; an answer whose evaluation is
+        missing or malformed in the reply is evaluated on its own instead
+        
+        Args:
+            question (str): The question asked (shared by all answers)
+            student_answers (list): Student answers (str)
+            activity_type (str): Type of activity (short_answer or word_cloud)
+            token_budget (int): Prompt plus completion tokens per request
+                                (default: Config.AI_BATCH_TOKEN_BUDGET)
+            max_batch_size (int): Answers per request (default: Config.AI_BATCH_MAX_ANSWERS)
             
-            # Call AI with shorter timeout for faster feedback
-            response = self.client.chat.completions.create(
-                model=self.model,
+        Returns:
+            list: One result per answer, in order, shaped like evaluate_student_answer's
+        """
+        # Identical answers (common for word clouds) are evaluated once
+        positions = {}
+        for i, answer in enumerate(student_answers):
+            positions.setdefault(answer.strip(), []).append(i)
+        
+        results = [None] * len(student_answers)
+        
+        def store(answer, result):
+            for i in positions[answer]:
+                results[i] = {'success': result['success'], 'evaluation': dict(result['evaluation'])}
+        
+        # Answers evaluated before (alone or in a batch) come from the cache
+        keys, pending = {}, []
+        for answer in positions:
+            keys[answer] = self.cache.key(self.model, **self._evaluation_request(question, answer, activity_type))
+            cached = self.cache.get(keys[answer])
+            if cached is not None:
+                store(answer, {'success': True, 'evaluation': cached})
+            else:
+                pending.append(answer)
+        
+        def evaluate(batch):
+            # Runs on a scheduler thread; fallbacks stay on the same thread
+            # so a full pool never waits on itself
+            if len(batch) == 1:
+                evaluations = [None]
+            else:
+                evaluations = self._evaluate_batch(question, batch, activity_type)
+            
+            batch_results = []
+            for answer, evaluation in zip(batch, evaluations):
+                if evaluation is None:
+                    result = self.evaluate_student_answer(question, answer, activity_type)
+                else:
+                    # Cached as if evaluated alone, so a resubmission is a hit
+                    self.cache.set(keys[answer], evaluation, tokens=self.BATCH_TOKENS_PER_EVALUATION)
+                    result = {'success': True, 'evaluation': evaluation}
+                batch_results.append(result)
+            return batch_results
+        
+        # Batches are independent, so they are requested concurrently
+        batches = self._batch_answers(question, pending, token_budget, max_batch_size)
+        for batch, batch_results in zip(batches, self.scheduler.map(evaluate, batches)):
+            for answer, result in zip(batch, batch_results):
+                store(answer, result)
+        
+        return results
+    
+    @staticmethod
+    def estimate_tokens(text):
+        """
+        Estimate the number of tokens in a text without a tokenizer
+        
+        Args:
+            text (str): Text
+            
+        Returns:
+            int: Approximate token count (about 4 characters per token)
+        """
+        return len(text) // GenAIService.CHARS_PER_TOKEN + 1
+    
+    def _batch_answers(self, question, answers, token_budget=None, max_batch_size=None):
+        """
+        Split answers into batches that fit one request each
+        
+        Args:
+            question (str): The question asked
+            answers (list): Distinct student answers
+            token_budget (int): Prompt plus completion tokens per request
+            max_batch_size (int): Answers per request
+            
+        Returns:
+            list: Lists of answers, in the original order
+        """
+        token_budget = token_budget or Config.AI_BATCH_TOKEN_BUDGET
+        max_batch_size = max_batch_size or Config.AI_BATCH_MAX_ANSWERS
+        available = token_budget - self.BATCH_PROMPT_TOKENS - self.estimate_tokens(question)
+        
+        batches, batch, used = [], [], 0
+        for answer in answers:
+            # The answer, its id/JSON wrapping and its evaluation in the reply
+            cost = self.estimate_tokens(answer) + 10 + self.BATCH_TOKENS_PER_EVALUATION
+            if batch and (used + cost > available or len(batch) >= max_batch_size):
+                batches.append(batch)
+                batch, used = [], 0
+            batch.append(answer)
+            used += cost
+        if batch:
+            batches.append(batch)
+        return batches
+    
+    def _evaluate_batch(self, question, answers, activity_type):
+        """
+        Evaluate a batch of answers with one request
+        
+        Args:
+            question (str): The question asked
+            answers (list): Student answers
+            activity_type (str): Type of activity (short_answer or word_cloud)
+            
+        Returns:
+            list: Evaluation (dict) per answer, None where the reply had no usable one
+        """
+        numbered = [{'id': i, 'answer': answer} for i, answer in enumerate(answers)]
+        subject = 'Question' if activity_type == 'short_answer' else 'Prompt'
+        fields = EVALUATION_FIELDS.get(activity_type, EVALUATION_FIELDS['word_cloud'])
+        fields = '\n'.join('    ' + line for line in fields.splitlines())
+        prompt = f"""You are an educational AI assistant. Evaluate each of these student answers on its own and provide constructive feedback.
+
+{subject}: {question}
+
+Student Answers:
+{json.dumps(numbered, indent=2, ensure_ascii=False)}
+
+Provide one evaluation per answer, with the answer's id, in JSON format:
+{{
+    "evaluations": [
+        {{
+            "id": <answer id>,
+{fields}
+        }}
+    ]
+}}
+
+Be supportive, constructive, and encouraging. Focus on what each student did well and how they can improve."""
+        
+        try:
+            logger.info(f"Generating AI evaluations for {len(answers)} {activity_type} answers in one request")
+            items = self._complete(
                 messages=[
                     {"role": "system", "content": "You are a supportive educational AI assistant."},
                     {"role": "user", "content": prompt}
                 ],
-                max_tokens=500,
                 temperature=0.7,
-                timeout=30  # Shorter timeout for evaluation
+                max_tokens=self.BATCH_TOKENS_PER_EVALUATION * len(answers) + 100,
+                parse=lambda content: self._parse_json(content).get('evaluations', []),
+                kind='evaluate_batch',
+                response_format={"type": "json_object"},
+                timeout=60
             )
+        except Exception as e:
+            logger.warning(f"Batch evaluation failed, evaluating {len(answers)} answers one by one: {e}")
+            return [None] * len(answers)
+        
+        evaluations = [None] * len(answers)
+        for item in items:
+            if not isinstance(item, dict) or 'score' not in item:
+                continue
+            item = dict(item)
+            index = item.pop('id', None)
+            if isinstance(index, int) and 0 <= index < len(answers) and evaluations[index] is None:
+                evaluations[index] = item
+        
+        missing = evaluations.count(None)
+        if missing:
+            logger.warning(f"Batch evaluation reply missed {missing} of {len(answers)} answers")
+        return evaluations
+    
+    def _complete(self, messages, temperature, max_tokens, parse=None, kind='chat', **options):
+        """
+        Call the chat completions API, answering repeated requests from the cache
+        The key covers the model, messages, temperature, max_tokens and any
+        option other than timeout. Only replies that parse and were not cut
+        off by max_tokens are cached. Calls go through the scheduler, which
+        keeps them within the rate limits and retries transient errors.
+        
+        Args:
+            messages (list): Chat messages
+            temperature (float): Sampling temperature
+            max_tokens (int): Completion token limit
+            parse (callable): Turns the reply text into the value returned
+                              and cached (default: the text itself)
+            kind (str): Name the call's metrics are recorded under
+            **options: Other create() arguments (timeout, response_format)
             
-            # Parse response
-            response_text = response.choices[0].message.content.strip()
-            
-            # Extract JSON
-            if '```json' in response_text:
-                response_text = response_text.split('```json')[1].split('```')[0].strip()
-            elif '```' in response_text:
-                response_text = response_text.split('```')[1].split('```')[0].strip()
+        Returns:
+            The parsed reply
+        """
+        key_options = {name: value for name, value in options.items() if name != 'timeout'}
+        key = self.cache.key(self.model, messages, temperature, max_tokens, **key_options)
+        cached = self.cache.get(key)
+        if cached is not None:
+            logger.info("AI reply served from cache")
+            return cached
+        
+        started = time.monotonic()
+        prompt_tokens = sum(self.estimate_tokens(message['content']) for message in messages)
+        response = self.scheduler.call(
+            lambda: self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                **options
+            ),
+            estimated_tokens=prompt_tokens + max_tokens,
+            kind=kind
+        )
+        elapsed = time.monotonic() - started
+        
+        content = response.choices[0].message.content
+        finish_reason = response.choices[0].finish_reason
+        logger.info(f"AI response - Length: {len(content)} chars, Finish reason: {finish_reason}")
+        
+        value = parse(content) if parse else content
+        
+        # Check if response was cut off
+        if finish_reason == 'length':
+            logger.warning(f"Response was truncated due to token limit! Content length: {len(content)}")
+        else:
+            self.cache.set(key, value, tokens=self._usage_tokens(response), seconds=elapsed)
+        return value
+    
+    def _stream(self, messages, temperature, max_tokens, parse=None, kind='chat', **options):
+        """
+        Stream a chat completion, reporting JSON parts as they are completed
+        Shares _complete()'s cache: a cached reply is replayed at once, and a
+        streamed reply that parses and was not truncated is cached. The
+        stream is read through the scheduler, which retries errors before
+        the first chunk and records the usage reported by the last one.
+        
+        Args:
+            messages (list): Chat messages
+            temperature (float): Sampling temperature
+            max_tokens (int): Completion token limit
+            parse (callable): Turns the reply text into the final value
+            kind (str): Name the call's metrics are recorded under
+            **options: Other create() arguments (timeout)
             
-            evaluation = json.loads(response_text)
+        Yields:
+            tuple: ('title', str) and ('question', dict) as they are completed,
+                   then ('done', value) with the parsed reply
+        """
+        key_options = {name: value for name, value in options.items() if name != 'timeout'}
+        key = self.cache.key(self.model, messages, temperature, max_tokens, **key_options)
+        cached = self.cache.get(key)
+        if cached is not None:
+            logger.info("AI reply served from cache")
+            if isinstance(cached, dict):
+                if 'title' in cached:
+                    yield 'title', cached['title']
+                for question in cached.get('questions') or []:
+                    yield 'question', question
+            yield 'done', cached
+            return
+        
+        started = time.monotonic()
+        prompt_tokens = sum(self.estimate_tokens(message['content']) for message in messages)
+        stream = self.scheduler.stream(
+            lambda: self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True,
+                stream_options={'include_usage': True},
+                **options
+            ),
+            estimated_tokens=prompt_tokens + max_tokens,
+            kind=kind
+        )
+        
+        parser = JSONObjectStream()
+        finish_reason = None
+        tokens = 0
+        for chunk in stream:
+            tokens = self._usage_tokens(chunk) or tokens
+            if not chunk.choices:
+                continue
+            choice = chunk.choices[0]
+            finish_reason = choice.finish_reason or finish_reason
+            for event, name, value in parser.feed(choice.delta.content or ''):
+                if event == 'field' and name == 'title':
+                    yield 'title', value
+                elif event == 'item' and name == 'questions':
+                    yield 'question', value
+        elapsed = time.monotonic() - started
+        
+        content = parser.text
+        logger.info(f"AI streamed response - Length: {len(content)} chars, Finish reason: {finish_reason}")
+        
+        value = parse(content) if parse else content
+        
+        if finish_reason == 'length':
+            logger.warning(f"Response was truncated due to token limit! Content length: {len(content)}")
+        else:
+            self.cache.set(key, value, tokens=tokens or prompt_tokens + self.estimate_tokens(content),
+                           seconds=elapsed)
+        yield 'done', value
+    
+    @staticmethod
+    def _usage_tokens(response):
+        """Total tokens reported for a completion (0 if the client reports none)"""
+        usage = getattr(response, 'usage', None)
+        total = getattr(usage, 'total_tokens', None)
+        if isinstance(total, int):
+            return total
+        parts = [getattr(usage, 'prompt_tokens', 0), getattr(usage, 'completion_tokens', 0)]
+        return sum(parts) if all(isinstance(part, int) for part in parts) else 0
+    
+    @classmethod
+    def _parse_json(cls, content):
+        """
+        Parse a JSON reply, logging a preview of the content if it is invalid
+        
+        Args:
+            content (str): Model reply
             
-            logger.info("AI evaluation generated successfully")
-            return {
-                'success': True,
-                'evaluation': evaluation
-            }
+        Returns:
+            Parsed JSON
+        """
+        text = cls._extract_json(content)
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError as json_err:
+            logger.error(f"JSON decode error: {json_err}")
+            logger.error(f"Content preview (first 500 chars): {text[:500]}")
+            logger.error(f"Content preview (last 500 chars): {text[-500:]}")
+            raise
+    
+    @staticmethod
+    def _extract_json(content):
+        """
+        Strip a Markdown code fence around JSON in a model reply
+        
+        Args:
+            content (str): Model reply
             
-        except json.JSONDecodeError as e:
-            logger.error(f"JSON parse error in evaluation: {e}")
-            return {
-                'success': False,
-                'evaluation': {
-                    'score': 70,
-                    'feedback': 'Good effort! Your answer shows understanding of the topic.',
-                    'encouragement': 'Keep up the good work!'
-                }
-            }
-        except Exception as e:
-            logger.error(f"Evaluation generation error: {e}")
-            return {
-                'success': False,
-                'evaluation': {
-                    'score': 70,
-                    'feedback': 'Thank you for your submission. Your answer has been recorded.',
-                    'encouragement': 'Keep learning!'
-                }
-            }
+        Returns:
+            str: JSON text
+        """
+        content = content.strip()
+        if '```json' in content:
+            return content.split('```json')[1].split('```')[0].strip()
+        if '```' in content:
+            return content.split('```')[1].split('```')[0].strip()
+        return content
 
 # Create global GenAI service instance
 genai_service = GenAIService()
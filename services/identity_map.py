@@ -0,0 +1,145 @@
+"""
+Identity Map Module
+Request-scoped map of documents already loaded by ID, so looking up the same
+user, course or activity twice during one request costs one database query
+"""
+
+from flask import g, has_app_context
+import copy
+import logging
+
+logger = logging.getLogger(__name__)
+
+class IdentityMap:
+    """
+    Documents loaded during one request, keyed by (collection, ID)
+    Stores and returns copies so routes that decorate documents for templates
+    do not leak those changes into later lookups
+    """
+
+    def __init__(self):
+        """Initialize an empty identity map"""
+        self._documents = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, collection_name, document_id):
+        """
+        Look up a document loaded earlier in this request
+
+        Args:
+            collection_name (str): Name of the collection
+            document_id (str or ObjectId): Document ID
+
+        Returns:
+            dict: Copy of the document or None if it has not been loaded
+        """
+        document = self._documents.get((collection_name, str(document_id)))
+        if document is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return copy.deepcopy(document)
+
+    def put(self, collection_name, document):
+        """
+        Remember a document loaded from the database
+
+        Args:
+            collection_name (str): Name of the collection
+            document (dict): Document with an _id (None is ignored)
+        """
+        if document and '_id' in document:
+            self._documents[(collection_name, str(document['_id']))] = copy.deepcopy(document)
+
+    def discard(self, collection_name, document_id):
+        """
+        Forget a document after it was changed or deleted
+
+        Args:
+            collection_name (str): Name of the collection
+            document_id (str or ObjectId): Document ID
+        """
+        self._documents.pop((collection_name, str(document_id)), None)
+
+    def stats(self):
+        """
+        Get lookup statistics for this request
+
+        Returns:
+            dict: hits, misses and number of documents held
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._documents)
+        }
+
+def current_identity_map():
+    """
+    Get the identity map of the current request
+
+    Returns:
+        IdentityMap: The map stored on flask.g, or None outside an app context
+    """
+    if not has_app_context():
+        return None
+    if 'identity_map' not in g:
+        g.identity_map = IdentityMap()
+    return g.identity_map
+
+def lookup(collection_name, document_id):
+    """
+    Look up a document in the current request's identity map
+
+    Args:
+        collection_name (str): Name of the collection
+        document_id (str or ObjectId): Document ID
+
+    Returns:
+        dict: Copy of the document or None on a miss
+    """
+    identity_map = current_identity_map()
+    if identity_map is None:
+        return None
+    return identity_map.get(collection_name, document_id)
+
+def remember(collection_name, document):
+    """
+    Add a loaded document to the current request's identity map
+
+    Args:
+        collection_name (str): Name of the collection
+        document (dict): Document with an _id (None is ignored)
+    """
+    identity_map = current_identity_map()
+    if identity_map is not None:
+        identity_map.put(collection_name, document)
+
+def forget(collection_name, document_id):
+    """
+    Remove a document from the current request's identity map
+
+    Args:
+        collection_name (str): Name of the collection
+        document_id (str or ObjectId): Document ID
+    """
+    identity_map = current_identity_map()
+    if identity_map is not None:
+        identity_map.discard(collection_name, document_id)
+
+def log_stats(response):
+    """
+    Log identity map statistics at the end of a request (after_request hook)
+
+    Args:
+        response: Flask response
+
+    Returns:
+        The unchanged response
+    """
+    identity_map = g.get('identity_map')
+    if identity_map is not None and identity_map.hits:
+        stats = identity_map.stats()
+        logger.debug(f"Identity map: {stats['hits']} hits, {stats['misses']} misses")
+    return response
@@ -0,0 +1,322 @@
+"""
+Index Migrations Module
+Declares every MongoDB index the application's queries rely on and brings a
+database in line with that declaration (create_indexes.py is the command line)
+
+Bump SCHEMA_VERSION whenever INDEXES or RETIRED_INDEXES change:
+    1 - indexes formerly created by DatabaseService on every first connection
+    2 - compound indexes matching the finders' filters and sorts; the
+        single-field indexes they make redundant are retired
+    3 - evaluation_jobs queue
+    4 - ai_cache: TTL expiry and least recently used eviction
+    5 - document_cache GridFS bucket: least recently used eviction
+    6 - the indexes GridFS itself requires on its buckets
+    7 - one response per student per activity
+"""
+
+from pymongo import ASCENDING, DESCENDING
+from utils.time_utils import get_hk_time
+import logging
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 7
+
+# Collection recording which SCHEMA_VERSION a database was migrated to
+MIGRATIONS_COLLECTION = 'schema_migrations'
+
+class IndexSpec:
+    """
+    One declared index
+    The name defaults to MongoDB's generated name so indexes created before
+    the declaration existed are recognised
+    """
+
+    def __init__(self, collection, keys, unique=False, name=None, expire_after_seconds=None):
+        """
+        Initialize an index declaration
+
+        Args:
+            collection (str): Collection name
+            keys (list): (field, ASCENDING/DESCENDING) pairs
+            unique (bool): Whether the index enforces uniqueness
+            name (str): Index name (default: MongoDB's generated name)
+            expire_after_seconds (int): Make this a TTL index (optional)
+        """
+        self.collection = collection
+        self.keys = list(keys)
+        self.unique = unique
+        self.expire_after_seconds = expire_after_seconds
+        self.name = name or '_'.join(f"{field}_{direction}" for field, direction in self.keys)
+
+    @property
+    def fields(self):
+        """Indexed field names in key order"""
+        return [field for field, _ in self.keys]
+
+    def matches(self, existing):
+        """
+        Check whether an index reported by list_indexes() is this index
+
+        Args:
+            existing (dict): Index document from list_indexes()
+
+        Returns:
+            bool: True if keys, uniqueness and TTL are the same
+        """
+        return (list(existing['key'].items()) == self.keys
+                and bool(existing.get('unique', False)) == self.unique
+                and existing.get('expireAfterSeconds') == self.expire_after_seconds)
+
+    def __repr__(self):
+        return f"IndexSpec({self.collection}.{self.name}{', unique' if self.unique else ''})"
+
+# Every index the application needs, in one place
+INDEXES = [
+    # users: login, registration checks, admin filtering and enrollment lookups
+    IndexSpec('users', [('username', ASCENDING)], unique=True),
+    IndexSpec('users', [('email', ASCENDING)]),
+    IndexSpec('users', [('role', ASCENDING), ('created_at', DESCENDING)]),
+    IndexSpec('users', [('student_id', ASCENDING)]),
+    IndexSpec('users', [('enrolled_courses', ASCENDING)]),
+
+    # courses: Course.find_by_teacher / count_by_teacher(s), admin paging
+    IndexSpec('courses', [('code', ASCENDING)]),
+    IndexSpec('courses', [('teacher_id', ASCENDING), ('active', ASCENDING), ('created_at', DESCENDING)]),
+    IndexSpec('courses', [('created_at', DESCENDING)]),
+
+    # activities: per-course and per-teacher lists (newest first), admin stats
+    IndexSpec('activities', [('link', ASCENDING)], unique=True),
+    IndexSpec('activities', [('course_id', ASCENDING), ('active', ASCENDING), ('created_at', DESCENDING)]),
+    IndexSpec('activities', [('teacher_id', ASCENDING), ('active', ASCENDING), ('created_at', DESCENDING)]),
+    IndexSpec('activities', [('active', ASCENDING), ('type', ASCENDING)]),
+    IndexSpec('activities', [('created_at', DESCENDING)]),
+
+    # responses: one per student per activity, lookups by student and in submission order
+    IndexSpec('responses', [('activity_id', ASCENDING), ('student_id', ASCENDING)], unique=True),
+    IndexSpec('responses', [('activity_id', ASCENDING), ('student_name', ASCENDING)]),
+    IndexSpec('responses', [('activity_id', ASCENDING), ('position', ASCENDING)]),
+
+    # students: roster per course (sorted by name), one record per student per course
+    IndexSpec('students', [('student_id', ASCENDING), ('course_id', ASCENDING)], unique=True),
+    IndexSpec('students', [('course_id', ASCENDING), ('name', ASCENDING)]),
+
+    # points_ledger: one entry per student per course, course rankings
+    IndexSpec('points_ledger', [('student_id', ASCENDING), ('course_id', ASCENDING)], unique=True),
+    IndexSpec('points_ledger', [('student_name', ASCENDING), ('course_id', ASCENDING)]),
+    IndexSpec('points_ledger', [('course_id', ASCENDING), ('total', DESCENDING)]),
+
+    # evaluation_jobs: workers claim the oldest queued job
+    IndexSpec('evaluation_jobs', [('status', ASCENDING), ('created_at', ASCENDING)]),
+
+    # ai_cache: MongoDB deletes expired replies, eviction removes the least recently used
+    IndexSpec('ai_cache', [('expires_at', ASCENDING)], expire_after_seconds=0),
+    IndexSpec('ai_cache', [('last_used_at', ASCENDING)]),
+
+    # document_cache.files: eviction removes the least recently used uploads
+    IndexSpec('document_cache.files', [('metadata.last_used_at', ASCENDING)]),
+]
+
+# GridFS buckets used by the application
+GRIDFS_BUCKETS = ['document_cache']
+
+def gridfs_indexes(bucket):
+    """
+    Get the indexes GridFS creates (and needs) on a bucket's collections
+
+    Args:
+        bucket (str): Bucket name
+
+    Returns:
+        list: IndexSpec objects for <bucket>.files and <bucket>.chunks
+    """
+    return [
+        IndexSpec(f'{bucket}.files', [('filename', ASCENDING), ('uploadDate', ASCENDING)]),
+        IndexSpec(f'{bucket}.chunks', [('files_id', ASCENDING), ('n', ASCENDING)], unique=True),
+    ]
+
+# Declared like the application's own indexes, so they are never undeclared
+INDEXES += [spec for bucket in GRIDFS_BUCKETS for spec in gridfs_indexes(bucket)]
+
+# Indexes created by earlier versions that are now prefixes of compound indexes
+RETIRED_INDEXES = {
+    'courses': ['teacher_id_1'],
+    'activities': ['course_id_1', 'teacher_id_1'],
+    'students': ['course_id_1', 'student_id_1'],
+}
+
+def declared_indexes(collection=None):
+    """
+    Get declared indexes
+
+    Args:
+        collection (str): Only indexes of this collection (optional)
+
+    Returns:
+        list: IndexSpec objects
+    """
+    return [spec for spec in INDEXES if collection is None or spec.collection == collection]
+
+def backing_index(collection, query, sort=None):
+    """
+    Find a declared index the query planner can use for a query
+    Mirrors the planner's basic rule: an index is a candidate when its first
+    field is constrained by the filter (or, without usable filter fields,
+    matches the sort). Each $or branch needs its own index.
+
+    Args:
+        collection (str): Collection name
+        query (dict): Query filter
+        sort (list): (field, direction) pairs (optional)
+
+    Returns:
+        str: Name of a usable index ('_id_' for _id lookups) or None
+    """
+    fields = {field for field in query if not field.startswith('$')}
+    if '_id' in fields:
+        return '_id_'
+
+    for spec in declared_indexes(collection):
+        if spec.fields[0] in fields:
+            return spec.name
+
+    if '$or' in query:
+        names = [backing_index(collection, branch) for branch in query['$or']]
+        return None if None in names else ','.join(sorted(set(names)))
+
+    if sort:
+        for spec in declared_indexes(collection):
+            if spec.fields[0] == sort[0][0]:
+                return spec.name
+    return None
+
+class IndexMigrator:
+    """
+    Compares a database's indexes with INDEXES and applies the difference
+    Safe to run repeatedly: indexes that already match are left alone
+    """
+
+    def __init__(self, db):
+        """
+        Initialize the migrator
+
+        Args:
+            db: pymongo Database
+        """
+        self.db = db
+
+    def applied_version(self):
+        """
+        Get the schema version recorded by the last successful apply()
+
+        Returns:
+            int: Version number (0 if never migrated)
+        """
+        record = self.db[MIGRATIONS_COLLECTION].find_one({'_id': 'indexes'})
+        return record['version'] if record else 0
+
+    def diff(self):
+        """
+        Compare the database's indexes with the declaration
+
+        Returns:
+            dict: missing (IndexSpec), changed (IndexSpec whose existing
+                  index differs), retired ((collection, name) still present),
+                  undeclared ((collection, name) neither declared nor retired),
+                  applied_version and target_version
+                  Collection names may contain dots (GridFS buckets), so
+                  indexes are pairs rather than 'collection.name' strings
+        """
+        result = {
+            'missing': [],
+            'changed': [],
+            'retired': [],
+            'undeclared': [],
+            'applied_version': self.applied_version(),
+            'target_version': SCHEMA_VERSION
+        }
+
+        collections = sorted({spec.collection for spec in INDEXES} | set(RETIRED_INDEXES))
+        for collection in collections:
+            existing = {index['name']: index for index in self.db[collection].list_indexes()}
+            declared = declared_indexes(collection)
+
+            for spec in declared:
+                if spec.name not in existing:
+                    result['missing'].append(spec)
+                elif not spec.matches(existing[spec.name]):
+                    result['changed'].append(spec)
+
+            declared_names = {spec.name for spec in declared}
+            retired_names = RETIRED_INDEXES.get(collection, [])
+            for name in existing:
+                if name == '_id_' or name in declared_names:
+                    continue
+                if name in retired_names:
+                    result['retired'].append((collection, name))
+                else:
+                    result['undeclared'].append((collection, name))
+
+        return result
+
+    def apply(self, drop_undeclared=False):
+        """
+        Create missing indexes, rebuild changed ones and drop retired ones
+        Retired indexes are dropped only after their replacements exist
+
+        Args:
+            drop_undeclared (bool): Also drop indexes that are not declared
+
+        Returns:
+            dict: created, rebuilt, dropped (names), errors (name -> message)
+                  and version (recorded only if there were no errors)
+        """
+        diff = self.diff()
+        result = {'created': [], 'rebuilt': [], 'dropped': [], 'errors': {}, 'version': diff['applied_version']}
+
+        for spec in diff['changed']:
+            try:
+                self.db[spec.collection].drop_index(spec.name)
+                self._create(spec)
+                result['rebuilt'].append(f"{spec.collection}.{spec.name}")
+            except Exception as e:
+                result['errors'][f"{spec.collection}.{spec.name}"] = str(e)
+
+        for spec in diff['missing']:
+            try:
+                self._create(spec)
+                result['created'].append(f"{spec.collection}.{spec.name}")
+            except Exception as e:
+                # e.g. DuplicateKeyError when existing data violates a unique index
+                result['errors'][f"{spec.collection}.{spec.name}"] = str(e)
+
+        to_drop = diff['retired'] + (diff['undeclared'] if drop_undeclared else [])
+        if not result['errors']:
+            for collection, name in to_drop:
+                try:
+                    self.db[collection].drop_index(name)
+                    result['dropped'].append(f"{collection}.{name}")
+                except Exception as e:
+                    result['errors'][f"{collection}.{name}"] = str(e)
+
+        if result['errors']:
+            for name, message in result['errors'].items():
+                logger.error(f"Index migration failed for {name}: {message}")
+        else:
+            self.db[MIGRATIONS_COLLECTION].update_one(
+                {'_id': 'indexes'},
+                {'$set': {'version': SCHEMA_VERSION, 'applied_at': get_hk_time()}},
+                upsert=True
+            )
+            result['version'] = SCHEMA_VERSION
+
+        return result
+
+    def _create(self, spec):
+        """Create one declared index"""
+        options = {'name': spec.name}
+        if spec.unique:
+            options['unique'] = True
+        if spec.expire_after_seconds is not None:
+            options['expireAfterSeconds'] = spec.expire_after_seconds
+        self.db[spec.collection].create_index(spec.keys, **options)
@@ -3,12 +3,19 @@ Points Service Module
 Manages student points, rankings, and achievements
 """
 
-from datetime import datetime
+from datetime import datetime, timedelta
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 from services.db_service import db_service
+from services.cache_service import cache_service
 from models.activity import Activity
 from models.student import Student
 from models.course import Course
+from models.points_ledger import PointsLedger
+from utils.time_utils import get_hk_time
+from config import Config
+import threading
+import time
 import logging
 
 logger = logging.getLogger(__name__)
@@ -17,14 +24,23 @@ class PointsService:
     """Service for managing student points and rankings"""
     
     # Point values for different actions
-    POINTS = {
-        'poll_response': 10,           # Completing a poll
-        'short_answer_response': 20,   # Submitting a short answer
-        'word_cloud_response': 15,     # Contributing to word cloud
-        'poll_correct': 30,            # Getting poll answer correct (with auto-grading)
-        'early_submission': 5,         # Bonus for being among first submissions
-        'feedback_received': 5,        # Receiving teacher feedback
-    }
+    POINTS = PointsLedger.POINTS
+    
+    # Materialized leaderboard snapshots
+    LEADERBOARDS_COLLECTION = 'leaderboards'
+    GLOBAL_LEADERBOARD_ID = 'global'
+    
+    # Cache namespace for computed leaderboards
+    CACHE_NAMESPACE = 'leaderboard'
+    
+    # A worker that claimed the snapshot refresh and has not finished it
+    # after this long is assumed to have died
+    REFRESH_LEASE_SECONDS = 120
+    
+    # Single flight: one thread per process refreshes the snapshot
+    _refresh_lock = threading.Lock()
+    _schedule_lock = threading.Lock()
+    _last_scheduled = float('-inf')
     
     @staticmethod
     def calculate_student_points(student_identifier, course_id=None):
@@ -39,69 +55,9 @@ class PointsService:
             dict: Points breakdown and total
         """
         try:
-            points_breakdown = {
-                'poll_responses': 0,
-                'short_answer_responses': 0,
-                'word_cloud_responses': 0,
-                'correct_answers': 0,
-                'early_submissions': 0,
-                'feedback_received': 0,
-                'total': 0
-            }
-            
-            # Build query for activities
-            query = {}
-            if course_id:
-                query['course_id'] = course_id
-            
-            # Get all activities
-            activities = db_service.find_many(Activity.COLLECTION_NAME, query)
-            
-            for activity in activities:
-                responses = activity.get('responses', [])
-                
-                for response in responses:
-                    # Check if this response belongs to the student
-                    if (response.get('student_id') == student_identifier or 
-                        response.get('student_name') == student_identifier):
-                        
-                        activity_type = activity.get('type')
-                        
-                        # Points for poll responses
-                        if activity_type == Activity.TYPE_POLL:
-                            points_breakdown['poll_responses'] += PointsService.POINTS['poll_response']
-                            
-                            # Check if answer is correct (for auto-graded polls)
-                            if response.get('is_correct'):
-                                points_breakdown['correct_answers'] += PointsService.POINTS['poll_correct']
-                        
-                        # Points for short answer
-                        elif activity_type == Activity.TYPE_SHORT_ANSWER:
-                            points_breakdown['short_answer_responses'] += PointsService.POINTS['short_answer_response']
-                        
-                        # Points for word cloud
-                        elif activity_type == Activity.TYPE_WORD_CLOUD:
-                            points_breakdown['word_cloud_responses'] += PointsService.POINTS['word_cloud_response']
-                        
-                        # Bonus for early submission (first 5 responses)
-                        response_index = responses.index(response)
-                        if response_index < 5:
-                            points_breakdown['early_submissions'] += PointsService.POINTS['early_submission']
-                        
-                        # Points for receiving feedback
-                        if response.get('feedback'):
-                            points_breakdown['feedback_received'] += PointsService.POINTS['feedback_received']
-            
-            # Calculate total
-            points_breakdown['total'] = sum([
-                points_breakdown['poll_responses'],
-                points_breakdown['short_answer_responses'],
-                points_breakdown['word_cloud_responses'],
-                points_breakdown['correct_answers'],
-                points_breakdown['early_submissions'],
-                points_breakdown['feedback_received']
-            ])
-            
+            # Read the incrementally maintained ledger instead of scanning activities
+            points_breakdown = PointsLedger.get_points(student_identifier, course_id)
+            points_breakdown.pop('activities_completed', None)
             return points_breakdown
             
         except Exception as e:
@@ -116,6 +72,42 @@ class PointsService:
                 'total': 0
             }
     
+    @staticmethod
+    def assign_ranks(leaderboard):
+        """
+        Sort a leaderboard by points and rank it
+        A student's rank is one plus the number of students with more points,
+        so tied students share a rank (the rule get_student_rank uses)
+        
+        Args:
+            leaderboard (list): Entries with points
+            
+        Returns:
+            list: The same entries, sorted, with rank set
+        """
+        leaderboard.sort(key=lambda x: x['points'], reverse=True)
+        for i, entry in enumerate(leaderboard):
+            if i and entry['points'] == leaderboard[i - 1]['points']:
+                entry['rank'] = leaderboard[i - 1]['rank']
+            else:
+                entry['rank'] = i + 1
+        return leaderboard
+    
+    @staticmethod
+    def course_cache_key(course_id):
+        """Cache key of a course's leaderboard"""
+        return f"course:{course_id}"
+    
+    @staticmethod
+    def invalidate_course_leaderboard(course_id):
+        """
+        Drop a course's cached leaderboard after its points changed
+        
+        Args:
+            course_id (str): Course ID
+        """
+        cache_service.delete(PointsService.CACHE_NAMESPACE, PointsService.course_cache_key(course_id))
+    
     @staticmethod
     def get_course_leaderboard(course_id, limit=50):
         """
@@ -128,21 +120,27 @@ class PointsService:
         Returns:
             list: Ranked list of students with their points
         """
+        # The whole ranking is cached under one key per course, so a ledger
+        # update can invalidate it whatever limit the callers use
+        cache_key = PointsService.course_cache_key(course_id)
+        cached = cache_service.get(PointsService.CACHE_NAMESPACE, cache_key)
+        if cached is not None:
+            return cached[:limit]
+        
         try:
             # Get all students in the course
             students = Student.find_by_course(course_id)
             
+            # Score every student from one ledger query instead of two scans each
+            entries = PointsLedger.find_by_course(course_id)
+            
             leaderboard = []
             
             for student in students:
                 student_id = student.get('student_id')
                 student_name = student.get('name', 'Anonymous')
-                
-                # Calculate points
-                points_data = PointsService.calculate_student_points(student_id, course_id)
-                
-                # Count activities completed
-                activities_count = PointsService.count_student_activities(student_id, course_id)
+                entry = entries.get(student_id)
+                points_data = PointsLedger.breakdown(entry)
                 
                 leaderboard.append({
                     '_id': student.get('_id'),
@@ -150,17 +148,18 @@ class PointsService:
                     'name': student_name,
                     'points': points_data['total'],
                     'points_breakdown': points_data,
-                    'activities_completed': activities_count,
+                    'activities_completed': entry.get('activities_completed', 0) if entry else 0,
                     'rank': 0  # Will be set after sorting
                 })
             
-            # Sort by points (descending)
-            leaderboard.sort(key=lambda x: x['points'], reverse=True)
-            
-            # Assign ranks
-            for i, entry in enumerate(leaderboard):
-                entry['rank'] = i + 1
+            PointsService.assign_ranks(leaderboard)
             
+            cache_service.set(
+                PointsService.CACHE_NAMESPACE,
+                cache_key,
+                leaderboard,
+                ttl_seconds=Config.LEADERBOARD_CACHE_SECONDS
+            )
             return leaderboard[:limit]
             
         except Exception as e:
@@ -174,7 +173,7 @@ class PointsService:
         Uses the same point calculation as "My Stats" - total points across all activities
         
         Args:
-            limit (int): Maximum number of students to return
+            limit (int): Maximum number of students to return (None for all)
             
         Returns:
             list: Ranked list of students with their total points across all courses
@@ -201,30 +200,22 @@ class PointsService:
                         'name': student_name
                     }
             
-            # Calculate points for each unique student
+            # Total points across ALL courses (same as My Stats) in one ledger read
+            totals = PointsLedger.totals_by_student()
+            
             leaderboard = []
             for student_id, student_data in student_map.items():
-                # Calculate total points across ALL courses (same as My Stats)
-                points_data = PointsService.calculate_student_points(student_id)
-                total_points = points_data['total']
-                
-                # Count activities completed across ALL courses
-                activities_count = PointsService.count_student_activities(student_id)
+                student_totals = totals.get(student_id, {})
                 
                 leaderboard.append({
                     'student_id': student_id,
                     'name': student_data['name'],
-                    'points': total_points,
-                    'activities_completed': activities_count,
+                    'points': student_totals.get('total', 0),
+                    'activities_completed': student_totals.get('activities_completed', 0),
                     'rank': 0  # Will be set after sorting
                 })
             
-            # Sort by points (descending)
-            leaderboard.sort(key=lambda x: x['points'], reverse=True)
-            
-            # Assign ranks
-            for i, entry in enumerate(leaderboard):
-                entry['rank'] = i + 1
+            PointsService.assign_ranks(leaderboard)
             
             return leaderboard[:limit]
             
@@ -232,6 +223,210 @@ class PointsService:
             logger.error(f"Error getting global leaderboard: {e}")
             return []
     
+    @staticmethod
+    def refresh_global_leaderboard(top_n=None):
+        """
+        Recompute the global leaderboard and store it as a snapshot
+        
+        The snapshot keeps the top-N entries for display plus a compact rank
+        list ([student_id, rank, points]) covering every student.
+        
+        Args:
+            top_n (int, optional): Number of full entries to keep
+            
+        Returns:
+            dict: The stored snapshot, with its rank_index
+        """
+        if top_n is None:
+            top_n = Config.LEADERBOARD_TOP_N
+        
+        leaderboard = PointsService.get_global_leaderboard(limit=None)
+        
+        snapshot = {
+            'entries': leaderboard[:top_n],
+            'ranks': [[entry['student_id'], entry['rank'], entry['points']] for entry in leaderboard],
+            'total_students': len(leaderboard),
+            'updated_at': get_hk_time()
+        }
+        
+        db_service.update_one(
+            PointsService.LEADERBOARDS_COLLECTION,
+            {'_id': PointsService.GLOBAL_LEADERBOARD_ID},
+            {'$set': snapshot, '$unset': {'refresh_started_at': ''}},
+            upsert=True
+        )
+        logger.info(f"Global leaderboard snapshot refreshed: {len(leaderboard)} students")
+        
+        snapshot['_id'] = PointsService.GLOBAL_LEADERBOARD_ID
+        PointsService._cache_snapshot(snapshot)
+        return snapshot
+    
+    @staticmethod
+    def _cache_snapshot(snapshot):
+        """
+        Index a snapshot's ranks by student_id and cache it
+        
+        Args:
+            snapshot (dict): Snapshot as stored in the leaderboards collection
+        """
+        snapshot['rank_index'] = {
+            student_id: [rank, points] for student_id, rank, points in snapshot.get('ranks', [])
+        }
+        cache_service.set(
+            PointsService.CACHE_NAMESPACE,
+            PointsService.GLOBAL_LEADERBOARD_ID,
+            snapshot,
+            ttl_seconds=Config.LEADERBOARD_CACHE_SECONDS
+        )
+    
+    @staticmethod
+    def _claim_refresh(min_age):
+        """
+        Take the lease on refreshing the snapshot, so one worker rebuilds it
+        
+        Args:
+            min_age (float): Only claim a snapshot at least this many seconds old
+            
+        Returns:
+            bool: True if this worker should refresh the snapshot
+        """
+        now = get_hk_time()
+        try:
+            db_service.get_collection(PointsService.LEADERBOARDS_COLLECTION).find_one_and_update(
+                {
+                    '_id': PointsService.GLOBAL_LEADERBOARD_ID,
+                    'updated_at': {'$not': {'$gt': now - timedelta(seconds=min_age)}},
+                    '$or': [
+                        {'refresh_started_at': None},
+                        {'refresh_started_at': {'$lt': now - timedelta(seconds=PointsService.REFRESH_LEASE_SECONDS)}}
+                    ]
+                },
+                {'$set': {'refresh_started_at': now}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            # The snapshot exists but is fresh or already being refreshed
+            return False
+        return True
+    
+    @staticmethod
+    def refresh_if_due(min_age):
+        """
+        Refresh the snapshot unless it is younger than min_age or another
+        thread or worker is already refreshing it (single flight)
+        
+        Args:
+            min_age (float): Minimum snapshot age in seconds
+            
+        Returns:
+            dict: The new snapshot, or None if this call did not refresh it
+        """
+        if not PointsService._refresh_lock.acquire(blocking=False):
+            return None
+        try:
+            if not PointsService._claim_refresh(min_age):
+                return None
+            return PointsService.refresh_global_leaderboard()
+        finally:
+            PointsService._refresh_lock.release()
+    
+    @staticmethod
+    def schedule_refresh():
+        """
+        Refresh the snapshot in the background after a submission changed
+        points, at most once per LEADERBOARD_MIN_REFRESH_SECONDS
+        """
+        now = time.monotonic()
+        with PointsService._schedule_lock:
+            if now - PointsService._last_scheduled < Config.LEADERBOARD_MIN_REFRESH_SECONDS:
+                return
+            PointsService._last_scheduled = now
+        
+        def refresh():
+            try:
+                PointsService.refresh_if_due(Config.LEADERBOARD_MIN_REFRESH_SECONDS)
+            except Exception as e:
+                logger.error(f"Error refreshing global leaderboard: {e}")
+        
+        threading.Thread(target=refresh, name='leaderboard-refresh', daemon=True).start()
+    
+    @staticmethod
+    def get_global_leaderboard_snapshot(max_age=None):
+        """
+        Get the materialized global leaderboard, refreshing it when stale
+        
+        A stale snapshot is refreshed by one caller while the others keep
+        serving it; only a missing snapshot makes callers wait for one.
+        
+        Args:
+            max_age (int, optional): Maximum snapshot age in seconds
+            
+        Returns:
+            dict: Snapshot with entries, ranks, rank_index, total_students and updated_at
+        """
+        if max_age is None:
+            max_age = Config.LEADERBOARD_REFRESH_SECONDS
+        
+        try:
+            snapshot = PointsService._load_snapshot()
+            
+            if snapshot is None:
+                with PointsService._refresh_lock:
+                    # Built by another thread while this one waited
+                    snapshot = PointsService._load_snapshot()
+                    if snapshot is None:
+                        snapshot = PointsService.refresh_global_leaderboard()
+            elif (get_hk_time() - snapshot['updated_at']).total_seconds() > max_age:
+                snapshot = PointsService.refresh_if_due(max_age) or snapshot
+            
+            return snapshot
+            
+        except Exception as e:
+            logger.error(f"Error getting global leaderboard snapshot: {e}")
+            return {'entries': [], 'ranks': [], 'rank_index': {}, 'total_students': 0, 'updated_at': None}
+    
+    @staticmethod
+    def _load_snapshot():
+        """
+        Get the stored snapshot from the cache or the leaderboards collection
+        
+        Returns:
+            dict: Snapshot with its rank_index, or None if none was built yet
+        """
+        snapshot = cache_service.get(
+            PointsService.CACHE_NAMESPACE,
+            PointsService.GLOBAL_LEADERBOARD_ID
+        )
+        if snapshot is not None:
+            return snapshot
+        
+        snapshot = db_service.find_one(
+            PointsService.LEADERBOARDS_COLLECTION,
+            {'_id': PointsService.GLOBAL_LEADERBOARD_ID}
+        )
+        if not snapshot or snapshot.get('updated_at') is None:
+            return None
+        PointsService._cache_snapshot(snapshot)
+        return snapshot
+    
+    @staticmethod
+    def get_global_rank(snapshot, student_identifier):
+        """
+        Look up a student's position in a global leaderboard snapshot
+        
+        Args:
+            snapshot (dict): Snapshot from get_global_leaderboard_snapshot
+            student_identifier (str): student_id
+            
+        Returns:
+            dict: Rank and points, rank is None if the student is not ranked
+        """
+        found = snapshot.get('rank_index', {}).get(student_identifier)
+        if found is None:
+            return {'rank': None, 'points': 0}
+        rank, points = found
+        return {'rank': rank, 'points': points}
+    
     @staticmethod
     def count_student_activities(student_identifier, course_id=None):
         """
@@ -245,23 +440,7 @@ class PointsService:
             int: Number of activities completed
         """
         try:
-            query = {}
-            if course_id:
-                query['course_id'] = course_id
-            
-            # Get all activities
-            activities = db_service.find_many(Activity.COLLECTION_NAME, query)
-            
-            count = 0
-            for activity in activities:
-                responses = activity.get('responses', [])
-                for response in responses:
-                    if (response.get('student_id') == student_identifier or 
-                        response.get('student_name') == student_identifier):
-                        count += 1
-                        break  # Count each activity only once
-            
-            return count
+            return PointsLedger.get_points(student_identifier, course_id)['activities_completed']
             
         except Exception as e:
             logger.error(f"Error counting activities for {student_identifier}: {e}")
@@ -272,6 +451,10 @@ class PointsService:
         """
         Get a student's rank in a course
         
+        Answered with a few indexed queries instead of building the whole
+        course leaderboard: rank is one plus the number of enrolled students
+        with more points, the rule assign_ranks uses for the leaderboard.
+        
         Args:
             student_identifier (str): student_id or student_name
             course_id (str): Course ID
@@ -280,22 +463,25 @@ class PointsService:
             dict: Rank information including position and total students
         """
         try:
-            leaderboard = PointsService.get_course_leaderboard(course_id, limit=1000)
-            
-            for entry in leaderboard:
-                if entry['student_id'] == student_identifier:
-                    return {
-                        'rank': entry['rank'],
-                        'total_students': len(leaderboard),
-                        'points': entry['points'],
-                        'percentile': round((1 - (entry['rank'] - 1) / len(leaderboard)) * 100, 1)
-                    }
+            total_students = Student.count_by_course(course_id)
+            
+            # Only students enrolled in the course are ranked
+            if not Student.find_by_student_id(student_identifier, course_id):
+                return {
+                    'rank': None,
+                    'total_students': total_students,
+                    'points': 0,
+                    'percentile': 0
+                }
+            
+            points = PointsLedger.get_points(student_identifier, course_id)['total']
+            rank = PointsLedger.count_above(course_id, points) + 1
             
             return {
-                'rank': None,
-                'total_students': len(leaderboard),
-                'points': 0,
-                'percentile': 0
+                'rank': rank,
+                'total_students': total_students,
+                'points': points,
+                'percentile': round((1 - (rank - 1) / max(total_students, 1)) * 100, 1)
             }
             
         except Exception as e:
@@ -0,0 +1,234 @@
+"""
+Query Profiler Module
+Attributes every MongoDB command to the request that issued it, using
+pymongo's CommandListener. Per request it counts queries, database time,
+documents returned and reply bytes; the totals are sent back as X-DB-Queries
+and Server-Timing headers, and queries slower than SLOW_QUERY_MS are logged
+with their filter shape
+"""
+
+from collections import deque, Counter
+from flask import g, has_request_context, request
+from pymongo import monitoring
+from config import Config
+import bson
+import json
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Commands that are driver housekeeping rather than application queries
+IGNORED_COMMANDS = {'ping', 'hello', 'isMaster', 'ismaster', 'endSessions', 'saslStart', 'saslContinue'}
+
+def query_shape(value):
+    """
+    Replace the values in a filter with '?' so equal queries look the same
+
+    Args:
+        value: Filter (or part of one)
+
+    Returns:
+        Filter with operators and field names kept and values replaced
+    """
+    if isinstance(value, dict):
+        return {key: query_shape(item) for key, item in value.items()}
+    if isinstance(value, list) and value and all(isinstance(item, dict) for item in value):
+        return [query_shape(item) for item in value]
+    return '?'
+
+def command_filter(command_name, command):
+    """
+    Get the filter of a command
+
+    Args:
+        command_name (str): Command name (find, update, aggregate, ...)
+        command (dict): Command document sent to the server
+
+    Returns:
+        dict: Filter, or None for commands without one (insert, getMore)
+    """
+    if command_name in ('find', 'count', 'distinct'):
+        return command.get('filter', command.get('query'))
+    if command_name == 'findAndModify':
+        return command.get('query')
+    if command_name == 'update':
+        return command.get('updates', [{}])[0].get('q')
+    if command_name == 'delete':
+        return command.get('deletes', [{}])[0].get('q')
+    if command_name == 'aggregate':
+        pipeline = command.get('pipeline', [])
+        if pipeline and '$match' in pipeline[0]:
+            return pipeline[0]['$match']
+    return None
+
+def reply_documents(reply):
+    """Count documents in a find/getMore/aggregate reply"""
+    cursor = reply.get('cursor')
+    if not cursor:
+        return 0
+    return len(cursor.get('firstBatch', cursor.get('nextBatch', [])))
+
+class RequestProfile:
+    """
+    Queries issued while handling one request
+    """
+
+    def __init__(self):
+        """Initialize empty totals"""
+        self.queries = 0
+        self.duration_ms = 0.0
+        self.documents = 0
+        self.bytes = 0
+        self.shapes = Counter()
+
+    def add(self, shape_key, duration_ms, documents, size):
+        """Add one finished command"""
+        self.queries += 1
+        self.duration_ms += duration_ms
+        self.documents += documents
+        self.bytes += size
+        self.shapes[shape_key] += 1
+
+    def summary(self):
+        """
+        Get the totals for this request
+
+        Returns:
+            dict: queries, duration_ms, documents, bytes and the most repeated shapes
+        """
+        return {
+            'queries': self.queries,
+            'duration_ms': round(self.duration_ms, 3),
+            'documents': self.documents,
+            'bytes': self.bytes,
+            'top_shapes': [
+                {'shape': shape, 'count': count} for shape, count in self.shapes.most_common(5)
+            ]
+        }
+
+class QueryProfiler(monitoring.CommandListener):
+    """
+    Command listener collecting per-request query statistics
+    pymongo calls the listener on the thread running the command, so the
+    current request's profile is found through flask.g
+    """
+
+    def __init__(self, history=50):
+        """
+        Initialize the profiler
+
+        Args:
+            history (int): Number of recent requests and slow queries kept
+        """
+        self._lock = threading.Lock()
+        self._pending = {}
+        self.recent_requests = deque(maxlen=history)
+        self.slow_queries = deque(maxlen=history)
+
+    def started(self, event):
+        if event.command_name in IGNORED_COMMANDS:
+            return
+        collection = event.command.get(event.command_name)
+        if not isinstance(collection, str):
+            collection = event.command.get('collection', '')
+        query = command_filter(event.command_name, event.command)
+        shape = query_shape(query) if query is not None else None
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = (collection, shape)
+
+    def succeeded(self, event):
+        # Re-encoding the reply to measure it is only worth it while profiling
+        size = len(bson.encode(event.reply)) if Config.DB_PROFILING else 0
+        self._finish(event, reply_documents(event.reply), size)
+
+    def failed(self, event):
+        self._finish(event, 0, 0)
+
+    def _finish(self, event, documents, size):
+        """Record a finished command against the current request"""
+        with self._lock:
+            pending = self._pending.pop((event.connection_id, event.request_id), None)
+        if pending is None:
+            return
+
+        collection, shape = pending
+        duration_ms = event.duration_micros / 1000
+        shape_key = f"{event.command_name} {collection} {json.dumps(shape) if shape else ''}".strip()
+
+        path = None
+        if has_request_context():
+            path = request.path
+            current_profile().add(shape_key, duration_ms, documents, size)
+
+        if duration_ms >= Config.SLOW_QUERY_MS:
+            logger.warning(f"Slow query ({duration_ms:.1f} ms, {documents} docs): {shape_key}"
+                           + (f" [{path}]" if path else ""))
+            self.slow_queries.append({
+                'path': path,
+                'query': shape_key,
+                'duration_ms': round(duration_ms, 3),
+                'documents': documents
+            })
+
+    def stats(self):
+        """
+        Get recent request profiles and slow queries (newest first)
+
+        Returns:
+            dict: recent_requests, slow_queries and the slow query threshold
+        """
+        return {
+            'slow_query_ms': Config.SLOW_QUERY_MS,
+            'recent_requests': list(reversed(self.recent_requests)),
+            'slow_queries': list(reversed(self.slow_queries))
+        }
+
+def current_profile():
+    """
+    Get the query profile of the current request
+
+    Returns:
+        RequestProfile: The profile stored on flask.g
+    """
+    if 'query_profile' not in g:
+        g.query_profile = RequestProfile()
+    return g.query_profile
+
+def add_headers(response):
+    """
+    Report the request's queries in response headers and the history
+    (after_request hook)
+
+    Args:
+        response: Flask response
+
+    Returns:
+        The response with X-DB-Queries and Server-Timing headers
+    """
+    profile = g.get('query_profile') or RequestProfile()
+    summary = profile.summary()
+
+    if Config.DB_PROFILER_HEADERS:
+        response.headers['X-DB-Queries'] = str(summary['queries'])
+        response.headers.add(
+            'Server-Timing',
+            f'db;dur={summary["duration_ms"]};desc="{summary["queries"]} queries, {summary["documents"]} docs"'
+        )
+
+    if profile.queries:
+        query_profiler.recent_requests.append({
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            **summary
+        })
+        repeated = [(shape, count) for shape, count in profile.shapes.items()
+                    if count >= Config.REPEATED_QUERY_WARN]
+        for shape, count in repeated:
+            logger.warning(f"Query repeated {count} times in {request.method} {request.path} "
+                           f"(possible N+1): {shape}")
+    return response
+
+# Global profiler, registered on the client by DatabaseService
+query_profiler = QueryProfiler()
@@ -24,6 +24,49 @@ async function apiCall(url, method = 'GET', data = null) {
     }
 }
 
+// Poll a background job status URL until the job is done or failed
+// Resolves with the last status (status 'timeout' if it never finished)
+async function pollJobStatus(url, intervalMs = 2000, timeoutMs = 90000) {
+    const deadline = Date.now() + timeoutMs;
+    while (Date.now() < deadline) {
+        try {
+            const result = await apiCall(url);
+            if (!result.success || result.status === 'done' || result.status === 'failed') {
+                return result;
+            }
+        } catch (error) {
+            // Transient network error, keep polling
+        }
+        await new Promise(resolve => setTimeout(resolve, intervalMs));
+    }
+    return { success: false, status: 'timeout' };
+}
+
+// Read a Server-Sent Events response, calling onEvent(name, data) per event
+// (data parsed as JSON) as the events arrive
+async function readEventStream(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    while (true) {
+        const { done, value } = await reader.read();
+        buffer += decoder.decode(value || new Uint8Array(), { stream: !done });
+        let end;
+        while ((end = buffer.indexOf('\n\n')) !== -1) {
+            const block = buffer.slice(0, end);
+            buffer = buffer.slice(end + 2);
+            let name = 'message';
+            const data = [];
+            block.split('\n').forEach(line => {
+                if (line.startsWith('event:')) name = line.slice(6).trim();
+                else if (line.startsWith('data:')) data.push(line.slice(5).trim());
+            });
+            if (data.length) onEvent(name, JSON.parse(data.join('\n')));
+        }
+        if (done) return;
+    }
+}
+
 // Show alert message
 function showAlert(message, type = 'info') {
     const alertDiv = document.createElement('div');
@@ -316,6 +359,7 @@ function initTooltips() {
 
 // Export functions for global use
 window.apiCall = apiCall;
+window.readEventStream = readEventStream;
 window.showAlert = showAlert;
 window.openModal = openModal;
 window.closeModal = closeModal;
@@ -0,0 +1,52 @@
+import pytest
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from models.activity import Activity
+from models.course import Course
+
+
+class TestProjectionAwareFinders:
+    """Test list and count finders that avoid loading full activity documents"""
+
+    def test_summary_projection_excludes_heavy_fields(self):
+        """Test the summary projection leaves out content and embedded responses"""
+        assert 'content' not in Activity.SUMMARY_PROJECTION
+        assert 'responses' not in Activity.SUMMARY_PROJECTION
+        assert Activity.SUMMARY_PROJECTION['response_count'] == 1
+
+    def test_find_summaries_by_course_passes_projection(self):
+        """Test summaries are fetched with the summary projection"""
+        with patch('models.activity.db_service') as mock_db:
+            mock_db.find_many.return_value = [{'_id': 'a1', 'title': 'Quiz'}]
+
+            result = Activity.find_summaries_by_course('c1')
+
+            assert result == [{'_id': 'a1', 'title': 'Quiz'}]
+            kwargs = mock_db.find_many.call_args[1]
+            assert kwargs['projection'] == Activity.SUMMARY_PROJECTION
+            assert mock_db.find_many.call_args[0][1] == {'course_id': 'c1', 'active': True}
+
+    def test_count_by_course_does_not_fetch_documents(self):
+        """Test activity counts use count_documents instead of find_many"""
+        with patch('models.activity.db_service') as mock_db:
+            mock_db.count_documents.return_value = 4
+
+            assert Activity.count_by_course('c1') == 4
+            mock_db.find_many.assert_not_called()
+
+    def test_course_count_by_teacher(self):
+        """Test course counts use count_documents instead of find_many"""
+        with patch('models.course.db_service') as mock_db:
+            mock_db.count_documents.return_value = 2
+
+            assert Course.count_by_teacher('t1') == 2
+            mock_db.count_documents.assert_called_once_with(
+                Course.COLLECTION_NAME, {'teacher_id': 't1', 'active': True}
+            )
+            mock_db.find_many.assert_not_called()
@@ -0,0 +1,156 @@
+import pytest
+import sys
+import json
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+from flask import Flask
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from services.ai_cache_service import AICacheService
+from services.cache_service import LRUCache
+from services.genai_service import GenAIService
+from utils.json_stream import JSONObjectStream
+
+POLL = {
+    'title': 'Threads "and" {Processes}',
+    'questions': [
+        {'question': f'Question {i}?',
+         'options': [{'label': label, 'text': f'Option, {label}]'} for label in 'ABCD'],
+         'correct_answer': 'A', 'explanation': 'Because.'}
+        for i in range(3)
+    ]
+}
+
+
+def chunks(content, size):
+    """Streamed completion chunks carrying content in pieces of size characters"""
+    pieces = [content[i:i + size] for i in range(0, len(content), size)]
+    yield SimpleNamespace(choices=[])  # e.g. a content filter preamble
+    for piece in pieces:
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece), finish_reason=None)])
+    yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=None), finish_reason='stop')])
+
+
+@pytest.fixture
+def service():
+    """GenAI service with an in-memory reply cache"""
+    return GenAIService(cache=AICacheService(enabled=True, backend=LRUCache(10, 60)))
+
+
+class TestJSONObjectStream:
+    """Test values are reported as soon as they are complete"""
+
+    @pytest.mark.parametrize('size', [1, 5, 64, 10000])
+    def test_any_chunking_gives_same_events(self, size):
+        """Test fields and array items come out whole however the text is split"""
+        text = '```json\n' + json.dumps(POLL, indent=2) + '\n```'
+        parser = JSONObjectStream()
+
+        events = []
+        for i in range(0, len(text), size):
+            events += parser.feed(text[i:i + size])
+
+        assert events[0] == ('field', 'title', POLL['title'])
+        assert [value for event, _, value in events if event == 'item'] == POLL['questions']
+        assert events[-1] == ('field', 'questions', POLL['questions'])
+        assert parser.done
+
+    def test_item_reported_when_closed(self):
+        """Test a question is reported at its closing brace, before the reply ends"""
+        parser = JSONObjectStream()
+
+        assert parser.feed('{"title": "T", "questions": [{"question": "Q1", "n": 1') == [('field', 'title', 'T')]
+        assert parser.feed('}, {"question": "Q2"') == [('item', 'questions', {'question': 'Q1', 'n': 1})]
+        assert not parser.done
+
+
+class TestStreamActivity:
+    """Test GenAIService.stream_activity"""
+
+    def test_questions_yielded_before_done(self, service):
+        """Test each question is yielded as it arrives, then the finished activity"""
+        with patch.object(service, '_client') as client:
+            client.chat.completions.create.return_value = chunks(json.dumps(POLL), 20)
+            events = list(service.stream_activity('Threads and processes', 'poll', 3))
+
+        assert client.chat.completions.create.call_args[1]['stream'] is True
+        assert client.chat.completions.create.call_args[1]['stream_options'] == {'include_usage': True}
+        assert service.scheduler.stats()['calls']['stream_activity']['calls'] >= 1
+        assert [event for event, _ in events] == ['title', 'question', 'question', 'question', 'done']
+        done = events[-1][1]
+        assert done['questions'] == POLL['questions']
+        assert done['activity_type'] == 'poll'
+
+    def test_shares_cache_with_generate_activity(self, service):
+        """Test a streamed activity is reused by generate_activity and replayed on a repeat"""
+        with patch.object(service, '_client') as client:
+            client.chat.completions.create.return_value = chunks(json.dumps(POLL), 20)
+            list(service.stream_activity('Threads and processes', 'poll', 3))
+            generated = service.generate_activity('Threads and processes', 'poll', 3)
+            replayed = list(service.stream_activity('Threads and processes', 'poll', 3))
+
+        assert client.chat.completions.create.call_count == 1
+        assert generated['questions'] == POLL['questions']
+        assert [event for event, _ in replayed].count('question') == 3
+
+    def test_invalid_reply_ends_with_fallback(self, service):
+        """Test an unparseable stream still ends with a usable activity"""
+        with patch.object(service, '_client') as client:
+            client.chat.completions.create.return_value = chunks('{"title": "T", "questions": [', 7)
+            events = list(service.stream_activity('Threads and processes', 'poll', 3))
+
+        assert events[0] == ('title', 'T')
+        assert events[-1][0] == 'done'
+        assert events[-1][1]['questions'] == service._get_fallback_activity('poll', 'Threads and processes')['questions']
+
+
+class TestGenerateRoute:
+    """Test /activity/ai-generate streams when asked to"""
+
+    @pytest.fixture
+    def client(self):
+        from routes.activity_routes import activity_bp
+
+        app = Flask(__name__)
+        app.secret_key = 'test'
+        app.register_blueprint(activity_bp)
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['user_id'] = 't1'
+            session['username'] = 'teacher'
+        return client
+
+    def test_event_stream(self, client):
+        """Test events are sent as text/event-stream ending with the usual JSON body"""
+        events = [('title', 'T'), ('question', POLL['questions'][0]), ('done', {'title': 'T'})]
+
+        with patch('routes.activity_routes.Course.find_by_id', return_value={'teacher_id': 't1'}), \
+             patch('routes.activity_routes.genai_service') as genai:
+            genai.stream_activity.return_value = iter(events)
+            response = client.post('/activity/ai-generate', headers={'Accept': 'text/event-stream'},
+                                   json={'teaching_content': 'Threads', 'type': 'poll',
+                                         'course_id': 'c1', 'num_questions': 1})
+            body = response.get_data(as_text=True)
+
+        assert response.mimetype == 'text/event-stream'
+        blocks = [block.split('\n') for block in body.strip().split('\n\n')]
+        assert [lines[0] for lines in blocks] == ['event: title', 'event: question', 'event: done']
+        done = json.loads(blocks[-1][1][len('data: '):])
+        assert done['success'] and done['generated_content']['ai_generated']
+        genai.generate_activity.assert_not_called()
+
+    def test_json_without_accept_header(self, client):
+        """Test clients that do not ask for a stream get the JSON response"""
+        with patch('routes.activity_routes.Course.find_by_id', return_value={'teacher_id': 't1'}), \
+             patch('routes.activity_routes.genai_service') as genai:
+            genai.generate_activity.return_value = {'title': 'T'}
+            response = client.post('/activity/ai-generate',
+                                   json={'teaching_content': 'Threads', 'type': 'poll',
+                                         'course_id': 'c1', 'num_questions': 1})
+
+        assert response.get_json()['generated_content'] == {'title': 'T', 'ai_generated': True}
+        genai.stream_activity.assert_not_called()
@@ -0,0 +1,89 @@
+import pytest
+import sys
+from pathlib import Path
+from unittest.mock import patch
+from bson import ObjectId
+from flask import Flask
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from benchmarks.fake_db import FakeDatabaseService
+from models.activity import Activity
+from models.course import Course
+from models.student import Student
+
+
+def build_fake_db(course_count):
+    """Build a fake database with one teacher per course and two activities each"""
+    users, courses, activities, students = [], [], [], []
+    for i in range(course_count):
+        teacher = {'_id': ObjectId(), 'username': f'teacher{i}', 'role': 'teacher'}
+        course = {'_id': ObjectId(), 'name': f'Course {i}', 'code': f'C{i}',
+                  'teacher_id': str(teacher['_id']), 'active': True}
+        users.append(teacher)
+        courses.append(course)
+        students.append({'_id': ObjectId(), 'course_id': str(course['_id'])})
+        for j in range(2):
+            activities.append({'_id': ObjectId(), 'title': f'A{i}-{j}', 'active': True,
+                               'course_id': str(course['_id']), 'teacher_id': str(teacher['_id'])})
+    return FakeDatabaseService({
+        'users': users,
+        'courses': courses,
+        'activities': activities,
+        'students': students
+    }, latency=0)
+
+
+class TestAdminListQueries:
+    """Test admin list endpoints resolve related documents in batches"""
+
+    def test_page_args_are_clamped(self):
+        """Test skip/limit are read from the query string and clamped"""
+        from routes.admin_routes import get_page_args, MAX_PAGE_SIZE
+
+        app = Flask(__name__)
+        with app.test_request_context('/?skip=-5&limit=100000'):
+            assert get_page_args(default_limit=100) == (0, MAX_PAGE_SIZE)
+        with app.test_request_context('/'):
+            assert get_page_args(default_limit=100) == (0, 100)
+            assert get_page_args() == (0, None)
+
+    def test_page_info_has_more(self):
+        """Test has_more is set while documents remain after the page"""
+        from routes.admin_routes import page_info
+
+        assert page_info(0, 10, 10, 25)['has_more'] is True
+        assert page_info(20, 10, 5, 25)['has_more'] is False
+
+    @pytest.mark.parametrize('course_count', [2, 10, 40])
+    def test_activity_owner_info_uses_constant_queries(self, course_count):
+        """Test teacher and course names cost two queries for any page size"""
+        from routes.admin_routes import add_activity_owner_info
+
+        fake_db = build_fake_db(course_count)
+        activities = [dict(activity) for activity in fake_db.collections['activities']]
+
+        with patch('models.user.db_service', fake_db), \
+             patch('models.course.db_service', fake_db):
+            add_activity_owner_info(activities)
+
+        assert fake_db.round_trips == 2
+        assert activities[0]['teacher_name'] == 'teacher0'
+        assert activities[0]['course_code'] == 'C0'
+
+    def test_grouped_counts(self):
+        """Test per-course and per-teacher counts come from one aggregation each"""
+        fake_db = build_fake_db(3)
+        courses = fake_db.collections['courses']
+        course_ids = [str(course['_id']) for course in courses]
+
+        with patch('models.activity.db_service', fake_db), \
+             patch('models.student.db_service', fake_db), \
+             patch('models.course.db_service', fake_db):
+            assert Activity.count_by_courses(course_ids) == {course_id: 2 for course_id in course_ids}
+            assert Student.count_by_courses(course_ids) == {course_id: 1 for course_id in course_ids}
+            assert Course.count_by_teachers([courses[0]['teacher_id']]) == {courses[0]['teacher_id']: 1}
+
+        assert fake_db.round_trips == 3
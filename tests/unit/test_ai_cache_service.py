@@ -0,0 +1,183 @@
+import pytest
+import sys
+import os
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from benchmarks.stub_openai import StubOpenAIClient
+from services.ai_cache_service import AICacheService, DiskCache, MongoCache, request_key
+from services.cache_service import LRUCache
+from services.genai_service import GenAIService
+from services.index_migrations import IndexSpec
+
+MESSAGES = [{'role': 'user', 'content': 'Evaluate this'}]
+
+
+@pytest.fixture
+def service():
+    """GenAI service with an in-memory reply cache and a stub client"""
+    service = GenAIService(cache=AICacheService(enabled=True, backend=LRUCache(100, 60)))
+    service.client = StubOpenAIClient(latency=0, seconds_per_token=0)
+    return service
+
+
+def reply(content, finish_reason='stop'):
+    """A chat completion carrying content"""
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content),
+                                                    finish_reason=finish_reason)])
+
+
+class TestRequestKey:
+    """Test the key identifies a request by content"""
+
+    def test_same_request_same_key(self):
+        """Test equal requests hash equally regardless of option order"""
+        first = request_key('gpt-4o-mini', MESSAGES, 0.7, 500, response_format={'type': 'json_object'})
+        second = request_key('gpt-4o-mini', list(MESSAGES), 0.7, 500, **{'response_format': {'type': 'json_object'}})
+
+        assert first == second
+        assert len(first) == 64
+
+    @pytest.mark.parametrize('change', [
+        {'model': 'gpt-4o'}, {'temperature': 0.2}, {'max_tokens': 100},
+        {'messages': [{'role': 'user', 'content': 'Evaluate that'}]}
+    ])
+    def test_any_input_changes_key(self, change):
+        """Test model, prompt, temperature and max_tokens are all part of the key"""
+        base = {'model': 'gpt-4o-mini', 'messages': MESSAGES, 'temperature': 0.7, 'max_tokens': 500}
+
+        assert request_key(**base) != request_key(**{**base, **change})
+
+
+class TestGenAICaching:
+    """Test GenAIService answers repeated requests from the cache"""
+
+    def test_repeated_evaluation_is_free(self, service):
+        """Test the same answer evaluated twice costs one API call"""
+        first = service.evaluate_student_answer('What is a thread?', 'A unit of execution')
+        second = service.evaluate_student_answer('What is a thread?', 'A unit of execution')
+
+        assert service.client.calls == 1
+        assert first == second
+        stats = service.cache.stats()
+        assert stats['hits'] == 1 and stats['misses'] == 1
+        assert stats['hit_rate'] == 0.5
+        assert stats['tokens_saved'] > 0
+
+    def test_different_answer_misses(self, service):
+        """Test a changed answer is sent to the API"""
+        service.evaluate_student_answer('What is a thread?', 'A unit of execution')
+        service.evaluate_student_answer('What is a thread?', 'A lightweight process')
+
+        assert service.client.calls == 2
+
+    def test_batched_evaluation_serves_single_resubmission(self, service):
+        """Test answers evaluated in a batch are hits when resubmitted on their own"""
+        service.evaluate_student_answers('What is a thread?', ['one', 'two', 'three'])
+        service.evaluate_student_answer('What is a thread?', 'two')
+        service.evaluate_student_answers('What is a thread?', ['three', 'one'])
+
+        assert service.client.calls == 1
+
+    def test_translation_cached(self, service):
+        """Test plain text replies are cached too"""
+        with patch.object(service.client.chat.completions, 'create', return_value=reply('你好')) as create:
+            assert service.translate_text('Hello') == '你好'
+            assert service.translate_text('Hello') == '你好'
+
+        assert create.call_count == 1
+
+    def test_unusable_replies_not_cached(self, service):
+        """Test truncated and unparseable replies are requested again next time"""
+        replies = [reply('{"score": 5', 'length'), reply('not json'), reply('{"score": 90}')]
+
+        with patch.object(service.client.chat.completions, 'create', side_effect=replies) as create:
+            results = [service.evaluate_student_answer('Q', 'A') for _ in range(4)]
+
+        assert create.call_count == 3
+        assert [result['success'] for result in results] == [False, False, True, True]
+
+    def test_disabled_cache_always_calls(self):
+        """Test AI_CACHE_ENABLED=false sends every request"""
+        service = GenAIService(cache=AICacheService(enabled=False, backend=LRUCache(100, 60)))
+        service.client = StubOpenAIClient(latency=0, seconds_per_token=0)
+
+        service.translate_text('Hello')
+        service.translate_text('Hello')
+
+        assert service.client.calls == 2
+
+
+class TestDiskCache:
+    """Test the file-backed cache"""
+
+    def test_round_trip_and_expiry(self, tmp_path):
+        """Test values survive a new instance and expire after their TTL"""
+        DiskCache(str(tmp_path), 10, 60).set('ab' * 32, {'value': [1, 2]})
+        DiskCache(str(tmp_path), 10, 60).set('cd' * 32, 'short-lived', ttl_seconds=0.01)
+        time.sleep(0.02)
+
+        cache = DiskCache(str(tmp_path), 10, 60)
+        assert cache.get('ab' * 32) == {'value': [1, 2]}
+        assert cache.get('cd' * 32) is None
+        assert cache.stats()['expirations'] == 1
+        assert cache.stats()['size'] == 1
+
+    def test_least_recently_used_evicted(self, tmp_path):
+        """Test entries beyond max_entries are deleted, oldest use first"""
+        cache = DiskCache(str(tmp_path), 2, 60)
+        for i, key in enumerate(['a1', 'b2', 'c3']):
+            cache.set(key, i)
+            os.utime(cache._path(key), (1000 + i, 1000 + i))
+        cache.get('a1')  # now the most recently used
+
+        assert cache.evict() == 1
+        assert cache.get('b2') is None
+        assert cache.get('a1') == 0 and cache.get('c3') == 2
+
+
+class TestMongoCache:
+    """Test the MongoDB-backed cache issues the right operations"""
+
+    def test_get_skips_expired_and_marks_use(self):
+        """Test a lookup only matches unexpired entries and refreshes last_used_at"""
+        with patch('services.ai_cache_service.db_service') as db:
+            db.find_one_and_update.return_value = {'_id': 'k', 'value': {'x': 1}}
+            assert MongoCache(10, 60).get('k') == {'x': 1}
+
+        _, query, update = db.find_one_and_update.call_args[0]
+        assert query['_id'] == 'k' and '$gt' in query['expires_at']
+        assert 'last_used_at' in update['$set']
+
+    def test_set_upserts_and_evicts_oldest(self):
+        """Test writes upsert with an expiry and trim the collection past max_entries"""
+        cache = MongoCache(max_entries=3, ttl_seconds=60)
+        cache.EVICT_EVERY = 1
+
+        with patch('services.ai_cache_service.db_service') as db:
+            db.count_documents.return_value = 5
+            db.find_many.return_value = [{'_id': 'old1'}, {'_id': 'old2'}]
+            db.delete_many.return_value.deleted_count = 2
+            cache.set('k', {'x': 1})
+            stats = cache.stats()
+
+        _, query, update = db.update_one.call_args[0]
+        assert db.update_one.call_args[1] == {'upsert': True}
+        assert update['$set']['expires_at'] > update['$set']['created_at']
+        assert db.find_many.call_args[1]['sort'] == [('last_used_at', 1)]
+        assert db.find_many.call_args[1]['limit'] == 2
+        assert db.delete_many.call_args[0][1] == {'_id': {'$in': ['old1', 'old2']}}
+        assert stats['evictions'] == 2
+
+    def test_ttl_index_declared(self):
+        """Test expiry relies on a TTL index on expires_at"""
+        spec = IndexSpec('ai_cache', [('expires_at', 1)], expire_after_seconds=0)
+
+        assert spec.matches({'key': {'expires_at': 1}, 'expireAfterSeconds': 0})
+        assert not spec.matches({'key': {'expires_at': 1}})
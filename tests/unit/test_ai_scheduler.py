@@ -0,0 +1,337 @@
+import pytest
+import sys
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from benchmarks.stub_openai import StubOpenAIClient, StubOpenAIServer
+from services.ai_cache_service import AICacheService
+from services.ai_scheduler import AIScheduler, RateLimiter, is_retryable
+from services.cache_service import LRUCache
+from services.genai_service import GenAIService
+
+
+class FakeClock:
+    """Clock advanced by the limiter's sleeps instead of real time"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class StatusError(Exception):
+    """API error carrying an HTTP status and headers, like openai.APIStatusError"""
+
+    def __init__(self, status_code, headers=None):
+        super().__init__(f'status {status_code}')
+        self.status_code = status_code
+        self.response = SimpleNamespace(headers=headers or {})
+
+
+def flaky(*outcomes):
+    """Request raising or returning the outcomes in turn"""
+    outcomes = list(outcomes)
+
+    def request():
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+    request.remaining = outcomes
+    return request
+
+
+@pytest.fixture
+def scheduler():
+    """Scheduler without limits on a fake clock that records its backoff sleeps"""
+    clock = FakeClock()
+    scheduler = AIScheduler(max_workers=4, requests_per_minute=0, tokens_per_minute=0,
+                            max_retries=3, base_delay=1, max_delay=8,
+                            clock=clock, sleep=clock.sleep)
+    scheduler.sleeps = clock.sleeps
+    return scheduler
+
+
+class TestRateLimiter:
+    """Test calls are held back to stay within per-minute budgets"""
+
+    def test_requests_per_minute(self):
+        """Test the call over the request budget waits for the window to move"""
+        clock = FakeClock()
+        limiter = RateLimiter(requests_per_minute=2, clock=clock, sleep=clock.sleep)
+
+        for _ in range(3):
+            limiter.acquire()
+
+        assert clock.sleeps == [60.0]
+
+    def test_tokens_per_minute_uses_actual_usage(self):
+        """Test reservations are corrected with the tokens the call really used"""
+        clock = FakeClock()
+        limiter = RateLimiter(tokens_per_minute=1000, clock=clock, sleep=clock.sleep)
+
+        first = limiter.acquire(800)
+        limiter.adjust(first, 300)
+        limiter.acquire(600)
+        assert clock.sleeps == []
+
+        clock.now = 10
+        limiter.acquire(500)
+        assert clock.sleeps == [50.0]
+
+    def test_oversized_call_runs_alone(self):
+        """Test a call larger than the budget still runs once the window is empty"""
+        clock = FakeClock()
+        limiter = RateLimiter(tokens_per_minute=100, clock=clock, sleep=clock.sleep)
+
+        limiter.acquire(500)
+        limiter.acquire(500)
+
+        assert clock.sleeps == [60.0]
+
+    def test_pause_holds_every_call(self):
+        """Test a pause after a 429 delays the next call"""
+        clock = FakeClock()
+        limiter = RateLimiter(clock=clock, sleep=clock.sleep)
+
+        limiter.pause(5)
+        limiter.acquire()
+
+        assert clock.sleeps == [5.0]
+
+
+class TestRetries:
+    """Test transient errors are retried with backoff and others are not"""
+
+    @pytest.mark.parametrize('status', [429, 500, 503])
+    def test_transient_status_retried(self, scheduler, status):
+        """Test rate limit and server errors are retried until the call succeeds"""
+        request = flaky(StatusError(status), StatusError(status), 'done')
+
+        assert scheduler.call(request, kind='test') == 'done'
+        assert len(scheduler.sleeps) == 2
+        stats = scheduler.stats()['calls']['test']
+        assert stats['calls'] == 1 and stats['retries'] == 2
+        assert stats['rate_limited'] == (2 if status == 429 else 0)
+
+    @pytest.mark.parametrize('status', [400, 401, 404])
+    def test_client_error_not_retried(self, scheduler, status):
+        """Test requests the API rejected are not repeated"""
+        request = flaky(StatusError(status), 'done')
+
+        with pytest.raises(StatusError):
+            scheduler.call(request, kind='test')
+        assert request.remaining == ['done']
+        assert scheduler.stats()['calls']['test']['failures'] == 1
+
+    def test_gives_up_after_max_retries(self, scheduler):
+        """Test the last error is raised once retries run out"""
+        request = flaky(*[StatusError(500)] * 5)
+
+        with pytest.raises(StatusError):
+            scheduler.call(request)
+        assert len(request.remaining) == 1
+
+    def test_backoff_is_jittered_exponential(self, scheduler):
+        """Test delays stay under base * 2^n, capped at max_delay"""
+        for attempt, ceiling in [(1, 1), (2, 2), (3, 4), (6, 8)]:
+            delays = [scheduler.backoff(attempt) for _ in range(50)]
+            assert all(0 <= delay <= ceiling for delay in delays)
+            assert len(set(delays)) > 1
+
+    def test_retry_after_honoured(self, scheduler):
+        """Test a Retry-After header sets the minimum wait"""
+        request = flaky(StatusError(429, {'retry-after': '3'}), 'done')
+
+        scheduler.call(request)
+
+        assert scheduler.sleeps[0] >= 3
+
+    def test_web_request_calls_have_a_deadline(self, scheduler):
+        """Test a call inside a web request stops retrying at the request deadline"""
+        from flask import Flask
+        scheduler.request_deadline = 5
+        request = flaky(*[StatusError(500)] * 5)
+
+        with patch.object(scheduler, 'backoff', return_value=2), \
+             Flask(__name__).test_request_context(), pytest.raises(StatusError):
+            scheduler.call(request, kind='test')
+
+        assert scheduler.sleeps == [2, 2]
+        assert scheduler.stats()['calls']['test']['failures'] == 1
+
+    def test_pool_calls_inherit_request_deadline(self, scheduler):
+        """Test a function a web request runs on the pool stops retrying at its deadline"""
+        from flask import Flask
+        scheduler.request_deadline = 5
+        request = flaky(*[StatusError(500)] * 5)
+
+        with patch.object(scheduler, 'backoff', return_value=2), \
+             Flask(__name__).test_request_context(), pytest.raises(StatusError):
+            scheduler.submit(scheduler.call, request, kind='test').result()
+
+        assert scheduler.sleeps == [2, 2]
+        assert scheduler.stats()['calls']['test']['failures'] == 1
+
+    def test_background_calls_use_max_retries(self, scheduler):
+        """Test calls outside a web request are only limited by max_retries"""
+        scheduler.request_deadline = 5
+        request = flaky(*[StatusError(500)] * 3, 'done')
+
+        with patch.object(scheduler, 'backoff', return_value=2):
+            assert scheduler.call(request) == 'done'
+
+        assert scheduler.sleeps == [2, 2, 2]
+
+    def test_connection_errors_retryable(self):
+        """Test timeouts and dropped connections count as transient"""
+        APITimeoutError = type('APITimeoutError', (Exception,), {})
+
+        assert is_retryable(APITimeoutError())
+        assert not is_retryable(ValueError())
+
+
+class TestStreaming:
+    """Test streamed calls are retried, limited and measured like other calls"""
+
+    def test_error_before_first_chunk_retried(self, scheduler):
+        """Test a stream failing before its first chunk is requested again"""
+        request = flaky(StatusError(503), iter(['a', 'b']))
+
+        assert list(scheduler.stream(request, kind='test')) == ['a', 'b']
+        stats = scheduler.stats()['calls']['test']
+        assert stats['calls'] == 1 and stats['retries'] == 1
+
+    def test_error_mid_stream_recorded(self, scheduler):
+        """Test a stream dropped after chunks were passed on fails and frees its slot"""
+        def dropped():
+            yield 'a'
+            raise StatusError(500)
+
+        with pytest.raises(StatusError):
+            list(scheduler.stream(lambda: dropped(), kind='test'))
+
+        assert scheduler.stats()['calls']['test']['failures'] == 1
+        assert scheduler._slots.acquire(blocking=False)
+
+    def test_reported_usage_corrects_reservation(self, scheduler):
+        """Test the usage chunk replaces the estimate held by the rate limiter"""
+        usage = SimpleNamespace(choices=[], usage=SimpleNamespace(prompt_tokens=30, completion_tokens=12))
+        chunks = [SimpleNamespace(choices=['x']), usage]
+
+        list(scheduler.stream(lambda: iter(chunks), estimated_tokens=1000, kind='test'))
+
+        assert scheduler.limiter._window[-1][1] == 42
+        assert scheduler.stats()['calls']['test']['completion_tokens'] == 12
+
+
+class TestConcurrency:
+    """Test independent calls run at the same time"""
+
+    def test_map_keeps_order_and_overlaps(self, scheduler):
+        """Test map() returns results in order while calls overlap"""
+        active, peak = [0], [0]
+        lock = threading.Lock()
+
+        def work(item):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+            return item * 2
+
+        assert scheduler.map(work, range(8)) == [0, 2, 4, 6, 8, 10, 12, 14]
+        assert peak[0] == 4
+
+    def test_calls_on_caller_threads_share_the_limit(self, scheduler):
+        """Test call() made directly from several threads runs at most max_workers requests"""
+        active, peak = [0], [0]
+        lock = threading.Lock()
+
+        def request():
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+            return 'done'
+
+        threads = [threading.Thread(target=scheduler.call, args=(request,)) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert peak[0] == 4
+
+    def test_batches_evaluated_concurrently(self, scheduler):
+        """Test a class's batches are requested in parallel"""
+        service = GenAIService(cache=AICacheService(enabled=False, backend=LRUCache(10, 60)),
+                               scheduler=scheduler)
+        service.client = StubOpenAIClient(latency=0.1, seconds_per_token=0)
+        answers = [f'Answer {i}' for i in range(8)]
+
+        started = time.perf_counter()
+        results = service.evaluate_student_answers('Q', answers, max_batch_size=2)
+        elapsed = time.perf_counter() - started
+
+        assert service.client.calls == 4
+        assert all(result['success'] for result in results)
+        assert elapsed < 0.3
+        assert scheduler.stats()['calls']['evaluate_batch']['calls'] == 4
+
+
+class TestStubServer:
+    """Test the real openai client against the local stub API"""
+
+    @pytest.fixture
+    def server(self):
+        with StubOpenAIServer() as server:
+            yield server
+
+    @pytest.fixture
+    def service(self, server, scheduler):
+        openai = pytest.importorskip('openai')
+        service = GenAIService(cache=AICacheService(enabled=False, backend=LRUCache(10, 60)),
+                               scheduler=scheduler)
+        service.client = openai.OpenAI(api_key='stub', base_url=server.url, max_retries=0)
+        return service
+
+    def test_rate_limited_request_retried(self, server, service, scheduler):
+        """Test a 429 with Retry-After and a 500 are retried to a successful evaluation"""
+        server.fail_next(429, retry_after=2)
+        server.fail_next(500)
+
+        result = service.evaluate_student_answer('What is a thread?', 'A unit of execution')
+
+        assert result['success'] and result['evaluation']['score'] == 80
+        assert server.requests == 3
+        assert scheduler.sleeps[0] >= 2
+        stats = scheduler.stats()['calls']['evaluate_answer']
+        assert stats['retries'] == 2 and stats['rate_limited'] == 1
+        assert stats['prompt_tokens'] > 0 and stats['latency_p50_ms'] is not None
+
+    def test_rejected_request_falls_back(self, server, service):
+        """Test a 400 is not retried and the caller's fallback is used"""
+        server.fail_next(400)
+
+        result = service.evaluate_student_answer('What is a thread?', 'A unit of execution')
+
+        assert not result['success']
+        assert server.requests == 1
@@ -0,0 +1,146 @@
+import pytest
+import sys
+from pathlib import Path
+from unittest.mock import patch
+from bson import ObjectId
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from benchmarks.fake_db import FakeDatabaseService
+from models.activity import Activity
+from models.course import Course
+from models.user import User
+
+
+def build_fake_db(course_count):
+    """Build a fake database with one student enrolled in course_count courses"""
+    courses = [{'_id': ObjectId(), 'name': f'Course {i}', 'code': f'C{i}'} for i in range(course_count)]
+    activities = []
+    for course in courses:
+        for i in range(3):
+            activities.append({
+                '_id': ObjectId(),
+                'course_id': str(course['_id']),
+                'title': f'Activity {i}',
+                'active': True
+            })
+    return FakeDatabaseService({
+        'courses': courses,
+        'activities': activities,
+        'responses': []
+    }, latency=0), courses
+
+
+class TestBatchFinders:
+    """Test $in based finders used by the student pages"""
+
+    def test_course_find_many_by_ids_skips_invalid_ids(self):
+        """Test invalid and empty IDs are dropped before querying"""
+        fake_db, courses = build_fake_db(2)
+
+        with patch('models.course.db_service', fake_db):
+            found = Course.find_many_by_ids([str(courses[0]['_id']), 'not-an-id', None, courses[1]['_id']])
+
+        assert set(found) == {str(courses[0]['_id']), str(courses[1]['_id'])}
+        assert fake_db.round_trips == 1
+
+    def test_user_find_many_by_ids_without_ids_skips_query(self):
+        """Test an empty ID list does not hit the database"""
+        fake_db = FakeDatabaseService({}, latency=0)
+
+        with patch('models.user.db_service', fake_db):
+            assert User.find_many_by_ids([]) == {}
+
+        assert fake_db.round_trips == 0
+
+    def test_activity_find_by_courses_groups_by_course(self):
+        """Test activities are grouped per course, including empty courses"""
+        fake_db, courses = build_fake_db(2)
+        empty_course_id = str(ObjectId())
+
+        with patch('models.activity.db_service', fake_db):
+            grouped = Activity.find_by_courses([courses[0]['_id'], empty_course_id])
+
+        assert len(grouped[str(courses[0]['_id'])]) == 3
+        assert grouped[empty_course_id] == []
+        assert fake_db.round_trips == 1
+
+    @pytest.mark.parametrize('course_count', [1, 5, 20])
+    def test_enrolled_courses_load_in_constant_round_trips(self, course_count):
+        """Test the student pages cost the same number of queries for any course count"""
+        from routes.student_routes import load_enrolled_courses
+
+        fake_db, courses = build_fake_db(course_count)
+        user = {
+            'student_id': '20231234',
+            'enrolled_courses': [str(course['_id']) for course in courses]
+        }
+
+        with patch('models.course.db_service', fake_db), \
+             patch('models.activity.db_service', fake_db), \
+             patch('models.response.db_service', fake_db):
+            enrolled = load_enrolled_courses(user)
+
+        assert [course['_id'] for course, _ in enrolled] == [course['_id'] for course in courses]
+        assert all(len(activities) == 3 for _, activities in enrolled)
+        assert fake_db.round_trips == 3
+
+    def test_enrolled_courses_match_responses_by_username(self):
+        """Test a response recorded under the student's username counts as theirs"""
+        from routes.student_routes import load_enrolled_courses
+
+        fake_db, courses = build_fake_db(1)
+        answered = fake_db.collections['activities'][0]
+        fake_db.collections['responses'] = [{
+            '_id': ObjectId(),
+            'activity_id': str(answered['_id']),
+            'student_id': 'Anonymous',
+            'student_name': 'amy',
+            'position': 0
+        }]
+        user = {
+            'student_id': '20231234',
+            'username': 'amy',
+            'enrolled_courses': [str(courses[0]['_id'])]
+        }
+
+        with patch('models.course.db_service', fake_db), \
+             patch('models.activity.db_service', fake_db), \
+             patch('models.response.db_service', fake_db):
+            [(_, activities)] = load_enrolled_courses(user)
+
+        completed = [activity for activity in activities if activity['student_response'] is not None]
+        assert [activity['_id'] for activity in completed] == [answered['_id']]
+
+    @pytest.mark.parametrize('course_count', [1, 5, 20])
+    def test_teacher_dashboard_counts_in_constant_round_trips(self, course_count):
+        """Test the teacher dashboard counts students and activities for all courses at once"""
+        from flask import Flask
+        from routes.course_routes import course_bp
+
+        fake_db, courses = build_fake_db(course_count)
+        for course in courses:
+            course.update({'teacher_id': 't1', 'active': True})
+        fake_db.collections['students'] = [
+            {'student_id': f'S{i}', 'course_id': str(courses[0]['_id'])} for i in range(4)
+        ]
+
+        app = Flask(__name__)
+        app.secret_key = 'test'
+        app.register_blueprint(course_bp)
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['user_id'] = 't1'
+
+        with patch('models.course.db_service', fake_db), \
+             patch('models.student.db_service', fake_db), \
+             patch('models.activity.db_service', fake_db), \
+             patch('routes.course_routes.render_template', return_value='ok') as render:
+            client.get('/dashboard')
+
+        rendered = render.call_args[1]['courses']
+        assert rendered[0]['student_count'] == 4
+        assert all(course['activity_count'] == 3 for course in rendered)
+        assert fake_db.round_trips == 3
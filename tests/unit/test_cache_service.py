@@ -0,0 +1,258 @@
+import pytest
+import sys
+from pathlib import Path
+from unittest.mock import patch, MagicMock
+from bson import ObjectId
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from models.course import Course
+from models.activity import Activity
+from models.user import User
+from services.auth_service import AuthService
+from services.cache_service import CacheService, LRUCache, RedisCache
+
+
+class TestLRUCache:
+    """Test the size-bounded TTL cache"""
+
+    def test_evicts_least_recently_used(self):
+        """Test the oldest unused entry is evicted when full"""
+        cache = LRUCache(max_entries=2, ttl_seconds=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        assert cache.get('b') is None
+        assert cache.get('a') == 1
+        assert cache.get('c') == 3
+        assert cache.stats()['evictions'] == 1
+
+    def test_entries_expire(self):
+        """Test entries are dropped once their TTL has passed"""
+        cache = LRUCache(max_entries=10, ttl_seconds=30)
+
+        with patch('services.cache_service.time.monotonic', return_value=100.0):
+            cache.set('a', {'name': 'x'})
+        with patch('services.cache_service.time.monotonic', return_value=120.0):
+            assert cache.get('a') == {'name': 'x'}
+        with patch('services.cache_service.time.monotonic', return_value=131.0):
+            assert cache.get('a') is None
+
+        stats = cache.stats()
+        assert stats['expirations'] == 1
+        assert stats['hits'] == 1
+        assert stats['misses'] == 1
+
+    def test_values_are_copies(self):
+        """Test callers cannot modify cached values in place"""
+        cache = LRUCache(max_entries=10, ttl_seconds=60)
+        value = {'name': 'x'}
+        cache.set('a', value)
+        value['name'] = 'changed'
+        cache.get('a')['name'] = 'changed again'
+
+        assert cache.get('a') == {'name': 'x'}
+
+
+class TestModelCaching:
+    """Test find_by_id goes through the process cache"""
+
+    def test_find_by_id_served_from_cache_until_update(self):
+        """Test repeated lookups skip MongoDB until the course changes"""
+        course_id = ObjectId()
+        mock_db = MagicMock()
+        mock_db.find_one.return_value = {'_id': course_id, 'name': 'Old'}
+        mock_db.update_one.return_value.modified_count = 1
+
+        with patch('models.course.db_service', mock_db), \
+             patch('models.course.cache_service', CacheService(enabled=True, max_entries=10, ttl_seconds=60)):
+            Course.find_by_id(str(course_id))
+            Course.find_by_id(str(course_id))
+            assert mock_db.find_one.call_count == 1
+
+            Course.update_course(str(course_id), {'name': 'New'})
+            Course.find_by_id(str(course_id))
+            assert mock_db.find_one.call_count == 2
+
+    def test_disabled_cache_always_queries(self):
+        """Test the config switch turns caching off"""
+        course_id = ObjectId()
+        mock_db = MagicMock()
+        mock_db.find_one.return_value = {'_id': course_id, 'name': 'Course'}
+        disabled = CacheService(enabled=False)
+
+        with patch('models.course.db_service', mock_db), \
+             patch('models.course.cache_service', disabled):
+            Course.find_by_id(str(course_id))
+            Course.find_by_id(str(course_id))
+
+        assert mock_db.find_one.call_count == 2
+        assert disabled.stats()['enabled'] is False
+
+    def test_users_cached_briefly_by_memory_backend(self):
+        """Test users (enrollments) only stay in a per-process cache for USER_CACHE_TTL_SECONDS"""
+        user_id = ObjectId()
+        mock_db = MagicMock()
+        mock_db.find_one.return_value = {'_id': user_id, 'enrolled_courses': []}
+        cache = CacheService(enabled=True, max_entries=10, ttl_seconds=300)
+
+        with patch('models.user.db_service', mock_db), \
+             patch('models.user.cache_service', cache), \
+             patch('models.user.Config.USER_CACHE_TTL_SECONDS', 5), \
+             patch('services.cache_service.time.monotonic', return_value=100.0):
+            User.find_by_id(str(user_id))
+        with patch('models.user.db_service', mock_db), \
+             patch('models.user.cache_service', cache), \
+             patch('services.cache_service.time.monotonic', return_value=106.0):
+            User.find_by_id(str(user_id))
+
+        assert mock_db.find_one.call_count == 2
+
+    def test_users_use_cache_ttl_with_shared_backend(self):
+        """Test a shared backend, which every worker invalidates, keeps the cache TTL"""
+        user = {'_id': ObjectId()}
+        cache = MagicMock(shared=True)
+
+        with patch('models.user.cache_service', cache):
+            User._cache(user)
+
+        cache.set.assert_called_once_with(User.COLLECTION_NAME, user['_id'], user)
+
+    def test_activities_cached_briefly_by_memory_backend(self):
+        """Test an activity closed on another worker is re-read after ACTIVITY_CACHE_TTL_SECONDS"""
+        activity_id = ObjectId()
+        mock_db = MagicMock()
+        mock_db.find_one.return_value = {'_id': activity_id, 'active': True}
+        cache = CacheService(enabled=True, max_entries=10, ttl_seconds=300)
+
+        with patch('models.activity.db_service', mock_db), \
+             patch('models.activity.cache_service', cache), \
+             patch('models.activity.Config.ACTIVITY_CACHE_TTL_SECONDS', 5), \
+             patch('services.cache_service.time.monotonic', return_value=100.0):
+            Activity.find_by_id(str(activity_id))
+        with patch('models.activity.db_service', mock_db), \
+             patch('models.activity.cache_service', cache), \
+             patch('services.cache_service.time.monotonic', return_value=106.0):
+            Activity.find_by_id(str(activity_id))
+
+        assert mock_db.find_one.call_count == 2
+
+    def test_auth_service_updates_invalidate_user(self):
+        """Test profile and password changes drop the cached user"""
+        user_id = str(ObjectId())
+        service = AuthService()
+        collection = MagicMock()
+        collection.find_one.return_value = {'_id': ObjectId(user_id), 'username': 'amy',
+                                            'password': service.hash_password('old')}
+
+        with patch.object(AuthService, 'users_collection', collection), \
+             patch('services.auth_service.User._invalidate') as invalidate:
+            service.update_user(user_id, {'institution': 'HKU'})
+            service.change_password(user_id, 'old', 'new')
+
+        assert [call[0][0] for call in invalidate.call_args_list] == [user_id, user_id]
+
+
+class FakeRedis:
+    """Embedded stand-in for a Redis server speaking the redis-py client API"""
+
+    def __init__(self):
+        self.store = {}
+        self.expiry = {}
+        self.commands = 0
+
+    def get(self, key):
+        self.commands += 1
+        return self.store.get(key)
+
+    def set(self, key, value, ex=None):
+        self.commands += 1
+        self.store[key] = value
+        self.expiry[key] = ex
+
+    def delete(self, *keys):
+        self.commands += 1
+        for key in keys:
+            self.store.pop(key, None)
+
+    def incrby(self, key, amount):
+        self.commands += 1
+        self.store[key] = int(self.store.get(key, 0)) + amount
+
+    def scan_iter(self, match='*'):
+        prefix = match.rstrip('*')
+        return [key for key in list(self.store) if key.startswith(prefix)]
+
+
+class TestRedisBackend:
+    """Test the Redis backend against the embedded stub"""
+
+    def test_documents_round_trip_with_bson_types(self):
+        """Test ObjectId and datetime fields survive serialization"""
+        from datetime import datetime
+        server = FakeRedis()
+        cache = CacheService(enabled=True, backend=RedisCache(server, ttl_seconds=60))
+        document = {'_id': ObjectId(), 'created_at': datetime(2025, 1, 2, 3, 4, 5), 'tags': ['a']}
+
+        cache.set('courses', document['_id'], document)
+
+        assert cache.get('courses', document['_id']) == document
+        assert server.expiry['cache:courses:' + str(document['_id'])] == 60
+
+    def test_workers_share_entries_and_invalidation(self):
+        """Test two workers see each other's writes and deletes"""
+        server = FakeRedis()
+        worker_a = CacheService(enabled=True, backend=RedisCache(server, ttl_seconds=60))
+        worker_b = CacheService(enabled=True, backend=RedisCache(server, ttl_seconds=60))
+
+        worker_a.set('users', 'u1', {'username': 'amy'})
+        assert worker_b.get('users', 'u1') == {'username': 'amy'}
+
+        worker_b.delete('users', 'u1')
+        assert worker_a.get('users', 'u1') is None
+
+    def test_hit_rate_is_shared(self):
+        """Test hit/miss counters are aggregated across workers"""
+        server = FakeRedis()
+        worker_a = RedisCache(server, ttl_seconds=60)
+        worker_b = RedisCache(server, ttl_seconds=60)
+        worker_a.set('k', 1)
+
+        worker_a.get('k')
+        worker_b.get('k')
+        worker_b.get('missing')
+        worker_a.stats()
+
+        stats = worker_b.stats()
+        assert stats['hits'] == 2
+        assert stats['misses'] == 1
+        assert stats['hit_rate'] == round(2 / 3, 3)
+
+    def test_unreachable_server_degrades_to_miss(self):
+        """Test a Redis outage turns lookups into misses instead of errors"""
+        server = MagicMock()
+        server.get.side_effect = ConnectionError('down')
+        cache = RedisCache(server, ttl_seconds=60)
+
+        assert cache.get('k') is None
+
+    def test_leaderboard_served_from_cache(self):
+        """Test a computed course leaderboard is reused until it expires"""
+        from services.points_service import PointsService
+
+        cache = CacheService(enabled=True, backend=RedisCache(FakeRedis(), ttl_seconds=60))
+        with patch('services.points_service.cache_service', cache), \
+             patch('models.student.db_service') as student_db, \
+             patch('models.points_ledger.db_service') as ledger_db:
+            student_db.find_many.return_value = [{'_id': ObjectId(), 'student_id': 's1', 'name': 'Amy'}]
+            ledger_db.find_many.return_value = [{'student_id': 's1', 'total': 10}]
+
+            first = PointsService.get_course_leaderboard('c1', limit=10)
+            second = PointsService.get_course_leaderboard('c1', limit=10)
+
+        assert first == second
+        assert student_db.find_many.call_count == 1
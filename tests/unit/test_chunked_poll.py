@@ -0,0 +1,136 @@
+import pytest
+import sys
+import json
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from benchmarks.stub_openai import StubOpenAIClient
+from services.ai_cache_service import AICacheService
+from services.cache_service import LRUCache
+from services.genai_service import GenAIService
+
+CONTENT = '\n\n'.join(f'Paragraph {i}.' + ' Threads share memory and need locks.' * 8 for i in range(8))
+
+
+@pytest.fixture
+def service():
+    """GenAI service answering from a stub client, without the reply cache"""
+    service = GenAIService(cache=AICacheService(enabled=False, backend=LRUCache(10, 60)))
+    service.client = StubOpenAIClient(latency=0, seconds_per_token=0)
+    return service
+
+
+def question(text):
+    """A well-formed poll question"""
+    return {'question': text, 'options': [{'label': 'A', 'text': 'Yes'}, {'label': 'B', 'text': 'No'}],
+            'correct_answer': 'A', 'explanation': 'Because.'}
+
+
+def reply(questions, title='Quiz'):
+    """A chat completion carrying a poll"""
+    content = json.dumps({'title': title, 'questions': questions})
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content),
+                                                    finish_reason='stop')])
+
+
+class TestSplitSections:
+    """Test content is divided among the requests"""
+
+    def test_paragraphs_grouped_in_order(self):
+        """Test sections are consecutive, of similar size and cover the whole text"""
+        sections = GenAIService._split_sections(CONTENT, 4)
+
+        assert len(sections) == 4
+        assert '\n\n'.join(sections) == CONTENT
+        assert all(section.startswith(f'Paragraph {2 * i}.') for i, section in enumerate(sections))
+
+    def test_short_content_shared(self):
+        """Test a topic too short to split is given whole to every request"""
+        assert GenAIService._split_sections('Python loops', 3) == ['Python loops'] * 3
+
+
+class TestDeduplication:
+    """Test near-identical questions are recognised"""
+
+    def test_rephrasings_are_duplicates(self, service):
+        """Test case, punctuation and small wording changes do not make a question new"""
+        kept = [question('What do threads of one process share?')]
+
+        assert not service._is_new_question(question('what do the threads of one process share'), kept)
+        assert service._is_new_question(question('What does a context switch save?'), kept)
+
+    def test_malformed_questions_rejected(self, service):
+        """Test questions without text or options are skipped"""
+        assert not service._is_new_question({'question': 'No options?'}, [])
+        assert not service._is_new_question('just text', [])
+
+
+class TestChunkedGeneration:
+    """Test polls are generated by concurrent requests and merged"""
+
+    def test_questions_split_across_requests(self, service):
+        """Test 10 questions come from 4 smaller requests and are all distinct"""
+        result = service.generate_activity(CONTENT, 'poll', 10)
+
+        assert service.client.calls == 4
+        assert len(result['questions']) == 10
+        assert len({q['question'] for q in result['questions']}) == 10
+        assert result['activity_type'] == 'poll' and 'note' not in result
+
+    def test_requests_run_concurrently(self, service):
+        """Test the poll takes about as long as one request, not four"""
+        service.client = StubOpenAIClient(latency=0.2, seconds_per_token=0)
+
+        started = time.perf_counter()
+        service.generate_activity(CONTENT, 'poll', 10)
+
+        assert time.perf_counter() - started < 0.6
+
+    def test_small_poll_is_one_request(self, service):
+        """Test polls within one request's size keep the single request"""
+        with patch.object(service, '_chunked_poll') as chunked:
+            service.generate_activity(CONTENT, 'poll', 3)
+
+        chunked.assert_not_called()
+        assert service.client.calls == 1
+
+    def test_duplicates_replaced_by_top_up(self, service):
+        """Test duplicates across parts are dropped and one more request fills the gap"""
+        replies = {'part 1 of 2': reply([question('What is a mutex?'), question('What is a deadlock?')]),
+                   'part 2 of 2': reply([question('What is a Mutex'), question('What is paging?')]),
+                   'Do not repeat': reply([question('What is a semaphore?')])}
+        prompts = []
+
+        def create(messages, **kwargs):
+            prompts.append(messages[1]['content'])
+            return next(answer for marker, answer in replies.items() if marker in prompts[-1])
+
+        with patch.object(service, '_client') as client:
+            client.chat.completions.create.side_effect = create
+            result = service.generate_activity(CONTENT, 'poll', 4)
+
+        assert len(prompts) == 3
+        assert 'existing questions:\n- ' in prompts[2]
+        questions = [q['question'].lower().rstrip('?') for q in result['questions']]
+        assert sorted(questions) == ['what is a deadlock', 'what is a mutex', 'what is a semaphore', 'what is paging']
+
+    def test_failed_parts_fall_back(self, service):
+        """Test a poll whose requests all fail gets the fallback activity"""
+        with patch.object(service, '_client') as client:
+            client.chat.completions.create.side_effect = RuntimeError('API down')
+            result = service.generate_activity(CONTENT, 'poll', 6)
+
+        assert result['questions'] == service._get_fallback_activity('poll', CONTENT)['questions']
+
+    def test_stream_yields_parts_as_they_finish(self, service):
+        """Test streamed chunked polls report questions before the done event"""
+        events = list(service.stream_activity(CONTENT, 'poll', 6))
+
+        assert [event for event, _ in events] == ['title'] + ['question'] * 6 + ['done']
+        assert len(events[-1][1]['questions']) == 6
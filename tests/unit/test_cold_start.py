@@ -0,0 +1,63 @@
+import pytest
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from benchmarks.bench_cold_start import parse_importtime, profile_import
+
+
+class TestColdStart:
+    """Test the serverless entry point imports without heavy work"""
+
+    def test_entry_point_defers_heavy_imports(self):
+        """Test importing api/index.py does not load openai, PyPDF2, pptx or pandas"""
+        result = profile_import()
+
+        assert result['deferred_loaded'] == []
+        assert 'app' in result['modules']
+
+    def test_parse_importtime(self):
+        """Test -X importtime lines are parsed into self/cumulative microseconds"""
+        stderr = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |   _io\n"
+            "import time:      3400 |      72390 |       services.db_service\n"
+        )
+
+        assert parse_importtime(stderr) == {
+            '_io': (120, 120),
+            'services.db_service': (3400, 72390)
+        }
+
+
+class TestLazyClients:
+    """Test clients are created on first use instead of at import"""
+
+    def test_genai_client_created_once_on_first_use(self):
+        """Test the OpenAI client is only built when first accessed"""
+        from services.genai_service import GenAIService
+
+        with patch.object(GenAIService, '_create_client', return_value=MagicMock()) as create:
+            service = GenAIService()
+            create.assert_not_called()
+
+            assert service.client is service.client
+            create.assert_called_once()
+
+    def test_connect_skips_index_creation_by_default(self):
+        """Test connecting does not create indexes unless configured to"""
+        from services.db_service import DatabaseService
+
+        service = DatabaseService()
+        with patch.object(service, '_client', None), \
+             patch.object(service, '_db', None), \
+             patch('services.db_service.MongoClient') as mongo_client, \
+             patch.object(DatabaseService, '_create_indexes') as create_indexes:
+            service._connect()
+
+            mongo_client.assert_called_once()
+            create_indexes.assert_not_called()
@@ -101,4 +101,86 @@ class TestDBServiceMocked:
         
         # Test that mocking works
         assert mock_client is not None
-        assert True  # Basic mock test passes
\ No newline at end of file
+        assert True  # Basic mock test passes
+
+
+class TestClientOptions:
+    """Test MongoClient options built from configuration"""
+    
+    def test_options_from_config(self):
+        """Test pool, compression, read preference and write concern settings"""
+        from pymongo import MongoClient
+        from services.db_service import DatabaseService
+        
+        with patch('services.db_service.Config') as config:
+            config.MONGO_SERVER_SELECTION_TIMEOUT_MS = 3000
+            config.MONGO_MAX_POOL_SIZE = 20
+            config.MONGO_MIN_POOL_SIZE = 2
+            config.MONGO_MAX_IDLE_TIME_MS = 60000
+            config.MONGO_WAIT_QUEUE_TIMEOUT_MS = 2000
+            config.MONGO_COMPRESSORS = 'zlib'
+            config.MONGO_READ_PREFERENCE = 'secondaryPreferred'
+            config.MONGO_WRITE_CONCERN = 'majority'
+            config.MONGO_MONITORING = True
+            config.DB_PROFILING = True
+            options = DatabaseService._client_options()
+        
+        client = MongoClient('mongodb://localhost:27017/', connect=False, **options)
+        pool_options = client.options.pool_options
+        assert pool_options.max_pool_size == 20
+        assert pool_options.min_pool_size == 2
+        assert pool_options.max_idle_time_seconds == 60
+        assert pool_options.wait_queue_timeout == 2
+        assert client.write_concern.document == {'w': 'majority'}
+        assert client.read_preference.mongos_mode == 'secondaryPreferred'
+        assert len(options['event_listeners']) == 3
+        client.close()
+    
+    def test_unset_options_keep_defaults(self):
+        """Test optional settings are left out when not configured"""
+        from services.db_service import DatabaseService
+        
+        with patch('services.db_service.Config') as config:
+            config.MONGO_MAX_IDLE_TIME_MS = None
+            config.MONGO_WAIT_QUEUE_TIMEOUT_MS = None
+            config.MONGO_COMPRESSORS = ''
+            config.MONGO_WRITE_CONCERN = ''
+            config.MONGO_MONITORING = False
+            config.DB_PROFILING = False
+            options = DatabaseService._client_options()
+        
+        for key in ('maxIdleTimeMS', 'waitQueueTimeoutMS', 'compressors', 'w', 'event_listeners'):
+            assert key not in options
+
+class TestMonitoringListeners:
+    """Test pool and command metrics collected from pymongo events"""
+    
+    def test_pool_metrics(self):
+        """Test checkout counters and wait times"""
+        from services.db_metrics import PoolMetrics
+        
+        metrics = PoolMetrics()
+        metrics.connection_created(Mock())
+        metrics.connection_checked_out(Mock(duration=0.004))
+        metrics.connection_checked_out(Mock(duration=0.002))
+        metrics.connection_checked_in(Mock())
+        
+        stats = metrics.stats()
+        assert stats['connections_open'] == 1
+        assert stats['checked_out'] == 1
+        assert stats['max_checked_out'] == 2
+        assert stats['avg_checkout_wait_ms'] == 3.0
+        assert stats['max_checkout_wait_ms'] == 4.0
+    
+    def test_command_metrics(self):
+        """Test commands are counted and timed by name"""
+        from services.db_metrics import CommandMetrics
+        
+        metrics = CommandMetrics()
+        metrics.succeeded(Mock(command_name='find', duration_micros=1500))
+        metrics.succeeded(Mock(command_name='find', duration_micros=500))
+        metrics.failed(Mock(command_name='insert', duration_micros=1000))
+        
+        stats = metrics.stats()
+        assert stats['commands']['find'] == {'count': 2, 'total_ms': 2.0, 'avg_ms': 1.0}
+        assert stats['failures'] == 1
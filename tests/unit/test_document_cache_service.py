@@ -0,0 +1,205 @@
+import pytest
+import sys
+import hashlib
+import io
+import json
+import zlib
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+from flask import Flask
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from benchmarks.sample_documents import lecture_pages, make_pdf
+from services.ai_cache_service import DiskCache
+from services import document_service
+from services.cache_service import LRUCache
+from services.document_cache_service import DocumentCacheService, GridFSCache, file_digest
+
+TEXT = '\n\n'.join(f'Section {i}. ' + 'Threads of a process share its memory and need locks. ' * 10
+                   for i in range(30))
+
+
+@pytest.fixture
+def cache():
+    """Document cache in memory"""
+    return DocumentCacheService(enabled=True, backend=LRUCache(100, 60))
+
+
+class TestDocumentCacheService:
+    """Test uploads are extracted once per file content"""
+
+    def test_digest_is_sha256_of_content(self, tmp_path):
+        """Test the key identifies the file by its bytes, not its name"""
+        path = tmp_path / 'slides.pdf'
+        path.write_bytes(b'%PDF-1.4 slides')
+
+        assert file_digest(str(path)) == hashlib.sha256(b'%PDF-1.4 slides').hexdigest()
+
+    def test_repeat_skips_extraction(self, cache):
+        """Test the same file and length is extracted and summarized once"""
+        extract = MagicMock(return_value=TEXT)
+
+        first = cache.content('d1', 3000, extract, 'slides.pdf')
+        second = cache.content('d1', 3000, extract, 'slides.pdf')
+
+        assert first == second and len(first) <= 3000
+        extract.assert_called_once()
+        document = cache.get_document('d1')
+        assert (document['filename'], document['text']) == ('slides.pdf', TEXT)
+
+    def test_new_length_reuses_text(self, cache):
+        """Test another activity type only selects content from the cached text"""
+        extract = MagicMock(return_value=TEXT)
+        cache.content('d1', 3000, extract)
+
+        longer = cache.content('d1', 7500, extract)
+
+        extract.assert_called_once()
+        assert 3000 < len(longer) <= 7500
+
+    def test_unknown_upload_without_extract(self, cache):
+        """Test a file that is not cached gives None when it cannot be extracted"""
+        assert cache.content('missing', 3000) is None
+
+    def test_disabled_always_extracts(self):
+        """Test a disabled cache extracts every time and stores nothing"""
+        cache = DocumentCacheService(enabled=False, backend=LRUCache(100, 60))
+        extract = MagicMock(return_value=TEXT)
+
+        cache.content('d1', 3000, extract)
+        cache.content('d1', 3000, extract)
+
+        assert extract.call_count == 2
+        assert cache.content('d1', 3000) is None
+
+    def test_disk_backend(self, tmp_path):
+        """Test text survives a new service instance when stored on disk"""
+        DocumentCacheService(enabled=True, backend=DiskCache(str(tmp_path), 10, 60)).content(
+            'ab' * 32, 3000, lambda: TEXT, 'slides.pdf')
+
+        cache = DocumentCacheService(enabled=True, backend=DiskCache(str(tmp_path), 10, 60))
+        assert cache.get_document('ab' * 32)['text'] == TEXT
+        assert cache.content('ab' * 32, 3000) is not None
+
+
+class TestGridFSCache:
+    """Test the GridFS-backed cache issues the right operations"""
+
+    @pytest.fixture
+    def db(self):
+        with patch('services.document_cache_service.db_service') as db, \
+             patch('services.document_cache_service.gridfs.GridFSBucket') as bucket:
+            db.bucket = bucket.return_value
+            yield db
+
+    def test_get_skips_expired_and_marks_use(self, db):
+        """Test a lookup only matches unexpired files, refreshes last use and decompresses"""
+        files = db.get_collection.return_value
+        files.find_one_and_update.return_value = {'_id': 'k'}
+        db.bucket.open_download_stream.return_value.read.return_value = zlib.compress(json.dumps({'x': 1}).encode())
+
+        assert GridFSCache(10, 60).get('k') == {'x': 1}
+
+        query, update = files.find_one_and_update.call_args[0]
+        assert db.get_collection.call_args[0][0] == 'document_cache.files'
+        assert query['_id'] == 'k' and '$gt' in query['metadata.expires_at']
+        assert 'metadata.last_used_at' in update['$set']
+
+    def test_missing_file_is_a_miss(self, db):
+        """Test an expired or unknown key is not downloaded"""
+        db.get_collection.return_value.find_one_and_update.return_value = None
+        cache = GridFSCache(10, 60)
+
+        assert cache.get('k') is None
+        db.bucket.open_download_stream.assert_not_called()
+        assert cache.stats()['misses'] == 1
+
+    def test_set_replaces_file(self, db):
+        """Test writes replace an earlier file and record use and expiry"""
+        GridFSCache(10, 60).set('k', {'text': 'threads'})
+
+        db.bucket.delete.assert_called_once_with('k')
+        file_id, filename, data = db.bucket.upload_from_stream_with_id.call_args[0]
+        metadata = db.bucket.upload_from_stream_with_id.call_args[1]['metadata']
+        assert file_id == 'k'
+        assert json.loads(zlib.decompress(data)) == {'text': 'threads'}
+        assert metadata['expires_at'] > metadata['last_used_at']
+
+    def test_evicts_expired_and_least_recently_used(self, db):
+        """Test eviction deletes expired files and the oldest beyond max_entries"""
+        files = db.get_collection.return_value
+        oldest = MagicMock()
+        oldest.sort.return_value.limit.return_value = [{'_id': 'old1'}, {'_id': 'old2'}]
+        files.find.side_effect = [[{'_id': 'expired'}], oldest]
+        files.count_documents.return_value = 6
+
+        assert GridFSCache(max_entries=3, ttl_seconds=60).evict() == 3
+
+        oldest.sort.assert_called_once_with('metadata.last_used_at', 1)
+        oldest.sort.return_value.limit.assert_called_once_with(2)
+        assert [call[0][0] for call in db.bucket.delete.call_args_list] == ['expired', 'old1', 'old2']
+
+
+class TestRegenerateFromUpload:
+    """Test /activity/ai-generate reuses uploads"""
+
+    @pytest.fixture
+    def client(self, cache):
+        from routes.activity_routes import activity_bp
+
+        app = Flask(__name__)
+        app.secret_key = 'test'
+        app.register_blueprint(activity_bp)
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['user_id'] = 't1'
+            session['username'] = 'teacher'
+        with patch('routes.activity_routes.Course.find_by_id', return_value={'teacher_id': 't1'}), \
+             patch('routes.activity_routes.genai_service') as genai, \
+             patch('routes.activity_routes.document_cache_service', cache):
+            genai.generate_activity.return_value = {'title': 'T'}
+            genai.poll_request_count.return_value = 1
+            client.genai = genai
+            yield client
+
+    def generate(self, client, content_source, **fields):
+        data = {'content_source': content_source, 'course_id': 'c1', 'type': 'short_answer', **fields}
+        return client.post('/activity/ai-generate', data=data, content_type='multipart/form-data')
+
+    def test_same_file_extracted_once(self, client):
+        """Test uploading the same file again does not parse it"""
+        pdf = make_pdf(lecture_pages(5, lines_per_page=10))
+
+        with patch.object(document_service, 'extract_text_from_pdf',
+                          wraps=document_service.extract_text_from_pdf) as extract:
+            for name in ('week1.pdf', 'week1 copy.pdf'):
+                response = self.generate(client, 'file', course_file=(io.BytesIO(pdf), name))
+                assert response.get_json()['success']
+
+        assert extract.call_count == 1
+        first, second = [call[0][0] for call in client.genai.generate_activity.call_args_list]
+        assert first == second and first.startswith('Page 1:')
+
+    def test_last_upload(self, client):
+        """Test generating from the last upload without sending the file"""
+        pdf = make_pdf(lecture_pages(5, lines_per_page=10))
+        self.generate(client, 'file', course_file=(io.BytesIO(pdf), 'week1.pdf'))
+
+        with patch('services.document_service.extract_document_content') as extract:
+            response = self.generate(client, 'last_upload', type='poll', num_questions='3')
+
+        assert response.get_json()['success']
+        extract.assert_not_called()
+        assert client.genai.generate_activity.call_args[0][0].startswith('Page 1:')
+        with client.session_transaction() as session:
+            assert session['last_upload']['filename'] == 'week1.pdf'
+
+    def test_last_upload_missing(self, client):
+        """Test a teacher without a cached upload is asked to upload again"""
+        response = self.generate(client, 'last_upload')
+
+        assert response.status_code == 400
+        assert 'upload it again' in response.get_json()['message']
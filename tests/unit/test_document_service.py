@@ -0,0 +1,188 @@
+import pytest
+import sys
+import random
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from benchmarks.sample_documents import lecture_pages, make_pdf
+from services import document_service
+from services.document_service import (OMITTED_MARKER, _drop_repeated_lines, _split_chunks, _terms,
+                                       extract_document_content, summarize_content)
+
+TOPICS = ['mutex', 'semaphore', 'deadlock', 'scheduler', 'paging', 'filesystem', 'socket', 'interrupt',
+          'cache', 'pipeline', 'compiler', 'linker', 'kernel', 'thread', 'process', 'signal']
+
+
+def lecture(pages=80, seed=7):
+    """Lecture notes with a page header on every page and one topic per 5 pages"""
+    rng = random.Random(seed)
+    text = []
+    for page in range(pages):
+        topic = TOPICS[page // 5 % len(TOPICS)]
+        words = [topic, f'{topic}s', 'operating', 'system', 'example', 'when', 'used', 'important']
+        paragraphs = [' '.join(rng.choice(words) for _ in range(40)).capitalize() + '.' for _ in range(3)]
+        text.append(f'COMP3122 Operating Systems lecture notes page {page + 1}\n\n' + '\n\n'.join(paragraphs))
+    return '\n\n'.join(text)
+
+
+@pytest.fixture
+def pdf_path(tmp_path):
+    """A 40-page PDF spooled to a file, as the upload route does"""
+    path = tmp_path / 'lecture.pdf'
+    path.write_bytes(make_pdf(lecture_pages(40, lines_per_page=10)))
+    return str(path)
+
+
+@pytest.fixture
+def process_pool():
+    """Extract with two worker processes, shutting the pool down afterwards"""
+    with patch.object(document_service.Config, 'DOCUMENT_EXTRACTION_WORKERS', 2):
+        yield
+    if document_service._pool is not None:
+        document_service._pool.shutdown(cancel_futures=True)
+        document_service._pool = None
+
+
+class TestExtraction:
+    """Test text extraction from uploaded documents"""
+
+    def test_path_and_bytes_give_same_text(self, pdf_path):
+        """Test a memory-mapped file extracts like its content in memory"""
+        text = extract_document_content('lecture.pdf', pdf_path)
+
+        assert text == extract_document_content('lecture.pdf', Path(pdf_path).read_bytes())
+        assert text.startswith('Page 1: threads') and 'Page 40:' in text
+
+    def test_page_budget(self, pdf_path):
+        """Test pages after max_pages are not read"""
+        text = extract_document_content('lecture.pdf', pdf_path, max_pages=3)
+
+        assert 'Page 3:' in text and 'Page 4:' not in text
+
+    def test_char_budget_stops_early(self, pdf_path):
+        """Test extraction stops at the first page that reaches max_chars"""
+        text = extract_document_content('lecture.pdf', pdf_path, max_chars=2000)
+
+        assert 2000 <= len(text) < 3000
+        assert 'Page 1:' in text and 'Page 10:' not in text
+
+    def test_worker_processes_keep_page_order(self, pdf_path, process_pool):
+        """Test page ranges extracted in worker processes are joined in order"""
+        sequential = extract_document_content('lecture.pdf', Path(pdf_path).read_bytes())
+
+        assert extract_document_content('lecture.pdf', pdf_path) == sequential
+        assert document_service._pool is not None
+
+    def test_worker_processes_respect_char_budget(self, pdf_path, process_pool):
+        """Test ranges after the character budget are not used"""
+        text = extract_document_content('lecture.pdf', pdf_path, max_chars=2000)
+
+        assert text == extract_document_content('lecture.pdf', Path(pdf_path).read_bytes(), max_chars=2000)
+
+    def test_pool_sized_by_config_not_first_document(self):
+        """Test the shared pool gets every configured worker whatever the first upload's length"""
+        with patch.object(document_service, '_pool', None), \
+             patch.object(document_service.Config, 'DOCUMENT_EXTRACTION_WORKERS', 6), \
+             patch.object(document_service, 'ProcessPoolExecutor') as executor:
+            document_service._get_pool()
+
+        assert executor.call_args[1]['max_workers'] == 6
+
+    def test_no_process_pool_falls_back(self, pdf_path, process_pool):
+        """Test hosts without multiprocessing support still extract the document"""
+        with patch.object(document_service, '_get_pool', side_effect=OSError('no /dev/shm')):
+            text = extract_document_content('lecture.pdf', pdf_path)
+
+        assert 'Page 40:' in text
+
+    def test_pptx_slide_budget(self, tmp_path):
+        """Test slides after max_pages are not read"""
+        from pptx import Presentation
+
+        presentation = Presentation()
+        for number in range(1, 6):
+            slide = presentation.slides.add_slide(presentation.slide_layouts[1])
+            slide.shapes.title.text = f'Topic {number}'
+        path = str(tmp_path / 'slides.pptx')
+        presentation.save(path)
+
+        text = extract_document_content('slides.pptx', path, max_pages=2)
+
+        assert '--- Slide 2 ---\nTopic 2' in text and 'Slide 3' not in text
+
+
+class TestSummarizeContent:
+    """Test content selection for AI prompts"""
+
+    def test_short_text_unchanged(self):
+        """Test text within the budget is returned as is"""
+        assert summarize_content('Threads share memory.', 100) == 'Threads share memory.'
+
+    @pytest.mark.parametrize('max_length', [1500, 2500, 10000])
+    def test_fits_budget(self, max_length):
+        """Test the selection never exceeds max_length"""
+        assert len(summarize_content(lecture(), max_length)) <= max_length
+
+    def test_covers_more_topics_than_head_middle_tail(self):
+        """Test picks spread over the document's topics instead of three regions"""
+        summary = summarize_content(lecture(), 3000)
+
+        # Head, middle and tail of this document hold 3 topics
+        covered = [topic for topic in TOPICS if topic in summary]
+        assert len(covered) >= 6
+
+    def test_boilerplate_not_selected(self):
+        """Test a header repeated on every page scores as unimportant"""
+        summary = summarize_content(lecture(), 3000)
+
+        assert summary.count('lecture notes page') <= 1
+
+    def test_document_order_and_gap_markers(self):
+        """Test chunks keep their order and skipped content is marked"""
+        text = ' '.join(_drop_repeated_lines(lecture()).split())
+        summary = summarize_content(lecture(), 3000)
+        parts = [' '.join(part.split()) for part in summary.split('\n\n') if part != OMITTED_MARKER]
+
+        positions = [text.find(part) for part in parts]
+        assert all(position >= 0 for position in positions)
+        assert positions == sorted(positions)
+        assert OMITTED_MARKER in summary
+
+    def test_deterministic(self):
+        """Test the same document always gives the same selection"""
+        assert summarize_content(lecture(), 2500) == summarize_content(lecture(), 2500)
+
+    def test_fast_on_long_documents(self):
+        """Test a 200-page document is handled well within a second"""
+        text = lecture(pages=200)
+
+        started = time.perf_counter()
+        summarize_content(text, 10000)
+
+        assert time.perf_counter() - started < 1.0
+
+    def test_text_without_words_truncated(self):
+        """Test content with nothing to score falls back to truncation"""
+        assert len(summarize_content('1234 5678. ' * 500, 1000)) <= 1000
+
+
+class TestChunking:
+    """Test splitting text into scoreable chunks"""
+
+    def test_chunks_respect_length(self):
+        """Test paragraphs are merged or split to about the chunk length"""
+        text = 'Short one.\n\nShort two.\n\n' + 'A long sentence about threads. ' * 40
+
+        chunks = _split_chunks(text, 200)
+
+        assert chunks[0].startswith('Short one. Short two. A long sentence')
+        assert all(len(chunk) <= 200 for chunk in chunks)
+
+    def test_chinese_terms(self):
+        """Test Chinese text (no spaces) yields character bigrams"""
+        assert _terms('作業系統 threads') == ['作業', '業系', '系統', 'threads']
@@ -0,0 +1,361 @@
+import pytest
+import sys
+from datetime import timedelta
+from pathlib import Path
+from unittest.mock import patch
+from bson import ObjectId
+from flask import Flask
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from models.evaluation_job import EvaluationJob
+from services.evaluation_service import EvaluationService
+from utils.time_utils import get_hk_time
+
+EVALUATION = {'score': 85, 'feedback': 'Good answer'}
+
+
+def make_job(attempts=1, status=EvaluationJob.STATUS_RUNNING, age_seconds=0):
+    """A job document as returned by EvaluationJob.claim"""
+    return {
+        '_id': ObjectId(),
+        'activity_id': 'a1',
+        'response_id': str(ObjectId()),
+        'question': 'What is AI?',
+        'answer': 'Machines that learn',
+        'activity_type': 'short_answer',
+        'status': status,
+        'attempts': attempts,
+        'created_at': get_hk_time() - timedelta(seconds=age_seconds)
+    }
+
+
+@pytest.fixture
+def models():
+    """Patched job and response models used by the service"""
+    with patch('services.evaluation_service.EvaluationJob') as job_model, \
+         patch('services.evaluation_service.Response') as response_model:
+        job_model.STATUS_QUEUED = EvaluationJob.STATUS_QUEUED
+        job_model.STATUS_RUNNING = EvaluationJob.STATUS_RUNNING
+        job_model.STATUS_DONE = EvaluationJob.STATUS_DONE
+        job_model.STATUS_FAILED = EvaluationJob.STATUS_FAILED
+        job_model.MAX_ATTEMPTS = EvaluationJob.MAX_ATTEMPTS
+        yield job_model, response_model
+
+
+class TestEvaluationJobModel:
+    """Test the queue operations issue the right updates"""
+
+    def test_claim_takes_oldest_queued_or_stale_job(self):
+        """Test claim is one atomic update over queued and stale running jobs"""
+        with patch('models.evaluation_job.db_service') as db:
+            EvaluationJob.claim(stale_after_seconds=60)
+
+        collection, query, update = db.find_one_and_update.call_args[0]
+        kwargs = db.find_one_and_update.call_args[1]
+        assert collection == 'evaluation_jobs'
+        assert [branch['status'] for branch in query['$or']] == ['queued', 'running']
+        assert query['attempts'] == {'$lt': EvaluationJob.MAX_ATTEMPTS}
+        assert update['$set']['status'] == 'running'
+        assert update['$inc'] == {'attempts': 1}
+        assert kwargs['sort'] == [('created_at', 1)]
+        assert kwargs['return_after'] is True
+
+    def test_fail_abandoned_matches_stale_jobs_out_of_attempts(self):
+        """Test only stale running jobs that claim will not take again are failed"""
+        with patch('models.evaluation_job.db_service') as db:
+            db.find_one_and_update.side_effect = [{'_id': 'j1'}, None]
+            failed = EvaluationJob.fail_abandoned(stale_after_seconds=60)
+
+        _, query, update = db.find_one_and_update.call_args[0]
+        assert failed == [{'_id': 'j1'}]
+        assert query['status'] == 'running'
+        assert query['attempts'] == {'$gte': EvaluationJob.MAX_ATTEMPTS}
+        assert '$lt' in query['started_at']
+        assert update['$set']['status'] == 'failed'
+
+    def test_set_evaluation_ignores_superseded_job(self):
+        """Test the evaluation is only written while the response still points at the job"""
+        from models.response import Response
+
+        response_id, job_id = ObjectId(), ObjectId()
+        with patch('models.response.db_service') as db:
+            db.update_one.return_value.modified_count = 0
+            assert Response.set_evaluation(str(response_id), job_id, EVALUATION, 'done') is False
+
+        query = db.update_one.call_args[0][1]
+        assert query == {'_id': response_id, 'ai_evaluation_job': str(job_id)}
+
+
+class TestEvaluationService:
+    """Test jobs are run, retried and reported"""
+
+    def test_prepare_marks_response_pending(self):
+        """Test prepare stores the pending status and job ID on the response"""
+        response_data = {'text': 'answer'}
+
+        job_id = EvaluationService.prepare(response_data)
+
+        assert response_data['ai_evaluation_status'] == 'pending'
+        assert response_data['ai_evaluation_job'] == str(job_id)
+        assert response_data['ai_evaluation'] is None
+
+    def test_queue_mode_only_stores_the_job(self, models):
+        """Test queue mode leaves the job for evaluation_worker.py"""
+        job_model, _ = models
+        service = EvaluationService(mode='queue')
+
+        with patch('services.evaluation_service.genai_service') as genai:
+            service.enqueue(ObjectId(), {'_id': 'a1'}, 'r1', 'Q', 'A', 'short_answer')
+
+        assert job_model.create.called
+        genai.evaluate_student_answer.assert_not_called()
+        assert service._executor is None
+
+    def test_enqueue_failure_marks_response_failed(self, models):
+        """Test a job that cannot be stored does not leave the response pending forever"""
+        job_model, response_model = models
+        job_model.create.side_effect = RuntimeError('db down')
+        job_id = ObjectId()
+
+        assert EvaluationService(mode='thread').enqueue(job_id, {'_id': 'a1'}, 'r1', 'Q', 'A', 'short_answer') is None
+
+        response_model.set_evaluation.assert_called_once_with('r1', job_id, None, EvaluationJob.STATUS_FAILED)
+
+    def test_run_success_writes_evaluation(self, models):
+        """Test a successful run writes onto the response and finishes the job"""
+        job_model, response_model = models
+        job = make_job()
+
+        with patch('services.evaluation_service.genai_service') as genai:
+            genai.evaluate_student_answer.return_value = {'success': True, 'evaluation': EVALUATION}
+            assert EvaluationService(mode='queue').run(job) is True
+
+        response_model.set_evaluation.assert_called_once_with(
+            job['response_id'], job['_id'], EVALUATION, EvaluationJob.STATUS_DONE
+        )
+        job_model.finish.assert_called_once_with(job['_id'], evaluation=EVALUATION)
+
+    def test_failed_run_is_retried_then_given_up(self, models):
+        """Test a failure releases the job until MAX_ATTEMPTS, then marks it failed"""
+        job_model, response_model = models
+        service = EvaluationService(mode='queue')
+
+        with patch('services.evaluation_service.genai_service') as genai:
+            genai.evaluate_student_answer.side_effect = TimeoutError('timed out')
+            assert service.run(make_job(attempts=1)) is False
+            assert job_model.release.called
+            response_model.set_evaluation.assert_not_called()
+
+            assert service.run(make_job(attempts=EvaluationJob.MAX_ATTEMPTS)) is True
+
+        assert response_model.set_evaluation.call_args[0][3] == EvaluationJob.STATUS_FAILED
+        assert job_model.finish.call_args[1]['error'] == 'timed out'
+
+    def test_process_retries_until_claim_fails(self, models):
+        """Test process keeps claiming the same job after a failed attempt"""
+        job_model, _ = models
+        job = make_job()
+        job_model.claim.side_effect = [job, dict(job, attempts=2), None]
+        service = EvaluationService(mode='queue')
+
+        with patch.object(service, 'run', side_effect=[False, True]) as run:
+            assert service.process(str(job['_id'])) is True
+
+        assert run.call_count == 2
+        assert job_model.claim.call_args[0][0] == str(job['_id'])
+
+    def test_process_batch_evaluates_activity_jobs_together(self, models):
+        """Test the worker claims jobs of one activity and evaluates them in one batch"""
+        job_model, response_model = models
+        jobs = [make_job(), make_job(), make_job(attempts=EvaluationJob.MAX_ATTEMPTS)]
+        job_model.claim.side_effect = jobs + [None]
+        service = EvaluationService(mode='queue')
+
+        with patch('services.evaluation_service.genai_service') as genai:
+            genai.evaluate_student_answers.return_value = [
+                {'success': True, 'evaluation': EVALUATION},
+                {'success': False, 'evaluation': {}},
+                {'success': True, 'evaluation': EVALUATION},
+            ]
+            assert service.process_batch(limit=5) == 3
+
+        genai.evaluate_student_answers.assert_called_once()
+        assert job_model.claim.call_args[1]['activity_id'] == 'a1'
+        assert job_model.finish.call_count == 2
+        job_model.release.assert_called_once_with(jobs[1]['_id'], 'AI evaluation unavailable')
+
+    def test_status_reports_queue_delay(self, models):
+        """Test polling never runs a job in the polling request by default"""
+        job_model, _ = models
+        job_model.find_by_id.return_value = make_job(status=EvaluationJob.STATUS_QUEUED, age_seconds=60)
+        service = EvaluationService(mode='queue')
+
+        with patch.object(service, 'process') as process:
+            job = service.status('id')
+
+        process.assert_not_called()
+        assert job['status'] == 'queued'
+        assert job['queued_seconds'] >= 60
+
+    def test_status_runs_stale_queued_job_inline_when_enabled(self, models):
+        """Test hosts without a worker can let the poll run a job nobody picked up"""
+        job_model, _ = models
+        queued = make_job(status=EvaluationJob.STATUS_QUEUED, age_seconds=60)
+        done = dict(queued, status=EvaluationJob.STATUS_DONE, evaluation=EVALUATION)
+        job_model.find_by_id.side_effect = [queued, done]
+        service = EvaluationService(mode='queue')
+
+        with patch('services.evaluation_service.Config.AI_EVALUATION_INLINE_AFTER_SECONDS', 10), \
+             patch.object(service, 'process') as process:
+            assert service.status(str(queued['_id']))['status'] == 'done'
+
+        process.assert_called_once_with(str(queued['_id']))
+
+    def test_status_leaves_fresh_job_to_the_worker(self, models):
+        """Test a recently queued job is not run inline"""
+        job_model, _ = models
+        job_model.find_by_id.return_value = make_job(status=EvaluationJob.STATUS_QUEUED)
+        service = EvaluationService(mode='queue')
+
+        with patch('services.evaluation_service.Config.AI_EVALUATION_INLINE_AFTER_SECONDS', 10), \
+             patch.object(service, 'process') as process:
+            assert service.status('id')['status'] == 'queued'
+
+        process.assert_not_called()
+
+    def test_status_fails_job_abandoned_on_last_attempt(self, models):
+        """Test a running job whose worker died on its last attempt ends as failed"""
+        job_model, response_model = models
+        running = make_job(attempts=EvaluationJob.MAX_ATTEMPTS)
+        running['started_at'] = get_hk_time() - timedelta(hours=1)
+        failed = dict(running, status=EvaluationJob.STATUS_FAILED)
+        job_model.find_by_id.side_effect = [running, failed]
+        job_model.fail_abandoned.return_value = [failed]
+
+        assert EvaluationService(mode='queue').status(str(running['_id']))['status'] == 'failed'
+
+        response_model.set_evaluation.assert_called_once_with(
+            running['response_id'], running['_id'], None, EvaluationJob.STATUS_FAILED)
+
+    def test_status_leaves_running_job_with_attempts_left(self, models):
+        """Test a stale job that can still be claimed again is not failed"""
+        job_model, _ = models
+        running = make_job(attempts=1)
+        running['started_at'] = get_hk_time() - timedelta(hours=1)
+        job_model.find_by_id.return_value = running
+
+        assert EvaluationService(mode='queue').status('id')['status'] == 'running'
+        job_model.fail_abandoned.assert_not_called()
+
+
+class TestSubmitRoute:
+    """Test submitting a short answer does not wait for the AI"""
+
+    @pytest.fixture
+    def client(self):
+        from routes.activity_routes import activity_bp
+
+        app = Flask(__name__)
+        app.secret_key = 'test'
+        app.register_blueprint(activity_bp)
+        return app.test_client()
+
+    @staticmethod
+    def log_in(client, user_id, role):
+        """Store a logged-in user in the client's session"""
+        with client.session_transaction() as session:
+            session['user_id'] = user_id
+            session['role'] = role
+
+    def test_submit_returns_status_url(self, client):
+        """Test the response is saved as pending and the job queued after it"""
+        activity_id = str(ObjectId())
+        activity = {'_id': ObjectId(activity_id), 'type': 'short_answer', 'active': True,
+                    'content': {'question': 'What is AI?'}}
+        service = EvaluationService(mode='queue')
+
+        with patch('routes.activity_routes.Activity.find_by_id', return_value=activity), \
+             patch('routes.activity_routes.Activity.is_expired', return_value=False), \
+             patch('routes.activity_routes.Activity.add_response', return_value='r1') as add_response, \
+             patch('routes.activity_routes.PointsService.schedule_refresh') as schedule_refresh, \
+             patch('routes.activity_routes.evaluation_service', service), \
+             patch.object(service, 'enqueue', side_effect=lambda job_id, *args: str(job_id)) as enqueue, \
+             patch('routes.activity_routes.genai_service') as genai:
+            response = client.post(f'/activity/{activity_id}/submit',
+                                   json={'student_id': 's1', 'text': 'Machines that learn'})
+
+        result = response.get_json()
+        assert response.status_code == 201
+        genai.evaluate_student_answer.assert_not_called()
+        saved = add_response.call_args[0][1]
+        assert saved['ai_evaluation_status'] == 'pending'
+        assert result['evaluation_job'] == saved['ai_evaluation_job']
+        assert result['evaluation_status_url'] == f"/activity/{activity_id}/evaluation/{result['evaluation_job']}"
+        assert enqueue.call_args[0][2:] == ('r1', 'What is AI?', 'Machines that learn', 'short_answer')
+        schedule_refresh.assert_called_once()
+
+    def test_submit_reports_failed_enqueue(self, client):
+        """Test a job that could not be queued is reported failed without a status URL"""
+        activity_id = str(ObjectId())
+        activity = {'_id': ObjectId(activity_id), 'type': 'short_answer', 'active': True,
+                    'content': {'question': 'What is AI?'}}
+        service = EvaluationService(mode='queue')
+
+        with patch('routes.activity_routes.Activity.find_by_id', return_value=activity), \
+             patch('routes.activity_routes.Activity.is_expired', return_value=False), \
+             patch('routes.activity_routes.Activity.add_response', return_value='r1'), \
+             patch('routes.activity_routes.PointsService.schedule_refresh'), \
+             patch('routes.activity_routes.evaluation_service', service), \
+             patch.object(service, 'enqueue', return_value=None):
+            response = client.post(f'/activity/{activity_id}/submit',
+                                   json={'student_id': 's1', 'text': 'Machines that learn'})
+
+        result = response.get_json()
+        assert response.status_code == 201
+        assert result['evaluation_status'] == 'failed'
+        assert 'evaluation_status_url' not in result
+
+    def test_status_route_checks_activity(self, client):
+        """Test a job is only reported under its own activity"""
+        job = make_job(status=EvaluationJob.STATUS_DONE)
+        job['evaluation'] = EVALUATION
+        self.log_in(client, 't1', 'teacher')
+
+        with patch('routes.activity_routes.evaluation_service') as service, \
+             patch('routes.activity_routes.Activity.find_by_id', return_value={'teacher_id': 't1'}):
+            service.status.return_value = job
+            done = client.get(f"/activity/a1/evaluation/{job['_id']}")
+            other = client.get(f"/activity/a2/evaluation/{job['_id']}")
+
+        assert done.get_json() == {'success': True, 'status': 'done', 'ai_evaluation': EVALUATION}
+        assert other.status_code == 404
+
+    def test_status_route_requires_access_to_activity(self, client):
+        """Test only the owning teacher and enrolled students can read an evaluation"""
+        job = make_job(status=EvaluationJob.STATUS_DONE)
+        job['evaluation'] = EVALUATION
+        url = f"/activity/a1/evaluation/{job['_id']}"
+        activity = {'teacher_id': 't1', 'course_id': 'c1'}
+
+        with patch('routes.activity_routes.evaluation_service') as service, \
+             patch('routes.activity_routes.Activity.find_by_id', return_value=activity), \
+             patch('routes.activity_routes.User.find_by_id') as find_user:
+            service.status.return_value = job
+            anonymous = client.get(url)
+
+            self.log_in(client, 't2', 'teacher')
+            other_teacher = client.get(url)
+
+            self.log_in(client, 'u1', 'student')
+            find_user.return_value = {'enrolled_courses': ['c2']}
+            outsider = client.get(url)
+            find_user.return_value = {'enrolled_courses': ['c1']}
+            enrolled = client.get(url)
+
+        assert anonymous.status_code == 401
+        assert other_teacher.status_code == 403
+        assert outsider.status_code == 403
+        assert enrolled.status_code == 200
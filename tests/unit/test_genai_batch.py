@@ -0,0 +1,88 @@
+import pytest
+import sys
+import json
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from benchmarks.stub_openai import StubOpenAIClient
+from services.ai_cache_service import AICacheService
+from services.cache_service import LRUCache
+from services.genai_service import GenAIService
+
+QUESTION = 'What is a thread?'
+
+
+@pytest.fixture
+def service():
+    """GenAI service answering from a stub client without latency"""
+    service = GenAIService(cache=AICacheService(enabled=False, backend=LRUCache(10, 60)))
+    service.client = StubOpenAIClient(latency=0, seconds_per_token=0)
+    return service
+
+
+def reply(content):
+    """A chat completion carrying content"""
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content),
+                                                    finish_reason='stop')])
+
+
+class TestBatchEvaluation:
+    """Test many answers share requests and map back to their positions"""
+
+    def test_answers_share_one_request(self, service):
+        """Test a class's answers are evaluated in one call and returned in order"""
+        answers = [f'Answer number {i}' for i in range(10)]
+
+        results = service.evaluate_student_answers(QUESTION, answers)
+
+        assert service.client.calls == 1
+        assert len(results) == 10
+        assert all(result['success'] and result['evaluation']['score'] == 80 for result in results)
+        assert all('id' not in result['evaluation'] for result in results)
+
+    def test_batches_respect_token_budget(self, service):
+        """Test answers are split so each request fits the budget and size limit"""
+        answers = ['word ' * 200 + str(i) for i in range(6)]  # ~250 tokens each
+
+        batches = service._batch_answers(QUESTION, answers, token_budget=1600)
+        assert [len(batch) for batch in batches] == [2, 2, 2]
+        assert sum(batches, []) == answers
+
+        assert [len(b) for b in service._batch_answers(QUESTION, answers, max_batch_size=4)] == [4, 2]
+
+    def test_identical_answers_evaluated_once(self, service):
+        """Test duplicate answers are sent once and each position gets its own copy"""
+        results = service.evaluate_student_answers(QUESTION, ['cpu', 'memory', 'cpu '], 'word_cloud')
+
+        assert service.client.calls == 1
+        assert results[0] == results[2]
+        assert results[0]['evaluation'] is not results[2]['evaluation']
+
+    def test_missing_evaluation_falls_back_to_single_call(self, service):
+        """Test an answer left out of the batch reply is evaluated on its own"""
+        single = json.dumps({'score': 60, 'feedback': 'ok'})
+        batch = json.dumps({'evaluations': [{'id': 0, 'score': 90}, {'id': 1, 'feedback': 'no score'}]})
+
+        with patch.object(service.client.chat.completions, 'create',
+                          side_effect=[reply(batch), reply(single), reply(single)]) as create:
+            results = service.evaluate_student_answers(QUESTION, ['a', 'b', 'c'])
+
+        assert create.call_count == 3
+        assert create.call_args_list[0][1]['response_format'] == {'type': 'json_object'}
+        assert [result['evaluation']['score'] for result in results] == [90, 60, 60]
+
+    def test_unparseable_batch_falls_back_for_all(self, service):
+        """Test a reply that is not JSON makes every answer of the batch fall back"""
+        single = json.dumps({'score': 70})
+
+        with patch.object(service.client.chat.completions, 'create',
+                          side_effect=[reply('Sorry, I cannot help'), reply(single), reply(single)]) as create:
+            results = service.evaluate_student_answers(QUESTION, ['a', 'b'])
+
+        assert create.call_count == 3
+        assert all(result['evaluation']['score'] == 70 for result in results)
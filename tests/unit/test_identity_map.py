@@ -0,0 +1,110 @@
+import pytest
+import sys
+from pathlib import Path
+from unittest.mock import patch, MagicMock
+from bson import ObjectId
+from flask import Flask
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from benchmarks.fake_db import FakeDatabaseService
+from models.course import Course
+from models.user import User
+from services.cache_service import CacheService
+from services.identity_map import current_identity_map
+
+
+@pytest.fixture(autouse=True)
+def no_process_cache():
+    """Disable the process-level cache so only the identity map is tested"""
+    disabled = CacheService(enabled=False)
+    with patch('models.course.cache_service', disabled), \
+         patch('models.user.cache_service', disabled):
+        yield
+
+
+@pytest.fixture
+def app():
+    """Minimal Flask app providing a request context"""
+    return Flask(__name__)
+
+
+@pytest.fixture
+def fake_db():
+    """Fake database with one course and its teacher"""
+    teacher = {'_id': ObjectId(), 'username': 'teacher1', 'role': 'teacher'}
+    course = {'_id': ObjectId(), 'name': 'Course', 'code': 'C1', 'teacher_id': str(teacher['_id'])}
+    return FakeDatabaseService({'courses': [course], 'users': [teacher]}, latency=0)
+
+
+class TestIdentityMap:
+    """Test request-scoped caching of find_by_id lookups"""
+
+    def test_repeated_lookup_hits_database_once(self, app, fake_db):
+        """Test the second lookup of the same course is served from the map"""
+        course_id = str(fake_db.collections['courses'][0]['_id'])
+
+        with app.test_request_context('/'), patch('models.course.db_service', fake_db):
+            first = Course.find_by_id(course_id)
+            second = Course.find_by_id(course_id)
+            stats = current_identity_map().stats()
+
+        assert first == second
+        assert fake_db.round_trips == 1
+        assert stats['hits'] == 1
+        assert stats['misses'] == 1
+
+    def test_returned_documents_are_copies(self, app, fake_db):
+        """Test changes a route makes to a document do not leak into later lookups"""
+        course_id = str(fake_db.collections['courses'][0]['_id'])
+
+        with app.test_request_context('/'), patch('models.course.db_service', fake_db):
+            course = Course.find_by_id(course_id)
+            course['_id'] = str(course['_id'])
+            course['activity_count'] = 3
+
+            again = Course.find_by_id(course_id)
+
+        assert isinstance(again['_id'], ObjectId)
+        assert 'activity_count' not in again
+
+    def test_batch_lookup_reuses_map(self, app, fake_db):
+        """Test find_many_by_ids only queries IDs not already loaded"""
+        teacher_id = fake_db.collections['users'][0]['_id']
+
+        with app.test_request_context('/'), patch('models.user.db_service', fake_db):
+            User.find_by_id(str(teacher_id))
+            found = User.find_many_by_ids([str(teacher_id)])
+
+        assert str(teacher_id) in found
+        assert fake_db.round_trips == 1
+
+    def test_update_invalidates(self, app):
+        """Test updating a course drops it from the map"""
+        course_id = ObjectId()
+        mock_db = MagicMock()
+        mock_db.find_one.return_value = {'_id': course_id, 'name': 'Old'}
+        mock_db.update_one.return_value.modified_count = 1
+
+        with app.test_request_context('/'), patch('models.course.db_service', mock_db):
+            Course.find_by_id(str(course_id))
+            Course.update_course(str(course_id), {'name': 'New'})
+            Course.find_by_id(str(course_id))
+
+        assert mock_db.find_one.call_count == 2
+
+    def test_maps_are_per_request(self, app, fake_db):
+        """Test a new request starts with an empty map"""
+        course_id = str(fake_db.collections['courses'][0]['_id'])
+
+        with patch('models.course.db_service', fake_db):
+            with app.test_request_context('/'):
+                Course.find_by_id(course_id)
+            with app.test_request_context('/'):
+                Course.find_by_id(course_id)
+            # No app context (scripts, migrations): always goes to the database
+            Course.find_by_id(course_id)
+
+        assert fake_db.round_trips == 3
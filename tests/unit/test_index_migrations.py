@@ -0,0 +1,324 @@
+import pytest
+import sys
+import uuid
+from pathlib import Path
+from unittest.mock import patch
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from services.cache_service import CacheService
+from services.index_migrations import (
+    IndexMigrator, IndexSpec, INDEXES, RETIRED_INDEXES, SCHEMA_VERSION, backing_index
+)
+from models.activity import Activity
+from models.course import Course
+from models.points_ledger import PointsLedger
+from models.response import Response
+from models.student import Student
+from models.user import User
+
+ACTIVITY_ID = '64b000000000000000000001'
+COURSE_ID = '64b000000000000000000002'
+USER_ID = '64b000000000000000000003'
+
+
+class FakeCollection:
+    """Collection stand-in that only keeps index definitions and one migration record"""
+
+    def __init__(self):
+        self.indexes = {'_id_': {'name': '_id_', 'key': {'_id': 1}}}
+        self.documents = {}
+        self.fail_on = set()
+
+    def list_indexes(self):
+        return list(self.indexes.values())
+
+    def create_index(self, keys, name, unique=False, expireAfterSeconds=None):
+        if name in self.fail_on:
+            raise Exception('E11000 duplicate key error')
+        index = {'name': name, 'key': dict(keys)}
+        if unique:
+            index['unique'] = True
+        if expireAfterSeconds is not None:
+            index['expireAfterSeconds'] = expireAfterSeconds
+        self.indexes[name] = index
+
+    def drop_index(self, name):
+        del self.indexes[name]
+
+    def find_one(self, query):
+        return self.documents.get(query['_id'])
+
+    def update_one(self, query, update, upsert=False):
+        self.documents.setdefault(query['_id'], {'_id': query['_id']}).update(update['$set'])
+
+
+class FakeDatabase(dict):
+    """Database stand-in creating collections on first access"""
+
+    def __missing__(self, name):
+        self[name] = FakeCollection()
+        return self[name]
+
+
+def version_1_database():
+    """A database with the indexes the app used to create on connect"""
+    db = FakeDatabase()
+    for collection, keys, unique in [
+        ('users', [('username', 1)], True),
+        ('users', [('email', 1)], False),
+        ('courses', [('code', 1)], False),
+        ('courses', [('teacher_id', 1)], False),
+        ('activities', [('course_id', 1)], False),
+        ('activities', [('teacher_id', 1)], False),
+        ('activities', [('link', 1)], True),
+        ('students', [('course_id', 1)], False),
+        ('students', [('student_id', 1)], False),
+    ]:
+        spec = IndexSpec(collection, keys, unique=unique)
+        db[collection].create_index(spec.keys, name=spec.name, unique=unique)
+    return db
+
+
+class TestIndexMigrator:
+    """Test diffing and applying the declared indexes"""
+
+    def test_spec_uses_mongodb_default_name(self):
+        """Test declared names match the names MongoDB generates"""
+        spec = IndexSpec('activities', [('course_id', 1), ('active', 1), ('created_at', -1)])
+        assert spec.name == 'course_id_1_active_1_created_at_-1'
+
+    def test_diff_from_version_1(self):
+        """Test missing and retired indexes are reported"""
+        diff = IndexMigrator(version_1_database()).diff()
+
+        missing = {f"{spec.collection}.{spec.name}" for spec in diff['missing']}
+        assert 'activities.course_id_1_active_1_created_at_-1' in missing
+        assert 'students.student_id_1_course_id_1' in missing
+        assert 'users.username_1' not in missing
+        assert set(diff['retired']) == {
+            (collection, name) for collection, names in RETIRED_INDEXES.items() for name in names
+        }
+        assert diff['applied_version'] == 0
+
+    def test_apply_is_idempotent(self):
+        """Test a second apply changes nothing and the version is recorded"""
+        db = version_1_database()
+        migrator = IndexMigrator(db)
+
+        first = migrator.apply()
+        second = migrator.apply()
+
+        assert first['errors'] == {}
+        assert len(first['created']) == len(INDEXES) - 4
+        assert 'activities.course_id_1' in first['dropped']
+        assert second['created'] == second['dropped'] == second['rebuilt'] == []
+        assert migrator.applied_version() == SCHEMA_VERSION
+
+        diff = migrator.diff()
+        assert diff['missing'] == diff['changed'] == diff['retired'] == []
+
+    def test_changed_options_are_rebuilt(self):
+        """Test an index with the declared keys but wrong uniqueness is recreated"""
+        db = FakeDatabase()
+        db['students'].create_index([('student_id', 1), ('course_id', 1)], name='student_id_1_course_id_1')
+
+        result = IndexMigrator(db).apply()
+
+        assert 'students.student_id_1_course_id_1' in result['rebuilt']
+        assert db['students'].indexes['student_id_1_course_id_1']['unique'] is True
+
+    def test_failed_create_keeps_retired_indexes(self):
+        """Test nothing is dropped and no version is recorded when a create fails"""
+        db = version_1_database()
+        db['students'].fail_on.add('student_id_1_course_id_1')
+        migrator = IndexMigrator(db)
+
+        result = migrator.apply()
+
+        assert 'students.student_id_1_course_id_1' in result['errors']
+        assert result['dropped'] == []
+        assert 'course_id_1' in db['activities'].indexes
+        assert migrator.applied_version() == 0
+
+    def test_undeclared_indexes_are_kept_by_default(self):
+        """Test indexes added by hand survive unless drop_undeclared is set"""
+        db = FakeDatabase()
+        db['users'].create_index([('nickname', 1)], name='nickname_1')
+        migrator = IndexMigrator(db)
+
+        migrator.apply()
+        assert 'nickname_1' in db['users'].indexes
+
+        result = migrator.apply(drop_undeclared=True)
+        assert result['dropped'] == ['users.nickname_1']
+
+    def test_dotted_collection_names(self):
+        """Test GridFS bucket collections (names with dots) are diffed and dropped correctly"""
+        db = FakeDatabase()
+        # As created by GridFS on first upload, plus one added by hand
+        db['document_cache.files'].create_index([('filename', 1), ('uploadDate', 1)], name='filename_1_uploadDate_1')
+        db['document_cache.chunks'].create_index([('files_id', 1), ('n', 1)], name='files_id_1_n_1', unique=True)
+        db['document_cache.files'].create_index([('length', 1)], name='length_1')
+        migrator = IndexMigrator(db)
+
+        assert migrator.diff()['undeclared'] == [('document_cache.files', 'length_1')]
+
+        result = migrator.apply(drop_undeclared=True)
+
+        assert result['errors'] == {}
+        assert result['dropped'] == ['document_cache.files.length_1']
+        assert 'filename_1_uploadDate_1' in db['document_cache.files'].indexes
+        assert 'files_id_1_n_1' in db['document_cache.chunks'].indexes
+        assert migrator.applied_version() == SCHEMA_VERSION
+
+
+class QueryRecorder:
+    """DatabaseService stand-in recording the filter and sort of every read"""
+
+    def __init__(self):
+        self.queries = []
+
+    def find_one(self, collection_name, query, projection=None):
+        self.queries.append((collection_name, query, None))
+        return None
+
+    def find_many(self, collection_name, query, sort=None, limit=None, projection=None, skip=None):
+        self.queries.append((collection_name, query, sort))
+        return []
+
+    def count_documents(self, collection_name, query=None):
+        self.queries.append((collection_name, query or {}, None))
+        return 0
+
+    def aggregate(self, collection_name, pipeline):
+        self.queries.append((collection_name, pipeline[0]['$match'], None))
+        return []
+
+
+# Every model finder that serves a page or API request
+FINDERS = {
+    'Activity.find_by_id': lambda: Activity.find_by_id(ACTIVITY_ID),
+    'Activity.find_by_link': lambda: Activity.find_by_link('abc123'),
+    'Activity.find_by_course': lambda: Activity.find_by_course(COURSE_ID),
+    'Activity.find_by_courses': lambda: Activity.find_by_courses([COURSE_ID]),
+    'Activity.find_summaries_by_course': lambda: Activity.find_summaries_by_course(COURSE_ID),
+    'Activity.count_by_course': lambda: Activity.count_by_course(COURSE_ID),
+    'Activity.count_by_courses': lambda: Activity.count_by_courses([COURSE_ID]),
+    'Activity.find_by_teacher': lambda: Activity.find_by_teacher(USER_ID),
+    'Activity.find_summaries_by_teacher': lambda: Activity.find_summaries_by_teacher(USER_ID),
+    'Activity.count_all': Activity.count_all,
+    'Activity.count_by_type': lambda: Activity.count_by_type('poll'),
+    'Course.find_by_id': lambda: Course.find_by_id(COURSE_ID),
+    'Course.find_many_by_ids': lambda: Course.find_many_by_ids([COURSE_ID]),
+    'Course.find_by_teacher': lambda: Course.find_by_teacher(USER_ID),
+    'Course.count_by_teacher': lambda: Course.count_by_teacher(USER_ID),
+    'Course.count_by_teachers': lambda: Course.count_by_teachers([USER_ID]),
+    'Course.find_by_code': lambda: Course.find_by_code('CS101'),
+    'Course.get_all': Course.get_all,
+    'Course.find_all': lambda: Course.find_all(skip=0, limit=50),
+    'Response.find_by_activity': lambda: Response.find_by_activity(ACTIVITY_ID),
+    'Response.find_by_activities': lambda: Response.find_by_activities([ACTIVITY_ID]),
+    'Response.find_for_student': lambda: Response.find_for_student(ACTIVITY_ID, 'S001'),
+    'Response.find_by_student': lambda: Response.find_by_student([ACTIVITY_ID], ['S001', 'Alice']),
+    'Response.count_by_activity': lambda: Response.count_by_activity(ACTIVITY_ID),
+    'Student.find_by_student_id': lambda: Student.find_by_student_id('S001', COURSE_ID),
+    'Student.find_by_course': lambda: Student.find_by_course(COURSE_ID),
+    'Student.count_by_course': lambda: Student.count_by_course(COURSE_ID),
+    'Student.count_by_courses': lambda: Student.count_by_courses([COURSE_ID]),
+    'User.find_by_username': lambda: User.find_by_username('teacher_demo'),
+    'User.find_by_id': lambda: User.find_by_id(USER_ID),
+    'User.find_many_by_ids': lambda: User.find_many_by_ids([USER_ID]),
+    'User.find_by_email': lambda: User.find_by_email('teacher@demo.com'),
+    'User.get_all_teachers': User.get_all_teachers,
+    'User.get_recent_teachers': User.get_recent_teachers,
+    'User.find_by_student_id': lambda: User.find_by_student_id('S001'),
+    'User.count_teachers': User.count_teachers,
+    'PointsLedger.find_entries': lambda: PointsLedger.find_entries('S001', COURSE_ID),
+    'PointsLedger.find_by_course': lambda: PointsLedger.find_by_course(COURSE_ID),
+    'PointsLedger.count_above': lambda: PointsLedger.count_above(COURSE_ID, 10),
+}
+
+
+def record_queries(finder):
+    """Run a finder against a QueryRecorder and return the queries it issued"""
+    recorder = QueryRecorder()
+    with patch('models.activity.db_service', recorder), \
+         patch('models.course.db_service', recorder), \
+         patch('models.response.db_service', recorder), \
+         patch('models.student.db_service', recorder), \
+         patch('models.user.db_service', recorder), \
+         patch('models.points_ledger.db_service', recorder):
+        finder()
+    return recorder.queries
+
+
+@pytest.fixture(autouse=True)
+def no_process_cache():
+    """Make sure finders always reach the (recording) database"""
+    with patch('models.activity.cache_service', CacheService(enabled=False)), \
+         patch('models.course.cache_service', CacheService(enabled=False)), \
+         patch('models.user.cache_service', CacheService(enabled=False)):
+        yield
+
+
+class TestFindersAreIndexed:
+    """Test every model finder's query can use a declared index"""
+
+    @pytest.mark.parametrize('name', sorted(FINDERS))
+    def test_finder_has_backing_index(self, name):
+        """Test the filter (or sort) starts with the first field of a declared index"""
+        queries = record_queries(FINDERS[name])
+
+        assert queries, f"{name} issued no query"
+        for collection, query, sort in queries:
+            assert backing_index(collection, query, sort), \
+                f"{name}: no index for {collection} {query} sort={sort}"
+
+
+def plan_stages(plan):
+    """Collect stage names from an explain() winning plan"""
+    stages = [plan.get('stage')]
+    for child in plan.get('inputStages', []) + [plan.get('inputStage', {})]:
+        if child:
+            stages.extend(plan_stages(child))
+    if 'queryPlan' in plan:
+        stages.extend(plan_stages(plan['queryPlan']))
+    return stages
+
+
+@pytest.fixture(scope='module')
+def migrated_db():
+    """A scratch database on the configured MongoDB with the declared indexes"""
+    from pymongo import MongoClient
+    from config import Config
+
+    client = MongoClient(Config.MONGODB_URI, serverSelectionTimeoutMS=500)
+    try:
+        client.admin.command('ping')
+    except Exception as e:
+        pytest.skip(f"MongoDB not available: {e}")
+
+    db = client[f"index_check_{uuid.uuid4().hex[:8]}"]
+    IndexMigrator(db).apply()
+    yield db
+    client.drop_database(db.name)
+    client.close()
+
+
+class TestExplainPlans:
+    """Test finder queries use an index scan on a real MongoDB (skipped without one)"""
+
+    @pytest.mark.parametrize('name', sorted(FINDERS))
+    def test_finder_avoids_collection_scan(self, migrated_db, name):
+        """Test explain() picks an index for every query the finder issues"""
+        for collection, query, sort in record_queries(FINDERS[name]):
+            cursor = migrated_db[collection].find(query)
+            if sort:
+                cursor = cursor.sort(sort)
+            winning_plan = cursor.explain()['queryPlanner']['winningPlan']
+
+            stages = plan_stages(winning_plan)
+            assert 'COLLSCAN' not in stages, f"{name}: {collection} {query} -> {stages}"
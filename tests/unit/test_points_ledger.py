@@ -0,0 +1,161 @@
+import pytest
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from models.points_ledger import PointsLedger
+
+
+def legacy_points(activities, student_identifier):
+    """Original full-scan calculation, used as the reference"""
+    total = 0
+    for activity in activities:
+        responses = activity.get('responses', [])
+        for response in responses:
+            if response.get('student_id') == student_identifier:
+                total += PointsLedger.score_response(
+                    activity.get('type'), response, responses.index(response)
+                )['total']
+    return total
+
+
+class TestScoreResponse:
+    """Test points for a single response"""
+    
+    def test_poll_correct_and_early(self):
+        """Test poll response with correct answer among first submissions"""
+        points = PointsLedger.score_response('poll', {'is_correct': True}, 0)
+        assert points['poll_responses'] == 10
+        assert points['correct_answers'] == 30
+        assert points['early_submissions'] == 5
+        assert points['total'] == 45
+    
+    def test_late_short_answer_with_feedback(self):
+        """Test short answer outside the early window with feedback"""
+        points = PointsLedger.score_response('short_answer', {'feedback': 'Nice'}, 7)
+        assert points['short_answer_responses'] == 20
+        assert points['early_submissions'] == 0
+        assert points['feedback_received'] == 5
+        assert points['total'] == 25
+
+
+class TestLedgerUpdates:
+    """Test ledger $inc updates"""
+    
+    def test_record_response_increments(self):
+        """Test a new response is credited with activities_completed"""
+        with patch('models.points_ledger.db_service') as mock_db:
+            PointsLedger.record_response(
+                {'type': 'word_cloud', 'course_id': 'c1'},
+                {'student_id': 's1', 'student_name': 'Amy'},
+                2
+            )
+            query, update = mock_db.update_one.call_args[0][1:]
+            assert query == {'student_id': 's1', 'course_id': 'c1'}
+            assert update['$inc']['word_cloud_responses'] == 15
+            assert update['$inc']['total'] == 20
+            assert update['$inc']['activities_completed'] == 1
+            assert mock_db.update_one.call_args[1]['upsert'] is True
+    
+    def test_record_update_applies_only_delta(self):
+        """Test feedback on an existing response adds only feedback points"""
+        with patch('models.points_ledger.db_service') as mock_db:
+            response = {'student_id': 's1', 'student_name': 'Amy'}
+            PointsLedger.record_update(
+                {'type': 'short_answer', 'course_id': 'c1'},
+                response,
+                {**response, 'feedback': 'Good'},
+                0
+            )
+            increments = mock_db.update_one.call_args[0][2]['$inc']
+            assert increments['feedback_received'] == 5
+            assert increments['total'] == 5
+            assert increments['short_answer_responses'] == 0
+    
+    def test_unchanged_response_skips_write(self):
+        """Test no database write when points do not change"""
+        with patch('models.points_ledger.db_service') as mock_db:
+            response = {'student_id': 's1', 'text': 'old'}
+            PointsLedger.record_update(
+                {'type': 'short_answer', 'course_id': 'c1'},
+                response,
+                {**response, 'text': 'new'},
+                0
+            )
+            mock_db.update_one.assert_not_called()
+
+
+class TestLedgerRebuild:
+    """Test rebuilding the ledger from activities"""
+    
+    def test_rebuild_matches_full_scan(self):
+        """Test rebuilt totals match the original full-scan calculation"""
+        activities = [
+            {
+                '_id': 'a1',
+                'type': 'poll',
+                'course_id': 'c1',
+                'responses': [{'student_id': f's{i}', 'is_correct': i % 2 == 0} for i in range(8)]
+            },
+            {
+                '_id': 'a2',
+                'type': 'short_answer',
+                'course_id': 'c1',
+                'responses': [{'student_id': 's7', 'feedback': 'ok'}, {'student_id': 's1'}]
+            }
+        ]
+        
+        stored = [{k: v for k, v in a.items() if k != 'responses'} for a in activities]
+        grouped = {a['_id']: a['responses'] for a in activities}
+        enrolled = [{'student_id': f's{i}', 'course_id': 'c1'} for i in range(8)]
+        
+        with patch('models.points_ledger.db_service') as mock_db, \
+             patch('models.response.Response.find_by_activities', return_value=grouped):
+            mock_db.find_many.side_effect = [enrolled, stored]
+            count = PointsLedger.rebuild()
+            operations = mock_db.get_collection.return_value.bulk_write.call_args[0][0]
+            documents = [op._doc for op in operations]
+        
+        assert count == 8
+        by_student = {doc['student_id']: doc for doc in documents}
+        for student_id, doc in by_student.items():
+            assert doc['total'] == legacy_points(activities, student_id)
+        assert by_student['s7']['activities_completed'] == 2
+        assert by_student['s0']['activities_completed'] == 1
+    
+    def test_rebuild_skips_students_who_left(self):
+        """Test responses of students no longer enrolled get no ledger entry"""
+        activity = {'_id': 'a1', 'type': 'poll', 'course_id': 'c1'}
+        grouped = {'a1': [{'student_id': 's1'}, {'student_id': 'gone'}]}
+        
+        with patch('models.points_ledger.db_service') as mock_db, \
+             patch('models.response.Response.find_by_activities', return_value=grouped):
+            mock_db.find_many.side_effect = [[{'student_id': 's1', 'course_id': 'c1'}], [activity]]
+            count = PointsLedger.rebuild()
+            operations = mock_db.get_collection.return_value.bulk_write.call_args[0][0]
+            documents = [op._doc for op in operations]
+        
+        assert count == 1
+        assert [doc['student_id'] for doc in documents] == ['s1']
+    
+    def test_rebuild_replaces_entries_in_place(self):
+        """Test the ledger is never emptied: entries are upserted, then stale ones removed"""
+        activity = {'_id': 'a1', 'type': 'poll', 'course_id': 'c1'}
+        grouped = {'a1': [{'student_id': 's1'}]}
+        
+        with patch('models.points_ledger.db_service') as mock_db, \
+             patch('models.response.Response.find_by_activities', return_value=grouped):
+            mock_db.find_many.side_effect = [[{'student_id': 's1', 'course_id': 'c1'}], [activity]]
+            PointsLedger.rebuild()
+            collection = mock_db.get_collection.return_value
+        
+        operation = collection.bulk_write.call_args[0][0][0]
+        assert operation._filter == {'student_id': 's1', 'course_id': 'c1'}
+        assert operation._upsert is True
+        collection.insert_many.assert_not_called()
+        stale = collection.delete_many.call_args[0][0]
+        assert stale == {'updated_at': {'$lt': operation._doc['updated_at']}}
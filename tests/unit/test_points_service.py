@@ -0,0 +1,239 @@
+import pytest
+import sys
+from pathlib import Path
+from unittest.mock import patch
+from bson import ObjectId
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from services.cache_service import CacheService
+from services.points_service import PointsService
+from models.student import Student
+from models.points_ledger import PointsLedger
+
+
+@pytest.fixture(autouse=True)
+def no_leaderboard_cache():
+    """Compute leaderboards on every call so each test sees its own data"""
+    with patch('services.points_service.cache_service', CacheService(enabled=False)):
+        yield
+
+
+class TestCourseLeaderboard:
+    """Test course leaderboard built from the points ledger"""
+    
+    def test_leaderboard_ranks_from_ledger(self):
+        """Test ranks, breakdown and activity counts come from one ledger query"""
+        students = [
+            {'_id': 1, 'student_id': 's1', 'name': 'Amy'},
+            {'_id': 2, 'student_id': 's2', 'name': 'Ben'},
+            {'_id': 3, 'student_id': 's3', 'name': 'Cat'}
+        ]
+        ledger = [
+            {'student_id': 's1', 'course_id': 'c1', 'poll_responses': 10, 'total': 15,
+             'early_submissions': 5, 'activities_completed': 1},
+            {'student_id': 's2', 'course_id': 'c1', 'short_answer_responses': 40, 'total': 40,
+             'activities_completed': 2}
+        ]
+        
+        with patch('models.student.db_service') as student_db, \
+             patch('models.points_ledger.db_service') as ledger_db:
+            student_db.find_many.return_value = students
+            ledger_db.find_many.return_value = ledger
+            leaderboard = PointsService.get_course_leaderboard('c1')
+            
+            assert ledger_db.find_many.call_count == 1
+        
+        assert [e['student_id'] for e in leaderboard] == ['s2', 's1', 's3']
+        assert [e['rank'] for e in leaderboard] == [1, 2, 3]
+        assert leaderboard[0]['points_breakdown']['short_answer_responses'] == 40
+        assert leaderboard[0]['activities_completed'] == 2
+        assert leaderboard[2]['points'] == 0
+        assert leaderboard[2]['activities_completed'] == 0
+    
+    def test_tied_students_share_rank(self):
+        """Test the leaderboard ranks ties like get_student_rank does"""
+        leaderboard = PointsService.assign_ranks([
+            {'student_id': 's1', 'points': 20},
+            {'student_id': 's2', 'points': 40},
+            {'student_id': 's3', 'points': 20},
+            {'student_id': 's4', 'points': 0}
+        ])
+        
+        assert [(e['student_id'], e['rank']) for e in leaderboard] == [
+            ('s2', 1), ('s1', 2), ('s3', 2), ('s4', 4)
+        ]
+
+
+class TestGlobalLeaderboardSnapshot:
+    """Test the materialized global leaderboard"""
+    
+    def test_fresh_snapshot_is_not_recomputed(self):
+        """Test a recent snapshot is served without touching the ledger"""
+        from utils.time_utils import get_hk_time
+        snapshot = {
+            '_id': 'global',
+            'entries': [{'student_id': 's1', 'rank': 1, 'points': 50}],
+            'ranks': [['s1', 1, 50], ['s2', 2, 10]],
+            'total_students': 2,
+            'updated_at': get_hk_time()
+        }
+        
+        with patch('services.points_service.db_service') as mock_db, \
+             patch('models.points_ledger.db_service') as ledger_db:
+            mock_db.find_one.return_value = snapshot
+            result = PointsService.get_global_leaderboard_snapshot(max_age=60)
+            
+            ledger_db.find_many.assert_not_called()
+            mock_db.update_one.assert_not_called()
+        
+        assert result is snapshot
+        assert PointsService.get_global_rank(result, 's2') == {'rank': 2, 'points': 10}
+        assert PointsService.get_global_rank(result, 's9')['rank'] is None
+    
+    def test_missing_snapshot_is_materialized(self):
+        """Test a missing snapshot is computed from the ledger and stored"""
+        students = [
+            {'student_id': 's1', 'name': 'Amy'},
+            {'student_id': 's1', 'name': 'Amy'},
+            {'student_id': 's2', 'name': 'Ben'}
+        ]
+        ledger = [
+            {'student_id': 's2', 'course_id': 'c1', 'total': 30, 'activities_completed': 2},
+            {'student_id': 's2', 'course_id': 'c2', 'total': 15, 'activities_completed': 1},
+            {'student_id': 's1', 'course_id': 'c1', 'total': 20, 'activities_completed': 1}
+        ]
+        
+        with patch('services.points_service.db_service') as mock_db, \
+             patch('models.points_ledger.db_service') as ledger_db:
+            mock_db.find_one.return_value = None
+            mock_db.find_many.return_value = students
+            ledger_db.find_many.return_value = ledger
+            result = PointsService.get_global_leaderboard_snapshot()
+            
+            stored = mock_db.update_one.call_args[0][2]['$set']
+        
+        assert stored['ranks'] == [['s2', 1, 45], ['s1', 2, 20]]
+        assert stored['total_students'] == 2
+        assert result['entries'][0]['activities_completed'] == 3
+
+
+    def test_stale_snapshot_served_while_another_refreshes(self):
+        """Test concurrent stale reads do not all rebuild the snapshot"""
+        from datetime import timedelta
+        from utils.time_utils import get_hk_time
+        stale = {'_id': 'global', 'entries': [], 'ranks': [['s1', 1, 50]], 'total_students': 1,
+                 'updated_at': get_hk_time() - timedelta(minutes=5)}
+        
+        with patch('services.points_service.db_service') as mock_db, \
+             patch('models.points_ledger.db_service') as ledger_db:
+            mock_db.find_one.return_value = stale
+            with PointsService._refresh_lock:
+                result = PointsService.get_global_leaderboard_snapshot(max_age=60)
+            
+            ledger_db.find_many.assert_not_called()
+        
+        assert result is stale
+        assert PointsService.get_global_rank(result, 's1') == {'rank': 1, 'points': 50}
+    
+    def test_refresh_claimed_by_another_worker(self):
+        """Test a worker that loses the refresh lease keeps the stale snapshot"""
+        from pymongo.errors import DuplicateKeyError
+        
+        with patch('services.points_service.db_service') as mock_db, \
+             patch('models.points_ledger.db_service') as ledger_db:
+            mock_db.get_collection.return_value.find_one_and_update.side_effect = DuplicateKeyError('dup')
+            
+            assert PointsService.refresh_if_due(60) is None
+            
+            ledger_db.find_many.assert_not_called()
+            query = mock_db.get_collection.return_value.find_one_and_update.call_args[0][0]
+            assert '$gt' in query['updated_at']['$not']
+    
+    def test_submissions_schedule_one_refresh(self):
+        """Test submissions refresh the snapshot in the background at most once per interval"""
+        with patch.object(PointsService, '_last_scheduled', float('-inf')), \
+             patch('services.points_service.threading.Thread') as thread:
+            PointsService.schedule_refresh()
+            PointsService.schedule_refresh()
+        
+        thread.assert_called_once()
+        thread.return_value.start.assert_called_once()
+
+
+class TestCourseLeaderboardCache:
+    """Test the cached course leaderboard follows ledger updates"""
+    
+    def test_ledger_update_invalidates_course_leaderboard(self):
+        """Test a student sees their new rank right after submitting"""
+        students = [{'_id': 1, 'student_id': 's1', 'name': 'Amy'}]
+        cache = CacheService(enabled=True, max_entries=10, ttl_seconds=60)
+        
+        with patch('services.points_service.cache_service', cache), \
+             patch('models.student.db_service') as student_db, \
+             patch('models.points_ledger.db_service') as ledger_db:
+            student_db.find_many.return_value = students
+            ledger_db.find_many.return_value = []
+            assert PointsService.get_course_leaderboard('c1', limit=1)[0]['points'] == 0
+            
+            ledger_db.find_many.return_value = [{'student_id': 's1', 'course_id': 'c1', 'total': 10}]
+            assert PointsService.get_course_leaderboard('c1')[0]['points'] == 0
+            
+            PointsLedger.record_response(
+                {'type': 'poll', 'course_id': 'c1'}, {'student_id': 's1', 'student_name': 'Amy'}, 9
+            )
+            
+            assert PointsService.get_course_leaderboard('c1')[0]['points'] == 10
+
+
+class TestStudentRank:
+    """Test rank lookup without building the leaderboard"""
+    
+    def test_rank_from_count_of_higher_totals(self):
+        """Test rank, total and percentile come from indexed counts"""
+        with patch('models.student.db_service') as student_db, \
+             patch('models.points_ledger.db_service') as ledger_db:
+            student_db.count_documents.return_value = 40
+            student_db.find_one.return_value = {'student_id': 's1', 'course_id': 'c1'}
+            ledger_db.find_many.return_value = [{'student_id': 's1', 'course_id': 'c1', 'total': 55}]
+            ledger_db.count_documents.return_value = 3
+            
+            rank = PointsService.get_student_rank('s1', 'c1')
+            
+            ledger_db.count_documents.assert_called_once_with(
+                'points_ledger', {'course_id': 'c1', 'total': {'$gt': 55}}
+            )
+            student_db.find_many.assert_not_called()
+        
+        assert rank == {'rank': 4, 'total_students': 40, 'points': 55, 'percentile': 92.5}
+    
+    def test_unenrolled_student_has_no_rank(self):
+        """Test a student outside the course is not ranked"""
+        with patch('models.student.db_service') as student_db, \
+             patch('models.points_ledger.db_service') as ledger_db:
+            student_db.count_documents.return_value = 12
+            student_db.find_one.return_value = None
+            
+            rank = PointsService.get_student_rank('s9', 'c1')
+            
+            ledger_db.count_documents.assert_not_called()
+        
+        assert rank['rank'] is None
+        assert rank['total_students'] == 12
+    
+    def test_unenroll_removes_ledger_entry(self):
+        """Test a student who leaves a course no longer counts toward its ranks"""
+        student_id = ObjectId()
+        
+        with patch('models.student.db_service') as student_db, \
+             patch('models.points_ledger.db_service') as ledger_db:
+            student_db.find_one.return_value = {'_id': student_id, 'student_id': 's1', 'course_id': 'c1'}
+            student_db.delete_one.return_value.deleted_count = 1
+            
+            assert Student.unenroll(str(student_id), 'c1')
+            
+            ledger_db.delete_many.assert_called_once_with(
+                'points_ledger', {'student_id': 's1', 'course_id': 'c1'}
+            )
@@ -0,0 +1,153 @@
+import pytest
+import sys
+import logging
+from pathlib import Path
+from unittest.mock import Mock, patch
+from flask import Flask
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from services.query_profiler import QueryProfiler, add_headers, query_shape, command_filter
+
+
+def run_command(profiler, command_name, command, reply, duration_ms, request_id=1):
+    """Feed one started/succeeded event pair to the profiler"""
+    profiler.started(Mock(command_name=command_name, command=command,
+                          connection_id=('localhost', 27017), request_id=request_id))
+    profiler.succeeded(Mock(command_name=command_name, reply=reply,
+                            duration_micros=int(duration_ms * 1000),
+                            connection_id=('localhost', 27017), request_id=request_id))
+
+
+def find_reply(count):
+    """A find reply with count documents in the first batch"""
+    return {'cursor': {'id': 0, 'ns': 'db.courses', 'firstBatch': [{'_id': i} for i in range(count)]}, 'ok': 1}
+
+
+@pytest.fixture
+def profiler():
+    """A fresh profiler installed as the global one, with profiling enabled"""
+    fresh = QueryProfiler()
+    with patch('services.query_profiler.query_profiler', fresh), \
+         patch('services.query_profiler.Config.DB_PROFILING', True), \
+         patch('services.query_profiler.Config.DB_PROFILER_HEADERS', True):
+        yield fresh
+
+
+@pytest.fixture
+def app(profiler):
+    """Flask app with the profiler's after_request hook and a route issuing queries"""
+    app = Flask(__name__)
+    app.after_request(add_headers)
+
+    @app.route('/courses')
+    def courses():
+        for i in range(3):
+            run_command(profiler, 'find', {'find': 'courses', 'filter': {'_id': f'id{i}'}}, find_reply(1), 2.0, i)
+        return 'ok'
+
+    @app.route('/static-page')
+    def static_page():
+        return 'ok'
+
+    return app
+
+
+class TestQueryShape:
+    """Test filters are reduced to their shape"""
+
+    def test_values_replaced(self):
+        """Test values become '?' while fields and operators stay"""
+        shape = query_shape({'course_id': {'$in': ['a', 'b']}, 'active': True,
+                             '$or': [{'student_id': 'S1'}, {'student_name': 'Ann'}]})
+
+        assert shape == {'course_id': {'$in': '?'}, 'active': '?',
+                         '$or': [{'student_id': '?'}, {'student_name': '?'}]}
+
+    def test_command_filters(self):
+        """Test the filter is found for the commands the models issue"""
+        assert command_filter('find', {'find': 'c', 'filter': {'a': 1}}) == {'a': 1}
+        assert command_filter('update', {'update': 'c', 'updates': [{'q': {'b': 1}}]}) == {'b': 1}
+        assert command_filter('aggregate', {'aggregate': 'c', 'pipeline': [{'$match': {'c': 1}}]}) == {'c': 1}
+        assert command_filter('insert', {'insert': 'c', 'documents': []}) is None
+
+
+class TestRequestProfile:
+    """Test per-request totals and headers"""
+
+    def test_headers_report_queries(self, app, profiler):
+        """Test X-DB-Queries and Server-Timing describe the request's queries"""
+        response = app.test_client().get('/courses')
+
+        assert response.headers['X-DB-Queries'] == '3'
+        assert response.headers['Server-Timing'] == 'db;dur=6.0;desc="3 queries, 3 docs"'
+
+        recent = profiler.stats()['recent_requests'][0]
+        assert recent['path'] == '/courses'
+        assert recent['documents'] == 3
+        assert recent['bytes'] > 0
+        assert recent['top_shapes'] == [{'shape': 'find courses {"_id": "?"}', 'count': 3}]
+
+    def test_headers_off_by_default(self):
+        """Test public responses carry no query headers unless enabled"""
+        from config import Config
+
+        assert Config.DB_PROFILING is False and Config.DB_PROFILER_HEADERS is False
+        app = Flask(__name__)
+        app.after_request(add_headers)
+        app.route('/')(lambda: 'ok')
+
+        assert 'X-DB-Queries' not in app.test_client().get('/').headers
+
+    def test_reply_not_encoded_without_profiling(self):
+        """Test reply sizes are only measured when profiling is enabled"""
+        profiler = QueryProfiler()
+
+        with patch('services.query_profiler.bson.encode') as encode, \
+             patch('services.query_profiler.Config.SLOW_QUERY_MS', 0):
+            run_command(profiler, 'find', {'find': 'courses', 'filter': {}}, find_reply(1), 1.0)
+
+        encode.assert_not_called()
+        assert profiler.stats()['slow_queries'][0]['documents'] == 1
+
+    def test_request_without_queries(self, app, profiler):
+        """Test requests without queries report zero and are not kept in the history"""
+        response = app.test_client().get('/static-page')
+
+        assert response.headers['X-DB-Queries'] == '0'
+        assert profiler.stats()['recent_requests'] == []
+
+    def test_repeated_shape_warns(self, app, caplog):
+        """Test a shape repeated past REPEATED_QUERY_WARN is logged as a possible N+1"""
+        with patch('services.query_profiler.Config.REPEATED_QUERY_WARN', 3), \
+             caplog.at_level(logging.WARNING, logger='services.query_profiler'):
+            app.test_client().get('/courses')
+
+        assert 'possible N+1' in caplog.text
+
+    def test_housekeeping_commands_ignored(self, profiler):
+        """Test driver commands like ping are not counted"""
+        run_command(profiler, 'ping', {'ping': 1}, {'ok': 1}, 500.0)
+
+        assert profiler.stats()['slow_queries'] == []
+
+
+class TestSlowQueryLog:
+    """Test queries over SLOW_QUERY_MS are logged with their shape"""
+
+    def test_slow_query_logged(self, profiler, caplog):
+        """Test a slow query is logged and kept outside a request too"""
+        with patch('services.query_profiler.Config.SLOW_QUERY_MS', 50), \
+             caplog.at_level(logging.WARNING, logger='services.query_profiler'):
+            run_command(profiler, 'find', {'find': 'activities', 'filter': {'course_id': 'c1', 'active': True}},
+                        find_reply(40), 120.0)
+            run_command(profiler, 'find', {'find': 'activities', 'filter': {'link': 'x'}},
+                        find_reply(1), 5.0, request_id=2)
+
+        slow = profiler.stats()['slow_queries']
+        assert len(slow) == 1
+        assert slow[0]['query'] == 'find activities {"course_id": "?", "active": "?"}'
+        assert slow[0]['documents'] == 40
+        assert 'Slow query (120.0 ms, 40 docs)' in caplog.text
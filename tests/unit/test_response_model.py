@@ -0,0 +1,181 @@
+import pytest
+import sys
+from pathlib import Path
+from unittest.mock import patch, MagicMock
+from bson import ObjectId
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from models.activity import Activity
+from models.response import Response
+
+
+class TestResponseCollection:
+    """Test responses stored outside the activity document"""
+    
+    def test_add_response_inserts_document(self):
+        """Test add_response upserts by student, then reserves a position"""
+        activity_id = ObjectId()
+        
+        with patch('models.activity.db_service') as activity_db, \
+             patch('models.response.db_service') as response_db, \
+             patch('models.points_ledger.db_service') as ledger_db:
+            response_db.find_one_and_update.return_value = None
+            response_db.update_one.return_value.modified_count = 1
+            activity_db.find_one_and_update.return_value = {
+                '_id': activity_id, 'type': 'poll', 'course_id': 'c1', 'response_count': 4
+            }
+            
+            response_id = Activity.add_response(str(activity_id), {'student_id': 's1', 'student_name': 'Amy'})
+            
+            query, update = response_db.find_one_and_update.call_args[0][1:]
+            assert query == {'activity_id': str(activity_id), 'student_id': 's1'}
+            assert update['$set']['student_name'] == 'Amy'
+            assert response_db.find_one_and_update.call_args[1]['upsert'] is True
+            assert response_id == str(update['$setOnInsert']['_id'])
+            
+            pipeline = activity_db.find_one_and_update.call_args[0][2]
+            count = pipeline[0]['$set']['response_count']
+            assert count['$add'][0] == {
+                '$ifNull': ['$response_count', {'$size': {'$ifNull': ['$responses', []]}}]
+            }
+            assert activity_db.find_one_and_update.call_args[1]['return_after'] is True
+            
+            update = response_db.update_one.call_args[0][2]
+            assert update['$set'] == {'course_id': 'c1', 'position': 3}
+            assert ledger_db.update_one.call_args[0][2]['$inc']['activities_completed'] == 1
+    
+    def test_add_response_again_replaces_without_crediting(self):
+        """Test a student's second submission replaces the first and is not counted twice"""
+        activity_id = ObjectId()
+        previous = {'_id': ObjectId(), 'student_id': 's1', 'student_name': 'Amy', 'position': 7}
+        
+        with patch('models.activity.db_service') as activity_db, \
+             patch('models.response.db_service') as response_db, \
+             patch('models.points_ledger.db_service') as ledger_db:
+            response_db.find_one_and_update.return_value = previous
+            activity_db.find_one.return_value = {'_id': activity_id, 'type': 'poll', 'course_id': 'c1'}
+            
+            response_id = Activity.add_response(str(activity_id), {'student_id': 's1', 'student_name': 'Amy'})
+            
+            assert response_id == str(previous['_id'])
+            activity_db.find_one_and_update.assert_not_called()
+            ledger_db.update_one.assert_not_called()
+    
+    def test_attach_responses_uses_one_query(self):
+        """Test responses for many activities are loaded with a single $in query"""
+        activities = [{'_id': ObjectId()}, {'_id': ObjectId()}]
+        first_id = str(activities[0]['_id'])
+        
+        with patch('models.response.db_service') as response_db:
+            response_db.find_many.return_value = [
+                {'_id': ObjectId(), 'activity_id': first_id, 'student_id': 's1', 'position': 0}
+            ]
+            Activity.attach_responses(activities)
+            
+            assert response_db.find_many.call_count == 1
+            query = response_db.find_many.call_args[0][1]
+            assert len(query['activity_id']['$in']) == 2
+        
+        assert activities[0]['responses'] == [
+            {'activity_id': first_id, 'student_id': 's1', 'position': 0}
+        ]
+        assert activities[1]['responses'] == []
+    
+    def test_feedback_updates_response_document(self):
+        """Test feedback is written to the response document, not the activity"""
+        activity_id = ObjectId()
+        response_id = ObjectId()
+        
+        with patch('models.activity.db_service') as activity_db, \
+             patch('models.response.db_service') as response_db, \
+             patch('models.points_ledger.db_service') as ledger_db:
+            activity_db.find_one.return_value = {'_id': activity_id, 'type': 'short_answer', 'course_id': 'c1'}
+            response_db.find_many.return_value = [
+                {'_id': response_id, 'student_id': 's1', 'position': 0}
+            ]
+            response_db.update_one.return_value.modified_count = 1
+            
+            assert Activity.add_feedback_to_response(str(activity_id), 's1', 'Well done')
+            
+            query, update = response_db.update_one.call_args[0][1:]
+            assert query == {'_id': response_id}
+            assert update['$set']['feedback'] == 'Well done'
+            assert ledger_db.update_one.call_args[0][2]['$inc']['feedback_received'] == 5
+
+
+class TestStudentResponseLookup:
+    """Test fetching one student's responses across many activities"""
+    
+    def test_find_by_student_uses_one_query(self):
+        """Test the lookup is a single $in query keyed by activity and student"""
+        activity_ids = [str(ObjectId()) for _ in range(3)]
+        
+        with patch('models.response.db_service') as mock_db:
+            mock_db.find_many.return_value = [
+                {'_id': ObjectId(), 'activity_id': activity_ids[0], 'student_id': 's1', 'position': 0},
+                {'_id': ObjectId(), 'activity_id': activity_ids[0], 'student_id': 's1', 'position': 4},
+                {'_id': ObjectId(), 'activity_id': activity_ids[2], 'student_name': 'Amy', 'position': 1}
+            ]
+            
+            found = Response.find_by_student(activity_ids, ['s1', 'Amy', None])
+            
+            assert mock_db.find_many.call_count == 1
+            query = mock_db.find_many.call_args[0][1]
+            assert query['activity_id'] == {'$in': activity_ids}
+            assert {'student_id': {'$in': ['s1', 'Amy']}} in query['$or']
+            assert found[activity_ids[0]]['position'] == 0
+            assert activity_ids[1] not in found
+            assert '_id' not in found[activity_ids[2]]
+    
+    def test_find_by_student_without_identifiers_skips_query(self):
+        """Test a student with no identifiers never matches anonymous responses"""
+        with patch('models.response.db_service') as mock_db:
+            assert Response.find_by_student([str(ObjectId())], [None, '']) == {}
+            mock_db.find_many.assert_not_called()
+    
+    def test_attach_student_responses(self):
+        """Test each activity gets the student's response or None"""
+        answered, unanswered = {'_id': ObjectId()}, {'_id': ObjectId()}
+        
+        with patch('models.response.db_service') as mock_db:
+            mock_db.find_many.return_value = [
+                {'activity_id': str(answered['_id']), 'student_id': 's1', 'position': 0}
+            ]
+            
+            Activity.attach_student_responses([answered, unanswered], ['s1'])
+        
+        assert answered['student_response']['student_id'] == 's1'
+        assert unanswered['student_response'] is None
+
+
+class TestMigrateEmbeddedResponses:
+    """Test migrate_responses_to_collection keeps responses submitted after the deploy"""
+    
+    def test_migration_upserts_and_counts(self):
+        """Test copies are upserted by student without deleting, keeping the count"""
+        from migrate_responses_to_collection import migrate_activity
+        
+        activity_id = ObjectId()
+        activity = {'_id': activity_id, 'course_id': 'c1',
+                    'responses': [{'student_id': 's1'}, {'student_id': 's2'}, {'student_id': 's1'}]}
+        
+        with patch('migrate_responses_to_collection.db_service') as db:
+            collection = db.get_collection.return_value
+            collection.bulk_write.return_value.upserted_count = 2
+            
+            assert migrate_activity(activity) == 2
+        
+        collection.delete_many.assert_not_called()
+        operations = collection.bulk_write.call_args[0][0]
+        assert [op._filter for op in operations] == [
+            {'activity_id': str(activity_id), 'student_id': student_id}
+            for student_id in ('s1', 's2', 's1')
+        ]
+        assert all(op._upsert and '$setOnInsert' in op._doc for op in operations)
+        assert [op._doc['$setOnInsert']['position'] for op in operations] == [0, 1, 2]
+        assert collection.bulk_write.call_args[1]['ordered'] is True
+        update = db.update_one.call_args[0][2]
+        assert update['$max'] == {'response_count': 3}
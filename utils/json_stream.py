@@ -0,0 +1,134 @@
+"""
+JSON Stream Utilities
+Incremental parsing of a JSON object that arrives in pieces (e.g. a streamed
+model reply), reporting its top-level fields and the elements of its
+top-level arrays as soon as each one is complete
+"""
+
+import json
+
+class JSONObjectStream:
+    """
+    Incremental parser for one JSON object
+    Text before the object (such as a Markdown code fence) and after it is
+    ignored. feed() returns events for values completed by the new text:
+        ('item', key, value)   an element of the array under a top-level key
+        ('field', key, value)  a top-level field (arrays included, once closed)
+    Values that are not valid JSON are skipped; the full reply should still
+    be parsed with json.loads once complete.
+    """
+
+    def __init__(self):
+        """Initialize an empty parser"""
+        self._text = ''
+        self._pos = 0
+        # Open containers: [kind ('{' or '['), key, expecting_key, value_start]
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._string_is_key = False
+        self._string_start = 0
+        self.done = False
+
+    @property
+    def text(self):
+        """All the text fed so far"""
+        return self._text
+
+    def feed(self, chunk):
+        """
+        Parse the next piece of text
+
+        Args:
+            chunk (str): Text following what was fed before
+
+        Returns:
+            list: Events for values completed by this chunk
+        """
+        self._text += chunk
+        events = []
+        text = self._text
+        stack = self._stack
+
+        for i in range(self._pos, len(text)):
+            c = text[i]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == '\\':
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    frame = stack[-1]
+                    if self._string_is_key:
+                        frame[1] = self._decode(text[self._string_start:i + 1])
+                    else:
+                        self._complete(frame, i + 1, events)
+                continue
+
+            if not stack:
+                if c == '{' and not self.done:
+                    stack.append(['{', None, True, None])
+                continue
+
+            frame = stack[-1]
+            if c == '"':
+                self._in_string = True
+                self._string_start = i
+                self._string_is_key = frame[0] == '{' and frame[2]
+                if not self._string_is_key and frame[3] is None:
+                    frame[3] = i
+            elif c in '{[':
+                if frame[3] is None:
+                    frame[3] = i
+                stack.append([c, None, c == '{', None])
+            elif c in '}]':
+                self._complete_scalar(frame, i, events)
+                stack.pop()
+                if stack:
+                    self._complete(stack[-1], i + 1, events)
+                else:
+                    self.done = True
+            elif c == ',':
+                self._complete_scalar(frame, i, events)
+                if frame[0] == '{':
+                    frame[2] = True
+            elif c == ':':
+                frame[2] = False
+            elif not c.isspace() and frame[3] is None:
+                frame[3] = i
+
+        self._pos = len(text)
+        return events
+
+    def _complete_scalar(self, frame, end, events):
+        """Complete a number, true, false or null ended by a delimiter"""
+        if frame[3] is not None:
+            self._complete(frame, end, events)
+
+    def _complete(self, frame, end, events):
+        """Report the value ending at end in the innermost container, if wanted"""
+        start, frame[3] = frame[3], None
+        depth = len(self._stack) - 1
+        if start is None or depth > 1:
+            return
+        if depth == 0:
+            event = ('field', frame[1])
+        elif frame[0] == '[':
+            event = ('item', self._stack[0][1])
+        else:
+            return
+        try:
+            value = json.loads(self._text[start:end])
+        except json.JSONDecodeError:
+            return
+        events.append(event + (value,))
+
+    @staticmethod
+    def _decode(token):
+        """Decode a JSON string token (None if it is malformed)"""
+        try:
+            return json.loads(token)
+        except json.JSONDecodeError:
+            return None